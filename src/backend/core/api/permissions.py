@@ -119,3 +119,13 @@ class IsStorageEventEnabled(permissions.BasePermission):
     def has_permission(self, request, view):
         """Determine if access is allowed based on settings."""
         return settings.RECORDING_STORAGE_EVENT_ENABLE
+
+
+class IsLiveKitEventEnabled(permissions.BasePermission):
+    """Check if the LiveKit event feature is enabled."""
+
+    message = "Access denied, LiveKit event is disabled."
+
+    def has_permission(self, request, view):
+        """Determine if access is allowed based on settings."""
+        return settings.RECORDING_LIVEKIT_EVENT_ENABLE
@@ -119,8 +119,12 @@ class RoomSerializer(serializers.ModelSerializer):
         is_admin = models.RoleChoices.check_administrator_role(role)
 
         if role is not None:
+            # Use accesses prefetched by `ResourceQuerySet.with_user_role` if available
+            accesses = getattr(instance, "prefetched_accesses", None)
+            if accesses is None:
+                accesses = instance.accesses.select_related("resource", "user").all()
             access_serializer = NestedResourceAccessSerializer(
-                instance.accesses.select_related("resource", "user").all(),
+                accesses,
                 context=self.context,
                 many=True,
             )
@@ -177,3 +181,21 @@ class StartRecordingSerializer(serializers.Serializer):
     def update(self, instance, validated_data):
         """Not implemented as this is a validation-only serializer."""
         raise NotImplementedError("StartRecordingSerializer is validation-only")
+
+
+class StopRecordingsSerializer(serializers.Serializer):
+    """Validate bulk stop recordings requests."""
+
+    ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+    def create(self, validated_data):
+        """Not implemented as this is a validation-only serializer."""
+        raise NotImplementedError("StopRecordingsSerializer is validation-only")
+
+    def update(self, instance, validated_data):
+        """Not implemented as this is a validation-only serializer."""
+        raise NotImplementedError("StopRecordingsSerializer is validation-only")
@@ -1,9 +1,12 @@
 """API endpoints"""
 
+import time
 import uuid
+from functools import partial
 from logging import getLogger
 
 from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
 from django.http import Http404
 from django.shortcuts import get_object_or_404
@@ -25,25 +28,22 @@ from rest_framework import (
     status as drf_status,
 )
 
-from core import models, utils
-from core.recording.event.authentication import StorageEventAuthentication
+from core import models, room_cache, tasks, utils
+from core.recording.event import livekit as livekit_events
+from core.recording.event.authentication import (
+    LiveKitEventAuthentication,
+    StorageEventAuthentication,
+)
 from core.recording.event.exceptions import (
     InvalidBucketError,
+    InvalidFilepathError,
     InvalidFileTypeError,
     ParsingEventDataError,
 )
 from core.recording.event.notification import notification_service
 from core.recording.event.parsers import get_parser
-from core.recording.worker.exceptions import (
-    RecordingStartError,
-    RecordingStopError,
-)
-from core.recording.worker.factories import (
-    get_worker_service,
-)
-from core.recording.worker.mediator import (
-    WorkerServiceMediator,
-)
+from core.recording.worker.factories import records_tracks
+from core.recording.worker.mediator import stop_recordings
 
 from . import permissions, serializers
 
@@ -192,41 +192,86 @@ class RoomViewSet(
     queryset = models.Room.objects.all()
     serializer_class = serializers.RoomSerializer
 
+    def get_queryset(self):
+        """Resolve the role of the logged-in user along with the room on detail views."""
+        queryset = super().get_queryset()
+        if self.action == "list":
+            return queryset
+        return queryset.with_user_role(self.request.user)
+
     def get_object(self):
-        """Allow getting a room by its slug."""
+        """Allow getting a room by its slug.
+
+        Anonymous users retrieve rooms from the room cache, if it is shared by all
+        processes so that changes to a room are seen by all of them. Others get the
+        room along with their role in a single query, which the cache would not save.
+        """
         try:
             uuid.UUID(self.kwargs["pk"])
             filter_kwargs = {"pk": self.kwargs["pk"]}
         except ValueError:
             filter_kwargs = {"slug": slugify(self.kwargs["pk"])}
-        queryset = self.filter_queryset(self.get_queryset())
-        obj = get_object_or_404(queryset, **filter_kwargs)
+
+        if (
+            self.action == "retrieve"
+            and not self.request.user.is_authenticated
+            and room_cache.is_cache_shared()
+        ):
+            try:
+                obj = room_cache.get_room(**filter_kwargs)
+            except models.Room.DoesNotExist as e:
+                raise Http404("No Room matches the given query.") from e
+        else:
+            queryset = self.filter_queryset(self.get_queryset())
+            obj = get_object_or_404(queryset, **filter_kwargs)
         # May raise a permission denied
         self.check_object_permissions(self.request, obj)
         return obj
 
+    def get_unregistered_room_data(self):
+        """Return a null id and the livekit room and token of an unregistered room."""
+        slug = slugify(self.kwargs["pk"])
+        username = self.request.query_params.get("username", None)
+        return {
+            "id": None,
+            "livekit": {
+                "url": settings.LIVEKIT_CONFIGURATION["url"],
+                "room": slug,
+                "token": utils.generate_token(
+                    room=slug, user=self.request.user, username=username
+                ),
+            },
+        }
+
+    def is_unregistered_slug(self):
+        """
+        Tell without any database query if the room is looked up by a slug that
+        is surely not registered, according to the filter of registered slugs.
+        """
+        if not (
+            settings.ALLOW_UNREGISTERED_ROOMS and settings.ROOM_UNREGISTERED_FAST_PATH
+        ):
+            return False
+        try:
+            uuid.UUID(self.kwargs["pk"])
+        except ValueError:
+            return not room_cache.registered_slugs.may_exist(slugify(self.kwargs["pk"]))
+        return False
+
     def retrieve(self, request, *args, **kwargs):
         """
         Allow unregistered rooms when activated.
         For unregistered rooms we only return a null id and the livekit room and token.
         """
+        if self.is_unregistered_slug():
+            return drf_response.Response(self.get_unregistered_room_data())
+
         try:
             instance = self.get_object()
         except Http404:
             if not settings.ALLOW_UNREGISTERED_ROOMS:
                 raise
-            slug = slugify(self.kwargs["pk"])
-            username = request.query_params.get("username", None)
-            data = {
-                "id": None,
-                "livekit": {
-                    "url": settings.LIVEKIT_CONFIGURATION["url"],
-                    "room": slug,
-                    "token": utils.generate_token(
-                        room=slug, user=request.user, username=username
-                    ),
-                },
-            }
+            data = self.get_unregistered_room_data()
         else:
             data = self.get_serializer(instance).data
 
@@ -289,20 +334,16 @@ class RoomViewSet(
             user=self.request.user, role=models.RoleChoices.OWNER, recording=recording
         )
 
-        worker_service = get_worker_service(mode=recording.mode)
-        worker_manager = WorkerServiceMediator(worker_service=worker_service)
-
-        try:
-            worker_manager.start(recording)
-        except RecordingStartError:
-            return drf_response.Response(
-                {"error": f"Recording failed to start for room {room.slug}"},
-                status=drf_status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        # The worker is called asynchronously, once the recording is committed
+        transaction.on_commit(partial(tasks.start_recording.delay, str(recording.id)))
 
         return drf_response.Response(
-            {"message": f"Recording successfully started for room {room.slug}"},
-            status=drf_status.HTTP_201_CREATED,
+            {
+                "message": f"Recording initiated for room {room.slug}",
+                "id": str(recording.id),
+                "status": recording.status,
+            },
+            status=drf_status.HTTP_202_ACCEPTED,
         )
 
     @decorators.action(
@@ -320,27 +361,28 @@ class RoomViewSet(
         room = self.get_object()
 
         try:
+            # Recordings are started asynchronously, and may not be active yet
             recording = models.Recording.objects.get(
-                room=room, status=models.RecordingStatusChoices.ACTIVE
+                room=room,
+                status__in=[
+                    models.RecordingStatusChoices.ACTIVE,
+                    models.RecordingStatusChoices.INITIATED,
+                ],
             )
         except models.Recording.DoesNotExist as e:
             raise drf_exceptions.NotFound(
                 "No active recording found for this room."
             ) from e
 
-        worker_service = get_worker_service(mode=recording.mode)
-        worker_manager = WorkerServiceMediator(worker_service=worker_service)
-
-        try:
-            worker_manager.stop(recording)
-        except RecordingStopError:
-            return drf_response.Response(
-                {"error": f"Recording failed to stop for room {room.slug}"},
-                status=drf_status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        transaction.on_commit(partial(tasks.stop_recording.delay, str(recording.id)))
 
         return drf_response.Response(
-            {"message": f"Recording stopped for room {room.slug}."}
+            {
+                "message": f"Recording stopping for room {room.slug}.",
+                "id": str(recording.id),
+                "status": recording.status,
+            },
+            status=drf_status.HTTP_202_ACCEPTED,
         )
 
 
@@ -412,6 +454,81 @@ class RecordingViewSet(
             .filter(Q(accesses__user=user) | Q(accesses__team__in=user.get_teams()))
         )
 
+    @decorators.action(
+        detail=False,
+        methods=["post"],
+        url_path="stop",
+        permission_classes=[
+            permissions.IsAuthenticated,
+            permissions.IsRecordingEnabled,
+        ],
+    )
+    def stop_recordings(self, request, pk=None):  # pylint: disable=unused-argument
+        """Stop several recordings at once and report the outcome of each of them."""
+
+        serializer = serializers.StopRecordingsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data["ids"]))
+
+        user = request.user
+        recordings = list(
+            models.Recording.objects.filter(
+                Q(accesses__user=user) | Q(accesses__team__in=user.get_teams()),
+                id__in=ids,
+                status=models.RecordingStatusChoices.ACTIVE,
+                accesses__role__in=[
+                    models.RoleChoices.OWNER,
+                    models.RoleChoices.ADMIN,
+                ],
+            ).distinct()
+        )
+
+        start = time.perf_counter()
+        outcomes = {
+            outcome.recording.id: outcome for outcome in stop_recordings(recordings)
+        }
+        duration = time.perf_counter() - start
+
+        results = []
+        for recording_id in ids:
+            outcome = outcomes.get(recording_id)
+            results.append(
+                {
+                    "id": str(recording_id),
+                    "status": outcome.status,
+                    "error": outcome.error,
+                }
+                if outcome
+                else {
+                    "id": str(recording_id),
+                    "status": None,
+                    "error": "No active recording found.",
+                }
+            )
+
+        return drf_response.Response({"results": results, "duration": duration})
+
+    @decorators.action(
+        detail=False,
+        methods=["post"],
+        url_path="livekit-hook",
+        authentication_classes=[LiveKitEventAuthentication],
+        permission_classes=[permissions.IsLiveKitEventEnabled],
+    )
+    def on_livekit_event_received(self, request, pk=None):  # pylint: disable=unused-argument
+        """Update recordings from incoming LiveKit egress events."""
+
+        try:
+            # The signed raw body is parsed, LiveKit sending it as application/webhook+json
+            event = livekit_events.parse_event(request.body)
+            updated = livekit_events.handle_event(event)
+        except ParsingEventDataError as e:
+            raise drf_exceptions.ParseError(f"Invalid request data: {e}") from e
+
+        return drf_response.Response(
+            {"message": "Event processed.", "updated": updated},
+        )
+
     @decorators.action(
         detail=False,
         methods=["post"],
@@ -438,6 +555,12 @@ class RecordingViewSet(
                 {"message": f"Ignore this file type, {e}"},
             )
 
+        # Participants' tracks are stored next to recordings, and notified with them
+        except InvalidFilepathError as e:
+            return drf_response.Response(
+                {"message": f"Ignore this file, {e}"},
+            )
+
         try:
             recording = models.Recording.objects.get(id=recording_id)
         except models.Recording.DoesNotExist as e:
@@ -449,6 +572,18 @@ class RecordingViewSet(
                 " in an error state or has already been saved."
             )
 
+        # Participants' tracks may still be uploading, the last of them or the
+        # recording notifies external services from a task
+        if records_tracks(recording.mode):
+            recording.status = models.RecordingStatusChoices.SAVED
+            recording.save()
+            transaction.on_commit(
+                partial(tasks.notify_recording.delay, str(recording.id))
+            )
+            return drf_response.Response(
+                {"message": "Event processed."},
+            )
+
         # Attempt to notify external services about the recording
         # This is a non-blocking operation - failures are logged but don't interrupt the flow
         notification_succeeded = notification_service.notify_external_services(
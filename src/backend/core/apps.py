@@ -1,11 +1,17 @@
 """Meet Core application"""
-# from django.apps import AppConfig
-# from django.utils.translation import gettext_lazy as _
 
+from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
 
-# class CoreConfig(AppConfig):
-#     """Configuration class for the Meet core app."""
 
-#     name = "core"
-#     app_label = "core"
-#     verbose_name = _("meet core application")
+class CoreConfig(AppConfig):
+    """Configuration class for the Meet core app."""
+
+    name = "core"
+    app_label = "core"
+    verbose_name = _("meet core application")
+
+    def ready(self):
+        """Connect signal receivers once models are loaded."""
+        # pylint: disable=import-outside-toplevel, unused-import
+        from core import signals
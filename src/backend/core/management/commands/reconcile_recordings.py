@@ -0,0 +1,26 @@
+"""reconcile_recordings management command"""
+
+from django.core.management.base import BaseCommand
+
+from core.recording.worker.reconciliation import reconcile_recordings
+
+
+class Command(BaseCommand):
+    """Align ongoing recordings' statuses with LiveKit egresses."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        """Allow to only report the drift."""
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the drift without updating recordings.",
+        )
+
+    def handle(self, *args, **options):
+        """Reconcile recordings and report drift counters."""
+        counters = reconcile_recordings(dry_run=options["dry_run"])
+
+        for name, count in sorted(counters.items()):
+            self.stdout.write(f"{name:s}: {count:d}")
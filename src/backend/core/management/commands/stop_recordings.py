@@ -0,0 +1,69 @@
+"""stop_recordings management command"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import models
+from core.recording.worker.mediator import stop_recordings
+
+
+class Command(BaseCommand):
+    """Stop active recordings at once, e.g. before draining a LiveKit node."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        """Select the recordings to stop."""
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument(
+            "--all",
+            action="store_true",
+            help="Stop all active recordings.",
+        )
+        group.add_argument(
+            "--room",
+            nargs="+",
+            dest="rooms",
+            help="Stop active recordings of the rooms with these slugs.",
+        )
+        group.add_argument(
+            "--recording",
+            nargs="+",
+            dest="recordings",
+            help="Stop the active recordings with these ids.",
+        )
+
+    def handle(self, *args, **options):
+        """Stop selected recordings and report the outcome of each of them."""
+        queryset = models.Recording.objects.filter(
+            status=models.RecordingStatusChoices.ACTIVE
+        )
+        if options["rooms"]:
+            queryset = queryset.filter(room__slug__in=options["rooms"])
+        elif options["recordings"]:
+            queryset = queryset.filter(id__in=options["recordings"])
+
+        recordings = list(queryset)
+        if not recordings:
+            self.stdout.write("No active recording to stop.")
+            return
+
+        start = time.perf_counter()
+        outcomes = stop_recordings(recordings)
+        duration = time.perf_counter() - start
+
+        for outcome in outcomes:
+            line = f"{outcome.recording.id!s} {outcome.status:s}"
+            if outcome.succeeded:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(self.style.ERROR(f"{line:s} ({outcome.error:s})"))
+
+        failures = sum(not outcome.succeeded for outcome in outcomes)
+        self.stdout.write(
+            f"Stopped {len(outcomes) - failures:d}/{len(outcomes):d} recordings "
+            f"in {duration:.3f}s."
+        )
+        if failures:
+            raise CommandError(f"{failures:d} recordings failed to stop.")
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_alter_resourceaccess_options_alter_user_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recording',
+            index=models.Index(condition=models.Q(('status__in', ['active', 'initiated'])), fields=['status'], name='recording_ongoing_status_idx'),
+        ),
+    ]
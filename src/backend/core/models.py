@@ -228,6 +228,11 @@ def get_resource_roles(resource: models.Model, user: User) -> List[str]:
     if hasattr(resource, "user_roles"):
         return resource.user_roles or []
 
+    # Resource accesses are not team-based, rely on the role resolution of the resource
+    if isinstance(resource, Resource):
+        role = resource.get_role(user)
+        return [role] if role else []
+
     try:
         return list(
             resource.accesses.filter_user(user)
@@ -238,6 +243,45 @@ def get_resource_roles(resource: models.Model, user: User) -> List[str]:
         return []
 
 
+class ResourceQuerySet(models.QuerySet):
+    """Custom queryset to resolve access rights of resources."""
+
+    def with_user_role(self, user):
+        """
+        Annotate the role of a user computed in the database and prefetch accesses.
+
+        The role is resolved in the same query as the resource, taking the highest role
+        if several are found. Accesses are prefetched along with their user so that
+        serializing them costs one query whatever the number of accesses.
+        Anonymous users have no role, the queryset is returned untouched.
+        """
+        if not user or not user.is_authenticated:
+            return self
+
+        user_role = (
+            ResourceAccess.objects.filter(resource=models.OuterRef("pk"), user=user)
+            .order_by(
+                models.Case(
+                    models.When(role=RoleChoices.OWNER, then=models.Value(0)),
+                    models.When(role=RoleChoices.ADMIN, then=models.Value(1)),
+                    default=models.Value(2),
+                )
+            )
+            .values("role")[:1]
+        )
+
+        return self.annotate(
+            user_role=models.Subquery(user_role),
+            user_role_for=models.Value(user.pk, output_field=models.UUIDField()),
+        ).prefetch_related(
+            models.Prefetch(
+                "accesses",
+                queryset=ResourceAccess.objects.select_related("user"),
+                to_attr="prefetched_accesses",
+            )
+        )
+
+
 class Resource(BaseModel):
     """Model to define access control"""
 
@@ -249,6 +293,8 @@ class Resource(BaseModel):
         related_name="resources",
     )
 
+    objects = ResourceQuerySet.as_manager()
+
     class Meta:
         db_table = "meet_resource"
         verbose_name = _("Resource")
@@ -267,6 +313,10 @@ class Resource(BaseModel):
         if not user or not user.is_authenticated:
             return None
 
+        # Use the role pre-annotated by `ResourceQuerySet.with_user_role` if available
+        if getattr(self, "user_role_for", None) == user.pk:
+            return getattr(self, "user_role", None)
+
         role = None
         for access in self.accesses.filter(user=user):
             if access.role == RoleChoices.OWNER:
@@ -529,6 +579,18 @@ class Recording(BaseModel):
                 name="unique_initiated_or_active_recording_per_room",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["status"],
+                condition=models.Q(
+                    status__in=[
+                        RecordingStatusChoices.ACTIVE,
+                        RecordingStatusChoices.INITIATED,
+                    ]
+                ),
+                name="recording_ongoing_status_idx",
+            )
+        ]
 
     def __str__(self):
         return f"Recording {self.id} ({self.status})"
@@ -1,11 +1,15 @@
 """Authentication class for storage event token validation."""
 
+import base64
+import hashlib
 import logging
 import secrets
 
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
+from jwt import PyJWTError
+from livekit import api as livekit_api
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
@@ -92,3 +96,55 @@ class StorageEventAuthentication(BaseAuthentication):
     def authenticate_header(self, request):
         """Return the WWW-Authenticate header value."""
         return f"{self.TOKEN_TYPE} realm='Storage event API'"
+
+
+class LiveKitEventAuthentication(BaseAuthentication):
+    """Authenticate LiveKit webhook requests using their signature.
+
+    LiveKit signs webhook requests with a JWT, issued with the configured API key
+    and secret, holding the SHA256 hash of the request body.
+    """
+
+    AUTH_HEADER = "Authorization"
+
+    def authenticate(self, request):
+        """Validate the JWT from the Authorization header against the request body."""
+
+        token = request.headers.get(self.AUTH_HEADER)
+
+        if not token:
+            logger.warning(
+                "Authentication failed: Missing Authorization header (ip: %s)",
+                request.META.get("REMOTE_ADDR"),
+            )
+            raise AuthenticationFailed(_("Authorization header is required"))
+
+        verifier = livekit_api.TokenVerifier(
+            settings.LIVEKIT_CONFIGURATION["api_key"],
+            settings.LIVEKIT_CONFIGURATION["api_secret"],
+        )
+
+        try:
+            claims = verifier.verify(token.removeprefix("Bearer "))
+            claims_hash = base64.b64decode(claims.sha256 or "")
+        except (PyJWTError, ValueError) as e:
+            logger.warning(
+                "Authentication failed: Invalid token (ip: %s)",
+                request.META.get("REMOTE_ADDR"),
+            )
+            raise AuthenticationFailed(_("Invalid token")) from e
+
+        body_hash = hashlib.sha256(request.body).digest()
+
+        if not secrets.compare_digest(body_hash, claims_hash):
+            logger.warning(
+                "Authentication failed: Invalid body hash (ip: %s)",
+                request.META.get("REMOTE_ADDR"),
+            )
+            raise AuthenticationFailed(_("Invalid signature"))
+
+        return MachineUser(), token
+
+    def authenticate_header(self, request):
+        """Return the WWW-Authenticate header value."""
+        return "Bearer realm='LiveKit event API'"
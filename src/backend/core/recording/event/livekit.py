@@ -0,0 +1,216 @@
+"""Update recordings from LiveKit egress and track webhook events."""
+
+# pylint: disable=no-member
+
+import logging
+import os
+import uuid
+from typing import Optional
+
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
+
+from google.protobuf.json_format import Parse, ParseError
+from livekit import api as livekit_api
+
+from core import tasks
+from core.models import Recording, RecordingStatusChoices
+from core.recording.worker.factories import records_tracks
+
+from .exceptions import ParsingEventDataError
+
+logger = logging.getLogger(__name__)
+
+EGRESS_EVENTS = {"egress_started", "egress_updated", "egress_ended"}
+TRACK_PUBLISHED_EVENT = "track_published"
+
+EgressStatus = livekit_api.EgressStatus
+
+ONGOING_EGRESS_STATUSES = {EgressStatus.EGRESS_STARTING, EgressStatus.EGRESS_ACTIVE}
+FAILED_EGRESS_STATUSES = {EgressStatus.EGRESS_FAILED, EgressStatus.EGRESS_ABORTED}
+
+
+def parse_event(body: bytes) -> livekit_api.WebhookEvent:
+    """Parse the JSON body of a LiveKit webhook request."""
+    try:
+        return Parse(body, livekit_api.WebhookEvent(), ignore_unknown_fields=True)
+    except (ParseError, ValueError) as e:
+        raise ParsingEventDataError(f"Invalid LiveKit event: {e}") from e
+
+
+def get_recording_id(egress_info) -> Optional[uuid.UUID]:
+    """Extract the recording id from the filepath of an egress file output.
+
+    Worker services name output files after the recording id, which allows to
+    identify the recording before its worker id is saved.
+    """
+    filepaths = [output.filepath for output in egress_info.room_composite.file_outputs]
+    filepaths += [result.filename for result in egress_info.file_results]
+
+    for filepath in filepaths:
+        filename = os.path.splitext(os.path.basename(filepath))[0]
+        try:
+            return uuid.UUID(filename)
+        except ValueError:
+            continue
+
+    return None
+
+
+def get_track_recording_id(egress_info) -> Optional[uuid.UUID]:
+    """Extract the recording id from the filepath of a track egress.
+
+    Tracks are stored in a folder named after the recording, with a subfolder per
+    participant identity.
+    """
+    filepaths = [egress_info.track.file.filepath]
+    filepaths += [result.filename for result in egress_info.file_results]
+
+    for filepath in filepaths:
+        folder = os.path.basename(os.path.dirname(os.path.dirname(filepath)))
+        try:
+            return uuid.UUID(folder)
+        except ValueError:
+            continue
+
+    return None
+
+
+def _get_transition(egress_status):
+    """Return the statuses a recording can transition from, and the new status.
+
+    Transitions only ever move recordings forward, so that duplicated or
+    out of order events have no effect.
+    """
+
+    if egress_status in ONGOING_EGRESS_STATUSES:
+        return (
+            Q(status=RecordingStatusChoices.INITIATED),
+            Value(RecordingStatusChoices.ACTIVE),
+        )
+
+    if egress_status in FAILED_EGRESS_STATUSES:
+        return (
+            Q(
+                status__in=[
+                    RecordingStatusChoices.INITIATED,
+                    RecordingStatusChoices.ACTIVE,
+                ]
+            ),
+            Case(
+                When(
+                    status=RecordingStatusChoices.INITIATED,
+                    then=Value(RecordingStatusChoices.FAILED_TO_START),
+                ),
+                default=Value(RecordingStatusChoices.ABORTED),
+            ),
+        )
+
+    # Ending, complete or limit reached, the output file is being uploaded
+    return (
+        Q(
+            status__in=[
+                RecordingStatusChoices.INITIATED,
+                RecordingStatusChoices.ACTIVE,
+                RecordingStatusChoices.FAILED_TO_STOP,
+            ]
+        ),
+        Value(RecordingStatusChoices.STOPPED),
+    )
+
+
+def handle_track_published(event) -> int:
+    """Start recording an audio track published in a room being recorded.
+
+    Only worker services recording the track of each participant, which have a
+    `start_track` method, record tracks published once the recording started.
+    Tracks are recorded by a task, for LiveKit not to wait on the egress start.
+    Return the number of recordings the track is being added to.
+    """
+
+    if event.track.type != livekit_api.TrackType.AUDIO:
+        return 0
+
+    try:
+        room_id = uuid.UUID(event.room.name)
+    except ValueError:
+        return 0
+
+    started = 0
+    for recording_id, mode in Recording.objects.filter(
+        room_id=room_id, status=RecordingStatusChoices.ACTIVE
+    ).values_list("id", "mode"):
+        if not records_tracks(mode):
+            continue
+
+        tasks.start_track.delay(
+            str(recording_id), event.participant.identity, event.track.sid
+        )
+        started += 1
+
+    return started
+
+
+def handle_track_egress(event) -> int:
+    """Notify the recording of a track once its file is uploaded, if it is the last.
+
+    The recording is notified by the last of the storage event of its mixed audio
+    and the `egress_ended` events of its tracks. Return 1 if a track ended and its
+    recording is known.
+    """
+
+    if event.event != "egress_ended":
+        return 0
+
+    recording_id = get_track_recording_id(event.egress_info)
+    if recording_id is None:
+        return 0
+
+    tasks.notify_recording.delay(str(recording_id))
+    return 1
+
+
+def handle_event(event) -> int:
+    """Apply an egress event to its recording with a single conditional update.
+
+    Return the number of updated recordings, 0 if the event is not an egress event,
+    does not match any recording, or was already applied. Audio tracks published
+    in rooms being recorded are recorded as well, and the recordings of ended
+    tracks notified, both being counted as updates.
+    """
+
+    if event.event == TRACK_PUBLISHED_EVENT:
+        return handle_track_published(event)
+
+    if event.event not in EGRESS_EVENTS:
+        return 0
+
+    egress_info = event.egress_info
+    if not egress_info.egress_id:
+        raise ParsingEventDataError("LiveKit egress event without egress id.")
+
+    # Track egresses run along with the egress of a recording, not changing its status
+    if egress_info.WhichOneof("request") == "track":
+        return handle_track_egress(event)
+
+    recording_id = get_recording_id(egress_info)
+    recording_filter = (
+        Q(id=recording_id)
+        if recording_id is not None
+        else Q(worker_id=egress_info.egress_id)
+    )
+    previous_statuses, status = _get_transition(egress_info.status)
+
+    updated = Recording.objects.filter(recording_filter & previous_statuses).update(
+        status=status,
+        worker_id=egress_info.egress_id,
+        updated_at=timezone.now(),
+    )
+
+    logger.info(
+        "LiveKit %s event for egress %s updated %d recording.",
+        event.event,
+        egress_info.egress_id,
+        updated,
+    )
+    return updated
@@ -3,6 +3,7 @@
 import logging
 
 from django.conf import settings
+from django.core.files.storage import default_storage
 
 import requests
 
@@ -14,11 +15,15 @@ logger = logging.getLogger(__name__)
 class NotificationService:
     """Service for processing recordings and notifying external services."""
 
-    def notify_external_services(self, recording):
-        """Process a recording based on its mode."""
+    def notify_external_services(self, recording, tracks_started_at=None):
+        """Process a recording based on its mode.
+
+        The time the recording of each track file started, in milliseconds, is
+        given by the worker service when it knows it.
+        """
 
         if recording.mode == models.RecordingModeChoices.TRANSCRIPT:
-            return self._notify_summary_service(recording)
+            return self._notify_summary_service(recording, tracks_started_at)
 
         if recording.mode == models.RecordingModeChoices.SCREEN_RECORDING:
             logger.warning(
@@ -34,7 +39,64 @@ class NotificationService:
         return False
 
     @staticmethod
-    def _notify_summary_service(recording):
+    def _get_tracks(recording, tracks_started_at=None):
+        """List the audio tracks recorded per participant, with their speaker.
+
+        Tracks are stored in a folder named after the recording, with a subfolder
+        per participant identity, and named after the time, in milliseconds, their
+        recording was requested. The time it actually started is used instead, if
+        known. Speakers are named after the display name of their user,
+        others being numbered. Offsets are relative to the first track.
+        """
+
+        folder = f"{settings.RECORDING_OUTPUT_FOLDER}/{recording.id}"
+        try:
+            identities, _files = default_storage.listdir(folder)
+        except FileNotFoundError:
+            return []
+
+        tracks = []
+        for identity in identities:
+            _folders, filenames = default_storage.listdir(f"{folder}/{identity}")
+            for filename in filenames:
+                requested_at, _, _track_id = filename.partition("-")
+                if not requested_at.isdigit():
+                    continue
+                filepath = f"{folder}/{identity}/{filename}"
+                started_at = (tracks_started_at or {}).get(filepath, int(requested_at))
+                tracks.append((identity, filepath, started_at))
+
+        if not tracks:
+            return []
+
+        tracks.sort(key=lambda track: track[2])
+        # Speakers are named after their display name, never their email address
+        # which would be sent to the summary service and its language model
+        users = {
+            sub: full_name or short_name
+            for sub, full_name, short_name in models.User.objects.filter(
+                sub__in=identities
+            ).values_list("sub", "full_name", "short_name")
+            if full_name or short_name
+        }
+        speakers = {}
+        for identity, _filename, _started_at in tracks:
+            if identity not in speakers:
+                anonymous = sum(1 for speaker in speakers if speaker not in users)
+                speakers[identity] = users.get(identity, f"Participant {anonymous + 1}")
+
+        first_started_at = tracks[0][2]
+        return [
+            {
+                "filename": filename,
+                "speaker": speakers[identity],
+                "offset": (started_at - first_started_at) / 1000,
+            }
+            for identity, filename, started_at in tracks
+        ]
+
+    @staticmethod
+    def _notify_summary_service(recording, tracks_started_at=None):
         """Notify summary service about a new recording."""
 
         if (
@@ -65,6 +127,10 @@ class NotificationService:
             "sub": owner_access.user.sub,
         }
 
+        tracks = NotificationService._get_tracks(recording, tracks_started_at)
+        if tracks:
+            payload["tracks"] = tracks
+
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {settings.SUMMARY_SERVICE_API_TOKEN}",
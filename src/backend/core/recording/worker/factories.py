@@ -1,9 +1,9 @@
 """Factory, configurations and Protocol to create worker services"""
 
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import lru_cache
-from typing import Any, ClassVar, Dict, Optional, Protocol, Type
+from typing import Any, ClassVar, Dict, List, Optional, Protocol, Type, Union
 
 from django.conf import settings
 from django.utils.module_loading import import_string
@@ -19,6 +19,8 @@ class WorkerServiceConfig:
     server_configurations: Dict[str, Any]
     verify_ssl: Optional[bool]
     bucket_args: Optional[dict]
+    transport_class: str = "core.recording.worker.transports.PooledSessionTransport"
+    transport_options: Dict[str, Any] = field(default_factory=dict)
 
     @classmethod
     @lru_cache
@@ -38,9 +40,39 @@ class WorkerServiceConfig:
                 "bucket": settings.AWS_STORAGE_BUCKET_NAME,
                 "force_path_style": True,
             },
+            transport_class=settings.RECORDING_WORKER_TRANSPORT_CLASS,
+            transport_options=settings.RECORDING_WORKER_TRANSPORT_OPTIONS,
         )
 
 
+@dataclass(frozen=True)
+class WorkerInfo:
+    """Describe a worker as reported by the worker service.
+
+    The status is one of the "ACTIVE", "STOPPED" or "ABORTED" strings, which
+    map to recording statuses. Workers recording a single track of a room, along
+    with the worker of its recording, are flagged as `is_track`.
+    """
+
+    worker_id: str
+    room_name: str
+    status: str
+    is_track: bool = False
+
+
+@dataclass(frozen=True)
+class TrackInfo:
+    """Describe the recording of a participant's track, as reported by the worker service.
+
+    Tracks are running until their file is uploaded. The time their recording
+    actually started is in milliseconds, or None if it did not start yet.
+    """
+
+    filepath: str
+    is_running: bool
+    started_at: Optional[int] = None
+
+
 class WorkerService(Protocol):
     """Define the interface for interacting with a worker service."""
 
@@ -55,9 +87,15 @@ class WorkerService(Protocol):
     def stop(self, worker_id: str) -> str:
         """Stop recording for a specified worker."""
 
+    def stop_many(self, worker_ids: List[str]) -> List[Union[str, Exception]]:
+        """Stop recording for several workers, returning an error for failed ones."""
 
-def get_worker_service(mode: str) -> WorkerService:
-    """Instantiate a worker service by its mode."""
+    def list_workers(self) -> List[WorkerInfo]:
+        """List all workers known by the worker service."""
+
+
+def get_worker_class(mode: str) -> Type[WorkerService]:
+    """Return the class of the worker service of a mode."""
 
     worker_registry: Dict[str, str] = settings.RECORDING_WORKER_CLASSES
 
@@ -69,7 +107,19 @@ def get_worker_service(mode: str) -> WorkerService:
             f"Available modes: {list(worker_registry.keys())}"
         ) from e
 
-    worker_class: Type[WorkerService] = import_string(worker_class_path)
+    return import_string(worker_class_path)
+
+
+def records_tracks(mode: str) -> bool:
+    """Return whether the worker service of a mode records each participant's track."""
+
+    return hasattr(get_worker_class(mode), "start_track")
+
+
+def get_worker_service(mode: str) -> WorkerService:
+    """Instantiate a worker service by its mode."""
+
+    worker_class = get_worker_class(mode)
 
     config = WorkerServiceConfig.from_settings()
     return worker_class(config=config)
@@ -1,6 +1,11 @@
 """Mediator between the worker service and recording instances in the Django ORM."""
 
 import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import List, Optional
+
+from django.utils import timezone
 
 from core.models import Recording, RecordingStatusChoices
 
@@ -11,11 +16,25 @@ from .exceptions import (
     WorkerRequestError,
     WorkerResponseError,
 )
-from .factories import WorkerService
+from .factories import WorkerService, get_worker_service
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class StopOutcome:
+    """Outcome of stopping a recording among a batch."""
+
+    recording: Recording
+    status: str
+    error: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        """Return whether the recording was stopped by its worker."""
+        return self.error is None
+
+
 class WorkerServiceMediator:
     """Mediate interactions between a worker service and a recording instance.
 
@@ -29,7 +48,7 @@ class WorkerServiceMediator:
 
         self._worker_service = worker_service
 
-    def start(self, recording: Recording):
+    def start(self, recording: Recording, final_attempt: bool = True):
         """Start the recording process using the worker service.
 
         If the operation is successful, the recording's status will
@@ -37,6 +56,8 @@ class WorkerServiceMediator:
 
         Args:
             recording (Recording): The recording instance to start.
+            final_attempt (bool): If False, a failed recording is left INITIATED so
+                that the operation can be retried.
         Raises:
             RecordingStartError: If there is an error starting the recording.
         """
@@ -52,7 +73,8 @@ class WorkerServiceMediator:
             logger.exception(
                 "Failed to start recording for room %s: %s", recording.room.slug, e
             )
-            recording.status = RecordingStatusChoices.FAILED_TO_START
+            if final_attempt:
+                recording.status = RecordingStatusChoices.FAILED_TO_START
             raise RecordingStartError() from e
         else:
             recording.worker_id = worker_id
@@ -66,18 +88,30 @@ class WorkerServiceMediator:
             recording.worker_id,
         )
 
-    def stop(self, recording: Recording):
+    def stop(self, recording: Recording, final_attempt: bool = True):
         """Stop the recording process using the worker service.
 
         If the operation is successful, the recording's status will transition
         from ACTIVE to STOPPED, else to FAILED_TO_STOP to keep track of errors.
+        A recording still INITIATED has no worker yet, it is cancelled and becomes
+        ABORTED without calling the worker service.
 
         Args:
             recording (Recording): The recording instance to stop.
+            final_attempt (bool): If False, a failed recording is left ACTIVE so
+                that the operation can be retried.
         Raises:
             RecordingStopError: If there is an error stopping the recording.
         """
 
+        if recording.status == RecordingStatusChoices.INITIATED:
+            recording.status = RecordingStatusChoices.ABORTED
+            recording.save()
+            logger.info(
+                "Recording cancelled before starting for room %s", recording.room
+            )
+            return
+
         if recording.status != RecordingStatusChoices.ACTIVE:
             logger.error("Cannot stop recording in %s status.", recording.status)
             raise RecordingStopError()
@@ -88,7 +122,8 @@ class WorkerServiceMediator:
             logger.exception(
                 "Failed to stop recording for room %s: %s", recording.room.slug, e
             )
-            recording.status = RecordingStatusChoices.FAILED_TO_STOP
+            if final_attempt:
+                recording.status = RecordingStatusChoices.FAILED_TO_STOP
             raise RecordingStopError() from e
         else:
             recording.status = RecordingStatusChoices[response]
@@ -96,3 +131,86 @@ class WorkerServiceMediator:
             recording.save()
 
         logger.info("Worker stopped for room %s", recording.room)
+
+    def stop_many(self, recordings: List[Recording]) -> List[StopOutcome]:
+        """Stop several recordings at once using the worker service.
+
+        Stop requests are sent concurrently and recordings' statuses are updated in
+        a single query. Like with `stop`, active recordings transition to STOPPED,
+        ABORTED or FAILED_TO_STOP, all of them failing if the whole batch does.
+        Recordings which are not active are left untouched.
+
+        Args:
+            recordings (List[Recording]): The recording instances to stop.
+        Returns:
+            List[StopOutcome]: The outcome of each recording, in the given order.
+        """
+
+        outcomes = [
+            StopOutcome(
+                recording=recording,
+                status=recording.status,
+                error=f"Cannot stop recording in {recording.status} status.",
+            )
+            for recording in recordings
+        ]
+        active_outcomes = [
+            outcome
+            for outcome in outcomes
+            if outcome.recording.status == RecordingStatusChoices.ACTIVE
+        ]
+        if not active_outcomes:
+            return outcomes
+
+        try:
+            results = self._worker_service.stop_many(
+                [outcome.recording.worker_id for outcome in active_outcomes]
+            )
+        except (WorkerConnectionError, WorkerResponseError) as e:
+            logger.exception(
+                "Failed to stop %d recordings: %s", len(active_outcomes), e
+            )
+            results = [e] * len(active_outcomes)
+
+        # bulk_update bypasses save, auto_now fields are thus updated manually
+        now = timezone.now()
+        for outcome, result in zip(active_outcomes, results, strict=True):
+            if isinstance(result, Exception):
+                logger.error(
+                    "Failed to stop recording %s: %s", outcome.recording.id, result
+                )
+                outcome.status = RecordingStatusChoices.FAILED_TO_STOP
+                outcome.error = str(result)
+            else:
+                outcome.status = RecordingStatusChoices[result]
+                outcome.error = None
+            outcome.recording.status = outcome.status
+            outcome.recording.updated_at = now
+
+        Recording.objects.bulk_update(
+            [outcome.recording for outcome in active_outcomes],
+            ["status", "updated_at"],
+        )
+
+        logger.info("Workers stopped for %d recordings", len(active_outcomes))
+        return outcomes
+
+
+def stop_recordings(recordings: List[Recording]) -> List[StopOutcome]:
+    """Stop recordings of any mode at once.
+
+    Recordings are grouped by mode, each group being stopped by the worker service
+    of its mode, as services may stop more than the egress of a recording. Return
+    the outcome of each recording, in the given order.
+    """
+    recordings_by_mode = defaultdict(list)
+    for recording in recordings:
+        recordings_by_mode[recording.mode].append(recording)
+
+    outcomes = {}
+    for mode, mode_recordings in recordings_by_mode.items():
+        mediator = WorkerServiceMediator(worker_service=get_worker_service(mode=mode))
+        for outcome in mediator.stop_many(mode_recordings):
+            outcomes[outcome.recording.id] = outcome
+
+    return [outcomes[recording.id] for recording in recordings]
@@ -0,0 +1,183 @@
+"""Reconcile recordings statuses with the workers known by the worker service."""
+
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import Recording, RecordingStatusChoices
+
+from .factories import WorkerInfo, get_worker_service
+
+logger = logging.getLogger(__name__)
+
+ONGOING_STATUSES = (RecordingStatusChoices.ACTIVE, RecordingStatusChoices.INITIATED)
+
+# Kinds of drift between a recording and its worker
+ENDED = "ended"
+ABORTED = "aborted"
+MISSING = "missing"
+ADOPTED = "adopted"
+STALE = "stale"
+
+ENDED_WORKER_DRIFTS = {
+    "STOPPED": (ENDED, RecordingStatusChoices.STOPPED),
+    "ABORTED": (ABORTED, RecordingStatusChoices.ABORTED),
+}
+
+
+def _diagnose(
+    recording: Recording,
+    workers: Dict[str, WorkerInfo],
+    untracked: Dict[str, List[WorkerInfo]],
+    stale_before,
+) -> Optional[Tuple[str, str, Optional[str]]]:
+    """Return the drift kind, expected status and worker id of a recording, if any."""
+
+    if recording.status == RecordingStatusChoices.ACTIVE:
+        worker = workers.get(recording.worker_id)
+        if worker is None:
+            return MISSING, RecordingStatusChoices.ABORTED, None
+        drift = ENDED_WORKER_DRIFTS.get(worker.status)
+        return (*drift, None) if drift else None
+
+    # Initiated recordings are given some time to be started by their task
+    if recording.updated_at >= stale_before:
+        return None
+
+    # The worker may have been started without its id being saved
+    room_workers = untracked.get(str(recording.room_id))
+    if room_workers:
+        return ADOPTED, RecordingStatusChoices.ACTIVE, room_workers.pop().worker_id
+
+    return STALE, RecordingStatusChoices.FAILED_TO_START, None
+
+
+def _get_untracked(
+    workers: Dict[str, WorkerInfo], tracked: Set[str]
+) -> Dict[str, List[WorkerInfo]]:
+    """Return the active workers which are not tracked by a recording, by room."""
+
+    untracked = defaultdict(list)
+    for worker in workers.values():
+        # Track egresses run along with the worker of a recording, they are never
+        # the worker of a recording to be adopted
+        if (
+            worker.status == "ACTIVE"
+            and not worker.is_track
+            and worker.worker_id not in tracked
+        ):
+            untracked[worker.room_name].append(worker)
+    return untracked
+
+
+def _apply(transitions, adoptions, now) -> int:
+    """Update drifting recordings still in the status they were diagnosed in."""
+
+    fixed = 0
+    for (from_status, to_status), ids in transitions.items():
+        fixed += Recording.objects.filter(id__in=ids, status=from_status).update(
+            status=to_status, updated_at=now
+        )
+
+    for recording_id, worker_id in adoptions:
+        fixed += Recording.objects.filter(
+            id=recording_id, status=RecordingStatusChoices.INITIATED
+        ).update(
+            status=RecordingStatusChoices.ACTIVE,
+            worker_id=worker_id,
+            updated_at=now,
+        )
+
+    return fixed
+
+
+def reconcile_recordings(dry_run: bool = False) -> Counter:
+    """Align ongoing recordings with the workers listed by their mode's worker service.
+
+    Active recordings whose worker ended, failed or vanished are stopped or aborted,
+    and initiated recordings which were never started are failed, or attached to the
+    worker recording their room. Changes are applied with one update per transition,
+    only if the recording's status did not change in the meantime.
+
+    Args:
+        dry_run (bool): Only report the drift, without updating recordings.
+    Returns:
+        Counter: The number of recordings checked, in sync, of each drift kind, of
+            untracked active workers and of recordings fixed.
+    """
+
+    counters = Counter(checked=0, in_sync=0, untracked=0, fixed=0)
+
+    # Recordings are loaded before workers are listed, so that workers started in
+    # the meantime are known
+    recordings = list(
+        Recording.objects.filter(status__in=ONGOING_STATUSES).only(
+            "id", "room_id", "status", "worker_id", "mode", "updated_at"
+        )
+    )
+    if not recordings:
+        return counters
+
+    tracked = {recording.worker_id for recording in recordings}
+    recordings_by_mode = defaultdict(list)
+    for recording in recordings:
+        recordings_by_mode[recording.mode].append(recording)
+
+    now = timezone.now()
+    stale_before = now - timedelta(
+        seconds=settings.RECORDING_RECONCILIATION_GRACE_PERIOD
+    )
+    transitions = defaultdict(list)
+    adoptions = []
+    untracked_ids = set()
+
+    # Recordings are checked against the workers of their mode's worker service
+    for mode, mode_recordings in recordings_by_mode.items():
+        workers = {
+            worker.worker_id: worker
+            for worker in get_worker_service(mode=mode).list_workers()
+        }
+
+        untracked = _get_untracked(workers, tracked)
+
+        for recording in mode_recordings:
+            counters["checked"] += 1
+            diagnosis = _diagnose(recording, workers, untracked, stale_before)
+            if diagnosis is None:
+                counters["in_sync"] += 1
+                continue
+
+            drift, status, worker_id = diagnosis
+            counters[drift] += 1
+            logger.warning(
+                "Recording %s is %s but its worker is %s, moving it to %s.",
+                recording.id,
+                recording.status,
+                drift,
+                status,
+            )
+            if worker_id is None:
+                transitions[(recording.status, status)].append(recording.id)
+            else:
+                adoptions.append((recording.id, worker_id))
+
+        untracked_ids.update(
+            worker.worker_id
+            for room_workers in untracked.values()
+            for worker in room_workers
+        )
+
+    # Worker services may list the same workers, adopted for another mode
+    counters["untracked"] = len(
+        untracked_ids - {worker_id for _, worker_id in adoptions}
+    )
+
+    if not dry_run:
+        counters["fixed"] = _apply(transitions, adoptions, now)
+
+    logger.info("Recordings reconciliation: %s", dict(counters))
+    return counters
@@ -2,13 +2,19 @@
 
 # pylint: disable=no-member
 
+import asyncio
+import logging
+import time
+from typing import Iterator, List, Union
+
 import aiohttp
-from asgiref.sync import async_to_sync
 from livekit import api as livekit_api
-from livekit.api.egress_service import EgressService
 
 from .exceptions import WorkerConnectionError, WorkerResponseError
-from .factories import WorkerServiceConfig
+from .factories import TrackInfo, WorkerInfo, WorkerServiceConfig
+from .transports import get_transport
+
+logger = logging.getLogger(__name__)
 
 
 class BaseEgressService:
@@ -17,6 +23,7 @@ class BaseEgressService:
     def __init__(self, config: WorkerServiceConfig):
         self._config = config
         self._s3 = livekit_api.S3Upload(**config.bucket_args)
+        self._transport = get_transport(config)
 
     def _get_filepath(self, filename: str, extension: str) -> str:
         """Construct the file path for a given filename and extension.
@@ -24,25 +31,69 @@ class BaseEgressService:
         """
         return f"{self._config.output_folder}/{filename}.{extension}"
 
-    @async_to_sync
-    async def _handle_request(self, request, method_name: str):
+    def _handle_request(self, request, method_name: str):
         """Handle making a request to the LiveKit API and returns the response."""
+        try:
+            return self._transport.request(request, method_name)
+        except livekit_api.TwirpError as e:
+            raise WorkerConnectionError(
+                f"LiveKit client connection error, {e.message}."
+            ) from e
+        except asyncio.TimeoutError as e:
+            raise WorkerConnectionError(
+                "LiveKit client connection error, the request timed out."
+            ) from e
+        except aiohttp.ClientError as e:
+            raise WorkerConnectionError(f"LiveKit client connection error, {e}.") from e
+
+    def _handle_requests(self, requests, method_name: str):
+        """Handle making concurrent requests to the LiveKit API.
+
+        Return responses in the order of requests, errors being returned in place of
+        the response of failed requests.
+        """
+        responses = []
+        for response in self._transport.request_many(requests, method_name):
+            if isinstance(response, livekit_api.TwirpError):
+                responses.append(
+                    WorkerConnectionError(
+                        f"LiveKit client connection error, {response.message}."
+                    )
+                )
+            elif isinstance(response, asyncio.TimeoutError):
+                responses.append(
+                    WorkerConnectionError(
+                        "LiveKit client connection error, the request timed out."
+                    )
+                )
+            elif isinstance(response, aiohttp.ClientError):
+                responses.append(
+                    WorkerConnectionError(
+                        f"LiveKit client connection error, {response}."
+                    )
+                )
+            else:
+                responses.append(response)
+        return responses
+
+    @staticmethod
+    def _get_stop_status(response) -> str:
+        """Map the response of a StopEgressRequest to a recording status."""
 
-        # Use HTTP connector for local development with Tilt,
-        # where cluster communications are unsecure
-        connector = aiohttp.TCPConnector(ssl=self._config.verify_ssl)
+        if not response.status:
+            raise WorkerResponseError(
+                "LiveKit response is missing the recording status."
+            )
 
-        async with aiohttp.ClientSession(connector=connector) as session:
-            client = EgressService(session, **self._config.server_configurations)
-            method = getattr(client, method_name)
-            try:
-                response = await method(request)
-            except livekit_api.TwirpError as e:
-                raise WorkerConnectionError(
-                    f"LiveKit client connection error, {e.message}."
-                ) from e
+        # To avoid exposing EgressStatus values and coupling with LiveKit outside of this class,
+        # the response status is mapped to simpler "ABORTED", "STOPPED" or "FAILED_TO_STOP" strings.
+        if response.status == livekit_api.EgressStatus.EGRESS_ABORTED:
+            return "ABORTED"
 
-            return response
+        if response.status == livekit_api.EgressStatus.EGRESS_ENDING:
+            return "STOPPED"
+
+        return "FAILED_TO_STOP"
 
     def stop(self, worker_id: str) -> str:
         """Stop an ongoing egress worker.
@@ -56,20 +107,81 @@ class BaseEgressService:
 
         response = self._handle_request(request, "stop_egress")
 
-        if not response.status:
-            raise WorkerResponseError(
-                "LiveKit response is missing the recording status."
-            )
+        return self._get_stop_status(response)
 
-        # To avoid exposing EgressStatus values and coupling with LiveKit outside of this class,
-        # the response status is mapped to simpler "ABORTED", "STOPPED" or "FAILED_TO_STOP" strings.
-        if response.status == livekit_api.EgressStatus.EGRESS_ABORTED:
+    def stop_many(self, worker_ids: List[str]) -> List[Union[str, Exception]]:
+        """Stop several ongoing egress workers concurrently.
+
+        Return the status of each worker, in the order of worker ids, or the
+        WorkerConnectionError or WorkerResponseError raised while stopping it.
+        """
+
+        requests = [
+            livekit_api.StopEgressRequest(egress_id=worker_id)
+            for worker_id in worker_ids
+        ]
+
+        results = []
+        for response in self._handle_requests(requests, "stop_egress"):
+            if isinstance(response, Exception):
+                results.append(response)
+                continue
+            try:
+                results.append(self._get_stop_status(response))
+            except WorkerResponseError as e:
+                results.append(e)
+
+        return results
+
+    @staticmethod
+    def _get_worker_status(egress_status) -> str:
+        """Map an egress status to an "ACTIVE", "STOPPED" or "ABORTED" string."""
+
+        if egress_status in (
+            livekit_api.EgressStatus.EGRESS_STARTING,
+            livekit_api.EgressStatus.EGRESS_ACTIVE,
+        ):
+            return "ACTIVE"
+
+        if egress_status in (
+            livekit_api.EgressStatus.EGRESS_FAILED,
+            livekit_api.EgressStatus.EGRESS_ABORTED,
+        ):
             return "ABORTED"
 
-        if response.status == livekit_api.EgressStatus.EGRESS_ENDING:
-            return "STOPPED"
+        # Ending, complete or limit reached, the output file is uploaded
+        return "STOPPED"
 
-        return "FAILED_TO_STOP"
+    def _list_egresses(self, **filters) -> Iterator:
+        """Iterate over the egresses known by LiveKit, following pages of ListEgress."""
+
+        page_token = None
+
+        while True:
+            request = livekit_api.ListEgressRequest(page_token=page_token, **filters)
+            response = self._handle_request(request, "list_egress")
+
+            yield from response.items
+
+            if not response.next_page_token.token:
+                return
+            page_token = response.next_page_token
+
+    def list_workers(self) -> List[WorkerInfo]:
+        """List all egresses known by LiveKit.
+
+        The ListEgressRequest is shared among all types of egress, like stop.
+        """
+
+        return [
+            WorkerInfo(
+                worker_id=egress.egress_id,
+                room_name=egress.room_name,
+                status=self._get_worker_status(egress.status),
+                is_track=egress.WhichOneof("request") == "track",
+            )
+            for egress in self._list_egresses()
+        ]
 
     def start(self, room_name, recording_id):
         """Start the egress process for a recording (not implemented in the base class).
@@ -138,3 +250,174 @@ class AudioCompositeEgressService(BaseEgressService):
             raise WorkerResponseError("Egress ID not found in the response.")
 
         return response.egress_id
+
+
+# Statuses of track egresses whose file is not uploaded yet
+RUNNING_TRACK_STATUSES = (
+    livekit_api.EgressStatus.EGRESS_STARTING,
+    livekit_api.EgressStatus.EGRESS_ACTIVE,
+    livekit_api.EgressStatus.EGRESS_ENDING,
+)
+
+
+class AudioTracksEgressService(AudioCompositeEgressService):
+    """Record the mixed audio of a room, and the audio track of each participant.
+
+    Tracks are recorded as '.ogg' files in a folder named after the recording, with
+    a subfolder per participant identity, so that transcripts can be attributed to
+    speakers. Files are named after the time their recording was requested, and
+    tracks merged in order of the time LiveKit reports they actually started.
+    Recording tracks is best effort: the mixed audio is always recorded, and
+    tracks failing to start are only logged.
+
+    Tracks published once the recording started are recorded from LiveKit
+    `track_published` webhooks, which require RECORDING_LIVEKIT_EVENT_ENABLE and
+    LiveKit to send its webhooks to Meet. Otherwise, only the tracks published
+    when the recording starts are recorded.
+    """
+
+    hrid = "audio-recording-tracks-livekit-egress"
+
+    def _get_track_request(self, room_name, recording_id, identity, track_id):
+        """Build the request to record a track of a participant."""
+
+        started_at = int(time.time() * 1000)
+        filepath = (
+            f"{self._config.output_folder}/{recording_id}/{identity}/"
+            f"{started_at}-{track_id}.ogg"
+        )
+        return livekit_api.TrackEgressRequest(
+            room_name=room_name,
+            track_id=track_id,
+            file=livekit_api.DirectFileOutput(filepath=filepath, s3=self._s3),
+        )
+
+    def start(self, room_name, recording_id):
+        """Start recording the mixed audio, then the audio tracks already published."""
+
+        egress_id = super().start(room_name, recording_id)
+
+        try:
+            response = self._handle_request(
+                livekit_api.ListParticipantsRequest(room=room_name),
+                "list_participants",
+            )
+        except WorkerConnectionError as e:
+            logger.error("Failed to list participants of room %s: %s", room_name, e)
+            return egress_id
+
+        requests = [
+            self._get_track_request(
+                room_name, recording_id, participant.identity, track.sid
+            )
+            for participant in response.participants
+            for track in participant.tracks
+            if track.type == livekit_api.TrackType.AUDIO
+        ]
+        responses = self._handle_requests(requests, "start_track_egress")
+        for request, track_response in zip(requests, responses, strict=True):
+            if isinstance(track_response, Exception):
+                logger.error(
+                    "Failed to record track %s: %s", request.track_id, track_response
+                )
+
+        return egress_id
+
+    def start_track(self, room_name, recording_id, identity, track_id) -> str:
+        """Start recording an audio track published once the recording started."""
+
+        request = self._get_track_request(room_name, recording_id, identity, track_id)
+        response = self._handle_request(request, "start_track_egress")
+
+        if not response.egress_id:
+            raise WorkerResponseError("Egress ID not found in the response.")
+
+        return response.egress_id
+
+    def list_tracks(self, room_name, recording_id) -> List[TrackInfo]:
+        """List the track egresses of a recording, with the time they started.
+
+        Files are named after the time their egress was requested, which is earlier
+        than the time their recording started by the latency of the egress start.
+        """
+
+        folder = f"{self._config.output_folder}/{recording_id}/"
+        return [
+            TrackInfo(
+                filepath=egress.track.file.filepath,
+                is_running=egress.status in RUNNING_TRACK_STATUSES,
+                # Nanoseconds, unset until the egress started
+                started_at=egress.started_at // 1_000_000 or None,
+            )
+            for egress in self._list_egresses(room_name=room_name)
+            if egress.WhichOneof("request") == "track"
+            and egress.track.file.filepath.startswith(folder)
+        ]
+
+    def _list_egresses_many(self, requests) -> Iterator:
+        """Iterate over the egresses listed by concurrent ListEgress requests.
+
+        Requests are filtered on a recording or a room, whose egresses fit in the
+        first page. Failed requests are logged and skipped.
+        """
+
+        if not requests:
+            return
+
+        for request, response in zip(
+            requests, self._handle_requests(requests, "list_egress"), strict=True
+        ):
+            if isinstance(response, Exception):
+                logger.error("Failed to list egresses of %s: %s", request, response)
+                continue
+            yield from response.items
+
+    def _stop_tracks(self, worker_ids: List[str]):
+        """Stop recording the tracks of the rooms recorded by the given workers.
+
+        Only the egresses of these rooms are listed, rather than those of the
+        whole server.
+        """
+
+        room_names = {
+            egress.room_name
+            for egress in self._list_egresses_many(
+                [
+                    livekit_api.ListEgressRequest(egress_id=worker_id)
+                    for worker_id in worker_ids
+                ]
+            )
+        }
+        track_egress_ids = [
+            egress.egress_id
+            for egress in self._list_egresses_many(
+                [
+                    livekit_api.ListEgressRequest(room_name=room_name, active=True)
+                    for room_name in sorted(room_names)
+                ]
+            )
+            if egress.WhichOneof("request") == "track"
+        ]
+        if not track_egress_ids:
+            return
+
+        results = super().stop_many(track_egress_ids)
+        for egress_id, result in zip(track_egress_ids, results, strict=True):
+            if isinstance(result, Exception):
+                logger.error("Failed to stop track egress %s: %s", egress_id, result)
+
+    def stop(self, worker_id: str) -> str:
+        """Stop recording the tracks, then the mixed audio, whose status is returned.
+
+        Tracks are stopped first, so that their files are uploaded by the time the
+        mixed audio file is.
+        """
+
+        self._stop_tracks([worker_id])
+        return super().stop(worker_id)
+
+    def stop_many(self, worker_ids: List[str]) -> List[Union[str, Exception]]:
+        """Stop recording the tracks, then the mixed audio, of several recordings."""
+
+        self._stop_tracks(worker_ids)
+        return super().stop_many(worker_ids)
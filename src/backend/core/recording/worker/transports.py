@@ -0,0 +1,318 @@
+"""Transports carrying worker services requests to the LiveKit egress API."""
+
+import asyncio
+import atexit
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Protocol
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+import aiohttp
+from asgiref.sync import async_to_sync
+from livekit.api.egress_service import EgressService
+from livekit.api.room_service import RoomService
+
+from .exceptions import WorkerConnectionError
+
+logger = logging.getLogger(__name__)
+
+# Twirp methods of the room service, the others being methods of the egress service
+ROOM_SERVICE_METHODS = {"list_participants"}
+
+# Seconds callers wait for the transport loop beyond the timeout of its requests
+LOOP_TIMEOUT_MARGIN = 5.0
+
+
+@dataclass
+class MethodMetrics:
+    """Latency aggregates of a Twirp method."""
+
+    count: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        """Return the mean duration of a call."""
+        return self.total_seconds / self.count if self.count else 0.0
+
+
+class LatencyMetrics:
+    """Thread-safe latency aggregates of the calls made by transports, per Twirp method.
+
+    Aggregates of the process are logged periodically, for operators to follow them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods: Dict[str, MethodMetrics] = {}
+        self._logged_at = time.monotonic()
+
+    def record(self, method_name: str, duration: float, failed: bool):
+        """Record the duration of a call."""
+        with self._lock:
+            method_metrics = self._methods.setdefault(method_name, MethodMetrics())
+            method_metrics.count += 1
+            method_metrics.errors += int(failed)
+            method_metrics.total_seconds += duration
+            method_metrics.max_seconds = max(method_metrics.max_seconds, duration)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Return a copy of the aggregates of each method."""
+        with self._lock:
+            return {
+                method_name: {
+                    **asdict(method_metrics),
+                    "mean_seconds": method_metrics.mean_seconds,
+                }
+                for method_name, method_metrics in self._methods.items()
+            }
+
+    def reset(self):
+        """Forget all recorded calls."""
+        with self._lock:
+            self._methods.clear()
+            self._logged_at = time.monotonic()
+
+    def log_if_due(self, interval: float):
+        """Log the aggregates, if they were not logged for `interval` seconds."""
+        if not interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._logged_at < interval:
+                return
+            self._logged_at = now
+        logger.info(
+            "LiveKit calls latency, per method: %s", json.dumps(self.snapshot())
+        )
+
+
+metrics = LatencyMetrics()
+
+
+class EgressTransport(Protocol):
+    """Define the interface of a transport to the LiveKit egress API."""
+
+    def __init__(self, config, **options):
+        """Initialize the transport with a worker service configuration."""
+
+    def request(self, request, method_name: str):
+        """Call an egress method synchronously and return its response."""
+
+    def request_many(self, requests: List, method_name: str) -> List:
+        """Call an egress method concurrently for each request.
+
+        Return responses in the order of requests, exceptions being returned in place
+        of the response of failed calls.
+        """
+
+
+class BaseTransport:
+    """Common logic to call an egress method on a given session and measure it."""
+
+    def __init__(self, config):
+        self._config = config
+
+    async def _call(self, session: aiohttp.ClientSession, request, method_name: str):
+        """Call an egress, or room service, method and record its latency."""
+        service_class = (
+            RoomService if method_name in ROOM_SERVICE_METHODS else EgressService
+        )
+        client = service_class(session, **self._config.server_configurations)
+        method = getattr(client, method_name)
+
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = await method(request)
+            failed = False
+            return response
+        finally:
+            duration = time.perf_counter() - start
+            metrics.record(method_name, duration, failed)
+            logger.debug("LiveKit %s call took %.3fs", method_name, duration)
+            metrics.log_if_due(settings.RECORDING_WORKER_METRICS_LOG_INTERVAL)
+
+    async def _call_many(self, session: aiohttp.ClientSession, requests, method_name):
+        """Call an egress method concurrently for each request on a given session."""
+        return await asyncio.gather(
+            *(self._call(session, request, method_name) for request in requests),
+            return_exceptions=True,
+        )
+
+
+class SessionPerRequestTransport(BaseTransport):
+    """Open a new session, hence new connections, for each request."""
+
+    @async_to_sync
+    async def request(self, request, method_name: str):
+        """Call an egress method on a session dedicated to this request."""
+
+        # Use HTTP connector for local development with Tilt,
+        # where cluster communications are unsecure
+        connector = aiohttp.TCPConnector(ssl=self._config.verify_ssl)
+
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await self._call(session, request, method_name)
+
+    @async_to_sync
+    async def request_many(self, requests, method_name: str):
+        """Call an egress method concurrently on a session dedicated to this batch."""
+        connector = aiohttp.TCPConnector(ssl=self._config.verify_ssl)
+
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await self._call_many(session, requests, method_name)
+
+
+class PooledSessionTransport(BaseTransport):
+    """Reuse a long-lived session and its keep-alive connections across requests.
+
+    An aiohttp session is bound to the event loop it was created in, while
+    `async_to_sync` may run each call in a new loop. The session thus lives in an
+    event loop running in a dedicated daemon thread, to which requests are submitted.
+    The loop is started lazily and restarted in forked processes.
+
+    Each request, including its wait for a pooled connection, times out after
+    `request_timeout` seconds. Callers stop waiting for the loop shortly after, so
+    that a hung loop thread does not block them indefinitely.
+    """
+
+    def __init__(
+        self, config, pool_size=10, keepalive_timeout=30.0, request_timeout=30.0
+    ):
+        super().__init__(config)
+        self._pool_size = pool_size
+        self._keepalive_timeout = keepalive_timeout
+        self._request_timeout = request_timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._session = None
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the loop of the current process, starting it if needed."""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._session = None
+                self._pid = os.getpid()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="livekit-egress-transport",
+                    daemon=True,
+                ).start()
+            return self._loop
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, only ever called from the loop thread."""
+        if self._session is None or self._session.closed:
+            # The connector limit bounds the number of concurrent requests
+            connector = aiohttp.TCPConnector(
+                ssl=self._config.verify_ssl,
+                limit=self._pool_size,
+                keepalive_timeout=self._keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self._request_timeout),
+            )
+        return self._session
+
+    async def _request(self, request, method_name: str):
+        """Call an egress method on the shared session."""
+        return await self._call(self._get_session(), request, method_name)
+
+    async def _request_many(self, requests, method_name: str):
+        """Call an egress method concurrently on the shared session."""
+        return await self._call_many(self._get_session(), requests, method_name)
+
+    def submit(self, coroutine):
+        """Run a coroutine in the transport loop and wait for its result.
+
+        Raises:
+            WorkerConnectionError: If the loop did not answer in time.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._get_loop())
+        # Timeouts of requests raise the same TimeoutError as waiting for the result
+        _done, pending = concurrent.futures.wait(
+            [future], timeout=self._request_timeout + LOOP_TIMEOUT_MARGIN
+        )
+        if pending:
+            future.cancel()
+            raise WorkerConnectionError(
+                "LiveKit client connection error, the transport loop timed out."
+            )
+        return future.result()
+
+    def request(self, request, method_name: str):
+        """Call an egress method on the shared session."""
+        return self.submit(self._request(request, method_name))
+
+    def request_many(self, requests, method_name: str):
+        """Call an egress method concurrently on the shared session.
+
+        Requests are submitted in chunks of the size of the connection pool, as the
+        timeout of a request includes its wait for a pooled connection. If the loop
+        does not answer in time, the requests left fail with the same error.
+        """
+        responses = []
+        for index in range(0, len(requests), self._pool_size):
+            chunk = requests[index : index + self._pool_size]
+            try:
+                responses.extend(self.submit(self._request_many(chunk, method_name)))
+            except WorkerConnectionError as e:
+                responses.extend([e] * (len(requests) - index))
+                break
+        return responses
+
+    def close(self):
+        """Close the shared session and stop the loop of the current process."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+            if loop is None or self._pid != os.getpid():
+                return
+            if self._session is not None:
+                asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(
+                    timeout=LOOP_TIMEOUT_MARGIN
+                )
+                self._session = None
+            loop.call_soon_threadsafe(loop.stop)
+
+
+_transports: Dict[str, EgressTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(config) -> EgressTransport:
+    """Return the transport of a worker service configuration, shared per process.
+
+    Transports are closed at the exit of the process.
+    """
+    key = json.dumps(
+        [
+            config.transport_class,
+            config.transport_options,
+            config.server_configurations,
+            config.verify_ssl,
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    with _transports_lock:
+        if key not in _transports:
+            transport_class = import_string(config.transport_class)
+            transport = transport_class(config, **config.transport_options)
+            # Close pooled connections cleanly when the process exits
+            if hasattr(transport, "close"):
+                atexit.register(transport.close)
+            _transports[key] = transport
+        return _transports[key]
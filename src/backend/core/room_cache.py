@@ -0,0 +1,264 @@
+"""
+Cache resolving room lookups without hitting the database.
+
+Two kinds of entries are stored in the Django cache framework:
+- a slug entry, mapping a room slug to the room id,
+- a room entry, mapping a room id to a snapshot of the room fields.
+
+Entries are refreshed by signal receivers once a room save or deletion is committed,
+which only reaches all processes if the cache is shared, as Redis is. As a slug
+entry may outlive a rename, the snapshot slug is always checked against the requested
+slug. Lookups of rooms that do not exist are cached as well when unregistered rooms
+are allowed, so that random room links do not hit the database on each join.
+
+A Bloom filter of registered slugs also tells, without any database query, that a
+slug is not registered, so that random room links can be served right away.
+
+Warning: queryset updates and bulk operations do not send signals, entries will then
+only be refreshed when they expire.
+"""
+
+import hashlib
+import math
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+
+from django_redis.cache import RedisCache
+
+from core import models
+
+ROOM_CACHE_KEY_PREFIX = "room"
+UNREGISTERED = "unregistered"
+
+
+def get_slug_cache_key(slug: str) -> str:
+    """Compute the cache key of a slug entry."""
+    return f"{ROOM_CACHE_KEY_PREFIX}:slug:{slug:s}"
+
+
+def get_room_cache_key(room_id) -> str:
+    """Compute the cache key of a room entry."""
+    return f"{ROOM_CACHE_KEY_PREFIX}:id:{room_id!s}"
+
+
+def is_cache_shared(alias=DEFAULT_CACHE_ALIAS) -> bool:
+    """Tell whether a cache is shared by all processes, as Redis is in production.
+
+    Other caches, local to each process, miss the changes made by other processes.
+    """
+    return isinstance(caches[alias], RedisCache)
+
+
+def get_snapshot(room: models.Room) -> dict:
+    """Return the values of all concrete fields of a room."""
+    return {
+        field.attname: getattr(room, field.attname)
+        for field in models.Room._meta.concrete_fields  # noqa: SLF001
+    }
+
+
+def from_snapshot(snapshot: dict) -> models.Room:
+    """Build a room instance from a snapshot, as if it had been loaded from the database."""
+    return models.Room.from_db(None, list(snapshot.keys()), list(snapshot.values()))
+
+
+def set_room(room: models.Room, only_if_missing: bool = False):
+    """Store the slug and room entries of a room."""
+    timeout = settings.ROOM_CACHE_TTL
+    if not timeout:
+        return
+
+    store = cache.add if only_if_missing else cache.set
+    store(get_room_cache_key(room.pk), get_snapshot(room), timeout=timeout)
+    if room.slug:
+        store(get_slug_cache_key(room.slug), room.pk, timeout=timeout)
+
+
+def delete_room(room: models.Room):
+    """Remove the slug and room entries of a room."""
+    keys = [get_room_cache_key(room.pk)]
+    if room.slug:
+        keys.append(get_slug_cache_key(room.slug))
+    cache.delete_many(keys)
+
+
+def _set_unregistered(cache_key: str):
+    """Remember that no room matches a lookup, when unregistered rooms are allowed."""
+    timeout = settings.ROOM_CACHE_UNREGISTERED_TTL
+    if settings.ALLOW_UNREGISTERED_ROOMS and timeout:
+        cache.add(cache_key, UNREGISTERED, timeout=timeout)
+
+
+def _get_from_database(cache_key: str, **filter_kwargs) -> models.Room:
+    """Load a room from the database and populate the cache accordingly."""
+    try:
+        room = models.Room.objects.get(**filter_kwargs)
+    except models.Room.DoesNotExist:
+        _set_unregistered(cache_key)
+        raise
+
+    # Don't override entries that a concurrent save may have refreshed meanwhile
+    set_room(room, only_if_missing=True)
+    return room
+
+
+def get_room(pk=None, slug=None) -> models.Room:
+    """Get a room by its primary key or by its slug, from the cache if possible.
+
+    Raises:
+        Room.DoesNotExist: If no room matches, possibly according to the cache.
+    """
+    if pk is not None:
+        pk = uuid.UUID(str(pk))
+        room_cache_key = get_room_cache_key(pk)
+        snapshot = cache.get(room_cache_key)
+        if snapshot == UNREGISTERED:
+            raise models.Room.DoesNotExist()
+        if snapshot is None:
+            return _get_from_database(room_cache_key, pk=pk)
+        return from_snapshot(snapshot)
+
+    slug_cache_key = get_slug_cache_key(slug)
+    room_id = cache.get(slug_cache_key)
+    if room_id == UNREGISTERED:
+        raise models.Room.DoesNotExist()
+    if room_id is None:
+        return _get_from_database(slug_cache_key, slug=slug)
+
+    snapshot = cache.get(get_room_cache_key(room_id))
+    if snapshot is None or snapshot == UNREGISTERED or snapshot["slug"] != slug:
+        # The slug entry is stale, the room was renamed or deleted
+        cache.delete(slug_cache_key)
+        return _get_from_database(slug_cache_key, slug=slug)
+
+    return from_snapshot(snapshot)
+
+
+class BloomFilter:
+    """Probabilistic set membership with no false negatives.
+
+    Bits are stored in a bytearray and positions are derived from a single
+    blake2b digest with double hashing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """Size the filter to hold `capacity` items with the expected error rate."""
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.count = 0
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+
+    def _get_positions(self, item: str):
+        """Yield the bit positions of an item."""
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first, second = (
+            int.from_bytes(digest[:8], "big"),
+            int.from_bytes(digest[8:], "big"),
+        )
+        for index in range(self.hash_count):
+            yield (first + index * second) % self.size
+
+    def add(self, item: str):
+        """Add an item to the filter."""
+        self.count += 1
+        for position in self._get_positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        """Return False if the item was never added, True if it probably was."""
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._get_positions(item)
+        )
+
+
+class RegisteredSlugs:
+    """Per-process Bloom filter of the slugs of all registered rooms.
+
+    The filter is tagged with a version shared in the Django cache, changed once a
+    room is created or renamed. A slug missing from the filter is surely not
+    registered only if the version did not change since the filter was built. The
+    filter is otherwise rebuilt, at most once every ROOM_SLUGS_FILTER_REBUILD_INTERVAL
+    seconds, lookups falling back to the database in between. The version is read
+    before slugs are loaded, so a room committed meanwhile always changes it.
+
+    Slugs of renamed or deleted rooms remain in the filter, as false positives also
+    falling back to the database, until it is rebuilt, at least every
+    ROOM_SLUGS_FILTER_MAX_AGE seconds.
+
+    The version is only seen by all processes if the cache is shared: any slug may
+    otherwise exist.
+    """
+
+    VERSION_CACHE_KEY = f"{ROOM_CACHE_KEY_PREFIX}:registered-slugs:version"
+
+    def __init__(self, cache_alias=DEFAULT_CACHE_ALIAS):
+        self.cache_alias = cache_alias
+        self._filter = None
+
+    @property
+    def cache(self):
+        """Return the cache holding the shared version."""
+        return caches[self.cache_alias]
+
+    def _get_version(self):
+        """Return the shared version, starting a new one if it was evicted."""
+        version = self.cache.get(self.VERSION_CACHE_KEY)
+        if version is None:
+            self.cache.add(self.VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+            version = self.cache.get(self.VERSION_CACHE_KEY)
+        return version
+
+    def change_version(self):
+        """Change the shared version, once a slug was registered."""
+        self.cache.set(self.VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
+    def _build(self, version: str) -> BloomFilter:
+        """Load all registered slugs from the database."""
+        # Rooms are ordered by name by default, which is useless here
+        slugs = list(
+            models.Room.objects.filter(slug__isnull=False)
+            .order_by()
+            .values_list("slug", flat=True)
+        )
+        bloom_filter = BloomFilter(
+            capacity=max(len(slugs), settings.ROOM_SLUGS_FILTER_MIN_CAPACITY)
+        )
+        for slug in slugs:
+            bloom_filter.add(slug)
+        self._filter = (version, time.monotonic(), bloom_filter)
+        return bloom_filter
+
+    def may_exist(self, slug: str) -> bool:
+        """Return False if no room is registered with this slug, True if one may be."""
+        if not is_cache_shared(self.cache_alias):
+            # Rooms registered by other processes cannot be told
+            return True
+
+        version = self._get_version()
+        if version is None:
+            # The cache does not keep the version, additions cannot be told
+            return True
+
+        if self._filter is not None:
+            filter_version, built_at, bloom_filter = self._filter
+            age = time.monotonic() - built_at
+            if age < settings.ROOM_SLUGS_FILTER_MAX_AGE:
+                if slug in bloom_filter:
+                    return True
+                if filter_version == version:
+                    return False
+                if age < settings.ROOM_SLUGS_FILTER_REBUILD_INTERVAL:
+                    return True
+
+        return slug in self._build(version)
+
+
+registered_slugs = RegisteredSlugs()
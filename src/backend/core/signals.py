@@ -0,0 +1,53 @@
+"""Signal receivers of the Meet core app."""
+
+from copy import copy
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core import models, room_cache
+
+
+@receiver(post_init, sender=models.Room)
+def remember_room_slug(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Remember the slug of a loaded room, to tell whether a save changes it."""
+    instance.registered_slug = instance.slug
+
+
+@receiver(post_save, sender=models.Room)
+def refresh_room_cache(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Store the fresh snapshot of a saved room, its slug may have been regenerated.
+
+    The snapshot is stored once the transaction is committed, so that a rollback
+    never leaves a room that does not exist in the cache.
+
+    Creating or renaming a room registers a slug, which changes the version of the
+    filters of registered slugs once committed.
+    """
+    # Copy the room so that changes made after this save are not stored
+    transaction.on_commit(partial(room_cache.set_room, copy(instance)))
+    if instance.slug and (created or instance.slug != instance.registered_slug):
+        transaction.on_commit(room_cache.registered_slugs.change_version)
+    instance.registered_slug = instance.slug
+
+
+@receiver(post_save, sender=models.Resource)
+def invalidate_resource_room_cache(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate the room entry once the parent resource saved on its own is committed."""
+    transaction.on_commit(
+        partial(cache.delete, room_cache.get_room_cache_key(instance.pk))
+    )
+
+
+@receiver(post_delete, sender=models.Room)
+def delete_room_cache(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Remove the entries of a deleted room, once the deletion is committed.
+
+    Entries stored meanwhile, by requests loading the room before the deletion was
+    committed, are removed as well. Its slug remains in the filters of registered
+    slugs until they are rebuilt.
+    """
+    transaction.on_commit(partial(room_cache.delete_room, copy(instance)))
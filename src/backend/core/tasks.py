@@ -0,0 +1,292 @@
+"""Celery tasks driving recordings through their worker service."""
+
+import logging
+import math
+import uuid
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+
+from celery.utils.time import get_exponential_backoff_interval
+from django_redis.cache import RedisCache
+
+from core.models import Recording, RecordingStatusChoices
+from core.recording.event.notification import notification_service
+from core.recording.worker.exceptions import (
+    RecordingStartError,
+    RecordingStopError,
+    WorkerConnectionError,
+    WorkerResponseError,
+)
+from core.recording.worker.factories import get_worker_service
+from core.recording.worker.mediator import WorkerServiceMediator
+from core.recording.worker.reconciliation import (
+    reconcile_recordings as reconcile_recordings_with_workers,
+)
+
+from meet.celery_app import app
+
+logger = logging.getLogger(__name__)
+
+LOCK_CACHE_KEY_PREFIX = "recording-lock"
+RECONCILIATION_LOCK_CACHE_KEY = "recording-reconciliation-lock"
+
+# Delete a lock only if it is still held by the given token
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def get_lock_cache_key(recording_id):
+    """Return the cache key of the lock held while a recording is being transitioned."""
+    return f"{LOCK_CACHE_KEY_PREFIX:s}:{recording_id!s}"
+
+
+def _release_lock(lock_key, token):
+    """Release a lock, unless it expired and was acquired by someone else meanwhile.
+
+    On Redis, the lock is compared and deleted atomically. Other caches, used in
+    development and tests, are not shared between processes, and are compared then
+    deleted.
+    """
+    default_cache = caches[DEFAULT_CACHE_ALIAS]
+    if isinstance(default_cache, RedisCache):
+        client = default_cache.client
+        client.get_client(write=True).eval(
+            RELEASE_LOCK_SCRIPT, 1, client.make_key(lock_key), client.encode(token)
+        )
+    elif cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _get_countdown(retries):
+    """Return the delay before the next attempt of a task, with exponential backoff."""
+    return get_exponential_backoff_interval(
+        factor=settings.RECORDING_WORKER_RETRY_BACKOFF,
+        retries=retries,
+        maximum=settings.RECORDING_WORKER_RETRY_BACKOFF_MAX,
+        full_jitter=True,
+    )
+
+
+def _get_lock_retries():
+    """Return the number of retries of a task waiting for a lock, every backoff.
+
+    Retries span the lock timeout, for the lock of a task that died to expire.
+    """
+    return (
+        math.ceil(
+            settings.RECORDING_WORKER_LOCK_TIMEOUT
+            / settings.RECORDING_WORKER_RETRY_BACKOFF
+        )
+        + 1
+    )
+
+
+def _transition(task, recording_id, operation, expected_statuses, error_class):
+    """Apply a worker operation on a recording, retrying on worker errors.
+
+    The transition is idempotent: a recording which is not in an expected status
+    anymore has already been handled and is left untouched. A lock keyed on the
+    recording id prevents duplicated tasks from calling the worker concurrently.
+    Stops are retried while the recording is locked, as they may be requested while
+    the recording is still being started.
+    """
+
+    lock_key = get_lock_cache_key(recording_id)
+    retries = task.request.retries
+    final_attempt = retries >= settings.RECORDING_WORKER_MAX_RETRIES
+
+    if not cache.add(lock_key, task.request.id, settings.RECORDING_WORKER_LOCK_TIMEOUT):
+        if operation != "stop" or final_attempt:
+            logger.info(
+                "Recording %s is already being handled, skipping.", recording_id
+            )
+            return None
+        logger.info("Recording %s is being handled, retrying to stop it.", recording_id)
+        raise task.retry(
+            countdown=_get_countdown(retries),
+            max_retries=settings.RECORDING_WORKER_MAX_RETRIES,
+        )
+
+    try:
+        try:
+            recording = Recording.objects.select_related("room").get(pk=recording_id)
+        except Recording.DoesNotExist:
+            logger.warning("Recording %s does not exist anymore.", recording_id)
+            return None
+
+        if recording.status not in expected_statuses:
+            logger.info(
+                "Recording %s is in %s status, nothing to %s.",
+                recording_id,
+                recording.status,
+                operation,
+            )
+            return recording.status
+
+        worker_service = get_worker_service(mode=recording.mode)
+        worker_manager = WorkerServiceMediator(worker_service=worker_service)
+
+        try:
+            getattr(worker_manager, operation)(recording, final_attempt=final_attempt)
+        except error_class as e:
+            if final_attempt:
+                return recording.status
+            error = e
+        else:
+            return recording.status
+    finally:
+        _release_lock(lock_key, task.request.id)
+
+    # Retry out of the lock, eager tasks being retried synchronously
+    countdown = _get_countdown(retries)
+    logger.info(
+        "Retrying to %s recording %s in %ss (attempt %d).",
+        operation,
+        recording_id,
+        countdown,
+        retries + 1,
+    )
+    raise task.retry(
+        exc=error,
+        countdown=countdown,
+        max_retries=settings.RECORDING_WORKER_MAX_RETRIES,
+    )
+
+
+@app.task(bind=True)
+def start_recording(self, recording_id):
+    """Transition a recording from INITIATED to ACTIVE, or FAILED_TO_START."""
+    return _transition(
+        self,
+        recording_id,
+        "start",
+        [RecordingStatusChoices.INITIATED],
+        RecordingStartError,
+    )
+
+
+@app.task(bind=True)
+def stop_recording(self, recording_id):
+    """Transition an ACTIVE recording to STOPPED or ABORTED, or FAILED_TO_STOP.
+
+    A recording which has not started yet is cancelled, becoming ABORTED.
+    """
+    return _transition(
+        self,
+        recording_id,
+        "stop",
+        [RecordingStatusChoices.ACTIVE, RecordingStatusChoices.INITIATED],
+        RecordingStopError,
+    )
+
+
+@app.task
+def start_track(recording_id, identity, track_id):
+    """Record an audio track published in the room of an ACTIVE recording.
+
+    Recording tracks is best effort: failures are logged, and not retried for a
+    track not to be recorded twice. Return the id of the track worker, if started.
+    """
+    try:
+        recording = Recording.objects.get(
+            pk=recording_id, status=RecordingStatusChoices.ACTIVE
+        )
+    except Recording.DoesNotExist:
+        logger.info("Recording %s is not active anymore.", recording_id)
+        return None
+
+    worker_service = get_worker_service(mode=recording.mode)
+    try:
+        return worker_service.start_track(
+            str(recording.room_id), recording.id, identity, track_id
+        )
+    except (WorkerConnectionError, WorkerResponseError) as e:
+        logger.error(
+            "Failed to record track %s of recording %s: %s",
+            track_id,
+            recording_id,
+            e,
+        )
+        return None
+
+
+@app.task(bind=True)
+def notify_recording(self, recording_id):
+    """Notify external services of a SAVED recording, once its tracks are uploaded.
+
+    Recordings of worker services recording tracks are notified by the last of the
+    storage event of their mixed audio and the `egress_ended` events of their
+    tracks. Notifications of a recording are serialized by its lock, retried while
+    it is held and until it expires, for the last one to see every track uploaded.
+    """
+
+    lock_key = get_lock_cache_key(recording_id)
+    if not cache.add(lock_key, self.request.id, settings.RECORDING_WORKER_LOCK_TIMEOUT):
+        logger.info("Recording %s is being handled, retrying to notify.", recording_id)
+        # Notifications are not reconciled, so they wait for the lock until it is
+        # released or expires, rather than for a few backoffs
+        raise self.retry(
+            countdown=settings.RECORDING_WORKER_RETRY_BACKOFF,
+            max_retries=_get_lock_retries(),
+        )
+
+    try:
+        recording = Recording.objects.filter(
+            pk=recording_id, status=RecordingStatusChoices.SAVED
+        ).first()
+        if recording is None:
+            logger.info("Recording %s is not waiting for notification.", recording_id)
+            return None
+
+        worker_service = get_worker_service(mode=recording.mode)
+        try:
+            tracks = worker_service.list_tracks(str(recording.room_id), recording.id)
+        except WorkerConnectionError as e:
+            # Notifying with the tracks uploaded so far beats not notifying at all
+            logger.error(
+                "Failed to list the tracks of recording %s: %s", recording_id, e
+            )
+            tracks = []
+
+        running_tracks = sum(1 for track in tracks if track.is_running)
+
+        if running_tracks:
+            logger.info(
+                "Recording %s waits for %d tracks to be notified.",
+                recording_id,
+                running_tracks,
+            )
+            return recording.status
+
+        tracks_started_at = {
+            track.filepath: track.started_at for track in tracks if track.started_at
+        }
+        if notification_service.notify_external_services(
+            recording, tracks_started_at=tracks_started_at
+        ):
+            recording.status = RecordingStatusChoices.NOTIFICATION_SUCCEEDED
+            recording.save()
+        return recording.status
+    finally:
+        _release_lock(lock_key, self.request.id)
+
+
+@app.task
+def reconcile_recordings(dry_run=False):
+    """Periodically align ongoing recordings with LiveKit egresses."""
+    token = uuid.uuid4().hex
+    if not cache.add(
+        RECONCILIATION_LOCK_CACHE_KEY, token, settings.RECORDING_RECONCILIATION_INTERVAL
+    ):
+        logger.info("Recordings reconciliation already running, skipping.")
+        return None
+
+    try:
+        return dict(reconcile_recordings_with_workers(dry_run=dry_run))
+    finally:
+        _release_lock(RECONCILIATION_LOCK_CACHE_KEY, token)
@@ -2,6 +2,8 @@
 
 from unittest import mock
 
+from django.core.cache import cache
+
 import pytest
 
 USER = "user"
@@ -14,3 +16,18 @@ def mock_user_get_teams():
     """Mock for the "get_teams" method on the User model."""
     with mock.patch("core.models.User.get_teams") as mock_get_teams:
         yield mock_get_teams
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start each test with an empty cache as rollbacks don't send any signal."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def shared_cache():
+    """Consider the cache of tests as shared by all processes, as Redis is."""
+    with mock.patch("core.room_cache.is_cache_shared", return_value=True):
+        yield
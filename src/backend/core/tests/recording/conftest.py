@@ -0,0 +1,42 @@
+"""Fixtures for tests of recordings."""
+
+# pylint: disable=W0212,W0621
+
+import pytest
+
+from core.recording.worker import transports
+from core.recording.worker.factories import WorkerServiceConfig
+
+from .livekit_stand_in import LiveKitStandIn
+
+
+@pytest.fixture
+def livekit():
+    """Fixture to provide a running LiveKit stand-in server"""
+    server = LiveKitStandIn()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def livekit_settings(livekit, settings):
+    """Point the worker services to the LiveKit stand-in."""
+    settings.LIVEKIT_CONFIGURATION = {
+        "url": livekit.url,
+        "api_key": "test_key",
+        "api_secret": "test_secret",
+    }
+    settings.RECORDING_VERIFY_SSL = False
+    settings.RECORDING_WORKER_MAX_RETRIES = 2
+    settings.RECORDING_WORKER_RETRY_BACKOFF = 1
+    settings.RECORDING_WORKER_RETRY_BACKOFF_MAX = 1
+
+    WorkerServiceConfig.from_settings.cache_clear()
+    yield settings
+    WorkerServiceConfig.from_settings.cache_clear()
+
+    with transports._transports_lock:
+        for transport in transports._transports.values():
+            transport.close()
+        transports._transports.clear()
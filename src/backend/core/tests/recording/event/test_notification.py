@@ -0,0 +1,137 @@
+"""
+Test the notification of external services once recordings are saved.
+"""
+
+# pylint: disable=W0212,W0621,W0613
+
+from unittest import mock
+
+import pytest
+
+from core.factories import RecordingFactory, UserFactory, UserRecordingAccessFactory
+from core.models import RecordingModeChoices, RoleChoices
+from core.recording.event.notification import NotificationService
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def summary_settings(settings, tmp_path):
+    """Configure the summary service, and store recordings in a temporary folder."""
+    settings.SUMMARY_SERVICE_ENDPOINT = "https://summary.test/api/v1/tasks/"
+    settings.SUMMARY_SERVICE_API_TOKEN = "testToken"
+    settings.RECORDING_OUTPUT_FOLDER = "recordings"
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    }
+    settings.MEDIA_ROOT = tmp_path
+    return settings
+
+
+def add_track(settings, recording, identity, filename):
+    """Store the track of a participant as the tracks egress service does."""
+    folder = settings.MEDIA_ROOT / "recordings" / str(recording.id) / identity
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / filename).write_bytes(b"OggS")
+
+
+def test_notification_tracks_none(summary_settings):
+    """Recordings without tracks should have none listed."""
+    recording = RecordingFactory()
+
+    assert not NotificationService._get_tracks(recording)
+
+
+def test_notification_tracks(summary_settings):
+    """Tracks should be listed in order, with their speaker and offset."""
+    recording = RecordingFactory()
+    user = UserFactory(full_name="Alice Martin")
+    unnamed_user = UserFactory(full_name=None, short_name=None)
+    add_track(summary_settings, recording, user.sub, "1700000001500-TR_2.ogg")
+    add_track(summary_settings, recording, unnamed_user.sub, "1700000004000-TR_4.ogg")
+    add_track(summary_settings, recording, "anonymous-1", "1700000000000-TR_1.ogg")
+    add_track(summary_settings, recording, "anonymous-2", "1700000003000-TR_3.ogg")
+    add_track(summary_settings, recording, "anonymous-2", "manifest.json")
+
+    tracks = NotificationService._get_tracks(recording)
+
+    folder = f"recordings/{recording.id!s}"
+    assert tracks == [
+        {
+            "filename": f"{folder}/anonymous-1/1700000000000-TR_1.ogg",
+            "speaker": "Participant 1",
+            "offset": 0,
+        },
+        {
+            "filename": f"{folder}/{user.sub}/1700000001500-TR_2.ogg",
+            "speaker": "Alice Martin",
+            "offset": 1.5,
+        },
+        {
+            "filename": f"{folder}/anonymous-2/1700000003000-TR_3.ogg",
+            "speaker": "Participant 2",
+            "offset": 3,
+        },
+        {
+            "filename": f"{folder}/{unnamed_user.sub}/1700000004000-TR_4.ogg",
+            "speaker": "Participant 3",
+            "offset": 4,
+        },
+    ]
+    assert all(track["speaker"] != user.email for track in tracks)
+
+
+def test_notification_tracks_short_name(summary_settings):
+    """Speakers without a full name should be named after their short name."""
+    recording = RecordingFactory()
+    user = UserFactory(full_name=None, short_name="Alice")
+    add_track(summary_settings, recording, user.sub, "1700000000000-TR_1.ogg")
+
+    assert NotificationService._get_tracks(recording)[0]["speaker"] == "Alice"
+
+
+def test_notification_tracks_started_at(summary_settings):
+    """Offsets should be computed from the time tracks actually started, if known."""
+    recording = RecordingFactory()
+    add_track(summary_settings, recording, "anonymous-1", "1700000000000-TR_1.ogg")
+    add_track(summary_settings, recording, "anonymous-2", "1700000001000-TR_2.ogg")
+
+    folder = f"recordings/{recording.id!s}"
+    tracks = NotificationService._get_tracks(
+        recording,
+        tracks_started_at={
+            f"{folder}/anonymous-1/1700000000000-TR_1.ogg": 1700000000800,
+            f"{folder}/anonymous-2/1700000001000-TR_2.ogg": 1700000001300,
+        },
+    )
+
+    assert [(track["speaker"], track["offset"]) for track in tracks] == [
+        ("Participant 1", 0),
+        ("Participant 2", 0.5),
+    ]
+
+
+@mock.patch("core.recording.event.notification.requests.post")
+def test_notification_summary_service_tracks(mock_post, summary_settings):
+    """The summary service should be sent the tracks of the recording, if any."""
+    recording = RecordingFactory(mode=RecordingModeChoices.TRANSCRIPT)
+    access = UserRecordingAccessFactory(recording=recording, role=RoleChoices.OWNER)
+    add_track(summary_settings, recording, "anonymous-1", "1700000000000-TR_1.ogg")
+
+    assert NotificationService().notify_external_services(recording) is True
+
+    payload = mock_post.call_args.kwargs["json"]
+    assert payload == {
+        "filename": f"recordings/{recording.id!s}.ogg",
+        "email": access.user.email,
+        "sub": access.user.sub,
+        "tracks": [
+            {
+                "filename": f"recordings/{recording.id!s}/anonymous-1/"
+                "1700000000000-TR_1.ogg",
+                "speaker": "Participant 1",
+                "offset": 0,
+            }
+        ],
+    }
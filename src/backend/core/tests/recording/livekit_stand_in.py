@@ -0,0 +1,180 @@
+"""
+Local stand-in of the LiveKit egress API, to test worker services end to end.
+"""
+
+# pylint: disable=W0212,E1101,R0902
+
+import asyncio
+import itertools
+import threading
+
+from aiohttp import web
+from livekit import api as livekit_api
+
+TWIRP_PREFIX = "/twirp/livekit.Egress"
+ROOM_TWIRP_PREFIX = "/twirp/livekit.RoomService"
+
+
+class LiveKitStandIn:
+    """Local HTTP server answering Twirp egress calls.
+
+    It keeps track of client connections, of the egresses it manages and of the number
+    of concurrent calls it served. Latency and failures can be injected per method.
+    """
+
+    def __init__(self, latency=0.0, page_size=None):
+        self.latency = latency
+        self.page_size = page_size
+        self.peers = set()
+        self.calls = {}
+        self.failures = {}
+        self.egresses = {}
+        self.participants = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.url = None
+        self._counter = itertools.count(1)
+        self._loop = asyncio.new_event_loop()
+        self._runner = None
+
+    def fail(self, method, times=1, code="unavailable", status=503):
+        """Answer the next calls of a method with a Twirp error."""
+        self.failures[method] = (times, code, status)
+
+    def add_egress(self, room_name, status=livekit_api.EgressStatus.EGRESS_ACTIVE):
+        """Register an egress as if it had been started by another client."""
+        egress_id = f"EG_{next(self._counter):d}"
+        self.egresses[egress_id] = livekit_api.EgressInfo(
+            egress_id=egress_id, room_name=room_name, status=status
+        )
+        return egress_id
+
+    def _handler(self, method, handler):
+        """Wrap a method handler with bookkeeping, latency and failures injection."""
+
+        async def wrapper(request):
+            self.peers.add(request.transport.get_extra_info("peername"))
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                times, code, status = self.failures.get(method, (0, None, None))
+                if times > 0:
+                    self.failures[method] = (times - 1, code, status)
+                    return web.json_response(
+                        {"code": code, "msg": f"{method} failed"}, status=status
+                    )
+
+                response = handler(await request.read())
+                return web.Response(body=response.SerializeToString())
+            finally:
+                self.in_flight -= 1
+
+        return wrapper
+
+    def _start_room_composite_egress(self, body):
+        """Start an egress for the requested room."""
+        egress_request = livekit_api.RoomCompositeEgressRequest.FromString(body)
+        egress_id = self.add_egress(
+            egress_request.room_name, livekit_api.EgressStatus.EGRESS_STARTING
+        )
+        return self.egresses[egress_id]
+
+    def _start_track_egress(self, body):
+        """Start an egress for the requested track."""
+        egress_request = livekit_api.TrackEgressRequest.FromString(body)
+        egress_id = self.add_egress(
+            egress_request.room_name, livekit_api.EgressStatus.EGRESS_STARTING
+        )
+        self.egresses[egress_id].track.CopyFrom(egress_request)
+        return self.egresses[egress_id]
+
+    def _list_participants(self, body):
+        """List the participants registered in the requested room."""
+        list_request = livekit_api.ListParticipantsRequest.FromString(body)
+        return livekit_api.ListParticipantsResponse(
+            participants=self.participants.get(list_request.room, [])
+        )
+
+    def _stop_egress(self, body):
+        """Answer a StopEgress call with an egress in ending status."""
+        egress_request = livekit_api.StopEgressRequest.FromString(body)
+        egress = self.egresses.setdefault(
+            egress_request.egress_id,
+            livekit_api.EgressInfo(egress_id=egress_request.egress_id),
+        )
+        egress.status = livekit_api.EgressStatus.EGRESS_ENDING
+        return egress
+
+    def _list_egress(self, body):
+        """List known egresses, optionally filtered on an id, a room or active ones.
+
+        Like LiveKit, active egresses are those whose file is not uploaded yet.
+        """
+        list_request = livekit_api.ListEgressRequest.FromString(body)
+        items = [
+            egress
+            for egress in self.egresses.values()
+            if (
+                not list_request.egress_id or egress.egress_id == list_request.egress_id
+            )
+            and (
+                not list_request.room_name or egress.room_name == list_request.room_name
+            )
+            and (
+                not list_request.active
+                or egress.status
+                in (
+                    livekit_api.EgressStatus.EGRESS_STARTING,
+                    livekit_api.EgressStatus.EGRESS_ACTIVE,
+                    livekit_api.EgressStatus.EGRESS_ENDING,
+                )
+            )
+        ]
+        if not self.page_size:
+            return livekit_api.ListEgressResponse(items=items)
+
+        offset = int(list_request.page_token.token or 0)
+        next_offset = offset + self.page_size
+        return livekit_api.ListEgressResponse(
+            items=items[offset:next_offset],
+            next_page_token=livekit_api.TokenPagination(
+                token=str(next_offset) if next_offset < len(items) else ""
+            ),
+        )
+
+    async def _start(self):
+        app = web.Application()
+        for prefix, method, handler in (
+            (
+                TWIRP_PREFIX,
+                "StartRoomCompositeEgress",
+                self._start_room_composite_egress,
+            ),
+            (TWIRP_PREFIX, "StartTrackEgress", self._start_track_egress),
+            (TWIRP_PREFIX, "StopEgress", self._stop_egress),
+            (TWIRP_PREFIX, "ListEgress", self._list_egress),
+            (ROOM_TWIRP_PREFIX, "ListParticipants", self._list_participants),
+        ):
+            app.router.add_post(
+                f"{prefix:s}/{method:s}", self._handler(method, handler)
+            )
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port:d}"
+
+    def start(self):
+        """Start the server in a dedicated thread."""
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+
+    def stop(self):
+        """Stop the server and its thread."""
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
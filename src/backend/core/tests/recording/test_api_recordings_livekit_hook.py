@@ -0,0 +1,356 @@
+"""
+Test recordings API endpoints in the Meet core app: LiveKit egress events.
+"""
+
+# pylint: disable=W0621,W0613,E1101
+
+import base64
+import hashlib
+import json
+import uuid
+from unittest import mock
+
+import pytest
+from livekit import api as livekit_api
+from rest_framework.test import APIClient
+
+from ...factories import RecordingFactory
+from ...models import Recording, RecordingModeChoices, RecordingStatusChoices
+
+pytestmark = pytest.mark.django_db
+
+EgressStatus = livekit_api.EgressStatus
+
+URL = "/api/v1.0/recordings/livekit-hook/"
+
+
+@pytest.fixture
+def livekit_event_settings(settings):
+    """Enable LiveKit events and configure LiveKit credentials."""
+    settings.RECORDING_LIVEKIT_EVENT_ENABLE = True
+    settings.LIVEKIT_CONFIGURATION = {
+        "url": "https://livekit.test",
+        "api_key": "test_key",
+        "api_secret": "test_secret",
+    }
+    return settings
+
+
+def get_body(event, egress_id="EG_1", status=EgressStatus.EGRESS_ACTIVE, filepath=""):
+    """Serialize a LiveKit webhook event as LiveKit does."""
+    egress_info = {
+        "egressId": egress_id,
+        "roomName": "room",
+        "status": EgressStatus.Name(status),
+    }
+    if filepath:
+        egress_info["roomComposite"] = {"fileOutputs": [{"filepath": filepath}]}
+    return json.dumps(
+        {"event": event, "id": str(uuid.uuid4()), "egressInfo": egress_info}
+    )
+
+
+def sign(body, secret="test_secret"):
+    """Sign a body like LiveKit does."""
+    body_hash = base64.b64encode(hashlib.sha256(body.encode()).digest()).decode()
+    return livekit_api.AccessToken("test_key", secret).with_sha256(body_hash).to_jwt()
+
+
+def post_event(body, token=None):
+    """Post an event to the LiveKit hook."""
+    return APIClient().post(
+        URL,
+        body,
+        content_type="application/webhook+json",
+        HTTP_AUTHORIZATION=sign(body) if token is None else token,
+    )
+
+
+def test_api_recordings_livekit_hook_disabled(livekit_event_settings):
+    """Events should be refused when LiveKit events are disabled."""
+    livekit_event_settings.RECORDING_LIVEKIT_EVENT_ENABLE = False
+    recording = RecordingFactory(status=RecordingStatusChoices.INITIATED)
+
+    response = post_event(
+        get_body("egress_started", filepath=f"recordings/{recording.id!s}.mp4")
+    )
+
+    assert response.status_code == 403
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.INITIATED
+
+
+def test_api_recordings_livekit_hook_missing_signature(livekit_event_settings):
+    """Unsigned events should be refused."""
+    response = APIClient().post(
+        URL, get_body("egress_started"), content_type="application/webhook+json"
+    )
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Authorization header is required"}
+
+
+def test_api_recordings_livekit_hook_wrong_secret(livekit_event_settings):
+    """Events signed with another secret should be refused."""
+    body = get_body("egress_started")
+
+    response = post_event(body, token=sign(body, secret="other_secret"))
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Invalid token"}
+
+
+def test_api_recordings_livekit_hook_tampered_body(livekit_event_settings):
+    """Events whose body does not match the signed hash should be refused."""
+    recording = RecordingFactory(status=RecordingStatusChoices.ACTIVE, worker_id="EG_1")
+    body = get_body("egress_ended", status=EgressStatus.EGRESS_COMPLETE)
+    token = sign(get_body("egress_updated"))
+
+    response = post_event(body, token=token)
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Invalid signature"}
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.ACTIVE
+
+
+def test_api_recordings_livekit_hook_invalid_body(livekit_event_settings):
+    """Signed but malformed events should be rejected."""
+    response = post_event("{not json")
+
+    assert response.status_code == 400
+
+
+def test_api_recordings_livekit_hook_other_events(
+    livekit_event_settings, django_assert_num_queries
+):
+    """Events unrelated to egresses should be ignored without querying."""
+    body = json.dumps({"event": "participant_joined", "id": "EV_1"})
+
+    with django_assert_num_queries(0):
+        response = post_event(body)
+
+    assert response.status_code == 200
+    assert response.json() == {"message": "Event processed.", "updated": 0}
+
+
+def test_api_recordings_livekit_hook_started(
+    livekit_event_settings, django_assert_num_queries
+):
+    """
+    An egress started event should activate its recording, identified by its output
+    filepath before its worker id is known, in a single query.
+    """
+    recording = RecordingFactory(status=RecordingStatusChoices.INITIATED)
+    body = get_body(
+        "egress_started",
+        egress_id="EG_started",
+        status=EgressStatus.EGRESS_STARTING,
+        filepath=f"recordings/{recording.id!s}.ogg",
+    )
+
+    with django_assert_num_queries(1):
+        response = post_event(body)
+
+    assert response.status_code == 200
+    assert response.json() == {"message": "Event processed.", "updated": 1}
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.ACTIVE
+    assert recording.worker_id == "EG_started"
+
+    # Duplicated deliveries have no effect
+    response = post_event(body)
+    assert response.json()["updated"] == 0
+
+
+@pytest.mark.parametrize(
+    "initial_status,egress_status,expected_status",
+    [
+        ("active", EgressStatus.EGRESS_ACTIVE, "active"),
+        ("active", EgressStatus.EGRESS_ENDING, "stopped"),
+        ("active", EgressStatus.EGRESS_COMPLETE, "stopped"),
+        ("active", EgressStatus.EGRESS_LIMIT_REACHED, "stopped"),
+        ("active", EgressStatus.EGRESS_FAILED, "aborted"),
+        ("active", EgressStatus.EGRESS_ABORTED, "aborted"),
+        ("initiated", EgressStatus.EGRESS_FAILED, "failed_to_start"),
+        ("failed_to_stop", EgressStatus.EGRESS_COMPLETE, "stopped"),
+        ("stopped", EgressStatus.EGRESS_ACTIVE, "stopped"),
+        ("stopped", EgressStatus.EGRESS_ABORTED, "stopped"),
+        ("saved", EgressStatus.EGRESS_COMPLETE, "saved"),
+        (
+            "notification_succeeded",
+            EgressStatus.EGRESS_ENDING,
+            "notification_succeeded",
+        ),
+    ],
+)
+def test_api_recordings_livekit_hook_transitions(
+    livekit_event_settings, initial_status, egress_status, expected_status
+):
+    """Events should only move recordings forward, identified by their worker id."""
+    recording = RecordingFactory(status=initial_status, worker_id="EG_1")
+    other = RecordingFactory(status=initial_status, worker_id="EG_2")
+
+    response = post_event(get_body("egress_updated", status=egress_status))
+
+    assert response.status_code == 200
+    assert response.json()["updated"] == int(initial_status != expected_status)
+    recording.refresh_from_db()
+    assert recording.status == expected_status
+    other.refresh_from_db()
+    assert other.status == initial_status
+
+
+def test_api_recordings_livekit_hook_out_of_order(livekit_event_settings):
+    """A late update event should not revive an ended recording."""
+    recording = RecordingFactory(status=RecordingStatusChoices.ACTIVE, worker_id="EG_1")
+
+    post_event(get_body("egress_ended", status=EgressStatus.EGRESS_COMPLETE))
+    post_event(get_body("egress_updated", status=EgressStatus.EGRESS_ACTIVE))
+
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.STOPPED
+    assert Recording.objects.count() == 1
+
+
+def get_track_body(room_name, track_type=livekit_api.TrackType.AUDIO):
+    """Serialize a LiveKit track published event as LiveKit does."""
+    return json.dumps(
+        {
+            "event": "track_published",
+            "id": str(uuid.uuid4()),
+            "room": {"name": room_name},
+            "participant": {"identity": "alice"},
+            "track": {"sid": "TR_1", "type": livekit_api.TrackType.Name(track_type)},
+        }
+    )
+
+
+@pytest.fixture
+def mock_start_track(settings):
+    """Record transcripts by track, and mock the task recording a track."""
+    settings.RECORDING_WORKER_CLASSES = {
+        "screen_recording": "core.recording.worker.services.VideoCompositeEgressService",
+        "transcript": "core.recording.worker.services.AudioTracksEgressService",
+    }
+    with mock.patch("core.tasks.start_track.delay") as mock_delay:
+        yield mock_delay
+
+
+def test_api_recordings_livekit_hook_track_published(
+    livekit_event_settings, mock_start_track
+):
+    """Audio tracks published in a room being recorded should be recorded too."""
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.ACTIVE,
+        mode=RecordingModeChoices.TRANSCRIPT,
+        worker_id="EG_1",
+    )
+    RecordingFactory(status=RecordingStatusChoices.STOPPED, room=recording.room)
+
+    response = post_event(get_track_body(str(recording.room_id)))
+
+    assert response.status_code == 200
+    assert response.json() == {"message": "Event processed.", "updated": 1}
+    mock_start_track.assert_called_once_with(str(recording.id), "alice", "TR_1")
+
+
+def test_api_recordings_livekit_hook_track_published_not_supported(
+    livekit_event_settings, mock_start_track
+):
+    """Tracks should be ignored by worker services not recording them."""
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.ACTIVE,
+        mode=RecordingModeChoices.SCREEN_RECORDING,
+    )
+
+    response = post_event(get_track_body(str(recording.room_id)))
+
+    assert response.status_code == 200
+    assert response.json()["updated"] == 0
+    mock_start_track.assert_not_called()
+
+
+def get_track_egress_body(event, filepath, status=EgressStatus.EGRESS_COMPLETE):
+    """Serialize a LiveKit event of a track egress as LiveKit does."""
+    return json.dumps(
+        {
+            "event": event,
+            "id": str(uuid.uuid4()),
+            "egressInfo": {
+                "egressId": "EG_track",
+                "roomName": "room",
+                "status": EgressStatus.Name(status),
+                "track": {"trackId": "TR_1", "file": {"filepath": filepath}},
+            },
+        }
+    )
+
+
+def test_api_recordings_livekit_hook_track_egress_ended(livekit_event_settings):
+    """The recording of an ended track should be notified, its status unchanged."""
+    recording = RecordingFactory(status=RecordingStatusChoices.ACTIVE, worker_id="EG_1")
+    filepath = f"recordings/{recording.id!s}/alice/1700000000000-TR_1.ogg"
+
+    with mock.patch("core.tasks.notify_recording.delay") as mock_notify:
+        response = post_event(get_track_egress_body("egress_ended", filepath))
+
+    assert response.status_code == 200
+    assert response.json()["updated"] == 1
+    mock_notify.assert_called_once_with(str(recording.id))
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.ACTIVE
+    assert recording.worker_id == "EG_1"
+
+
+@pytest.mark.parametrize(
+    "event, filepath",
+    [
+        ("egress_updated", "recordings/{recording_id}/alice/1700000000000-TR_1.ogg"),
+        ("egress_ended", "recordings/alice/1700000000000-TR_1.ogg"),
+    ],
+)
+def test_api_recordings_livekit_hook_track_egress_ignored(
+    livekit_event_settings, event, filepath
+):
+    """Tracks which did not end, or of unknown recordings, should be ignored."""
+    recording = RecordingFactory(status=RecordingStatusChoices.ACTIVE, worker_id="EG_1")
+    filepath = filepath.format(recording_id=recording.id)
+
+    with mock.patch("core.tasks.notify_recording.delay") as mock_notify:
+        response = post_event(
+            get_track_egress_body(event, filepath, EgressStatus.EGRESS_ACTIVE)
+        )
+
+    assert response.status_code == 200
+    assert response.json()["updated"] == 0
+    mock_notify.assert_not_called()
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.ACTIVE
+
+
+@pytest.mark.parametrize(
+    "room_name, track_type",
+    [
+        ("not-a-room-id", livekit_api.TrackType.AUDIO),
+        (None, livekit_api.TrackType.VIDEO),
+    ],
+)
+def test_api_recordings_livekit_hook_track_published_ignored(
+    livekit_event_settings,
+    mock_start_track,
+    django_assert_num_queries,
+    room_name,
+    track_type,
+):
+    """Video tracks, and tracks of rooms unknown to Meet, should be ignored."""
+    recording = RecordingFactory(status=RecordingStatusChoices.ACTIVE)
+
+    with django_assert_num_queries(0):
+        response = post_event(
+            get_track_body(room_name or str(recording.room_id), track_type)
+        )
+
+    assert response.status_code == 200
+    assert response.json()["updated"] == 0
+    mock_start_track.assert_not_called()
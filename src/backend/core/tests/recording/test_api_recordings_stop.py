@@ -0,0 +1,184 @@
+"""
+Test recordings API endpoints in the Meet core app: bulk stop.
+"""
+
+# pylint: disable=W0613
+
+import uuid
+
+import pytest
+from rest_framework.test import APIClient
+
+from ...factories import (
+    RecordingFactory,
+    TeamRecordingAccessFactory,
+    UserFactory,
+    UserRecordingAccessFactory,
+)
+from ...models import Recording, RecordingStatusChoices
+
+pytestmark = pytest.mark.django_db
+
+
+def test_api_recordings_stop_anonymous(settings):
+    """Anonymous users should not be allowed to stop recordings."""
+    settings.RECORDING_ENABLE = True
+    recording = RecordingFactory(status=RecordingStatusChoices.ACTIVE)
+
+    response = APIClient().post(
+        "/api/v1.0/recordings/stop/", {"ids": [str(recording.id)]}, format="json"
+    )
+
+    assert response.status_code == 401
+    assert Recording.objects.get().status == RecordingStatusChoices.ACTIVE
+
+
+def test_api_recordings_stop_recording_disabled(settings):
+    """Recordings should not be stopped when recording is disabled."""
+    settings.RECORDING_ENABLE = False
+    recording = RecordingFactory(status=RecordingStatusChoices.ACTIVE)
+    user = UserFactory()
+    UserRecordingAccessFactory(recording=recording, user=user, role="owner")
+
+    client = APIClient()
+    client.force_login(user)
+
+    response = client.post(
+        "/api/v1.0/recordings/stop/", {"ids": [str(recording.id)]}, format="json"
+    )
+
+    assert response.status_code == 403
+    assert Recording.objects.get().status == RecordingStatusChoices.ACTIVE
+
+
+def test_api_recordings_stop_invalid(settings):
+    """A list of recording ids is required."""
+    settings.RECORDING_ENABLE = True
+    client = APIClient()
+    client.force_login(UserFactory())
+
+    response = client.post("/api/v1.0/recordings/stop/", {"ids": []}, format="json")
+
+    assert response.status_code == 400
+    assert response.json() == {"ids": ["This list may not be empty."]}
+
+
+def test_api_recordings_stop_success(livekit_settings, livekit, settings):
+    """
+    Owners and administrators should stop their active recordings in bulk, other
+    recordings being reported as not found.
+    """
+    settings.RECORDING_ENABLE = True
+    user = UserFactory()
+    livekit.latency = 0.1
+
+    stoppable = []
+    for role in ["owner", "administrator", "owner"]:
+        recording = RecordingFactory(
+            status=RecordingStatusChoices.ACTIVE,
+            worker_id=livekit.add_egress("room"),
+        )
+        UserRecordingAccessFactory(recording=recording, user=user, role=role)
+        stoppable.append(recording)
+
+    member = RecordingFactory(status=RecordingStatusChoices.ACTIVE, worker_id="EG")
+    UserRecordingAccessFactory(recording=member, user=user, role="member")
+    other = RecordingFactory(status=RecordingStatusChoices.ACTIVE, worker_id="EG")
+    stopped = RecordingFactory(status=RecordingStatusChoices.STOPPED)
+    UserRecordingAccessFactory(recording=stopped, user=user, role="owner")
+    unknown = uuid.uuid4()
+
+    client = APIClient()
+    client.force_login(user)
+
+    ids = [recording.id for recording in [*stoppable, member, other, stopped]]
+    response = client.post(
+        "/api/v1.0/recordings/stop/",
+        {"ids": [str(recording_id) for recording_id in [*ids, unknown]]},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    content = response.json()
+    assert content["results"] == [
+        {"id": str(recording.id), "status": "stopped", "error": None}
+        for recording in stoppable
+    ] + [
+        {"id": str(recording_id), "status": None, "error": "No active recording found."}
+        for recording_id in [member.id, other.id, stopped.id, unknown]
+    ]
+    assert 0.1 <= content["duration"] < 0.3
+    assert livekit.calls["StopEgress"] == 3
+    assert livekit.max_in_flight == 3
+
+    statuses = dict(Recording.objects.values_list("id", "status"))
+    assert statuses == {
+        **{recording.id: "stopped" for recording in stoppable},
+        member.id: "active",
+        other.id: "active",
+        stopped.id: "stopped",
+    }
+
+
+def test_api_recordings_stop_via_team(
+    livekit_settings, livekit, settings, mock_user_get_teams
+):
+    """Owners and administrators via a team should stop its active recordings."""
+    settings.RECORDING_ENABLE = True
+    user = UserFactory()
+    mock_user_get_teams.return_value = ["team1"]
+
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.ACTIVE, worker_id=livekit.add_egress("room")
+    )
+    TeamRecordingAccessFactory(recording=recording, team="team1", role="administrator")
+    member = RecordingFactory(status=RecordingStatusChoices.ACTIVE, worker_id="EG")
+    TeamRecordingAccessFactory(recording=member, team="team1", role="member")
+
+    client = APIClient()
+    client.force_login(user)
+
+    response = client.post(
+        "/api/v1.0/recordings/stop/",
+        {"ids": [str(recording.id), str(member.id)]},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"id": str(recording.id), "status": "stopped", "error": None},
+        {"id": str(member.id), "status": None, "error": "No active recording found."},
+    ]
+    assert livekit.calls["StopEgress"] == 1
+
+
+def test_api_recordings_stop_worker_error(livekit_settings, livekit, settings):
+    """Failures should be reported per recording."""
+    settings.RECORDING_ENABLE = True
+    user = UserFactory()
+    livekit.fail("StopEgress")
+
+    recordings = RecordingFactory.create_batch(
+        2, status=RecordingStatusChoices.ACTIVE, worker_id="EG"
+    )
+    for recording in recordings:
+        UserRecordingAccessFactory(recording=recording, user=user, role="owner")
+
+    client = APIClient()
+    client.force_login(user)
+
+    response = client.post(
+        "/api/v1.0/recordings/stop/",
+        {"ids": [str(recording.id) for recording in recordings]},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert sorted(result["status"] for result in results) == [
+        "failed_to_stop",
+        "stopped",
+    ]
+    assert [result["error"] is None for result in results] == [
+        result["status"] == "stopped" for result in results
+    ]
@@ -11,9 +11,10 @@ import pytest
 from rest_framework.test import APIClient
 
 from ...factories import RecordingFactory
-from ...models import Recording, RecordingStatusChoices
+from ...models import Recording, RecordingModeChoices, RecordingStatusChoices
 from ...recording.event.exceptions import (
     InvalidBucketError,
+    InvalidFilepathError,
     InvalidFileTypeError,
     ParsingEventDataError,
 )
@@ -134,6 +135,30 @@ def test_save_recording_filetype_error(recording_settings, mock_get_parser):
     assert response.json() == {"message": "Ignore this file type, unsupported '.json'"}
 
 
+def test_save_recording_filepath_error(recording_settings, mock_get_parser):
+    """Files which are not recordings, like participants' tracks, should be ignored."""
+
+    mock_parser = mock.Mock()
+    mock_parser.get_recording_id.side_effect = InvalidFilepathError(
+        "Invalid filepath structure: recordings/id/alice/1-TR_1.ogg"
+    )
+    mock_get_parser.return_value = mock_parser
+
+    client = APIClient()
+
+    response = client.post(
+        "/api/v1.0/recordings/storage-hook/",
+        {"recording_data": "valid-data"},
+        HTTP_AUTHORIZATION="Bearer testAuthToken",
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "message": "Ignore this file, Invalid filepath structure: "
+        "recordings/id/alice/1-TR_1.ogg"
+    }
+
+
 def test_save_recording_unknown_recording(recording_settings, mock_get_parser, client):
     """Test handling of events for non-existent recordings."""
 
@@ -201,3 +226,35 @@ def test_save_recording_success(recording_settings, mock_get_parser, client, sta
 
     recording.refresh_from_db()
     assert recording.status == RecordingStatusChoices.SAVED
+
+
+def test_save_recording_tracks(
+    recording_settings, mock_get_parser, client, django_capture_on_commit_callbacks
+):
+    """Recordings of tracks should be notified from a task, once tracks are uploaded."""
+    recording_settings.RECORDING_WORKER_CLASSES = {
+        "transcript": "core.recording.worker.services.AudioTracksEgressService",
+    }
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.STOPPED, mode=RecordingModeChoices.TRANSCRIPT
+    )
+    mock_get_parser.return_value.get_recording_id.return_value = recording.id
+
+    with (
+        mock.patch("core.tasks.notify_recording.delay") as mock_notify,
+        mock.patch(
+            "core.api.viewsets.notification_service.notify_external_services"
+        ) as mock_notify_external_services,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        response = client.post(
+            "/api/v1.0/recordings/storage-hook/",
+            {"recording_data": "valid-data"},
+            HTTP_AUTHORIZATION="Bearer testAuthToken",
+        )
+
+    assert response.status_code == 200
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.SAVED
+    mock_notify.assert_called_once_with(str(recording.id))
+    mock_notify_external_services.assert_not_called()
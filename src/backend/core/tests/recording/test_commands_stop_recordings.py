@@ -0,0 +1,77 @@
+"""Test the `stop_recordings` management command"""
+
+# pylint: disable=W0613
+
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+import pytest
+
+from core.factories import RecordingFactory, RoomFactory
+from core.models import Recording, RecordingStatusChoices
+
+pytestmark = pytest.mark.django_db
+
+
+def test_commands_stop_recordings_all(livekit_settings, livekit):
+    """All active recordings should be stopped at once."""
+    recordings = [
+        RecordingFactory(
+            status=RecordingStatusChoices.ACTIVE, worker_id=livekit.add_egress("room")
+        )
+        for _ in range(3)
+    ]
+    stopped = RecordingFactory(status=RecordingStatusChoices.STOPPED)
+    output = StringIO()
+
+    call_command("stop_recordings", "--all", stdout=output)
+
+    assert livekit.calls["StopEgress"] == 3
+    for recording in recordings:
+        assert f"{recording.id!s} stopped" in output.getvalue()
+    assert str(stopped.id) not in output.getvalue()
+    assert "Stopped 3/3 recordings in" in output.getvalue()
+    assert set(Recording.objects.values_list("status", flat=True)) == {
+        RecordingStatusChoices.STOPPED
+    }
+
+
+def test_commands_stop_recordings_rooms(livekit_settings, livekit):
+    """Only active recordings of the given rooms should be stopped."""
+    room = RoomFactory()
+    recording = RecordingFactory(
+        room=room, status=RecordingStatusChoices.ACTIVE, worker_id="EG_1"
+    )
+    other = RecordingFactory(status=RecordingStatusChoices.ACTIVE, worker_id="EG_2")
+
+    call_command("stop_recordings", "--room", room.slug, stdout=StringIO())
+
+    recording.refresh_from_db()
+    other.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.STOPPED
+    assert other.status == RecordingStatusChoices.ACTIVE
+
+
+def test_commands_stop_recordings_failures(livekit_settings, livekit):
+    """Failures should be reported and make the command fail."""
+    recording = RecordingFactory(status=RecordingStatusChoices.ACTIVE, worker_id="EG")
+    livekit.fail("StopEgress")
+    output = StringIO()
+
+    with pytest.raises(CommandError, match="1 recordings failed to stop."):
+        call_command("stop_recordings", "--recording", str(recording.id), stdout=output)
+
+    assert f"{recording.id!s} failed_to_stop" in output.getvalue()
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.FAILED_TO_STOP
+
+
+def test_commands_stop_recordings_nothing(livekit_settings, livekit):
+    """The command should not call LiveKit when no recording is active."""
+    output = StringIO()
+
+    call_command("stop_recordings", "--all", stdout=output)
+
+    assert output.getvalue() == "No active recording to stop.\n"
+    assert livekit.calls == {}
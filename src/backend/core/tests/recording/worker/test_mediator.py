@@ -2,12 +2,12 @@
 
 # pylint: disable=W0621,W0613
 
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import pytest
 
 from core.factories import RecordingFactory
-from core.models import RecordingStatusChoices
+from core.models import Recording, RecordingModeChoices, RecordingStatusChoices
 from core.recording.worker.exceptions import (
     RecordingStartError,
     RecordingStopError,
@@ -16,7 +16,7 @@ from core.recording.worker.exceptions import (
     WorkerResponseError,
 )
 from core.recording.worker.factories import WorkerService
-from core.recording.worker.mediator import WorkerServiceMediator
+from core.recording.worker.mediator import WorkerServiceMediator, stop_recordings
 
 pytestmark = pytest.mark.django_db
 
@@ -79,6 +79,21 @@ def test_mediator_start_recording_worker_errors(
     assert mock_recording.worker_id is None
 
 
+def test_mediator_start_recording_worker_error_not_final(mediator, mock_worker_service):
+    """A failed attempt which will be retried should leave the recording initiated"""
+    mock_worker_service.start.side_effect = WorkerConnectionError("Test error")
+    mock_recording = RecordingFactory(
+        status=RecordingStatusChoices.INITIATED, worker_id=None
+    )
+
+    with pytest.raises(RecordingStartError):
+        mediator.start(mock_recording, final_attempt=False)
+
+    mock_recording.refresh_from_db()
+    assert mock_recording.status == RecordingStatusChoices.INITIATED
+    assert mock_recording.worker_id is None
+
+
 @pytest.mark.parametrize(
     "status",
     [
@@ -141,6 +156,19 @@ def test_mediator_stop_recording_aborted(mediator, mock_worker_service):
     assert mock_recording.status == RecordingStatusChoices.ABORTED
 
 
+def test_mediator_stop_recording_initiated(mediator, mock_worker_service):
+    """A recording which has not started yet should be aborted without its worker."""
+    mock_recording = RecordingFactory(
+        status=RecordingStatusChoices.INITIATED, worker_id=None
+    )
+
+    mediator.stop(mock_recording)
+
+    mock_worker_service.stop.assert_not_called()
+    mock_recording.refresh_from_db()
+    assert mock_recording.status == RecordingStatusChoices.ABORTED
+
+
 @pytest.mark.parametrize("error_class", [WorkerConnectionError, WorkerResponseError])
 def test_mediator_stop_recording_worker_errors(
     mediator, mock_worker_service, error_class
@@ -159,3 +187,116 @@ def test_mediator_stop_recording_worker_errors(
     # Verify recording updates
     mock_recording.refresh_from_db()
     assert mock_recording.status == RecordingStatusChoices.FAILED_TO_STOP
+
+
+def test_mediator_stop_many(mediator, mock_worker_service, django_assert_num_queries):
+    """Test stopping several recordings with a single update query"""
+    recordings = [
+        RecordingFactory(status=RecordingStatusChoices.ACTIVE, worker_id=f"w{i:d}")
+        for i in range(3)
+    ]
+    initiated = RecordingFactory(status=RecordingStatusChoices.INITIATED)
+    mock_worker_service.stop_many.return_value = [
+        "STOPPED",
+        WorkerConnectionError("Test error"),
+        "ABORTED",
+    ]
+
+    with django_assert_num_queries(1):
+        outcomes = mediator.stop_many([*recordings, initiated])
+
+    mock_worker_service.stop_many.assert_called_once_with(["w0", "w1", "w2"])
+    assert [(o.recording, o.status, o.succeeded) for o in outcomes] == [
+        (recordings[0], RecordingStatusChoices.STOPPED, True),
+        (recordings[1], RecordingStatusChoices.FAILED_TO_STOP, False),
+        (recordings[2], RecordingStatusChoices.ABORTED, True),
+        (initiated, RecordingStatusChoices.INITIATED, False),
+    ]
+    assert outcomes[1].error == "Test error"
+    assert outcomes[3].error == "Cannot stop recording in initiated status."
+
+    statuses = dict(Recording.objects.values_list("id", "status"))
+    assert statuses == {
+        recordings[0].id: RecordingStatusChoices.STOPPED,
+        recordings[1].id: RecordingStatusChoices.FAILED_TO_STOP,
+        recordings[2].id: RecordingStatusChoices.ABORTED,
+        initiated.id: RecordingStatusChoices.INITIATED,
+    }
+
+
+def test_mediator_stop_many_batch_failure(mediator, mock_worker_service):
+    """Test a failure of the whole batch fails each active recording"""
+    recordings = [
+        RecordingFactory(status=RecordingStatusChoices.ACTIVE, worker_id=f"w{i:d}")
+        for i in range(2)
+    ]
+    mock_worker_service.stop_many.side_effect = WorkerConnectionError("Test error")
+
+    outcomes = mediator.stop_many(recordings)
+
+    assert [(o.status, o.error) for o in outcomes] == [
+        (RecordingStatusChoices.FAILED_TO_STOP, "Test error"),
+        (RecordingStatusChoices.FAILED_TO_STOP, "Test error"),
+    ]
+    assert set(Recording.objects.values_list("status", flat=True)) == {
+        RecordingStatusChoices.FAILED_TO_STOP
+    }
+
+
+def test_mediator_stop_many_nothing_active(mediator, mock_worker_service):
+    """Test the worker is not called when no recording is active"""
+    recording = RecordingFactory(status=RecordingStatusChoices.STOPPED)
+
+    outcomes = mediator.stop_many([recording])
+
+    mock_worker_service.stop_many.assert_not_called()
+    assert outcomes[0].status == RecordingStatusChoices.STOPPED
+    assert not outcomes[0].succeeded
+
+
+def test_mediator_stop_recordings_empty():
+    """Test stopping an empty list of recordings"""
+    assert stop_recordings([]) == []
+
+
+def test_mediator_stop_recordings_by_mode():
+    """Test recordings are stopped by the worker service of their mode"""
+    services = {
+        RecordingModeChoices.SCREEN_RECORDING: Mock(spec=WorkerService),
+        RecordingModeChoices.TRANSCRIPT: Mock(spec=WorkerService),
+    }
+    services[RecordingModeChoices.SCREEN_RECORDING].stop_many.return_value = ["STOPPED"]
+    services[RecordingModeChoices.TRANSCRIPT].stop_many.return_value = [
+        "STOPPED",
+        "ABORTED",
+    ]
+    recordings = [
+        RecordingFactory(
+            status=RecordingStatusChoices.ACTIVE, worker_id=f"w{index}", mode=mode
+        )
+        for index, mode in enumerate(
+            [
+                RecordingModeChoices.TRANSCRIPT,
+                RecordingModeChoices.SCREEN_RECORDING,
+                RecordingModeChoices.TRANSCRIPT,
+            ]
+        )
+    ]
+
+    with patch(
+        "core.recording.worker.mediator.get_worker_service",
+        side_effect=lambda mode: services[mode],
+    ):
+        outcomes = stop_recordings(recordings)
+
+    services[RecordingModeChoices.TRANSCRIPT].stop_many.assert_called_once_with(
+        ["w0", "w2"]
+    )
+    services[RecordingModeChoices.SCREEN_RECORDING].stop_many.assert_called_once_with(
+        ["w1"]
+    )
+    assert [(o.recording, o.status) for o in outcomes] == [
+        (recordings[0], RecordingStatusChoices.STOPPED),
+        (recordings[1], RecordingStatusChoices.STOPPED),
+        (recordings[2], RecordingStatusChoices.ABORTED),
+    ]
@@ -0,0 +1,241 @@
+"""
+Test the reconciliation of recordings with LiveKit egresses.
+"""
+
+# pylint: disable=W0613,W0621,E1101
+
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+import pytest
+from livekit import api as livekit_api
+
+from core.factories import RecordingFactory
+from core.models import Recording, RecordingModeChoices, RecordingStatusChoices
+from core.recording.worker.factories import get_worker_service
+from core.recording.worker.reconciliation import reconcile_recordings
+from core.tasks import RECONCILIATION_LOCK_CACHE_KEY
+from core.tasks import reconcile_recordings as reconcile_recordings_task
+
+pytestmark = pytest.mark.django_db
+
+EgressStatus = livekit_api.EgressStatus
+
+
+def create_recording(status, worker_id=None, age=0, **kwargs):
+    """Create a recording last updated `age` seconds ago."""
+    recording = RecordingFactory(status=status, worker_id=worker_id, **kwargs)
+    Recording.objects.filter(id=recording.id).update(
+        updated_at=timezone.now() - timedelta(seconds=age)
+    )
+    return recording
+
+
+@pytest.fixture
+def drift(livekit, livekit_settings):
+    """Create recordings in sync and drifting from the egresses of LiveKit."""
+    livekit_settings.RECORDING_RECONCILIATION_GRACE_PERIOD = 600
+    livekit.page_size = 2
+
+    recordings = {}
+    for name, egress_status in [
+        ("active", EgressStatus.EGRESS_ACTIVE),
+        ("starting", EgressStatus.EGRESS_STARTING),
+        ("ending", EgressStatus.EGRESS_ENDING),
+        ("complete", EgressStatus.EGRESS_COMPLETE),
+        ("failed", EgressStatus.EGRESS_FAILED),
+        ("aborted", EgressStatus.EGRESS_ABORTED),
+    ]:
+        worker_id = livekit.add_egress(f"room-{name:s}", egress_status)
+        recordings[name] = create_recording(RecordingStatusChoices.ACTIVE, worker_id)
+
+    recordings["missing"] = create_recording(RecordingStatusChoices.ACTIVE, "EG_gone")
+    recordings["pending"] = create_recording(RecordingStatusChoices.INITIATED, age=60)
+    recordings["stale"] = create_recording(RecordingStatusChoices.INITIATED, age=3600)
+    recordings["orphan"] = create_recording(RecordingStatusChoices.INITIATED, age=3600)
+    recordings["orphan_worker_id"] = livekit.add_egress(
+        str(recordings["orphan"].room.id)
+    )
+    livekit.add_egress("unknown-room")
+    recordings["saved"] = create_recording(RecordingStatusChoices.SAVED, "EG_saved")
+    return recordings
+
+
+def get_statuses():
+    """Return the status of each recording."""
+    return dict(Recording.objects.values_list("id", "status"))
+
+
+def test_reconciliation(drift, livekit, django_assert_num_queries):
+    """Drifting recordings should be fixed with one query per transition."""
+    # Select recordings, then 3 transitions and 1 adoption
+    with django_assert_num_queries(5):
+        counters = reconcile_recordings()
+
+    assert counters == {
+        "checked": 10,
+        "in_sync": 3,
+        "ended": 2,
+        "aborted": 2,
+        "missing": 1,
+        "stale": 1,
+        "adopted": 1,
+        "untracked": 1,
+        "fixed": 7,
+    }
+    # Egresses were listed page by page
+    assert livekit.calls["ListEgress"] == 4
+
+    orphan = Recording.objects.get(id=drift["orphan"].id)
+    assert orphan.status == RecordingStatusChoices.ACTIVE
+    assert orphan.worker_id == drift["orphan_worker_id"]
+
+    expected = {
+        "active": "active",
+        "starting": "active",
+        "ending": "stopped",
+        "complete": "stopped",
+        "failed": "aborted",
+        "aborted": "aborted",
+        "missing": "aborted",
+        "pending": "initiated",
+        "stale": "failed_to_start",
+        "orphan": "active",
+        "saved": "saved",
+    }
+    statuses = get_statuses()
+    assert {name: statuses[drift[name].id] for name in expected} == expected
+
+    # A second run finds everything in sync
+    counters = reconcile_recordings()
+    assert counters["in_sync"] == counters["checked"] == 4
+    assert counters["fixed"] == 0
+
+
+def test_reconciliation_dry_run(drift):
+    """A dry run should report the drift without updating recordings."""
+    statuses = get_statuses()
+
+    counters = reconcile_recordings(dry_run=True)
+
+    assert counters["checked"] == 10
+    assert counters["fixed"] == 0
+    assert counters["stale"] == 1
+    assert get_statuses() == statuses
+
+
+def test_reconciliation_concurrent_update(drift):
+    """Recordings updated meanwhile should not be overwritten."""
+    worker_service = get_worker_service("screen_recording")
+
+    def stop_meanwhile():
+        Recording.objects.filter(id=drift["missing"].id).update(
+            status=RecordingStatusChoices.STOPPED
+        )
+        return worker_service.list_workers()
+
+    with mock.patch(
+        "core.recording.worker.reconciliation.get_worker_service",
+        return_value=mock.Mock(list_workers=stop_meanwhile),
+    ):
+        counters = reconcile_recordings()
+
+    assert counters["missing"] == 1
+    assert counters["fixed"] == 6
+    assert get_statuses()[drift["missing"].id] == RecordingStatusChoices.STOPPED
+
+
+def test_reconciliation_track_egress(livekit_settings, livekit):
+    """Track egresses should never be adopted as the worker of a recording."""
+    livekit_settings.RECORDING_RECONCILIATION_GRACE_PERIOD = 600
+    recording = create_recording(RecordingStatusChoices.INITIATED, age=3600)
+    track_worker_id = livekit.add_egress(str(recording.room.id))
+    livekit.egresses[track_worker_id].track.track_id = "TR_audio"
+
+    counters = reconcile_recordings()
+
+    assert counters["adopted"] == 0
+    assert counters["stale"] == 1
+    assert counters["untracked"] == 0
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.FAILED_TO_START
+    assert recording.worker_id is None
+
+
+def test_reconciliation_modes(livekit_settings, livekit):
+    """Recordings should be checked with the worker service of their mode."""
+    livekit_settings.RECORDING_RECONCILIATION_GRACE_PERIOD = 600
+    screen_recording = create_recording(
+        RecordingStatusChoices.ACTIVE, livekit.add_egress("room-screen")
+    )
+    transcript = create_recording(
+        RecordingStatusChoices.ACTIVE,
+        livekit.add_egress("room-transcript"),
+        mode=RecordingModeChoices.TRANSCRIPT,
+    )
+    orphan = create_recording(
+        RecordingStatusChoices.INITIATED, age=3600, mode=RecordingModeChoices.TRANSCRIPT
+    )
+    orphan_worker_id = livekit.add_egress(str(orphan.room.id))
+
+    with mock.patch(
+        "core.recording.worker.reconciliation.get_worker_service",
+        wraps=get_worker_service,
+    ) as get_service:
+        counters = reconcile_recordings()
+
+    assert sorted(call.kwargs["mode"] for call in get_service.call_args_list) == [
+        "screen_recording",
+        "transcript",
+    ]
+    assert counters["checked"] == 3
+    assert counters["in_sync"] == 2
+    assert counters["adopted"] == 1
+    # Both worker services list the adopted worker
+    assert counters["untracked"] == 0
+    statuses = get_statuses()
+    assert statuses[screen_recording.id] == RecordingStatusChoices.ACTIVE
+    assert statuses[transcript.id] == RecordingStatusChoices.ACTIVE
+    orphan.refresh_from_db()
+    assert orphan.worker_id == orphan_worker_id
+
+
+def test_reconciliation_nothing_ongoing(livekit_settings, livekit):
+    """LiveKit should not be called without ongoing recordings."""
+    RecordingFactory(status=RecordingStatusChoices.SAVED)
+
+    assert reconcile_recordings()["checked"] == 0
+    assert livekit.calls == {}
+
+
+def test_reconciliation_task(drift):
+    """The task should reconcile recordings and return counters."""
+    result = reconcile_recordings_task.delay()
+
+    assert result.get()["fixed"] == 7
+    assert cache.get(RECONCILIATION_LOCK_CACHE_KEY) is None
+
+
+def test_reconciliation_task_locked(drift, livekit):
+    """Overlapping runs should be skipped."""
+    cache.add(RECONCILIATION_LOCK_CACHE_KEY, True)
+
+    assert reconcile_recordings_task.delay().get() is None
+    assert livekit.calls == {}
+
+
+def test_reconciliation_command_dry_run(drift):
+    """The command should print counters and support dry runs."""
+    statuses = get_statuses()
+    output = StringIO()
+
+    call_command("reconcile_recordings", "--dry-run", stdout=output)
+
+    assert "checked: 10\n" in output.getvalue()
+    assert "fixed: 0\n" in output.getvalue()
+    assert get_statuses() == statuses
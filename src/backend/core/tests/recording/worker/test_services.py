@@ -4,6 +4,7 @@ Test worker service classes.
 
 # pylint: disable=W0212,W0621,W0613,E1101
 
+import asyncio
 from unittest.mock import AsyncMock, Mock, patch
 
 import aiohttp
@@ -13,11 +14,16 @@ from core.recording.worker.exceptions import WorkerConnectionError, WorkerRespon
 from core.recording.worker.factories import WorkerServiceConfig
 from core.recording.worker.services import (
     AudioCompositeEgressService,
+    AudioTracksEgressService,
     BaseEgressService,
     VideoCompositeEgressService,
     livekit_api,
 )
 
+SESSION_PER_REQUEST_TRANSPORT = (
+    "core.recording.worker.transports.SessionPerRequestTransport"
+)
+
 
 @pytest.fixture
 def config():
@@ -38,6 +44,7 @@ def config():
             "bucket": "test-bucket",
             "force_path_style": True,
         },
+        transport_class=SESSION_PER_REQUEST_TRANSPORT,
     )
 
 
@@ -51,7 +58,7 @@ def mock_s3_upload():
 @pytest.fixture
 def mock_egress_service():
     """Fixture for mocked EgressService"""
-    with patch("core.recording.worker.services.EgressService") as mock:
+    with patch("core.recording.worker.transports.EgressService") as mock:
         yield mock
 
 
@@ -95,6 +102,15 @@ def audio_service(config):
     return service
 
 
+@pytest.fixture
+def tracks_service(config):
+    """Fixture for AudioTracksEgressService"""
+    service = AudioTracksEgressService(config)
+    service._handle_request = Mock()  # Mock the request handler
+    service._transport = Mock()  # Mock the concurrent requests transport
+    return service
+
+
 def test_base_egress_initialization(config, mock_s3_upload):
     """Test service initialization"""
 
@@ -179,6 +195,30 @@ def test_base_egress_handle_request_connection_error(service, mock_egress_servic
     assert "Connection failed" in str(exc.value)
 
 
+def test_base_egress_handle_request_timeout(service, mock_egress_service):
+    """Test timed out requests raise connection errors"""
+    mock_egress_instance = Mock()
+    mock_egress_instance.test_method = AsyncMock(side_effect=asyncio.TimeoutError())
+    mock_egress_service.return_value = mock_egress_instance
+
+    with pytest.raises(WorkerConnectionError, match="the request timed out"):
+        service._handle_request(Mock(), "test_method")
+
+
+def test_base_egress_handle_request_client_error(service, mock_egress_service):
+    """Test failed connections to LiveKit raise connection errors"""
+    mock_egress_instance = Mock()
+    mock_egress_instance.test_method = AsyncMock(
+        side_effect=aiohttp.ServerDisconnectedError()
+    )
+    mock_egress_service.return_value = mock_egress_instance
+
+    with pytest.raises(WorkerConnectionError, match="Server disconnected") as exc:
+        service._handle_request(Mock(), "test_method")
+
+    assert isinstance(exc.value.__cause__, aiohttp.ClientError)
+
+
 @pytest.mark.parametrize(
     "response_status,expected_result",
     [
@@ -217,6 +257,86 @@ def test_base_egress_stop_missing_status(service):
     assert "missing the recording status" in str(exc.value)
 
 
+def test_base_egress_stop_many(service):
+    """Test stopping several egresses, errors being returned in place"""
+    service._transport = Mock()
+    service._transport.request_many.return_value = [
+        Mock(status=livekit_api.EgressStatus.EGRESS_ENDING),
+        livekit_api.TwirpError(msg="Connection failed", code=500),
+        Mock(status=None),
+        Mock(status=livekit_api.EgressStatus.EGRESS_ABORTED),
+    ]
+
+    results = service.stop_many(["w1", "w2", "w3", "w4"])
+
+    service._transport.request_many.assert_called_once_with(
+        [
+            livekit_api.StopEgressRequest(egress_id=worker_id)
+            for worker_id in ["w1", "w2", "w3", "w4"]
+        ],
+        "stop_egress",
+    )
+    assert results[0] == "STOPPED"
+    assert isinstance(results[1], WorkerConnectionError)
+    assert "Connection failed" in str(results[1])
+    assert isinstance(results[2], WorkerResponseError)
+    assert results[3] == "ABORTED"
+
+
+def test_base_egress_list_workers(service):
+    """Test listing egresses follows pages and maps their statuses"""
+    service._handle_request = Mock(
+        side_effect=[
+            livekit_api.ListEgressResponse(
+                items=[
+                    livekit_api.EgressInfo(
+                        egress_id="w1",
+                        room_name="room-1",
+                        status=livekit_api.EgressStatus.EGRESS_STARTING,
+                    ),
+                    livekit_api.EgressInfo(
+                        egress_id="w2",
+                        room_name="room-2",
+                        status=livekit_api.EgressStatus.EGRESS_LIMIT_REACHED,
+                    ),
+                ],
+                next_page_token=livekit_api.TokenPagination(token="next"),
+            ),
+            livekit_api.ListEgressResponse(
+                items=[
+                    livekit_api.EgressInfo(
+                        egress_id="w3",
+                        room_name="room-3",
+                        status=livekit_api.EgressStatus.EGRESS_FAILED,
+                    ),
+                    livekit_api.EgressInfo(
+                        egress_id="w4",
+                        room_name="room-3",
+                        status=livekit_api.EgressStatus.EGRESS_ACTIVE,
+                        track=livekit_api.TrackEgressRequest(track_id="TR_1"),
+                    ),
+                ],
+            ),
+        ]
+    )
+
+    workers = service.list_workers()
+
+    assert [(w.worker_id, w.room_name, w.status, w.is_track) for w in workers] == [
+        ("w1", "room-1", "ACTIVE", False),
+        ("w2", "room-2", "STOPPED", False),
+        ("w3", "room-3", "ABORTED", False),
+        ("w4", "room-3", "ACTIVE", True),
+    ]
+    requests = [call.args[0] for call in service._handle_request.call_args_list]
+    assert requests == [
+        livekit_api.ListEgressRequest(),
+        livekit_api.ListEgressRequest(
+            page_token=livekit_api.TokenPagination(token="next")
+        ),
+    ]
+
+
 def test_base_egress_start_not_implemented(service):
     """Test that start method raises NotImplementedError"""
     with pytest.raises(NotImplementedError) as exc:
@@ -243,6 +363,7 @@ def test_base_egress_ssl_verification_config(verify_ssl):
             "bucket": "test-bucket",
             "force_path_style": True,
         },
+        transport_class=SESSION_PER_REQUEST_TRANSPORT,
     )
 
     service = BaseEgressService(config)
@@ -366,3 +487,148 @@ def test_audio_composite_egress_start_missing_egress_id(audio_service):
         audio_service.start("test-room", "rec-123")
 
     assert "Egress ID not found" in str(exc_info.value)
+
+
+def test_audio_tracks_egress_hrid(tracks_service):
+    """Test HRID is correct"""
+    assert tracks_service.hrid == "audio-recording-tracks-livekit-egress"
+
+
+@patch("core.recording.worker.services.time.time", return_value=1700000000.123)
+def test_audio_tracks_egress_start_success(mock_time, tracks_service):
+    """Test start records the mixed audio, then each published audio track"""
+    tracks_service._handle_request.side_effect = [
+        Mock(egress_id="EG_mixed"),
+        livekit_api.ListParticipantsResponse(
+            participants=[
+                livekit_api.ParticipantInfo(
+                    identity="alice",
+                    tracks=[
+                        livekit_api.TrackInfo(
+                            sid="TR_audio", type=livekit_api.TrackType.AUDIO
+                        ),
+                        livekit_api.TrackInfo(
+                            sid="TR_video", type=livekit_api.TrackType.VIDEO
+                        ),
+                    ],
+                ),
+                livekit_api.ParticipantInfo(identity="bob"),
+            ]
+        ),
+    ]
+    tracks_service._transport.request_many.return_value = [
+        livekit_api.TwirpError(msg="Connection failed", code=500),
+    ]
+
+    result = tracks_service.start("test-room", "rec-123")
+
+    assert result == "EG_mixed"
+    mixed_request, list_request = [
+        call.args for call in tracks_service._handle_request.call_args_list
+    ]
+    assert mixed_request[0].audio_only is True
+    assert mixed_request[0].file_outputs[0].filepath == "/test/output/rec-123.ogg"
+    assert list_request == (
+        livekit_api.ListParticipantsRequest(room="test-room"),
+        "list_participants",
+    )
+
+    # Failing to record a track does not fail the recording
+    [requests, method] = tracks_service._transport.request_many.call_args.args
+    assert method == "start_track_egress"
+    assert len(requests) == 1
+    assert requests[0].room_name == "test-room"
+    assert requests[0].track_id == "TR_audio"
+    assert (
+        requests[0].file.filepath
+        == "/test/output/rec-123/alice/1700000000123-TR_audio.ogg"
+    )
+    assert requests[0].file.s3.bucket == "test-bucket"
+
+
+def test_audio_tracks_egress_start_list_participants_error(tracks_service):
+    """Test start keeps recording the mixed audio if participants can't be listed"""
+    tracks_service._handle_request.side_effect = [
+        Mock(egress_id="EG_mixed"),
+        WorkerConnectionError("LiveKit client connection error."),
+    ]
+
+    assert tracks_service.start("test-room", "rec-123") == "EG_mixed"
+    tracks_service._transport.request_many.assert_not_called()
+
+
+def test_audio_tracks_egress_start_track(tracks_service):
+    """Test recording a track published once the recording started"""
+    tracks_service._handle_request.return_value = Mock(egress_id="EG_track")
+
+    result = tracks_service.start_track("test-room", "rec-123", "alice", "TR_1")
+
+    assert result == "EG_track"
+    request, method = tracks_service._handle_request.call_args.args
+    assert method == "start_track_egress"
+    assert request.track_id == "TR_1"
+    assert request.file.filepath.startswith("/test/output/rec-123/alice/")
+
+
+def test_audio_tracks_egress_stop(tracks_service):
+    """Test stop ends the track egresses of the room before the mixed audio"""
+    mixed = livekit_api.EgressInfo(
+        egress_id="EG_mixed",
+        room_name="room-1",
+        room_composite=livekit_api.RoomCompositeEgressRequest(),
+    )
+    tracks_service._transport.request_many.side_effect = [
+        [livekit_api.ListEgressResponse(items=[mixed])],
+        [
+            livekit_api.ListEgressResponse(
+                items=[
+                    mixed,
+                    livekit_api.EgressInfo(
+                        egress_id="EG_track",
+                        room_name="room-1",
+                        track=livekit_api.TrackEgressRequest(),
+                    ),
+                ]
+            )
+        ],
+        [Mock(status=livekit_api.EgressStatus.EGRESS_ENDING)],
+    ]
+    tracks_service._handle_request.return_value = Mock(
+        status=livekit_api.EgressStatus.EGRESS_ENDING
+    )
+
+    assert tracks_service.stop("EG_mixed") == "STOPPED"
+
+    # Only the egresses of the recorded room are listed
+    assert [
+        call.args for call in tracks_service._transport.request_many.call_args_list
+    ] == [
+        ([livekit_api.ListEgressRequest(egress_id="EG_mixed")], "list_egress"),
+        (
+            [livekit_api.ListEgressRequest(room_name="room-1", active=True)],
+            "list_egress",
+        ),
+        ([livekit_api.StopEgressRequest(egress_id="EG_track")], "stop_egress"),
+    ]
+    tracks_service._handle_request.assert_called_once_with(
+        livekit_api.StopEgressRequest(egress_id="EG_mixed"), "stop_egress"
+    )
+
+
+def test_audio_tracks_egress_stop_list_error(tracks_service):
+    """Test failing to list the track egresses does not fail the recording stop"""
+    tracks_service._transport.request_many.return_value = [
+        livekit_api.TwirpError(msg="List failed", code=500)
+    ]
+    tracks_service._handle_request.return_value = Mock(
+        status=livekit_api.EgressStatus.EGRESS_ENDING
+    )
+
+    assert tracks_service.stop("EG_mixed") == "STOPPED"
+
+    tracks_service._transport.request_many.assert_called_once_with(
+        [livekit_api.ListEgressRequest(egress_id="EG_mixed")], "list_egress"
+    )
+    tracks_service._handle_request.assert_called_once_with(
+        livekit_api.StopEgressRequest(egress_id="EG_mixed"), "stop_egress"
+    )
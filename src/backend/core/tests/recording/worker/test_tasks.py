@@ -0,0 +1,494 @@
+"""
+Test recording tasks driving the worker services, against a LiveKit stand-in.
+"""
+
+# pylint: disable=W0212,W0621,W0613,E1101
+
+import threading
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.db import connection
+
+import pytest
+from celery.exceptions import MaxRetriesExceededError
+from livekit import api as livekit_api
+
+from core.factories import RecordingFactory
+from core.models import Recording, RecordingModeChoices, RecordingStatusChoices
+from core.tasks import (
+    RELEASE_LOCK_SCRIPT,
+    _release_lock,
+    get_lock_cache_key,
+    notify_recording,
+    start_recording,
+    start_track,
+    stop_recording,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def test_tasks_start_recording_success(livekit_settings, livekit):
+    """An initiated recording should become active with the egress id as worker id."""
+    recording = RecordingFactory(status=RecordingStatusChoices.INITIATED)
+
+    result = start_recording.delay(str(recording.id))
+
+    assert result.get() == RecordingStatusChoices.ACTIVE
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.ACTIVE
+    assert recording.worker_id in livekit.egresses
+    assert livekit.egresses[recording.worker_id].room_name == str(recording.room.id)
+    assert cache.get(get_lock_cache_key(recording.id)) is None
+
+
+def test_tasks_start_recording_retries(livekit_settings, livekit):
+    """Transient worker errors should be retried before the recording fails."""
+    livekit.fail("StartRoomCompositeEgress", times=2)
+    recording = RecordingFactory(status=RecordingStatusChoices.INITIATED)
+
+    start_recording.delay(str(recording.id))
+
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.ACTIVE
+    assert livekit.calls["StartRoomCompositeEgress"] == 3
+
+
+def test_tasks_start_recording_retries_exhausted(livekit_settings, livekit):
+    """The recording should fail to start once retries are exhausted."""
+    livekit.fail("StartRoomCompositeEgress", times=10)
+    recording = RecordingFactory(status=RecordingStatusChoices.INITIATED)
+
+    start_recording.delay(str(recording.id))
+
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.FAILED_TO_START
+    assert not recording.worker_id
+    assert livekit.calls["StartRoomCompositeEgress"] == 3
+
+
+def test_tasks_start_recording_idempotent(livekit_settings, livekit):
+    """Running the task again should not start another egress."""
+    recording = RecordingFactory(status=RecordingStatusChoices.INITIATED)
+
+    start_recording.delay(str(recording.id))
+    result = start_recording.delay(str(recording.id))
+
+    assert result.get() == RecordingStatusChoices.ACTIVE
+    assert livekit.calls["StartRoomCompositeEgress"] == 1
+    assert len(livekit.egresses) == 1
+
+
+def test_tasks_start_recording_unknown(livekit_settings, livekit):
+    """A deleted recording should be ignored."""
+    result = start_recording.delay("d2a8c1c3-8f5c-4bd4-a7a5-bb4a4e8cd9d1")
+
+    assert result.get() is None
+    assert livekit.calls == {}
+
+
+def test_tasks_start_recording_locked(livekit_settings, livekit):
+    """A recording being handled by another task should be skipped."""
+    recording = RecordingFactory(status=RecordingStatusChoices.INITIATED)
+    cache.add(get_lock_cache_key(recording.id), "other-task")
+
+    result = start_recording.delay(str(recording.id))
+
+    assert result.get() is None
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.INITIATED
+    assert livekit.calls == {}
+
+
+@pytest.mark.parametrize(
+    "status",
+    [
+        RecordingStatusChoices.STOPPED,
+        RecordingStatusChoices.FAILED_TO_START,
+    ],
+)
+def test_tasks_stop_recording_not_active(livekit_settings, livekit, status):
+    """Only active or initiated recordings should be stopped."""
+    recording = RecordingFactory(status=status, worker_id="EG_1")
+
+    result = stop_recording.delay(str(recording.id))
+
+    assert result.get() == status
+    assert livekit.calls == {}
+
+
+def test_tasks_stop_recording_success(livekit_settings, livekit):
+    """An active recording should be stopped."""
+    worker_id = livekit.add_egress("room")
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.ACTIVE, worker_id=worker_id
+    )
+
+    result = stop_recording.delay(str(recording.id))
+
+    assert result.get() == RecordingStatusChoices.STOPPED
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.STOPPED
+
+
+def test_tasks_stop_recording_initiated(livekit_settings, livekit):
+    """A recording which has not started yet should be cancelled."""
+    recording = RecordingFactory(status=RecordingStatusChoices.INITIATED)
+
+    result = stop_recording.delay(str(recording.id))
+
+    assert result.get() == RecordingStatusChoices.ABORTED
+    assert livekit.calls == {}
+
+    # The start task, coming next, has nothing left to start
+    assert start_recording.delay(str(recording.id)).get() == (
+        RecordingStatusChoices.ABORTED
+    )
+    assert livekit.calls == {}
+
+
+def test_tasks_stop_recording_locked(livekit_settings, livekit):
+    """A recording being started should be stopped once it is released."""
+    worker_id = livekit.add_egress("room")
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.ACTIVE, worker_id=worker_id
+    )
+    lock_key = get_lock_cache_key(recording.id)
+    cache.add(lock_key, "start-task")
+
+    attempts = []
+
+    def release_after_retry(*args, **kwargs):
+        attempts.append(args)
+        if len(attempts) > 1:
+            cache.delete(lock_key)
+        return original_add(*args, **kwargs)
+
+    original_add = cache.add
+    with mock.patch.object(cache, "add", side_effect=release_after_retry):
+        result = stop_recording.delay(str(recording.id))
+
+    assert result.get() == RecordingStatusChoices.STOPPED
+    assert len(attempts) == 2
+
+
+def test_tasks_stop_recording_locked_exhausted(livekit_settings, livekit):
+    """Stopping a recording locked by another task should give up eventually."""
+    recording = RecordingFactory(status=RecordingStatusChoices.INITIATED)
+    cache.add(get_lock_cache_key(recording.id), "start-task")
+
+    result = stop_recording.delay(str(recording.id))
+
+    assert result.get() is None
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.INITIATED
+    assert cache.get(get_lock_cache_key(recording.id)) == "start-task"
+
+
+def test_tasks_release_lock_of_another_task():
+    """A lock acquired by another task, once ours expired, should not be released."""
+    cache.set("lock", "other-task")
+
+    _release_lock("lock", "task")
+    assert cache.get("lock") == "other-task"
+
+    _release_lock("lock", "other-task")
+    assert cache.get("lock") is None
+
+
+def test_tasks_release_lock_redis(settings):
+    """On Redis, a lock should be compared to the token and deleted atomically."""
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": "redis://redis:6379/1",
+        }
+    }
+    redis_client = mock.Mock()
+
+    with mock.patch(
+        "django_redis.client.DefaultClient.get_client", return_value=redis_client
+    ):
+        _release_lock("lock", "task")
+
+    redis_cache = caches["default"]
+    redis_client.eval.assert_called_once_with(
+        RELEASE_LOCK_SCRIPT,
+        1,
+        redis_cache.client.make_key("lock"),
+        redis_cache.client.encode("task"),
+    )
+
+
+def test_tasks_stop_recording_retries_exhausted(livekit_settings, livekit):
+    """The recording should fail to stop once retries are exhausted."""
+    livekit.fail("StopEgress", times=10)
+    recording = RecordingFactory(status=RecordingStatusChoices.ACTIVE, worker_id="EG")
+
+    stop_recording.delay(str(recording.id))
+
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.FAILED_TO_STOP
+    assert livekit.calls["StopEgress"] == 3
+
+
+@pytest.fixture
+def tracks_settings(livekit_settings):
+    """Record transcripts by track."""
+    livekit_settings.RECORDING_WORKER_CLASSES = {
+        "transcript": "core.recording.worker.services.AudioTracksEgressService",
+    }
+    return livekit_settings
+
+
+def test_tasks_start_track_success(tracks_settings, livekit):
+    """A track published in the room of an active recording should be recorded."""
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.ACTIVE,
+        mode=RecordingModeChoices.TRANSCRIPT,
+        worker_id="EG_mixed",
+    )
+
+    worker_id = start_track.delay(str(recording.id), "alice", "TR_1").get()
+
+    egress = livekit.egresses[worker_id]
+    assert egress.room_name == str(recording.room_id)
+    assert egress.track.track_id == "TR_1"
+    assert f"/{recording.id!s}/alice/" in egress.track.file.filepath
+
+
+def test_tasks_start_track_not_active(tracks_settings, livekit):
+    """Tracks should not be recorded once the recording stopped."""
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.STOPPED, mode=RecordingModeChoices.TRANSCRIPT
+    )
+
+    assert start_track.delay(str(recording.id), "alice", "TR_1").get() is None
+    assert livekit.calls == {}
+
+
+def test_tasks_start_track_error(tracks_settings, livekit):
+    """Failing to record a track should only be logged, without retrying."""
+    livekit.fail("StartTrackEgress", times=10)
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.ACTIVE, mode=RecordingModeChoices.TRANSCRIPT
+    )
+
+    assert start_track.delay(str(recording.id), "alice", "TR_1").get() is None
+    assert livekit.calls["StartTrackEgress"] == 1
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.ACTIVE
+
+
+@pytest.fixture
+def mock_notify():
+    """Mock the notification of external services, succeeding."""
+    with mock.patch(
+        "core.tasks.notification_service.notify_external_services", return_value=True
+    ) as mock_notify_external_services:
+        yield mock_notify_external_services
+
+
+def add_track_egress(livekit, recording, status):
+    """Register the egress of a track of a recording in the LiveKit stand-in."""
+    egress_id = livekit.add_egress(str(recording.room_id), status)
+    livekit.egresses[
+        egress_id
+    ].track.file.filepath = (
+        f"recordings/{recording.id!s}/alice/1700000000000-TR_{egress_id:s}.ogg"
+    )
+    return egress_id
+
+
+def test_tasks_notify_recording_tracks_uploaded(tracks_settings, livekit, mock_notify):
+    """A saved recording should be notified once its tracks are uploaded."""
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.SAVED, mode=RecordingModeChoices.TRANSCRIPT
+    )
+    egress_id = add_track_egress(
+        livekit, recording, livekit_api.EgressStatus.EGRESS_COMPLETE
+    )
+    # Nanoseconds, LiveKit starting the egress after it was requested
+    livekit.egresses[egress_id].started_at = 1700000000250 * 1_000_000
+    # Tracks of another recording of the room are not waited for
+    other = RecordingFactory(
+        status=RecordingStatusChoices.ACTIVE,
+        mode=RecordingModeChoices.TRANSCRIPT,
+        room=recording.room,
+    )
+    add_track_egress(livekit, other, livekit_api.EgressStatus.EGRESS_ACTIVE)
+
+    result = notify_recording.delay(str(recording.id))
+
+    assert result.get() == RecordingStatusChoices.NOTIFICATION_SUCCEEDED
+    mock_notify.assert_called_once_with(
+        recording,
+        tracks_started_at={
+            f"recordings/{recording.id!s}/alice/1700000000000-TR_{egress_id:s}.ogg": (
+                1700000000250
+            )
+        },
+    )
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.NOTIFICATION_SUCCEEDED
+    assert cache.get(get_lock_cache_key(recording.id)) is None
+
+
+def test_tasks_notify_recording_tracks_uploading(tracks_settings, livekit, mock_notify):
+    """A saved recording should wait for its last track to be uploaded."""
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.SAVED, mode=RecordingModeChoices.TRANSCRIPT
+    )
+    add_track_egress(livekit, recording, livekit_api.EgressStatus.EGRESS_ENDING)
+
+    assert notify_recording.delay(str(recording.id)).get() == (
+        RecordingStatusChoices.SAVED
+    )
+    mock_notify.assert_not_called()
+
+
+def test_tasks_notify_recording_list_error(tracks_settings, livekit, mock_notify):
+    """Failing to list tracks should not prevent the recording from being notified."""
+    livekit.fail("ListEgress", times=10)
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.SAVED, mode=RecordingModeChoices.TRANSCRIPT
+    )
+
+    assert notify_recording.delay(str(recording.id)).get() == (
+        RecordingStatusChoices.NOTIFICATION_SUCCEEDED
+    )
+
+
+@pytest.mark.parametrize(
+    "status",
+    [RecordingStatusChoices.STOPPED, RecordingStatusChoices.NOTIFICATION_SUCCEEDED],
+)
+def test_tasks_notify_recording_not_saved(
+    tracks_settings, livekit, mock_notify, status
+):
+    """Recordings not saved yet, or already notified, should not be notified."""
+    recording = RecordingFactory(status=status, mode=RecordingModeChoices.TRANSCRIPT)
+
+    assert notify_recording.delay(str(recording.id)).get() is None
+    mock_notify.assert_not_called()
+    assert livekit.calls == {}
+
+
+def test_tasks_notify_recording_locked(tracks_settings, livekit, mock_notify):
+    """Notifications should be retried while the recording is locked."""
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.SAVED, mode=RecordingModeChoices.TRANSCRIPT
+    )
+    lock_key = get_lock_cache_key(recording.id)
+    cache.add(lock_key, "other-task")
+
+    attempts = []
+
+    def release_after_retry(*args, **kwargs):
+        attempts.append(args)
+        if len(attempts) > 1:
+            cache.delete(lock_key)
+        return original_add(*args, **kwargs)
+
+    original_add = cache.add
+    with mock.patch.object(cache, "add", side_effect=release_after_retry):
+        result = notify_recording.delay(str(recording.id))
+
+    assert result.get() == RecordingStatusChoices.NOTIFICATION_SUCCEEDED
+    assert len(attempts) == 2
+    mock_notify.assert_called_once_with(recording, tracks_started_at={})
+
+
+def test_tasks_notify_recording_locked_long(tracks_settings, livekit, mock_notify):
+    """
+    Notifications should be retried beyond the retries of worker operations, until
+    the lock of the recording is released or expires.
+    """
+    tracks_settings.RECORDING_WORKER_LOCK_TIMEOUT = 10
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.SAVED, mode=RecordingModeChoices.TRANSCRIPT
+    )
+    lock_key = get_lock_cache_key(recording.id)
+    cache.add(lock_key, "other-task")
+
+    attempts = []
+
+    def release_late(*args, **kwargs):
+        attempts.append(args)
+        if len(attempts) > tracks_settings.RECORDING_WORKER_MAX_RETRIES + 2:
+            cache.delete(lock_key)
+        return original_add(*args, **kwargs)
+
+    original_add = cache.add
+    with mock.patch.object(cache, "add", side_effect=release_late):
+        result = notify_recording.delay(str(recording.id))
+
+    assert result.get() == RecordingStatusChoices.NOTIFICATION_SUCCEEDED
+    mock_notify.assert_called_once()
+
+
+def test_tasks_notify_recording_locked_expired(tracks_settings, livekit, mock_notify):
+    """Notifications should give up once the lock would have expired."""
+    tracks_settings.RECORDING_WORKER_LOCK_TIMEOUT = 10
+    recording = RecordingFactory(
+        status=RecordingStatusChoices.SAVED, mode=RecordingModeChoices.TRANSCRIPT
+    )
+    cache.add(get_lock_cache_key(recording.id), "other-task")
+
+    with mock.patch.object(cache, "add", wraps=cache.add) as mock_add:
+        with pytest.raises(MaxRetriesExceededError):
+            notify_recording.delay(str(recording.id)).get()
+
+    # One attempt and a retry every backoff of a second, spanning the lock timeout
+    assert mock_add.call_count == 12
+    mock_notify.assert_not_called()
+
+
+def run_concurrently(target, arguments):
+    """Run a target in one thread per argument and wait for all of them."""
+
+    def run(argument):
+        try:
+            target(argument)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(arg,)) for arg in arguments]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_tasks_start_recording_concurrent_duplicates(livekit_settings, livekit):
+    """Duplicated tasks running concurrently should start a single egress."""
+    livekit.latency = 0.2
+    recording = RecordingFactory(status=RecordingStatusChoices.INITIATED)
+
+    run_concurrently(start_recording.apply, [(str(recording.id),)] * 8)
+
+    recording.refresh_from_db()
+    assert recording.status == RecordingStatusChoices.ACTIVE
+    assert livekit.calls["StartRoomCompositeEgress"] == 1
+    assert list(livekit.egresses) == [recording.worker_id]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_tasks_start_recording_concurrent_recordings(livekit_settings, livekit):
+    """Tasks of distinct recordings should reach the worker concurrently."""
+    livekit.latency = 0.2
+    recordings = RecordingFactory.create_batch(
+        5, status=RecordingStatusChoices.INITIATED
+    )
+
+    run_concurrently(
+        start_recording.apply, [(str(recording.id),) for recording in recordings]
+    )
+
+    assert set(Recording.objects.values_list("status", flat=True)) == {
+        RecordingStatusChoices.ACTIVE
+    }
+    assert livekit.calls["StartRoomCompositeEgress"] == 5
+    assert livekit.max_in_flight > 1
@@ -0,0 +1,370 @@
+"""
+Test worker service transports.
+"""
+
+# pylint: disable=W0212,W0621,W0613,E1101
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from livekit import api as livekit_api
+
+from core.recording.worker.exceptions import WorkerConnectionError
+from core.recording.worker.factories import WorkerServiceConfig
+from core.recording.worker.transports import (
+    LatencyMetrics,
+    PooledSessionTransport,
+    SessionPerRequestTransport,
+    get_transport,
+    metrics,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Start each test with empty latency metrics"""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def get_config(url, transport_class, transport_options=None):
+    """Build a worker service configuration targeting the given url."""
+    return WorkerServiceConfig(
+        output_folder="/test/output",
+        server_configurations={
+            "url": url,
+            "api_key": "test_key",
+            "api_secret": "test_secret",
+        },
+        verify_ssl=False,
+        bucket_args={},
+        transport_class=transport_class,
+        transport_options=transport_options or {},
+    )
+
+
+def stop_egress(transport, egress_id):
+    """Stop an egress through a transport."""
+    return transport.request(
+        livekit_api.StopEgressRequest(egress_id=egress_id), "stop_egress"
+    )
+
+
+def test_transports_pooled_reuses_connection(livekit):
+    """Sequential requests should reuse a single keep-alive connection."""
+    config = get_config(livekit.url, "unused")
+    transport = PooledSessionTransport(config, pool_size=2)
+
+    try:
+        for index in range(5):
+            response = stop_egress(transport, f"egress-{index:d}")
+            assert response.egress_id == f"egress-{index:d}"
+            assert response.status == livekit_api.EgressStatus.EGRESS_ENDING
+    finally:
+        transport.close()
+
+    assert len(livekit.peers) == 1
+
+
+def test_transports_room_service_methods(livekit):
+    """Room service methods should be called on the room service, on shared connections."""
+    livekit.participants["room-1"] = [livekit_api.ParticipantInfo(identity="alice")]
+    config = get_config(livekit.url, "unused")
+    transport = PooledSessionTransport(config, pool_size=2)
+
+    try:
+        response = transport.request(
+            livekit_api.ListParticipantsRequest(room="room-1"), "list_participants"
+        )
+        stop_egress(transport, "egress-1")
+    finally:
+        transport.close()
+
+    assert [participant.identity for participant in response.participants] == ["alice"]
+    assert livekit.calls == {"ListParticipants": 1, "StopEgress": 1}
+    assert len(livekit.peers) == 1
+
+
+def test_transports_session_per_request_opens_connections(livekit):
+    """The legacy transport should open a new connection for each request."""
+    config = get_config(livekit.url, "unused")
+    transport = SessionPerRequestTransport(config)
+
+    for index in range(3):
+        stop_egress(transport, f"egress-{index:d}")
+
+    assert len(livekit.peers) == 3
+
+
+def test_transports_pooled_concurrent_threads(livekit):
+    """Requests from several threads should share the pool, bounded by its size."""
+    config = get_config(livekit.url, "unused")
+    transport = PooledSessionTransport(config, pool_size=2)
+    results = []
+
+    def worker(index):
+        results.append(stop_egress(transport, f"egress-{index:d}").egress_id)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        transport.close()
+
+    assert sorted(results) == sorted(f"egress-{index:d}" for index in range(8))
+    assert len(livekit.peers) <= 2
+
+
+def test_transports_pooled_restarts_after_fork(livekit):
+    """A forked process should not reuse the loop and session of its parent."""
+    config = get_config(livekit.url, "unused")
+    transport = PooledSessionTransport(config)
+
+    try:
+        stop_egress(transport, "egress-1")
+        parent_loop = transport._loop
+
+        with patch("core.recording.worker.transports.os.getpid", return_value=-1):
+            stop_egress(transport, "egress-2")
+            assert transport._loop is not parent_loop
+            transport.close()
+    finally:
+        parent_loop.call_soon_threadsafe(parent_loop.stop)
+
+
+def test_transports_pooled_request_timeout(livekit):
+    """Requests should time out after the configured request timeout."""
+    livekit.latency = 1.0
+    config = get_config(livekit.url, "unused")
+    transport = PooledSessionTransport(config, request_timeout=0.1)
+
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            stop_egress(transport, "egress-1")
+        assert isinstance(
+            transport.request_many(
+                [livekit_api.StopEgressRequest(egress_id="egress-2")], "stop_egress"
+            )[0],
+            asyncio.TimeoutError,
+        )
+    finally:
+        transport.close()
+
+
+@patch("core.recording.worker.transports.LOOP_TIMEOUT_MARGIN", 0)
+def test_transports_pooled_loop_timeout():
+    """Callers should stop waiting for a hung loop, with a worker error."""
+    config = get_config("http://unused", "unused")
+    transport = PooledSessionTransport(config, request_timeout=0.1)
+
+    try:
+        with pytest.raises(WorkerConnectionError, match="transport loop timed out"):
+            transport.submit(asyncio.sleep(5))
+    finally:
+        transport.close()
+
+
+def test_transports_pooled_request_many(livekit):
+    """Batched requests should be sent concurrently, failures returned in place."""
+    livekit.latency = 0.1
+    livekit.fail("StopEgress", times=1)
+    config = get_config(livekit.url, "unused")
+    transport = PooledSessionTransport(config, pool_size=4)
+
+    requests = [
+        livekit_api.StopEgressRequest(egress_id=f"egress-{index:d}")
+        for index in range(8)
+    ]
+    try:
+        responses = transport.request_many(requests, "stop_egress")
+    finally:
+        transport.close()
+
+    assert len(responses) == 8
+    errors = [response for response in responses if isinstance(response, Exception)]
+    assert len(errors) == 1
+    assert isinstance(errors[0], livekit_api.TwirpError)
+    assert {
+        response.egress_id
+        for response in responses
+        if not isinstance(response, Exception)
+    } == {request.egress_id for request in requests} - {
+        requests[responses.index(errors[0])].egress_id
+    }
+    assert 1 < livekit.max_in_flight <= 4
+    assert len(livekit.peers) <= 4
+
+
+def test_transports_pooled_request_many_chunks(livekit):
+    """
+    Batches larger than the pool should be sent in chunks, so that requests do not
+    time out while waiting for a pooled connection.
+    """
+    livekit.latency = 0.1
+    config = get_config(livekit.url, "unused")
+    transport = PooledSessionTransport(config, pool_size=2, request_timeout=0.25)
+
+    requests = [
+        livekit_api.StopEgressRequest(egress_id=f"egress-{index:d}")
+        for index in range(6)
+    ]
+    try:
+        responses = transport.request_many(requests, "stop_egress")
+    finally:
+        transport.close()
+
+    assert [response.egress_id for response in responses] == [
+        request.egress_id for request in requests
+    ]
+    assert livekit.max_in_flight == 2
+
+
+def test_transports_pooled_request_many_loop_timeout():
+    """Requests left should fail without being sent once the loop timed out."""
+    config = get_config("http://unused", "unused")
+    transport = PooledSessionTransport(config, pool_size=2)
+    error = WorkerConnectionError("transport loop timed out")
+
+    requests = [
+        livekit_api.StopEgressRequest(egress_id=f"egress-{index:d}")
+        for index in range(5)
+    ]
+    with patch.object(transport, "submit", side_effect=error) as mock_submit:
+        responses = transport.request_many(requests, "stop_egress")
+
+    assert responses == [error] * 5
+    mock_submit.assert_called_once()
+    mock_submit.call_args.args[0].close()
+
+
+def test_transports_session_per_request_request_many(livekit):
+    """The legacy transport should share a session between batched requests."""
+    livekit.latency = 0.1
+    config = get_config(livekit.url, "unused")
+    transport = SessionPerRequestTransport(config)
+
+    responses = transport.request_many(
+        [livekit_api.StopEgressRequest(egress_id=f"egress-{i:d}") for i in range(3)],
+        "stop_egress",
+    )
+
+    assert [response.egress_id for response in responses] == [
+        "egress-0",
+        "egress-1",
+        "egress-2",
+    ]
+    assert livekit.max_in_flight == 3
+
+
+def test_transports_metrics(livekit):
+    """Calls should be recorded per Twirp method, including failures."""
+    config = get_config(livekit.url, "unused")
+    transport = PooledSessionTransport(config)
+
+    livekit.fail("ListEgress")
+    try:
+        stop_egress(transport, "egress-1")
+        stop_egress(transport, "egress-2")
+        with pytest.raises(livekit_api.TwirpError):
+            transport.request(livekit_api.ListEgressRequest(), "list_egress")
+    finally:
+        transport.close()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["stop_egress"]["count"] == 2
+    assert snapshot["stop_egress"]["errors"] == 0
+    assert snapshot["list_egress"]["count"] == 1
+    assert snapshot["list_egress"]["errors"] == 1
+    assert (
+        0
+        < snapshot["stop_egress"]["mean_seconds"]
+        <= snapshot["stop_egress"]["max_seconds"]
+    )
+
+
+def test_transports_latency_metrics_aggregates():
+    """Aggregates should sum durations and keep the maximum."""
+    latency_metrics = LatencyMetrics()
+    latency_metrics.record("stop_egress", 0.1, failed=False)
+    latency_metrics.record("stop_egress", 0.3, failed=True)
+
+    assert latency_metrics.snapshot() == {
+        "stop_egress": {
+            "count": 2,
+            "errors": 1,
+            "total_seconds": pytest.approx(0.4),
+            "max_seconds": 0.3,
+            "mean_seconds": pytest.approx(0.2),
+        }
+    }
+
+
+def test_transports_latency_metrics_logged(caplog):
+    """Aggregates should be logged once the interval elapsed since the last log."""
+    latency_metrics = LatencyMetrics()
+    latency_metrics.record("stop_egress", 0.1, failed=False)
+
+    with caplog.at_level("INFO", logger="core.recording.worker.transports"):
+        latency_metrics.log_if_due(60)
+        assert not caplog.records
+
+        with patch("time.monotonic", return_value=time.monotonic() + 60):
+            latency_metrics.log_if_due(60)
+            latency_metrics.log_if_due(60)
+
+    assert len(caplog.records) == 1
+    assert '"stop_egress": {"count": 1' in caplog.records[0].getMessage()
+
+
+def test_transports_metrics_logged_by_calls(livekit, settings, caplog):
+    """Calls should log the aggregates periodically, unless disabled."""
+    config = get_config(livekit.url, "unused")
+    transport = PooledSessionTransport(config)
+
+    try:
+        with caplog.at_level("INFO", logger="core.recording.worker.transports"):
+            settings.RECORDING_WORKER_METRICS_LOG_INTERVAL = 0
+            stop_egress(transport, "egress-1")
+            assert not caplog.records
+
+            metrics._logged_at -= 1
+            settings.RECORDING_WORKER_METRICS_LOG_INTERVAL = 1
+            stop_egress(transport, "egress-2")
+    finally:
+        transport.close()
+
+    assert len(caplog.records) == 1
+    assert "stop_egress" in caplog.records[0].getMessage()
+
+
+def test_transports_get_transport_shared():
+    """Transports should be shared between services with the same configuration."""
+    pooled = "core.recording.worker.transports.PooledSessionTransport"
+    config = get_config("http://livekit", pooled, {"pool_size": 3})
+
+    transport = get_transport(config)
+
+    assert isinstance(transport, PooledSessionTransport)
+    assert transport._pool_size == 3
+    assert get_transport(get_config("http://livekit", pooled, {"pool_size": 3})) is (
+        transport
+    )
+    assert get_transport(get_config("http://other", pooled)) is not transport
+
+
+@patch("core.recording.worker.transports.atexit.register")
+def test_transports_get_transport_closed_at_exit(mock_register):
+    """Transports should be closed when the process exits."""
+    pooled = "core.recording.worker.transports.PooledSessionTransport"
+
+    transport = get_transport(get_config("http://exit", pooled))
+    get_transport(get_config("http://exit", pooled))
+
+    mock_register.assert_called_once_with(transport.close)
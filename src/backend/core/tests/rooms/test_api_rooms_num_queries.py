@@ -0,0 +1,217 @@
+"""
+Test rooms API endpoints in the Meet core app: number of queries.
+
+The role of the logged-in user is resolved along with the room, so the number of
+queries must not depend on the number of accesses or of role checks.
+"""
+
+# pylint: disable=W0613
+
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+
+import pytest
+from rest_framework.test import APIClient
+
+from core import models, room_cache
+
+from ...factories import RoomFactory, UserFactory, UserResourceAccessFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.usefixtures("shared_cache")
+@mock.patch("core.utils.generate_token", return_value="foo")
+def test_api_rooms_num_queries_retrieve_anonymous(
+    mock_token, settings, django_assert_num_queries
+):
+    """
+    Anonymous users should retrieve a public room with a single query on a cold cache,
+    and without any query once the room is cached.
+
+    When unregistered rooms are allowed with the fast path, the filter of registered
+    slugs is loaded with one more query on a cold cache, then reused by the process
+    until a room is created or renamed.
+    """
+    settings.ALLOW_UNREGISTERED_ROOMS = True
+    settings.ROOM_UNREGISTERED_FAST_PATH = True
+    room = RoomFactory(is_public=True)
+    UserResourceAccessFactory.create_batch(3, resource=room)
+    cache.clear()
+
+    with django_assert_num_queries(2):
+        response = APIClient().get(f"/api/v1.0/rooms/{room.slug:s}/")
+
+    assert response.status_code == 200
+    assert "accesses" not in response.json()
+
+    room_cache.delete_room(room)
+
+    with django_assert_num_queries(1):
+        response = APIClient().get(f"/api/v1.0/rooms/{room.slug:s}/")
+
+    assert response.status_code == 200
+
+    with django_assert_num_queries(0):
+        response = APIClient().get(f"/api/v1.0/rooms/{room.slug:s}/")
+
+    assert response.status_code == 200
+
+
+@mock.patch("core.utils.generate_token", return_value="foo")
+@mock.patch("core.room_cache.get_room")
+def test_api_rooms_num_queries_retrieve_anonymous_not_shared(
+    mock_get_room, mock_token, django_assert_num_queries
+):
+    """
+    Anonymous users should not retrieve rooms from the room cache if it is not shared
+    by all processes, as it would miss the changes made by the others.
+    """
+    room = RoomFactory(is_public=True)
+
+    for _ in range(2):
+        with django_assert_num_queries(1):
+            response = APIClient().get(f"/api/v1.0/rooms/{room.id!s}/")
+        assert response.status_code == 200
+
+    mock_get_room.assert_not_called()
+
+
+@pytest.mark.parametrize("accesses_count", [1, 5])
+@pytest.mark.parametrize("role", ["member", "administrator", "owner"])
+@mock.patch("core.utils.generate_token", return_value="foo")
+def test_api_rooms_num_queries_retrieve_related(
+    mock_token, role, accesses_count, django_assert_num_queries
+):
+    """
+    Related users should retrieve a room and its accesses with a fixed number of
+    queries: the user, the room with its role and the accesses with their users.
+    """
+    user = UserFactory()
+    room = RoomFactory(users=[(user, role)])
+    UserResourceAccessFactory.create_batch(accesses_count, resource=room)
+
+    client = APIClient()
+    client.force_login(user)
+
+    with django_assert_num_queries(3):
+        response = client.get(f"/api/v1.0/rooms/{room.id!s}/")
+
+    assert response.status_code == 200
+    assert len(response.json()["accesses"]) == accesses_count + 1
+
+
+@mock.patch("core.utils.generate_token", return_value="foo")
+def test_api_rooms_num_queries_retrieve_unrelated(
+    mock_token, django_assert_num_queries
+):
+    """Unrelated users should retrieve a public room with a fixed number of queries."""
+    user = UserFactory()
+    room = RoomFactory(is_public=True)
+    UserResourceAccessFactory.create_batch(3, resource=room)
+
+    client = APIClient()
+    client.force_login(user)
+
+    with django_assert_num_queries(3):
+        response = client.get(f"/api/v1.0/rooms/{room.id!s}/")
+
+    assert response.status_code == 200
+    assert "accesses" not in response.json()
+
+
+@mock.patch("core.utils.generate_token", return_value="foo")
+@mock.patch("core.room_cache.get_room")
+def test_api_rooms_num_queries_retrieve_authenticated_uncached(
+    mock_get_room, mock_token, django_assert_num_queries
+):
+    """
+    Authenticated users should get the room along with their role in a single
+    query, rather than from the room cache.
+    """
+    user = UserFactory()
+    room = RoomFactory(users=[(user, "member")])
+
+    client = APIClient()
+    client.force_login(user)
+
+    with django_assert_num_queries(3):
+        response = client.get(f"/api/v1.0/rooms/{room.id!s}/")
+
+    assert response.status_code == 200
+    mock_get_room.assert_not_called()
+
+
+def test_api_rooms_num_queries_update_administrator(django_assert_num_queries):
+    """Object permissions should not trigger any query to resolve the role."""
+    user = UserFactory()
+    room = RoomFactory(users=[(user, "administrator")])
+    UserResourceAccessFactory.create_batch(3, resource=room)
+
+    client = APIClient()
+    client.force_login(user)
+
+    # user, room with role, accesses, slug unicity check and one update
+    # per table of the multi-table room model
+    with django_assert_num_queries(6):
+        response = client.patch(
+            f"/api/v1.0/rooms/{room.id!s}/", {"name": "New name"}, format="json"
+        )
+
+    assert response.status_code == 200
+    assert len(response.json()["accesses"]) == 4
+
+
+def test_api_rooms_num_queries_delete_denied(django_assert_num_queries):
+    """Owner checks on delete should rely on the resolved role."""
+    user = UserFactory()
+    room = RoomFactory(users=[(user, "administrator")])
+
+    client = APIClient()
+    client.force_login(user)
+
+    with django_assert_num_queries(3):
+        response = client.delete(f"/api/v1.0/rooms/{room.id!s}/")
+
+    assert response.status_code == 403
+    assert models.Room.objects.filter(id=room.id).exists()
+
+
+@pytest.mark.parametrize(
+    "role,expected",
+    [(None, None), ("member", "member"), ("owner", "owner")],
+)
+def test_models_rooms_with_user_role(role, expected, django_assert_num_queries):
+    """Role checks on a room fetched with its role should not hit the database."""
+    user = UserFactory()
+    room = RoomFactory(users=[(user, role)] if role else [])
+    UserResourceAccessFactory(resource=room, role="administrator")
+
+    room = models.Room.objects.with_user_role(user).get(id=room.id)
+
+    with django_assert_num_queries(0):
+        assert room.get_role(user) == expected
+        assert room.is_owner(user) is (expected == "owner")
+        assert room.is_administrator(user) is (expected == "owner")
+        assert models.get_resource_roles(room, user) == ([expected] if role else [])
+
+
+def test_models_rooms_with_user_role_other_user(django_assert_num_queries):
+    """The resolved role should not be used for another user."""
+    user = UserFactory()
+    other_user = UserFactory()
+    room = RoomFactory(users=[(user, "owner"), (other_user, "member")])
+
+    room = models.Room.objects.with_user_role(user).get(id=room.id)
+
+    with django_assert_num_queries(1):
+        assert room.get_role(other_user) == "member"
+
+
+def test_models_rooms_with_user_role_anonymous():
+    """Anonymous users should not be annotated with any role."""
+    room = RoomFactory()
+    room = models.Room.objects.with_user_role(AnonymousUser()).get(id=room.id)
+    assert not hasattr(room, "user_role")
@@ -286,7 +286,7 @@ def test_api_rooms_retrieve_members(mock_token, django_assert_num_queries):
     client = APIClient()
     client.force_login(user)
 
-    with django_assert_num_queries(4):
+    with django_assert_num_queries(3):
         response = client.get(
             f"/api/v1.0/rooms/{room.id!s}/",
         )
@@ -364,7 +364,7 @@ def test_api_rooms_retrieve_administrators(mock_token, django_assert_num_queries
     client = APIClient()
     client.force_login(user)
 
-    with django_assert_num_queries(4):
+    with django_assert_num_queries(3):
         response = client.get(
             f"/api/v1.0/rooms/{room.id!s}/",
         )
@@ -414,3 +414,59 @@ def test_api_rooms_retrieve_administrators(mock_token, django_assert_num_queries
     }
 
     mock_token.assert_called_once_with(room=expected_name, user=user, username=None)
+
+
+@override_settings(ALLOW_UNREGISTERED_ROOMS=True, ROOM_UNREGISTERED_FAST_PATH=True)
+@pytest.mark.usefixtures("shared_cache")
+@mock.patch("core.utils.generate_token", return_value="foo")
+def test_api_rooms_retrieve_unregistered_fast_path(
+    mock_token, django_assert_num_queries
+):
+    """
+    Anonymous users joining an unregistered room should not hit the database
+    once the filter of registered slugs is built.
+    """
+    RoomFactory(name="registered")
+    client = APIClient()
+    client.get("/api/v1.0/rooms/unregistered-room/")
+
+    with django_assert_num_queries(0):
+        response = client.get("/api/v1.0/rooms/Unregistered-Room/")
+
+    assert response.status_code == 200
+    assert response.json()["id"] is None
+    assert response.json()["livekit"]["room"] == "unregistered-room"
+    assert mock_token.call_count == 2
+
+
+@override_settings(ALLOW_UNREGISTERED_ROOMS=True, ROOM_UNREGISTERED_FAST_PATH=True)
+@pytest.mark.usefixtures("shared_cache")
+@mock.patch("core.utils.generate_token", return_value="foo")
+def test_api_rooms_retrieve_unregistered_fast_path_created(
+    mock_token, django_capture_on_commit_callbacks
+):
+    """A room registered after its slug was looked up should be found."""
+    client = APIClient()
+    response = client.get("/api/v1.0/rooms/my-room/")
+    assert response.json()["id"] is None
+
+    with django_capture_on_commit_callbacks(execute=True):
+        room = RoomFactory(name="My room", is_public=True)
+
+    response = client.get("/api/v1.0/rooms/my-room/")
+    assert response.json()["id"] == str(room.id)
+    assert response.json()["livekit"]["room"] == str(room.id)
+    assert mock_token.call_count == 2
+
+
+@override_settings(ALLOW_UNREGISTERED_ROOMS=True, ROOM_UNREGISTERED_FAST_PATH=False)
+@mock.patch("core.utils.generate_token", return_value="foo")
+@mock.patch("core.room_cache.registered_slugs.may_exist")
+def test_api_rooms_retrieve_unregistered_fast_path_disabled(mock_may_exist, mock_token):
+    """The filter of registered slugs should not be used if the fast path is disabled."""
+    response = APIClient().get("/api/v1.0/rooms/unregistered-room/")
+
+    assert response.status_code == 200
+    assert response.json()["id"] is None
+    mock_may_exist.assert_not_called()
+    mock_token.assert_called_once()
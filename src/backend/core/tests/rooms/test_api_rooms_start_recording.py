@@ -26,7 +26,7 @@ def mock_worker_service():
 def mock_worker_service_factory(mock_worker_service):
     """Mock worker service factory."""
     with mock.patch(
-        "core.api.viewsets.get_worker_service",
+        "core.tasks.get_worker_service",
         return_value=mock_worker_service,
     ) as mock_worker_service_factory:
         yield mock_worker_service_factory
@@ -35,7 +35,7 @@ def mock_worker_service_factory(mock_worker_service):
 @pytest.fixture
 def mock_worker_manager(mock_worker_service):
     """Mock worker service mediator."""
-    with mock.patch("core.api.viewsets.WorkerServiceMediator") as mock_mediator_class:
+    with mock.patch("core.tasks.WorkerServiceMediator") as mock_mediator_class:
         mock_mediator = mock.Mock()
         mock_mediator_class.return_value = mock_mediator
         yield mock_mediator
@@ -113,10 +113,14 @@ def test_start_recording_missing_mode(settings):
 
 
 def test_start_recording_worker_error(
-    mock_worker_service_factory, mock_worker_manager, settings
+    mock_worker_service_factory,
+    mock_worker_manager,
+    settings,
+    django_capture_on_commit_callbacks,
 ):
-    """Should handle worker service errors appropriately."""
+    """Worker errors should not fail the request, the recording being started async."""
     settings.RECORDING_ENABLE = True
+    settings.RECORDING_WORKER_MAX_RETRIES = 0
 
     room = RoomFactory()
     user = UserFactory()
@@ -132,23 +136,27 @@ def test_start_recording_worker_error(
     client = APIClient()
     client.force_login(user)
 
-    response = client.post(
-        f"/api/v1.0/rooms/{room.id}/start-recording/",
-        {"mode": "screen_recording"},
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            f"/api/v1.0/rooms/{room.id}/start-recording/",
+            {"mode": "screen_recording"},
+        )
 
     mock_worker_service_factory.assert_called_once_with(mode="screen_recording")
 
-    assert response.status_code == 500
-    assert response.json() == {
-        "error": f"Recording failed to start for room {room.slug}"
-    }
-
     # Recording object should be created even if worker fails
     assert Recording.objects.count() == 1
     recording = Recording.objects.first()
     assert recording.room == room
     assert recording.mode == "screen_recording"
+    mock_start.assert_called_once_with(recording, final_attempt=True)
+
+    assert response.status_code == 202
+    assert response.json() == {
+        "message": f"Recording initiated for room {room.slug}",
+        "id": str(recording.id),
+        "status": "initiated",
+    }
 
     # Verify recording access details
     assert recording.accesses.count() == 1
@@ -158,9 +166,12 @@ def test_start_recording_worker_error(
 
 
 def test_start_recording_success(
-    mock_worker_service_factory, mock_worker_manager, settings
+    mock_worker_service_factory,
+    mock_worker_manager,
+    settings,
+    django_capture_on_commit_callbacks,
 ):
-    """Should successfully start recording when everything is configured correctly."""
+    """Should accept the recording and start it once the transaction is committed."""
     settings.RECORDING_ENABLE = True
 
     room = RoomFactory()
@@ -174,21 +185,28 @@ def test_start_recording_success(
     client = APIClient()
     client.force_login(user)
 
-    response = client.post(
-        f"/api/v1.0/rooms/{room.id}/start-recording/",
-        {"mode": "screen_recording"},
-    )
+    with django_capture_on_commit_callbacks() as callbacks:
+        response = client.post(
+            f"/api/v1.0/rooms/{room.id}/start-recording/",
+            {"mode": "screen_recording"},
+        )
 
-    mock_worker_service_factory.assert_called_once_with(mode="screen_recording")
+    recording = Recording.objects.first()
 
-    assert response.status_code == 201
+    assert response.status_code == 202
     assert response.json() == {
-        "message": f"Recording successfully started for room {room.slug}"
+        "message": f"Recording initiated for room {room.slug}",
+        "id": str(recording.id),
+        "status": "initiated",
     }
 
-    # Verify the mediator was called with the recording
-    recording = Recording.objects.first()
-    mock_start.assert_called_once_with(recording)
+    # The worker is only called once the recording is committed
+    mock_worker_service_factory.assert_not_called()
+    assert len(callbacks) == 1
+    callbacks[0]()
+
+    mock_worker_service_factory.assert_called_once_with(mode="screen_recording")
+    mock_start.assert_called_once_with(recording, final_attempt=False)
 
     assert recording.room == room
     assert recording.mode == "screen_recording"
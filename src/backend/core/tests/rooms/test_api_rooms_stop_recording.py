@@ -26,7 +26,7 @@ def mock_worker_service():
 def mock_worker_service_factory(mock_worker_service):
     """Mock worker service factory."""
     with mock.patch(
-        "core.api.viewsets.get_worker_service",
+        "core.tasks.get_worker_service",
         return_value=mock_worker_service,
     ) as mock_worker_service_factory:
         yield mock_worker_service_factory
@@ -35,7 +35,7 @@ def mock_worker_service_factory(mock_worker_service):
 @pytest.fixture
 def mock_worker_manager(mock_worker_service):
     """Mock worker service mediator."""
-    with mock.patch("core.api.viewsets.WorkerServiceMediator") as mock_mediator_class:
+    with mock.patch("core.tasks.WorkerServiceMediator") as mock_mediator_class:
         mock_mediator = mock.Mock()
         mock_mediator_class.return_value = mock_mediator
         yield mock_mediator
@@ -110,11 +110,15 @@ def test_stop_recording_no_active_recording(settings):
 
 
 def test_stop_recording_worker_error(
-    mock_worker_service_factory, mock_worker_manager, settings
+    mock_worker_service_factory,
+    mock_worker_manager,
+    settings,
+    django_capture_on_commit_callbacks,
 ):
-    """Should handle worker service errors appropriately."""
+    """Worker errors should not fail the request, the recording being stopped async."""
 
     settings.RECORDING_ENABLE = True
+    settings.RECORDING_WORKER_MAX_RETRIES = 0
 
     room = RoomFactory()
     user = UserFactory()
@@ -134,23 +138,29 @@ def test_stop_recording_worker_error(
     client = APIClient()
     client.force_login(user)
 
-    response = client.post(f"/api/v1.0/rooms/{room.id}/stop-recording/")
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(f"/api/v1.0/rooms/{room.id}/stop-recording/")
 
     mock_worker_service_factory.assert_called_once_with(mode="screen_recording")
-    mock_stop.assert_called_once_with(recording)
+    mock_stop.assert_called_once_with(recording, final_attempt=True)
 
-    assert response.status_code == 500
+    assert response.status_code == 202
     assert response.json() == {
-        "error": f"Recording failed to stop for room {room.slug}"
+        "message": f"Recording stopping for room {room.slug}.",
+        "id": str(recording.id),
+        "status": "active",
     }
     # Verify recording status hasn't changed
     assert Recording.objects.filter(status=RecordingStatusChoices.ACTIVE).count() == 1
 
 
 def test_stop_recording_success(
-    mock_worker_service_factory, mock_worker_manager, settings
+    mock_worker_service_factory,
+    mock_worker_manager,
+    settings,
+    django_capture_on_commit_callbacks,
 ):
-    """Should successfully stop recording when everything is configured correctly."""
+    """Should accept stopping the recording and stop it once the request is committed."""
 
     settings.RECORDING_ENABLE = True
 
@@ -170,13 +180,56 @@ def test_stop_recording_success(
     client = APIClient()
     client.force_login(user)
 
-    response = client.post(f"/api/v1.0/rooms/{room.id}/stop-recording/")
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(f"/api/v1.0/rooms/{room.id}/stop-recording/")
 
     mock_worker_service_factory.assert_called_once_with(mode="screen_recording")
-    mock_stop.assert_called_once_with(recording)
+    mock_stop.assert_called_once_with(recording, final_attempt=False)
 
-    assert response.status_code == 200
-    assert response.json() == {"message": f"Recording stopped for room {room.slug}."}
+    assert response.status_code == 202
+    assert response.json() == {
+        "message": f"Recording stopping for room {room.slug}.",
+        "id": str(recording.id),
+        "status": "active",
+    }
 
     # Verify the recording still exists
     assert Recording.objects.count() == 1
+
+
+def test_stop_recording_initiated(
+    mock_worker_service_factory,
+    mock_worker_manager,
+    settings,
+    django_capture_on_commit_callbacks,
+):
+    """Should accept stopping a recording whose start is still pending."""
+
+    settings.RECORDING_ENABLE = True
+
+    room = RoomFactory()
+    user = UserFactory()
+    recording = RecordingFactory(
+        room=room,
+        status=RecordingStatusChoices.INITIATED,
+        mode="screen_recording",
+    )
+    room.accesses.create(user=user, role="owner")
+
+    mock_stop = mock.Mock()
+    mock_worker_manager.stop = mock_stop
+
+    client = APIClient()
+    client.force_login(user)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(f"/api/v1.0/rooms/{room.id}/stop-recording/")
+
+    mock_stop.assert_called_once_with(recording, final_attempt=False)
+
+    assert response.status_code == 202
+    assert response.json() == {
+        "message": f"Recording stopping for room {room.slug}.",
+        "id": str(recording.id),
+        "status": "initiated",
+    }
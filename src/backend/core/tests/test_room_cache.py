@@ -0,0 +1,335 @@
+"""
+Test the room cache in the Meet core app.
+"""
+
+import uuid
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.test.utils import override_settings
+
+import pytest
+
+from core import models, room_cache
+from core.factories import RoomFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_room_cache_get_by_slug_and_pk(
+    django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    """Saved rooms should be resolved from the cache by slug or by primary key."""
+    with django_capture_on_commit_callbacks(execute=True):
+        room = RoomFactory(name="My room", configuration={"foo": "bar"})
+
+    with django_assert_num_queries(0):
+        by_slug = room_cache.get_room(slug="my-room")
+        by_pk = room_cache.get_room(pk=str(room.pk))
+
+    for cached_room in [by_slug, by_pk]:
+        assert cached_room == room
+        assert cached_room.name == "My room"
+        assert cached_room.configuration == {"foo": "bar"}
+        assert cached_room.is_public == room.is_public
+        assert cached_room._state.adding is False  # pylint: disable=protected-access
+
+
+def test_room_cache_cold(django_assert_num_queries):
+    """A cache miss should load the room from the database and cache it."""
+    room = RoomFactory(name="My room")
+    cache.clear()
+
+    with django_assert_num_queries(1):
+        assert room_cache.get_room(slug="my-room") == room
+    with django_assert_num_queries(0):
+        assert room_cache.get_room(slug="my-room") == room
+        assert room_cache.get_room(pk=room.pk) == room
+
+
+def test_room_cache_rename(
+    django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    """Renaming a room should resolve the new slug and stop resolving the old one."""
+    with django_capture_on_commit_callbacks(execute=True):
+        room = RoomFactory(name="Old name")
+        room.name = "New name"
+        room.save()
+
+    with django_assert_num_queries(0):
+        assert room_cache.get_room(slug="new-name").name == "New name"
+        assert room_cache.get_room(pk=room.pk).slug == "new-name"
+
+    with pytest.raises(models.Room.DoesNotExist):
+        room_cache.get_room(slug="old-name")
+
+
+def test_room_cache_delete():
+    """Deleting a room should remove its entries."""
+    room = RoomFactory(name="My room")
+    room_id = room.pk
+    room.delete()
+
+    with pytest.raises(models.Room.DoesNotExist):
+        room_cache.get_room(slug="my-room")
+    with pytest.raises(models.Room.DoesNotExist):
+        room_cache.get_room(pk=room_id)
+
+
+def test_room_cache_delete_concurrent(django_capture_on_commit_callbacks):
+    """
+    Entries stored by a request loading the room before its deletion is committed
+    should be removed as well.
+    """
+    room = RoomFactory(name="My room")
+    room_id = room.pk
+
+    with django_capture_on_commit_callbacks(execute=True):
+        room.delete()
+        room.pk = room_id
+        room_cache.set_room(room, only_if_missing=True)
+
+    with pytest.raises(models.Room.DoesNotExist):
+        room_cache.get_room(slug="my-room")
+    with pytest.raises(models.Room.DoesNotExist):
+        room_cache.get_room(pk=room_id)
+
+
+def test_room_cache_rollback(django_assert_num_queries):
+    """A room saved in a transaction that is rolled back should not be cached."""
+    with pytest.raises(RuntimeError), transaction.atomic():
+        RoomFactory(name="My room")
+        raise RuntimeError()
+
+    with django_assert_num_queries(1), pytest.raises(models.Room.DoesNotExist):
+        room_cache.get_room(slug="my-room")
+
+
+def test_room_cache_resource_save(django_capture_on_commit_callbacks):
+    """Saving the parent resource on its own should invalidate the room entry."""
+    with django_capture_on_commit_callbacks(execute=True):
+        room = RoomFactory(is_public=False)
+    assert room_cache.get_room(pk=room.pk).is_public is False
+
+    resource = models.Resource.objects.get(pk=room.pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        resource.is_public = True
+        resource.save()
+
+    assert room_cache.get_room(pk=room.pk).is_public is True
+
+
+def test_room_cache_unregistered(settings, django_assert_num_queries):
+    """Lookups of unregistered rooms should be cached when they are allowed."""
+    settings.ALLOW_UNREGISTERED_ROOMS = True
+
+    with django_assert_num_queries(1), pytest.raises(models.Room.DoesNotExist):
+        room_cache.get_room(slug="unknown")
+    with django_assert_num_queries(0), pytest.raises(models.Room.DoesNotExist):
+        room_cache.get_room(slug="unknown")
+
+    room_id = uuid.uuid4()
+    with django_assert_num_queries(1), pytest.raises(models.Room.DoesNotExist):
+        room_cache.get_room(pk=room_id)
+    with django_assert_num_queries(0), pytest.raises(models.Room.DoesNotExist):
+        room_cache.get_room(pk=room_id)
+
+
+def test_room_cache_unregistered_created(settings, django_capture_on_commit_callbacks):
+    """Creating a room should override the negative entry of its slug once committed."""
+    settings.ALLOW_UNREGISTERED_ROOMS = True
+
+    with pytest.raises(models.Room.DoesNotExist):
+        room_cache.get_room(slug="unknown")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        room = RoomFactory(name="Unknown")
+    assert room_cache.get_room(slug="unknown") == room
+
+
+def test_room_cache_unregistered_not_allowed(settings, django_assert_num_queries):
+    """Lookups of unregistered rooms should not be cached when they are not allowed."""
+    settings.ALLOW_UNREGISTERED_ROOMS = False
+
+    for _ in range(2):
+        with django_assert_num_queries(1), pytest.raises(models.Room.DoesNotExist):
+            room_cache.get_room(slug="unknown")
+
+
+def test_room_cache_disabled(settings, django_assert_num_queries):
+    """A null TTL should disable the room cache."""
+    settings.ROOM_CACHE_TTL = 0
+    room = RoomFactory(name="My room")
+
+    for _ in range(2):
+        with django_assert_num_queries(1):
+            assert room_cache.get_room(slug="my-room") == room
+
+
+def test_room_cache_bloom_filter():
+    """The Bloom filter should never miss an item that was added."""
+    bloom_filter = room_cache.BloomFilter(capacity=1000)
+    slugs = [f"room-{index:d}" for index in range(1000)]
+    for slug in slugs:
+        bloom_filter.add(slug)
+
+    assert all(slug in bloom_filter for slug in slugs)
+    false_positives = sum(f"other-{index:d}" in bloom_filter for index in range(1000))
+    assert false_positives < 50
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_room_cache_registered_slugs(django_assert_num_queries):
+    """The filter of registered slugs should be built once per version."""
+    RoomFactory(name="My room")
+    registered_slugs = room_cache.RegisteredSlugs()
+
+    with django_assert_num_queries(1):
+        assert registered_slugs.may_exist("my-room") is True
+        assert registered_slugs.may_exist("unknown") is False
+
+    with django_assert_num_queries(0):
+        assert registered_slugs.may_exist("unknown") is False
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_room_cache_registered_slugs_created(
+    settings, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    """
+    Creating a room should change the version once committed, lookups falling back
+    to the database until the filter may be rebuilt.
+    """
+    registered_slugs = room_cache.RegisteredSlugs()
+    assert registered_slugs.may_exist("my-room") is False
+
+    with django_capture_on_commit_callbacks(execute=True):
+        RoomFactory(name="My room")
+
+    with django_assert_num_queries(0):
+        assert registered_slugs.may_exist("my-room") is True
+        assert registered_slugs.may_exist("unknown") is True
+
+    settings.ROOM_SLUGS_FILTER_REBUILD_INTERVAL = 0
+    with django_assert_num_queries(1):
+        assert registered_slugs.may_exist("my-room") is True
+        assert registered_slugs.may_exist("unknown") is False
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_room_cache_registered_slugs_created_during_build(
+    settings, django_capture_on_commit_callbacks
+):
+    """A room committed while the filter is built should be seen on a next lookup."""
+    settings.ROOM_SLUGS_FILTER_REBUILD_INTERVAL = 0
+    registered_slugs = room_cache.RegisteredSlugs()
+    build = registered_slugs._build  # pylint: disable=protected-access
+
+    def build_then_create(version):
+        # The slugs were loaded, then the room is committed
+        bloom_filter = build(version)
+        with django_capture_on_commit_callbacks(execute=True):
+            RoomFactory(name="My room")
+        return bloom_filter
+
+    with mock.patch.object(registered_slugs, "_build", build_then_create):
+        assert registered_slugs.may_exist("my-room") is False
+
+    assert registered_slugs.may_exist("my-room") is True
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_room_cache_registered_slugs_renamed(
+    settings, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    """Renaming a room should change the version once committed."""
+    settings.ROOM_SLUGS_FILTER_REBUILD_INTERVAL = 0
+    room = RoomFactory(name="My room")
+    registered_slugs = room_cache.RegisteredSlugs()
+    assert registered_slugs.may_exist("new-name") is False
+
+    with django_capture_on_commit_callbacks(execute=True):
+        room.name = "New name"
+        room.save()
+
+    with django_assert_num_queries(1):
+        assert registered_slugs.may_exist("new-name") is True
+        assert registered_slugs.may_exist("my-room") is False
+
+
+def test_room_cache_registered_slugs_unchanged(django_capture_on_commit_callbacks):
+    """Saving or deleting rooms without registering a slug should keep the version."""
+    room = RoomFactory(name="My room")
+    cache.set(room_cache.RegisteredSlugs.VERSION_CACHE_KEY, "version")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        room.configuration = {"foo": "bar"}
+        room.save()
+        models.Room.objects.get(pk=room.pk).save()
+        room.delete()
+
+    assert cache.get(room_cache.RegisteredSlugs.VERSION_CACHE_KEY) == "version"
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_room_cache_registered_slugs_max_age(settings, django_assert_num_queries):
+    """Filters should be rebuilt once too old, shedding slugs of deleted rooms."""
+    room = RoomFactory(name="My room")
+    registered_slugs = room_cache.RegisteredSlugs()
+    assert registered_slugs.may_exist("my-room") is True
+
+    room.delete()
+    with django_assert_num_queries(0):
+        assert registered_slugs.may_exist("my-room") is True
+
+    settings.ROOM_SLUGS_FILTER_MAX_AGE = 0
+    with django_assert_num_queries(1):
+        assert registered_slugs.may_exist("my-room") is False
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_room_cache_registered_slugs_evicted(settings, django_assert_num_queries):
+    """Filters should be rebuilt if the shared version was evicted from the cache."""
+    settings.ROOM_SLUGS_FILTER_REBUILD_INTERVAL = 0
+    registered_slugs = room_cache.RegisteredSlugs()
+    assert registered_slugs.may_exist("my-room") is False
+
+    RoomFactory(name="My room")
+    cache.clear()
+
+    with django_assert_num_queries(1):
+        assert registered_slugs.may_exist("my-room") is True
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "first": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "first",
+        },
+        "second": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "second",
+        },
+    }
+)
+def test_room_cache_registered_slugs_not_shared(django_assert_num_queries):
+    """
+    Filters of processes that do not share a cache should never tell that a slug
+    registered by another process is not registered.
+    """
+    first, second = (
+        room_cache.RegisteredSlugs("first"),
+        room_cache.RegisteredSlugs("second"),
+    )
+    assert first.may_exist("my-room") is True
+
+    RoomFactory(name="My room")
+    second.change_version()
+
+    assert caches["first"].get(room_cache.RegisteredSlugs.VERSION_CACHE_KEY) is None
+    with django_assert_num_queries(0):
+        assert first.may_exist("my-room") is True
+        assert first.may_exist("unknown") is True
@@ -0,0 +1,120 @@
+"""
+Test LiveKit token generation utils in the Meet core app.
+"""
+
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+import pytest
+from livekit.api import TokenVerifier
+
+from core import utils
+from core.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def livekit_settings(settings):
+    """Configure LiveKit credentials."""
+    settings.LIVEKIT_CONFIGURATION = {
+        "api_key": "key",
+        "api_secret": "secret",
+        "url": "test_url_value",
+    }
+
+
+def _verify(token):
+    """Decode a LiveKit token with the configured credentials."""
+    return TokenVerifier(api_key="key", api_secret="secret").verify(token)
+
+
+def test_utils_generate_token_claims():
+    """Tokens should carry the room grants, identity, name and color of the user."""
+    user = UserFactory()
+
+    claims = _verify(utils.generate_token(room="my-room", user=user, username="Jo"))
+
+    assert claims.identity == str(user.sub)
+    assert claims.name == "Jo"
+    assert claims.video.room == "my-room"
+    assert claims.video.room_join is True
+    assert claims.video.can_publish_sources == [
+        "camera",
+        "microphone",
+        "screen_share",
+        "screen_share_audio",
+    ]
+    assert claims.metadata == f'{{"color": "{utils.generate_color(str(user.sub))}"}}'
+
+
+def test_utils_generate_token_default_username():
+    """The user's string representation should be used when no username is given."""
+    user = UserFactory()
+    claims = _verify(utils.generate_token(room="my-room", user=user))
+    assert claims.name == str(user)
+
+
+def test_utils_generate_token_cached():
+    """Authenticated users should get the same token while it is cached."""
+    user = UserFactory()
+
+    with mock.patch.object(utils, "mint_token", wraps=utils.mint_token) as mock_mint:
+        token = utils.generate_token(room="my-room", user=user)
+        assert utils.generate_token(room="my-room", user=user) == token
+
+    mock_mint.assert_called_once()
+
+
+def test_utils_generate_token_cache_key():
+    """Tokens should be cached per room, identity and username."""
+    user = UserFactory()
+    token = utils.generate_token(room="my-room", user=user)
+
+    assert utils.generate_token(room="other-room", user=user) != token
+    assert utils.generate_token(room="my-room", user=UserFactory()) != token
+    assert utils.generate_token(room="my-room", user=user, username="Jo") != token
+
+
+def test_utils_generate_token_cache_key_rotation(settings):
+    """Tokens signed with former LiveKit credentials should not be served."""
+    user = UserFactory()
+    token = utils.generate_token(room="my-room", user=user)
+
+    settings.LIVEKIT_CONFIGURATION = {
+        **settings.LIVEKIT_CONFIGURATION,
+        "api_secret": "rotated",
+    }
+    rotated_token = utils.generate_token(room="my-room", user=user)
+
+    assert rotated_token != token
+    assert (
+        TokenVerifier(api_key="key", api_secret="rotated").verify(rotated_token)
+        is not None
+    )
+
+
+@override_settings(LIVEKIT_TOKEN_CACHE_TTL=0)
+def test_utils_generate_token_cache_disabled():
+    """A null TTL should disable the token cache."""
+    user = UserFactory()
+
+    with mock.patch.object(utils, "mint_token", wraps=utils.mint_token) as mock_mint:
+        utils.generate_token(room="my-room", user=user)
+        utils.generate_token(room="my-room", user=user)
+
+    assert mock_mint.call_count == 2
+
+
+def test_utils_generate_token_anonymous():
+    """Anonymous users should get a new identity and should never be cached."""
+    with mock.patch.object(cache, "set") as mock_set:
+        first = _verify(utils.generate_token(room="my-room", user=AnonymousUser()))
+        second = _verify(utils.generate_token(room="my-room", user=AnonymousUser()))
+
+    assert first.identity != second.identity
+    assert first.name == "Anonymous"
+    mock_set.assert_not_called()
@@ -4,17 +4,23 @@ Utils functions used in the core app
 
 # ruff: noqa:S311
 
+import dataclasses
 import hashlib
 import json
 import random
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Tuple
 from uuid import uuid4
 
 from django.conf import settings
+from django.core.cache import cache
 
 from livekit.api import AccessToken, VideoGrants
 
+TOKEN_CACHE_KEY_PREFIX = "livekit-token"  # noqa: S105
 
+
+@lru_cache(maxsize=4096)
 def generate_color(identity: str) -> str:
     """Generates a consistent HSL color based on a given identity string.
 
@@ -23,6 +29,8 @@ def generate_color(identity: str) -> str:
     over saturation and lightness, empirically adjusted to produce visually
     appealing and distinct colors. HSL is preferred over hex to constrain the color
     range and ensure predictability.
+
+    The output only depends on the identity, results are memoized per process.
     """
 
     # ruff: noqa:S324
@@ -37,17 +45,14 @@ def generate_color(identity: str) -> str:
     return f"hsl({hue}, {saturation}%, {lightness}%)"
 
 
-def generate_token(room: str, user, username: Optional[str] = None) -> str:
-    """Generate a LiveKit access token for a user in a specific room.
+@lru_cache(maxsize=1024)
+def get_video_grants(room: str) -> Tuple[VideoGrants, str]:
+    """Build the video grants template of a room, along with its fingerprint.
 
-    Args:
-        room (str): The name of the room.
-        user (User): The user which request the access token.
-        username (Optional[str]): The username to be displayed in the room.
-                         If none, a default value will be used.
-
-    Returns:
-        str: The LiveKit JWT access token.
+    Grants only depend on the room, they are built once per process and shared
+    between all tokens minted for this room. The returned instance must not be mutated.
+    The fingerprint identifies the grants content in token cache keys, so any change
+    to the template invalidates previously cached tokens.
     """
     video_grants = VideoGrants(
         room=room,
@@ -61,13 +66,49 @@ def generate_token(room: str, user, username: Optional[str] = None) -> str:
             "screen_share_audio",
         ],
     )
+    fingerprint = hashlib.sha256(
+        json.dumps(dataclasses.asdict(video_grants), sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return video_grants, fingerprint
+
 
+def get_identity(user) -> Tuple[str, str]:
+    """Return the LiveKit identity and the default display name of a user.
+
+    Anonymous users get a random identity, each request joins as a new participant.
+    """
     if user.is_anonymous:
-        identity = str(uuid4())
-        default_username = "Anonymous"
-    else:
-        identity = str(user.sub)
-        default_username = str(user)
+        return str(uuid4()), "Anonymous"
+    return str(user.sub), str(user)
+
+
+def get_token_cache_key(
+    room: str, identity: str, name: str, grants_fingerprint: str
+) -> str:
+    """Compute the cache key of a signed token.
+
+    The LiveKit credentials are part of the key, so tokens signed before a key
+    rotation are no longer served once the new credentials are deployed.
+    """
+    credentials = settings.LIVEKIT_CONFIGURATION
+    digest = hashlib.sha256(
+        json.dumps(
+            [
+                room,
+                identity,
+                name,
+                grants_fingerprint,
+                credentials["api_key"],
+                credentials["api_secret"],
+            ]
+        ).encode("utf-8")
+    ).hexdigest()
+    return f"{TOKEN_CACHE_KEY_PREFIX}:{digest}"
+
+
+def mint_token(room: str, identity: str, name: str) -> str:
+    """Sign a new LiveKit access token, bypassing the token cache."""
+    video_grants, _fingerprint = get_video_grants(room)
 
     token = (
         AccessToken(
@@ -76,8 +117,39 @@ def generate_token(room: str, user, username: Optional[str] = None) -> str:
         )
         .with_grants(video_grants)
         .with_identity(identity)
-        .with_name(username or default_username)
+        .with_name(name)
         .with_metadata(json.dumps({"color": generate_color(identity)}))
     )
 
     return token.to_jwt()
+
+
+def generate_token(room: str, user, username: Optional[str] = None) -> str:
+    """Generate a LiveKit access token for a user in a specific room.
+
+    Tokens of authenticated users are cached for LIVEKIT_TOKEN_CACHE_TTL seconds.
+
+    Args:
+        room (str): The name of the room.
+        user (User): The user which request the access token.
+        username (Optional[str]): The username to be displayed in the room.
+                         If none, a default value will be used.
+
+    Returns:
+        str: The LiveKit JWT access token.
+    """
+    identity, default_username = get_identity(user)
+    name = username or default_username
+    timeout = settings.LIVEKIT_TOKEN_CACHE_TTL
+
+    # Anonymous users are never cached as their identity is random
+    if not timeout or user.is_anonymous:
+        return mint_token(room, identity, name)
+
+    _video_grants, grants_fingerprint = get_video_grants(room)
+    cache_key = get_token_cache_key(room, identity, name, grants_fingerprint)
+    token = cache.get(cache_key)
+    if token is None:
+        token = mint_token(room, identity, name)
+        cache.set(cache_key, token, timeout=timeout)
+    return token
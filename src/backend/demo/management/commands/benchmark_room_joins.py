@@ -0,0 +1,80 @@
+"""benchmark_room_joins management command"""
+
+import statistics
+import time
+from uuid import uuid4
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIRequestFactory
+
+from core import room_cache
+from core.api.viewsets import RoomViewSet
+
+
+class Command(BaseCommand):
+    """Compare join latency of unregistered rooms with and without the fast path."""
+
+    help = "Benchmark anonymous joins of unregistered rooms"
+
+    def add_arguments(self, parser):
+        """Define the number of joins per mode."""
+        parser.add_argument(
+            "--joins",
+            type=int,
+            default=2000,
+            help="Number of joins per mode, each on a distinct random room link.",
+        )
+
+    def _run(self, slugs):
+        """Join random unregistered rooms and return latencies and query count."""
+        view = RoomViewSet.as_view({"get": "retrieve"})
+        factory = APIRequestFactory()
+        latencies = []
+
+        with CaptureQueriesContext(connection) as queries:
+            for slug in slugs:
+                request = factory.get(f"/api/v1.0/rooms/{slug:s}/")
+                request.user = AnonymousUser()
+                start = time.perf_counter()
+                response = view(request, pk=slug)
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200  # noqa: S101
+
+        return latencies, len(queries)
+
+    def _report(self, mode, latencies, queries_count):
+        """Write latency percentiles of a mode."""
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{mode:s}: p50={percentiles[49]:.3f}ms p95={percentiles[94]:.3f}ms "
+            f"max={max(latencies):.3f}ms queries={queries_count:d}"
+        )
+
+    def handle(self, *args, **options):
+        """Run each mode on a cold cache and report its latency."""
+        joins = options["joins"]
+        if not room_cache.is_cache_shared():
+            self.stderr.write(
+                "The fast path is only used with a Redis cache, shared by all processes."
+            )
+
+        for mode, fast_path in [("ORM path", False), ("Fast path", True)]:
+            # Random slugs are not cached yet, their entries are deleted once measured
+            slugs = [uuid4().hex[:10] for _ in range(joins)]
+            try:
+                with override_settings(
+                    ALLOW_UNREGISTERED_ROOMS=True,
+                    ROOM_UNREGISTERED_FAST_PATH=fast_path,
+                ):
+                    latencies, queries_count = self._run(slugs)
+            finally:
+                cache.delete_many(
+                    [room_cache.get_slug_cache_key(slug) for slug in slugs]
+                )
+            self._report(mode, latencies, queries_count)
@@ -0,0 +1,72 @@
+"""benchmark_tokens management command"""
+
+import time
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core import models, utils
+
+
+class Command(BaseCommand):
+    """Measure LiveKit token minting throughput on a single core."""
+
+    help = "Benchmark LiveKit tokens per second, with and without the token cache"
+
+    def add_arguments(self, parser):
+        """Define the number of iterations and of distinct participants."""
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=5000,
+            help="Number of tokens to generate per scenario.",
+        )
+        parser.add_argument(
+            "--participants",
+            type=int,
+            default=100,
+            help="Number of distinct participants joining the same room.",
+        )
+
+    def _run(self, room, users, iterations):
+        """Generate tokens for the given users and return the number of tokens per second."""
+        start = time.perf_counter()
+        for index in range(iterations):
+            utils.generate_token(room, users[index % len(users)])
+        return iterations / (time.perf_counter() - start)
+
+    @staticmethod
+    def _delete_tokens(room, users):
+        """Delete the tokens cached by the benchmark, and only them."""
+        _video_grants, grants_fingerprint = utils.get_video_grants(room)
+        cache.delete_many(
+            [
+                utils.get_token_cache_key(
+                    room, *utils.get_identity(user), grants_fingerprint
+                )
+                for user in users
+            ]
+        )
+
+    def handle(self, *args, **options):
+        """Run each scenario and report its throughput."""
+        iterations = options["iterations"]
+        room = str(uuid4())
+        users = [
+            models.User(sub=str(uuid4()), email=f"user{index:d}@example.com")
+            for index in range(options["participants"])
+        ]
+
+        # The room is new, no token of its participants is cached yet
+        with override_settings(LIVEKIT_TOKEN_CACHE_TTL=0):
+            uncached = self._run(room, users, iterations)
+
+        try:
+            cached = self._run(room, users, iterations)
+        finally:
+            self._delete_tokens(room, users)
+
+        self.stdout.write(f"Uncached minting: {uncached:.0f} tokens/s")
+        self.stdout.write(f"Cached minting: {cached:.0f} tokens/s")
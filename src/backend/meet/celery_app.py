@@ -21,3 +21,19 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
+
+
+@app.on_after_configure.connect
+def setup_periodic_tasks(sender, **kwargs):
+    """Schedule periodic tasks according to Django settings.
+
+    They are only sent by a celery beat, which runs apart from the workers, once.
+    """
+    from django.conf import settings  # pylint: disable=import-outside-toplevel
+
+    if settings.RECORDING_RECONCILIATION_INTERVAL:
+        sender.add_periodic_task(
+            settings.RECORDING_RECONCILIATION_INTERVAL,
+            sender.signature("core.tasks.reconcile_recordings"),
+            name="reconcile recordings",
+        )
@@ -411,12 +411,34 @@ class Base(Configuration):
         ),
         "url": values.Value(environ_name="LIVEKIT_API_URL", environ_prefix=None),
     }
+    LIVEKIT_TOKEN_CACHE_TTL = values.PositiveIntegerValue(
+        60, environ_name="LIVEKIT_TOKEN_CACHE_TTL", environ_prefix=None
+    )
     RESOURCE_DEFAULT_IS_PUBLIC = values.BooleanValue(
         True, environ_name="RESOURCE_DEFAULT_IS_PUBLIC", environ_prefix=None
     )
     ALLOW_UNREGISTERED_ROOMS = values.BooleanValue(
         True, environ_name="ALLOW_UNREGISTERED_ROOMS", environ_prefix=None
     )
+    ROOM_CACHE_TTL = values.PositiveIntegerValue(
+        300, environ_name="ROOM_CACHE_TTL", environ_prefix=None
+    )
+    ROOM_CACHE_UNREGISTERED_TTL = values.PositiveIntegerValue(
+        30, environ_name="ROOM_CACHE_UNREGISTERED_TTL", environ_prefix=None
+    )
+    # Only used with a Redis cache, shared by all processes
+    ROOM_UNREGISTERED_FAST_PATH = values.BooleanValue(
+        False, environ_name="ROOM_UNREGISTERED_FAST_PATH", environ_prefix=None
+    )
+    ROOM_SLUGS_FILTER_MIN_CAPACITY = values.PositiveIntegerValue(
+        10000, environ_name="ROOM_SLUGS_FILTER_MIN_CAPACITY", environ_prefix=None
+    )
+    ROOM_SLUGS_FILTER_REBUILD_INTERVAL = values.PositiveIntegerValue(
+        60, environ_name="ROOM_SLUGS_FILTER_REBUILD_INTERVAL", environ_prefix=None
+    )
+    ROOM_SLUGS_FILTER_MAX_AGE = values.PositiveIntegerValue(
+        3600, environ_name="ROOM_SLUGS_FILTER_MAX_AGE", environ_prefix=None
+    )
 
     # Recording settings
     RECORDING_ENABLE = values.BooleanValue(
@@ -428,6 +450,8 @@ class Base(Configuration):
     RECORDING_VERIFY_SSL = values.BooleanValue(
         True, environ_name="RECORDING_VERIFY_SSL", environ_prefix=None
     )
+    # The AudioTracksEgressService records tracks published during a recording from
+    # LiveKit webhooks, which RECORDING_LIVEKIT_EVENT_ENABLE must then enable
     RECORDING_WORKER_CLASSES = values.DictValue(
         {
             "screen_recording": "core.recording.worker.services.VideoCompositeEgressService",
@@ -436,6 +460,39 @@ class Base(Configuration):
         environ_name="RECORDING_WORKER_CLASSES",
         environ_prefix=None,
     )
+    RECORDING_WORKER_TRANSPORT_CLASS = values.Value(
+        "core.recording.worker.transports.PooledSessionTransport",
+        environ_name="RECORDING_WORKER_TRANSPORT_CLASS",
+        environ_prefix=None,
+    )
+    RECORDING_WORKER_TRANSPORT_OPTIONS = values.DictValue(
+        {"pool_size": 10, "keepalive_timeout": 30, "request_timeout": 30},
+        environ_name="RECORDING_WORKER_TRANSPORT_OPTIONS",
+        environ_prefix=None,
+    )
+    # Seconds between logs of the latency of the LiveKit calls of a process, 0 for none
+    RECORDING_WORKER_METRICS_LOG_INTERVAL = values.PositiveIntegerValue(
+        300, environ_name="RECORDING_WORKER_METRICS_LOG_INTERVAL", environ_prefix=None
+    )
+    RECORDING_WORKER_MAX_RETRIES = values.PositiveIntegerValue(
+        3, environ_name="RECORDING_WORKER_MAX_RETRIES", environ_prefix=None
+    )
+    RECORDING_WORKER_RETRY_BACKOFF = values.PositiveIntegerValue(
+        2, environ_name="RECORDING_WORKER_RETRY_BACKOFF", environ_prefix=None
+    )
+    RECORDING_WORKER_RETRY_BACKOFF_MAX = values.PositiveIntegerValue(
+        60, environ_name="RECORDING_WORKER_RETRY_BACKOFF_MAX", environ_prefix=None
+    )
+    RECORDING_WORKER_LOCK_TIMEOUT = values.PositiveIntegerValue(
+        120, environ_name="RECORDING_WORKER_LOCK_TIMEOUT", environ_prefix=None
+    )
+    # Periodic reconciliation of recordings, scheduled by the celery beat
+    RECORDING_RECONCILIATION_INTERVAL = values.PositiveIntegerValue(
+        300, environ_name="RECORDING_RECONCILIATION_INTERVAL", environ_prefix=None
+    )
+    RECORDING_RECONCILIATION_GRACE_PERIOD = values.PositiveIntegerValue(
+        600, environ_name="RECORDING_RECONCILIATION_GRACE_PERIOD", environ_prefix=None
+    )
     RECORDING_EVENT_PARSER_CLASS = values.Value(
         "core.recording.event.parsers.MinioParser",
         environ_name="RECORDING_EVENT_PARSER_CLASS",
@@ -450,6 +507,9 @@ class Base(Configuration):
     RECORDING_STORAGE_EVENT_TOKEN = values.Value(
         None, environ_name="RECORDING_STORAGE_EVENT_TOKEN", environ_prefix=None
     )
+    RECORDING_LIVEKIT_EVENT_ENABLE = values.BooleanValue(
+        False, environ_name="RECORDING_LIVEKIT_EVENT_ENABLE", environ_prefix=None
+    )
     SUMMARY_SERVICE_ENDPOINT = values.Value(
         None, environ_name="SUMMARY_SERVICE_ENDPOINT", environ_prefix=None
     )
@@ -184,6 +184,24 @@ Requires top level scope
 {{ include "meet.fullname" . }}-celery
 {{- end }}
 
+{{/*
+Full name for the backend Celery
+
+Requires top level scope
+*/}}
+{{- define "meet.backendCelery.fullname" -}}
+{{ include "meet.fullname" . }}-backend-celery
+{{- end }}
+
+{{/*
+Full name for the backend Celery beat
+
+Requires top level scope
+*/}}
+{{- define "meet.backendCeleryBeat.fullname" -}}
+{{ include "meet.fullname" . }}-backend-celery-beat
+{{- end }}
+
 {{/*
 Usage : {{ include "meet.secret.dockerconfigjson.name" (dict "fullname" (include "meet.fullname" .) "imageCredentials" .Values.path.to.the.image1) }}
 */}}
@@ -0,0 +1 @@
+"""Benchmarks of the summary service, kept apart from its runtime package."""
@@ -0,0 +1,127 @@
+"""Benchmark the audio handoff from object storage to the ASR client.
+
+A synthetic Ogg Opus recording of any size is generated on the fly, read in
+ranges as from object storage, and split in chunks which are read through as
+the ASR client uploads them. The report shows throughput, peak memory and the
+chunks spilled to disk, for the chunked handoff and for the former handoff
+through a temporary file holding the whole recording:
+
+    python -m benchmarks.audio --size 4096
+    python -m benchmarks.audio --size 4096 --mode tempfile
+"""
+
+import argparse
+import json
+import resource
+import tempfile
+import time
+
+from summary.core.audio import OGG_HEADER, iter_pages, split_in_chunks
+
+# Upload requests read files in blocks of this size
+UPLOAD_BLOCK_SIZE = 64 * 1024
+
+MEGABYTE = 1024 * 1024
+
+
+def build_page(granule_position: int, body: bytes) -> bytes:
+    """Build an Ogg page, without checksum, holding a single packet."""
+    segments = [255] * (len(body) // 255) + [len(body) % 255]
+    return (
+        OGG_HEADER.pack(b"OggS", 0, 0, granule_position, 1, 0, 0, len(segments))
+        + bytes(segments)
+        + body
+    )
+
+
+def generate_recording(size: int, bitrate: int, range_size: int):
+    """Generate a synthetic Ogg Opus recording, in ranges as read from storage."""
+    header = build_page(0, b"OpusHead" + bytes(11)) + build_page(0, b"OpusTags")
+    # One page per second of audio, in as many bytes as the bitrate yields
+    body = bytes(bitrate // 8)
+    buffer, produced, second = bytearray(header), len(header), 0
+
+    while produced < size:
+        second += 1
+        page = build_page(second * 48000, body)
+        buffer += page
+        produced += len(page)
+        while len(buffer) >= range_size:
+            yield bytes(buffer[:range_size])
+            del buffer[:range_size]
+
+    if buffer:
+        yield bytes(buffer)
+
+
+def upload(file) -> int:
+    """Read a file through, as an upload request does, returning its size."""
+    size = 0
+    while block := file.read(UPLOAD_BLOCK_SIZE):
+        size += len(block)
+    return size
+
+
+def run_chunked(ranges, args) -> dict:
+    """Split the recording in chunks, uploaded as soon as they are complete."""
+    stats = {"chunks": 0, "spilled_chunks": 0, "uploaded": 0}
+    chunks = split_in_chunks(
+        iter_pages(ranges),
+        duration=args.chunk_duration,
+        overlap=args.chunk_overlap,
+        spool_size=args.spool_size * MEGABYTE,
+    )
+    for chunk in chunks:
+        stats["chunks"] += 1
+        stats["spilled_chunks"] += int(chunk.data._rolled)
+        stats["uploaded"] += upload(chunk.data)
+        chunk.close()
+    return stats
+
+
+def run_tempfile(ranges, _args) -> dict:
+    """Write the recording to a temporary file, then upload it whole."""
+    with tempfile.NamedTemporaryFile(suffix=".ogg") as file:
+        file.writelines(ranges)
+        file.flush()
+        file.seek(0)
+        return {"chunks": 1, "spilled_chunks": 1, "uploaded": upload(file)}
+
+
+def main():
+    """Run the benchmark and print its report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1024, help="In megabytes.")
+    parser.add_argument("--bitrate", type=int, default=64000, help="In bits/s.")
+    parser.add_argument("--range-size", type=int, default=1, help="In megabytes.")
+    parser.add_argument("--chunk-duration", type=float, default=600)
+    parser.add_argument("--chunk-overlap", type=float, default=10)
+    parser.add_argument("--spool-size", type=int, default=32, help="In megabytes.")
+    parser.add_argument("--mode", choices=("chunked", "tempfile"), default="chunked")
+    args = parser.parse_args()
+
+    ranges = generate_recording(
+        args.size * MEGABYTE, args.bitrate, args.range_size * MEGABYTE
+    )
+    run = run_chunked if args.mode == "chunked" else run_tempfile
+
+    start = time.perf_counter()
+    stats = run(ranges, args)
+    duration = time.perf_counter() - start
+
+    report = {
+        "mode": args.mode,
+        "size_mb": args.size,
+        **stats,
+        "duration": round(duration, 2),
+        "throughput_mb_s": round(args.size / duration, 1),
+        # Kilobytes on Linux
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+    print(json.dumps(report, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
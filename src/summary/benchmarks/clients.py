@@ -0,0 +1,86 @@
+"""Measure the setup latency and requests of the clients of tasks, for comparison.
+
+Each iteration gets the clients as a task does, shared by the process or
+created for it, and sends a request to both Minio and the OpenAI-compliant API
+set up in the environment of the summary service:
+
+    python -m benchmarks.clients --iterations 10
+    python -m benchmarks.clients --iterations 10 --no-shared
+
+The report shows the average latencies, and the connections and requests the
+clients sent.
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+
+from summary.core.clients import (
+    create_minio_client,
+    create_openai_client,
+    get_minio_client,
+    get_minio_stats,
+    get_openai_client,
+    openai_request_count,
+)
+from summary.core.config import get_settings
+
+
+def run(iterations: int, shared: bool) -> dict:
+    """Get the clients and send requests with them, for a number of iterations."""
+    settings = get_settings()
+    minio_stats = Counter()
+    requests_before = openai_request_count["requests"]
+    setup_latency = request_latency = 0.0
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        if shared:
+            minio_client, openai_client = get_minio_client(), get_openai_client()
+        else:
+            minio_client = create_minio_client(settings)
+            openai_client = create_openai_client(settings)
+        ready = time.perf_counter()
+
+        minio_client.bucket_exists(settings.aws_storage_bucket_name)
+        openai_client.models.list()
+        request_latency += time.perf_counter() - ready
+        setup_latency += ready - start
+
+        if not shared:
+            minio_stats += get_minio_stats(minio_client)
+            openai_client.close()
+
+    if shared:
+        minio_stats = get_minio_stats(minio_client)
+
+    return {
+        "shared": shared,
+        "iterations": iterations,
+        "setup_latency_ms": round(setup_latency / iterations * 1000, 2),
+        "request_latency_ms": round(request_latency / iterations * 1000, 2),
+        "minio_connections": minio_stats["connections"],
+        "minio_requests": minio_stats["requests"],
+        "openai_requests": openai_request_count["requests"] - requests_before,
+    }
+
+
+def main():
+    """Run the benchmark and print its report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument(
+        "--shared",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Share the clients of the process, or create them for each iteration.",
+    )
+    args = parser.parse_args()
+
+    report = run(args.iterations, args.shared)
+    print(json.dumps(report, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
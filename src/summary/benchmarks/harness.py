@@ -0,0 +1,109 @@
+"""Drive concurrent workers against an OpenAI-compliant API, to tune rate limits.
+
+Each simulated worker process sends chat completions through its own client, as
+the Celery workers do, with or without the shared Redis rate limiter:
+
+    python -m benchmarks.harness --processes 8 --requests 20
+    python -m benchmarks.harness --processes 8 --requests 20 --no-limiter
+
+The report shows throughput and, from the simulated upstream statistics, how
+many requests were rejected.
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import httpx
+import openai
+import redis
+
+from summary.core.clients import create_openai_client, create_rate_limiter
+
+
+def run_worker(options, index: int) -> dict:
+    """Send requests from a simulated worker process, and count their outcome."""
+    settings = SimpleNamespace(**options)
+    rate_limiter = (
+        create_rate_limiter(settings, redis.Redis.from_url(settings.redis_url))
+        if settings.limiter
+        else None
+    )
+    client = create_openai_client(settings, rate_limiter).with_options(
+        max_retries=settings.max_retries
+    )
+
+    stats = {"succeeded": 0, "failed": 0}
+
+    for request in range(settings.requests):
+        try:
+            client.chat.completions.create(
+                model=settings.openai_llm_model,
+                messages=[{"role": "user", "content": f"Worker {index}, #{request}"}],
+                max_tokens=settings.max_tokens,
+            )
+            stats["succeeded"] += 1
+        except openai.APIError:
+            stats["failed"] += 1
+
+    client.close()
+    return stats
+
+
+def main():
+    """Run the harness and print its report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000/v1")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--requests-per-minute", type=int, default=60)
+    parser.add_argument("--tokens-per-minute", type=int, default=30000)
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--no-limiter", dest="limiter", action="store_false")
+    args = parser.parse_args()
+
+    options = {
+        "limiter": args.limiter,
+        "redis_url": args.redis_url,
+        "requests": args.requests,
+        "max_tokens": args.max_tokens,
+        "max_retries": args.max_retries,
+        "openai_api_key": "simulation",
+        "openai_base_url": args.base_url,
+        "openai_llm_model": "simulation",
+        "openai_llm_requests_per_minute": args.requests_per_minute,
+        "openai_llm_tokens_per_minute": args.tokens_per_minute,
+        "openai_asr_requests_per_minute": 0,
+        "openai_rate_limit_max_wait": 120,
+        "http_pool_maxsize": 10,
+        "http_keepalive_expiry": 60,
+        "http_connect_timeout": 10,
+    }
+
+    stats_url = args.base_url.removesuffix("/v1") + "/stats"
+    rejected_before = httpx.get(stats_url).json()["chat"]["rejected"]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.processes) as executor:
+        results = list(
+            executor.map(run_worker, [options] * args.processes, range(args.processes))
+        )
+    duration = time.perf_counter() - start
+
+    report = {
+        key: sum(result[key] for result in results) for key in ("succeeded", "failed")
+    }
+    report["rate_limited"] = (
+        httpx.get(stats_url).json()["chat"]["rejected"] - rejected_before
+    )
+    report["duration"] = round(duration, 2)
+    report["requests_per_minute"] = round(report["succeeded"] / duration * 60, 1)
+    print(json.dumps(report, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""Benchmark the summary pipeline end to end, under load, at N worker processes.
+
+Jobs are submitted with `process_audio_transcribe_summarize` on a synthetic
+recording of any duration, and run by a Celery worker started for the benchmark.
+Minio, the OpenAI-compliant API and the webhook receiver are simulated in
+process, so that only Redis needs to run:
+
+    python -m benchmarks.pipeline --workers 4 --jobs 20 --duration 3600
+    python -m benchmarks.pipeline --workers 8 --jobs 20 --latency 1
+
+The report shows, from the pipelines progress, the duration of each stage, the
+tasks completed per minute, the peak memory of worker processes and the peak
+size of the temporary files they hold open. Synthetic audio is silence without
+actual Opus frames, so pre-processing must stay disabled.
+"""
+
+import argparse
+import json
+import math
+import os
+import resource
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from statistics import mean
+
+from benchmarks import storage, webhook
+from benchmarks.audio import MEGABYTE, generate_recording
+from summary.core.progress import get_progress_key, is_finished, parse_progress
+from summary.core.scheduling import LONG, SHORT
+
+BUCKET_NAME = "benchmark"
+RECORDING_NAME = "recordings/benchmark.ogg"
+
+# Seconds between samples of the pipelines progress and temporary files
+SAMPLE_INTERVAL = 0.5
+
+
+def get_free_port(host: str) -> int:
+    """Return a port free to listen on."""
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def serve_upstream(host: str, args) -> str:
+    """Start the simulated OpenAI-compliant API in a thread, returning its URL."""
+    # Limits and latencies of the simulated API are read when it is imported
+    os.environ["SIMULATION_REQUESTS_PER_MINUTE"] = str(args.requests_per_minute)
+    os.environ["SIMULATION_TOKENS_PER_MINUTE"] = str(args.tokens_per_minute)
+    os.environ["SIMULATION_LATENCY"] = str(args.latency)
+
+    import uvicorn
+
+    from benchmarks.upstream import app
+
+    port = get_free_port(host)
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=host, port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://{host}:{port}/v1"
+
+
+def get_environment(args, storage_url: str, upstream_url: str, webhook_url: str):
+    """Return the settings of the worker and of the benchmark, as variables."""
+    return {
+        "APP_API_TOKEN": "benchmark",
+        "CELERY_BROKER_URL": args.redis_url,
+        "CELERY_RESULT_BACKEND": args.redis_url,
+        "REDIS_URL": args.redis_url,
+        "AWS_STORAGE_BUCKET_NAME": BUCKET_NAME,
+        "AWS_S3_ENDPOINT_URL": storage_url,
+        "AWS_S3_ACCESS_KEY_ID": "benchmark",
+        "AWS_S3_SECRET_ACCESS_KEY": "benchmark",
+        "AWS_S3_SECURE_ACCESS": "false",
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": upstream_url,
+        "WEBHOOK_API_TOKEN": "benchmark",
+        "WEBHOOK_URL": webhook_url,
+        # Every job transcribes the same recording, which must not be cached
+        "CACHE_ENABLED": "false",
+        "PREPROCESSING_ENABLED": "false",
+        "TRANSCRIPTION_CHUNK_SPOOL_SIZE": str(args.spool_size * MEGABYTE),
+    }
+
+
+def start_worker(settings, workers: int) -> subprocess.Popen:
+    """Start a Celery worker consuming all the queues of the pipeline."""
+    queues = [settings.celery_delivery_queue]
+    for queue in (
+        settings.celery_transcription_queue,
+        settings.celery_summarization_queue,
+    ):
+        queues += [f"{queue}-{SHORT}", f"{queue}-{LONG}"]
+
+    return subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            "-m",
+            "celery",
+            "--app",
+            "summary.core.celery_worker",
+            "worker",
+            "--concurrency",
+            str(workers),
+            "--queues",
+            ",".join(queues),
+            "--loglevel",
+            "WARNING",
+            "--without-gossip",
+            "--without-mingle",
+        ]
+    )
+
+
+def wait_worker(celery, worker: subprocess.Popen, timeout: float):
+    """Wait until the worker answers pings."""
+    deadline = time.monotonic() + timeout
+    while not celery.control.ping(timeout=1):
+        if worker.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("The Celery worker failed to start.")
+
+
+def stop_worker(worker: subprocess.Popen):
+    """Stop the worker after its tasks in progress, as a deployment does."""
+    worker.send_signal(signal.SIGTERM)
+    try:
+        worker.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        worker.kill()
+        worker.wait()
+
+
+def get_process_tree(pid: int):
+    """Return a process and its descendants, from the Linux proc filesystem."""
+    pids = [pid]
+    for parent in pids:
+        try:
+            children = Path(f"/proc/{parent}/task/{parent}/children").read_text()
+        except OSError:
+            continue
+        pids.extend(int(child) for child in children.split())
+    return pids
+
+
+def get_open_temp_size(pid: int, directory: str) -> int:
+    """Return the size of the files in a directory open by a process tree.
+
+    Spooled chunks spilled to disk are unnamed, and only found through the file
+    descriptors of the processes holding them.
+    """
+    size = 0
+    for process in get_process_tree(pid):
+        try:
+            descriptors = os.listdir(f"/proc/{process}/fd")
+        except OSError:
+            continue
+        for descriptor in descriptors:
+            path = f"/proc/{process}/fd/{descriptor}"
+            try:
+                if os.readlink(path).startswith(directory):
+                    size += os.stat(path).st_size
+            except OSError:
+                continue
+    return size
+
+
+def get_stage_durations(progresses: dict, submitted: dict) -> dict:
+    """Return the durations of each stage, and of whole jobs, across pipelines."""
+    durations = {}
+    for pipeline_id, progress in progresses.items():
+        stages = progress["stages"]
+        for name, stage in stages.items():
+            if "started_at" in stage and "ended_at" in stage:
+                durations.setdefault(name, []).append(
+                    stage["ended_at"] - stage["started_at"]
+                )
+        # Jobs wait in queues before their first stage starts
+        if "started_at" in stages["download"]:
+            durations.setdefault("queued", []).append(
+                stages["download"]["started_at"] - submitted[pipeline_id]
+            )
+        if "ended_at" in stages["delivery"]:
+            durations.setdefault("total", []).append(
+                stages["delivery"]["ended_at"] - submitted[pipeline_id]
+            )
+
+    return {name: summarize_durations(values) for name, values in durations.items()}
+
+
+def summarize_durations(values) -> dict:
+    """Return the mean, median, 95th percentile and maximum of durations."""
+    values = sorted(values)
+
+    def percentile(rank):
+        return values[max(math.ceil(rank * len(values)) - 1, 0)]
+
+    return {
+        "mean": round(mean(values), 3),
+        "p50": round(percentile(0.5), 3),
+        "p95": round(percentile(0.95), 3),
+        "max": round(values[-1], 3),
+    }
+
+
+def run(args, size: int, worker: subprocess.Popen, scratch: str):
+    """Submit the jobs, and sample their progress until they all finished."""
+    from summary.core.celery_worker import (
+        get_redis_client,
+        process_audio_transcribe_summarize,
+    )
+
+    redis_client = get_redis_client()
+    run_id = uuid.uuid4().hex[:8]
+    submitted, progresses = {}, {}
+    peak_temp_size = 0
+
+    start = time.perf_counter()
+    for index in range(args.jobs):
+        # Jobs of distinct users, for them not to be deprioritized
+        result = process_audio_transcribe_summarize(
+            RECORDING_NAME,
+            f"benchmark-{index}@example.com",
+            f"benchmark-{run_id}-{index}",
+            size=size,
+        )
+        submitted[result.id] = time.time()
+
+    deadline = time.monotonic() + args.timeout
+    while len(progresses) < args.jobs and time.monotonic() < deadline:
+        if worker.poll() is not None:
+            raise RuntimeError("The Celery worker exited during the benchmark.")
+        peak_temp_size = max(peak_temp_size, get_open_temp_size(worker.pid, scratch))
+
+        for pipeline_id in submitted.keys() - progresses.keys():
+            progress = parse_progress(
+                redis_client.hgetall(get_progress_key(pipeline_id))
+            )
+            if is_finished(progress):
+                progresses[pipeline_id] = progress
+        time.sleep(SAMPLE_INTERVAL)
+    duration = time.perf_counter() - start
+
+    succeeded = sum(
+        progress["stages"]["delivery"]["status"] == "done"
+        for progress in progresses.values()
+    )
+    return {
+        "succeeded": succeeded,
+        "failed": len(progresses) - succeeded,
+        "timed_out": args.jobs - len(progresses),
+        "duration": round(duration, 2),
+        "tasks_per_minute": round(succeeded / duration * 60, 1),
+        "stages": get_stage_durations(progresses, submitted),
+        "peak_temp_disk_mb": round(peak_temp_size / MEGABYTE, 1),
+    }
+
+
+def main():
+    """Run the benchmark and print its report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--jobs", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=3600, help="In seconds.")
+    parser.add_argument("--bitrate", type=int, default=64000, help="In bits/s.")
+    parser.add_argument("--spool-size", type=int, default=32, help="In megabytes.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Of the API.")
+    parser.add_argument("--webhook-latency", type=float, default=0.05)
+    parser.add_argument("--requests-per-minute", type=int, default=100_000)
+    parser.add_argument("--tokens-per-minute", type=int, default=100_000_000)
+    parser.add_argument("--timeout", type=float, default=30 * 60)
+    args = parser.parse_args()
+
+    storage_server = storage.serve(args.host)
+    webhook_server = webhook.serve(args.host, latency=args.webhook_latency)
+    upstream_url = serve_upstream(args.host, args)
+
+    recording = b"".join(
+        generate_recording(
+            int(args.duration * args.bitrate / 8), args.bitrate, MEGABYTE
+        )
+    )
+    storage_server.store.put(RECORDING_NAME, recording)
+
+    # Temporary files of the worker are written apart, to be measured
+    scratch = tempfile.mkdtemp(prefix="summary-benchmark-")
+    environment = {
+        **get_environment(
+            args,
+            "{}:{}".format(*storage_server.server_address),
+            upstream_url,
+            "http://{}:{}/webhook".format(*webhook_server.server_address),
+        ),
+        "TMPDIR": scratch,
+    }
+    # Settings of the worker, and of the pipeline module once imported
+    os.environ.update(environment)
+    from benchmarks.upstream import windows
+    from summary.core.celery_worker import celery, settings
+
+    worker = start_worker(settings, args.workers)
+    try:
+        wait_worker(celery, worker, timeout=60)
+        report = run(args, len(recording), worker, scratch)
+    finally:
+        stop_worker(worker)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "workers": args.workers,
+        "jobs": args.jobs,
+        "audio_duration": args.duration,
+        "size_mb": round(len(recording) / MEGABYTE, 1),
+        **report,
+        "deliveries": len(webhook_server.deliveries),
+        # Kilobytes on Linux, of the largest worker process once they exited
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1
+        ),
+        "storage": storage_server.store.stats,
+        "upstream": {kind: window.stats for kind, window in windows.items()},
+    }
+    print(json.dumps(report, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Simulated S3-compatible object storage, holding objects in memory.
+
+It answers the requests the Minio client sends for the summary pipeline: bucket
+location and existence, object stat, ranged reads, single-part writes, listing
+and batch deletion. Requests are not authenticated, and a single bucket holds
+all objects whatever its name.
+"""
+
+import hashlib
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+
+S3_NAMESPACE = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+class ObjectStore:
+    """Objects of the simulated storage, with their ETag and modification date."""
+
+    def __init__(self):
+        """Initialize an empty store."""
+        self.objects = {}
+        self.lock = threading.Lock()
+        self.stats = {"reads": 0, "writes": 0, "deletes": 0, "bytes_read": 0}
+
+    def put(self, name: str, data: bytes) -> str:
+        """Store an object, replacing it if it exists, and return its ETag."""
+        etag = hashlib.md5(data, usedforsecurity=False).hexdigest()
+        with self.lock:
+            self.objects[name] = (data, etag, formatdate(usegmt=True))
+            self.stats["writes"] += 1
+        return etag
+
+    def get(self, name: str):
+        """Return the data, ETag and modification date of an object, or None."""
+        with self.lock:
+            return self.objects.get(name)
+
+    def list(self, prefix: str):
+        """Return the names of the objects starting with a prefix, sorted."""
+        with self.lock:
+            return sorted(name for name in self.objects if name.startswith(prefix))
+
+    def delete(self, name: str):
+        """Delete an object, if it exists."""
+        with self.lock:
+            if self.objects.pop(name, None) is not None:
+                self.stats["deletes"] += 1
+
+
+def _xml(element: str, body: str) -> bytes:
+    """Return an XML document of the S3 namespace."""
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>'
+        f'<{element} xmlns="{S3_NAMESPACE}">{body}</{element}>'
+    ).encode()
+
+
+class StorageHandler(BaseHTTPRequestHandler):
+    """Answer S3 requests from the store of the server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        """Silence the request logs."""
+
+    @property
+    def store(self) -> ObjectStore:
+        """Return the store of the server."""
+        return self.server.store
+
+    def _parse(self):
+        """Return the object name, empty for bucket requests, and query of a request."""
+        url = urlsplit(self.path)
+        _bucket, _, name = unquote(url.path).lstrip("/").partition("/")
+        return name, parse_qs(url.query, keep_blank_values=True)
+
+    def _respond(self, status: int, body: bytes = b"", headers=None, length=None):
+        """Send a response, with its length for connections to be kept alive.
+
+        HEAD responses have no body, but the `length` of the object they stat.
+        """
+        self.send_response(status)
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.send_header("Content-Length", str(len(body) if length is None else length))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self, name: str):
+        """Answer a request on a missing object."""
+        self._respond(
+            404,
+            f"<Error><Code>NoSuchKey</Code><Key>{escape(name)}</Key></Error>".encode(),
+            {"Content-Type": "application/xml"},
+        )
+
+    def _read_body(self) -> bytes:
+        """Read the body of a request."""
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_HEAD(self):
+        """Answer bucket existence and object stat requests."""
+        name, _query = self._parse()
+        if not name:
+            self._respond(200)
+            return
+
+        obj = self.store.get(name)
+        if obj is None:
+            self._respond(404)
+            return
+        data, etag, modified = obj
+        self._respond(
+            200,
+            headers={
+                "ETag": f'"{etag}"',
+                "Last-Modified": modified,
+                "Content-Type": "application/octet-stream",
+            },
+            length=len(data),
+        )
+
+    def do_GET(self):
+        """Answer bucket location, listing and ranged object reads."""
+        name, query = self._parse()
+        if not name and "location" in query:
+            self._respond(200, _xml("LocationConstraint", "us-east-1"))
+            return
+        if not name:
+            self._list(query.get("prefix", [""])[0])
+            return
+
+        obj = self.store.get(name)
+        if obj is None:
+            self._not_found(name)
+            return
+        data, etag, modified = obj
+        headers = {"ETag": f'"{etag}"', "Last-Modified": modified}
+
+        status, body = 200, data
+        if byte_range := self.headers.get("Range"):
+            start, _, end = byte_range.removeprefix("bytes=").partition("-")
+            end = min(int(end) if end else len(data) - 1, len(data) - 1)
+            status, body = 206, data[int(start) : end + 1]
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+
+        with self.store.lock:
+            self.store.stats["reads"] += 1
+            self.store.stats["bytes_read"] += len(body)
+        self._respond(status, body, headers)
+
+    def _list(self, prefix: str):
+        """Answer a listing of the objects starting with a prefix, in one page."""
+        contents = []
+        for name in self.store.list(prefix):
+            obj = self.store.get(name)
+            if obj is None:
+                continue
+            data, etag, _modified = obj
+            contents.append(
+                f"<Contents><Key>{escape(name)}</Key>"
+                f"<LastModified>2025-01-01T00:00:00.000Z</LastModified>"
+                f"<ETag>&quot;{etag}&quot;</ETag><Size>{len(data)}</Size>"
+                f"<StorageClass>STANDARD</StorageClass></Contents>"
+            )
+        self._respond(
+            200,
+            _xml(
+                "ListBucketResult",
+                f"<Name>bucket</Name><Prefix>{escape(prefix)}</Prefix>"
+                f"<KeyCount>{len(contents)}</KeyCount>"
+                f"<IsTruncated>false</IsTruncated>{''.join(contents)}",
+            ),
+            {"Content-Type": "application/xml"},
+        )
+
+    def do_PUT(self):
+        """Store an object written in a single part."""
+        name, _query = self._parse()
+        body = self._read_body()
+        if not name:
+            self._respond(200)
+            return
+        etag = self.store.put(name, body)
+        self._respond(200, headers={"ETag": f'"{etag}"'})
+
+    def do_POST(self):
+        """Delete a batch of objects."""
+        _name, query = self._parse()
+        body = self._read_body()
+        if "delete" not in query:
+            self._respond(501)
+            return
+
+        deleted = []
+        # Keys are namespaced or not, depending on the client, which is trusted
+        root = ET.fromstring(body)  # noqa: S314
+        keys = [element.text for element in root.iter() if element.tag.endswith("Key")]
+        for key in keys:
+            self.store.delete(key)
+            deleted.append(f"<Deleted><Key>{escape(key)}</Key></Deleted>")
+        self._respond(
+            200,
+            _xml("DeleteResult", "".join(deleted)),
+            {"Content-Type": "application/xml"},
+        )
+
+
+def serve(host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the simulated storage in a background thread, and return its server."""
+    server = ThreadingHTTPServer((host, port), StorageHandler)
+    server.daemon_threads = True
+    server.store = ObjectStore()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,126 @@
+"""Simulated OpenAI-compliant API, enforcing rate limits like the real ones.
+
+Run it with `uvicorn benchmarks.upstream:app`, and point workers or the
+harness at it with `OPENAI_BASE_URL=http://localhost:8000/v1`. Limits and
+latencies are set with the `SIMULATION_*` environment variables.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+REQUESTS_PER_MINUTE = int(os.environ.get("SIMULATION_REQUESTS_PER_MINUTE", "60"))
+TOKENS_PER_MINUTE = int(os.environ.get("SIMULATION_TOKENS_PER_MINUTE", "30000"))
+LATENCY = float(os.environ.get("SIMULATION_LATENCY", "0.2"))
+COMPLETION_TOKENS = int(os.environ.get("SIMULATION_COMPLETION_TOKENS", "200"))
+
+WINDOW = 60
+
+
+class SlidingWindow:
+    """Requests and tokens consumed over the last minute."""
+
+    def __init__(self):
+        """Initialize an empty window."""
+        self.events = deque()
+        self.lock = threading.Lock()
+        self.stats = {"accepted": 0, "rejected": 0}
+
+    def consume(self, tokens: int):
+        """Consume a request, or return the headers of its rejection."""
+        now = time.monotonic()
+        with self.lock:
+            while self.events and self.events[0][0] <= now - WINDOW:
+                self.events.popleft()
+
+            used_tokens = sum(event[1] for event in self.events)
+            remaining_requests = REQUESTS_PER_MINUTE - len(self.events)
+            remaining_tokens = TOKENS_PER_MINUTE - used_tokens
+            reset = self.events[0][0] + WINDOW - now if self.events else 0
+
+            if remaining_requests < 1 or remaining_tokens < tokens:
+                self.stats["rejected"] += 1
+                return False, {"retry-after": f"{max(reset, 0.1):.3f}"}
+
+            self.events.append((now, tokens))
+            self.stats["accepted"] += 1
+            return True, {
+                "x-ratelimit-limit-requests": str(REQUESTS_PER_MINUTE),
+                "x-ratelimit-remaining-requests": str(remaining_requests - 1),
+                "x-ratelimit-reset-requests": f"{reset:.3f}s",
+                "x-ratelimit-limit-tokens": str(TOKENS_PER_MINUTE),
+                "x-ratelimit-remaining-tokens": str(remaining_tokens - tokens),
+                "x-ratelimit-reset-tokens": f"{reset:.3f}s",
+            }
+
+
+app = FastAPI(title="Simulated OpenAI-compliant API")
+windows = {"chat": SlidingWindow(), "audio": SlidingWindow()}
+
+
+def rejection(headers):
+    """Return a rate limit error, as the OpenAI API does."""
+    return JSONResponse(
+        {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+        status_code=429,
+        headers=headers,
+    )
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """Answer chat completions with a fixed text, after a simulated latency."""
+    body = await request.json()
+    prompt = "".join(str(message.get("content")) for message in body["messages"])
+    tokens = len(prompt) // 4 + COMPLETION_TOKENS
+
+    accepted, headers = windows["chat"].consume(tokens)
+    if not accepted:
+        return rejection(headers)
+
+    await asyncio.sleep(LATENCY)
+    return JSONResponse(
+        {
+            "id": "chatcmpl-simulated",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "word " * 50},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": tokens - COMPLETION_TOKENS,
+                "completion_tokens": COMPLETION_TOKENS,
+                "total_tokens": tokens,
+            },
+        },
+        headers=headers,
+    )
+
+
+@app.post("/v1/audio/transcriptions")
+async def audio_transcriptions(request: Request):
+    """Answer transcriptions with a fixed text, after a simulated latency."""
+    await request.body()
+
+    accepted, headers = windows["audio"].consume(0)
+    if not accepted:
+        return rejection(headers)
+
+    await asyncio.sleep(LATENCY)
+    return JSONResponse({"text": "simulated transcript"}, headers=headers)
+
+
+@app.get("/stats")
+async def stats():
+    """Return the number of accepted and rejected requests, by endpoint."""
+    return {kind: window.stats for kind, window in windows.items()}
@@ -0,0 +1,55 @@
+"""Simulated webhook receiver, recording the summaries delivered to it.
+
+Deliveries are acknowledged after a simulated latency, and recorded with their
+reception time, user and status, for the benchmark to tell when each pipeline
+delivered its summary.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Record the deliveries posted to the server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        """Silence the request logs."""
+
+    def do_POST(self):
+        """Record a delivery, then acknowledge it."""
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.latency)
+
+        with self.server.lock:
+            self.server.deliveries.append(
+                {
+                    "received_at": time.time(),
+                    "sub": payload.get("sub"),
+                    "status": payload.get("status", "complete"),
+                    "size": len(payload.get("content", "")),
+                }
+            )
+
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(
+    host: str = "127.0.0.1", port: int = 0, latency: float = 0
+) -> ThreadingHTTPServer:
+    """Start the simulated receiver in a background thread, and return its server."""
+    server = ThreadingHTTPServer((host, port), WebhookHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.deliveries = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -2,8 +2,9 @@
 
 from fastapi import APIRouter, Depends
 
-from summary.api.route import tasks
+from summary.api.route import tasks, webhooks
 from summary.core.security import verify_token
 
 api_router = APIRouter(dependencies=[Depends(verify_token)])
 api_router.include_router(tasks.router, tags=["tasks"])
+api_router.include_router(webhooks.router, tags=["webhooks"])
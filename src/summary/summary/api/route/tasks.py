@@ -1,10 +1,37 @@
 """API routes related to application tasks."""
 
+import asyncio
+import logging
+from typing import List, Optional
+from uuid import uuid4
+
+import urllib3
 from celery.result import AsyncResult
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from minio.error import S3Error
 from pydantic import BaseModel
 
 from summary.core.celery_worker import process_audio_transcribe_summarize
+from summary.core.clients import get_minio_client
+from summary.core.config import SettingsDeps
+from summary.core.dedup import (
+    RedisDeps,
+    acquire_task_lock,
+    get_task_lock_key,
+    release_task_lock_async,
+)
+from summary.core.progress import get_progress, stream_progress, wait_progress
+
+logger = logging.getLogger(__name__)
+
+
+class Track(BaseModel):
+    """Audio track of a participant, offset from the start of the recording."""
+
+    filename: str
+    speaker: str
+    offset: float = 0
 
 
 class TaskCreation(BaseModel):
@@ -13,22 +40,93 @@ class TaskCreation(BaseModel):
     filename: str
     email: str
     sub: str
+    tracks: Optional[List[Track]] = None
 
 
 router = APIRouter(prefix="/tasks")
 
 
+async def get_object_size(settings, filename: str) -> Optional[int]:
+    """Return the size of a recording, in bytes, or None if it is unknown."""
+    try:
+        stat = await asyncio.to_thread(
+            get_minio_client().stat_object, settings.aws_storage_bucket_name, filename
+        )
+    except (S3Error, urllib3.exceptions.HTTPError) as e:
+        logger.warning("Failed to get the size of %s: %s", filename, e)
+        return None
+    return stat.size
+
+
 @router.post("/")
-async def create_task(request: TaskCreation):
-    """Create a task."""
-    task = process_audio_transcribe_summarize.delay(
-        request.filename, request.email, request.sub
+async def create_task(
+    request: TaskCreation, settings: SettingsDeps, redis_client: RedisDeps
+):
+    """Create a task, unless one is already running for the same file and user."""
+    lock_key = get_task_lock_key(request.filename, request.sub)
+    task_id = str(uuid4())
+
+    running_task_id = await acquire_task_lock(
+        redis_client, lock_key, task_id, settings.task_dedup_ttl
     )
-    return {"id": task.id, "message": "Task created"}
+    if running_task_id is not None:
+        return {"id": running_task_id, "message": "Task already exists"}
+
+    try:
+        size = await get_object_size(settings, request.filename)
+        # Enqueueing blocks on the broker and on Redis, off the event loop
+        await asyncio.to_thread(
+            process_audio_transcribe_summarize,
+            request.filename,
+            request.email,
+            request.sub,
+            task_id=task_id,
+            size=size,
+            tracks=[track.model_dump() for track in request.tracks or []],
+        )
+    except Exception:
+        await release_task_lock_async(redis_client, lock_key, task_id)
+        raise
+
+    return {"id": task_id, "message": "Task created"}
 
 
 @router.get("/{task_id}")
-async def get_task_status(task_id: str):
-    """Check task status by ID."""
+async def get_task_status(
+    task_id: str,
+    settings: SettingsDeps,
+    redis_client: RedisDeps,
+    wait: float = Query(0, ge=0),
+    version: Optional[int] = None,
+):
+    """Check task status and progress by ID.
+
+    With `wait`, respond once the progress version exceeds `version`, or after
+    `wait` seconds (capped) if it does not change.
+    """
+    if wait and version is not None:
+        progress = await wait_progress(
+            redis_client, task_id, version, min(wait, settings.progress_wait_max)
+        )
+    else:
+        progress = await get_progress(redis_client, task_id)
+
     task = AsyncResult(task_id)
-    return {"id": task_id, "status": task.status}
+    return {"id": task_id, "status": task.status, "progress": progress}
+
+
+@router.get("/{task_id}/events")
+async def stream_task_progress(
+    task_id: str, settings: SettingsDeps, redis_client: RedisDeps
+):
+    """Stream task progress by ID, as server-sent events."""
+    return StreamingResponse(
+        stream_progress(
+            redis_client,
+            task_id,
+            timeout=settings.progress_stream_timeout,
+            keepalive=settings.progress_stream_keepalive,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,14 @@
+"""API routes related to webhook deliveries."""
+
+from fastapi import APIRouter
+
+from summary.core.dedup import RedisDeps
+from summary.core.webhook import get_stats
+
+router = APIRouter(prefix="/webhooks")
+
+
+@router.get("/stats")
+async def get_delivery_stats(redis_client: RedisDeps):
+    """Return the delivery latency histograms of all workers, by host."""
+    return await get_stats(redis_client)
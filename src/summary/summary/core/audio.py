@@ -0,0 +1,248 @@
+"""Stream Ogg audio from object storage and split it into time chunks.
+
+Recordings are Ogg files. They are split on page boundaries without decoding
+the audio, using page granule positions to locate pages in time. Each chunk is
+a standalone Ogg file made of the stream header pages followed by the chunk
+audio pages.
+
+Chunks are written as pages are read, to buffers held in memory up to a size
+threshold, and spilled to disk above it, so that no recording is ever fully
+held in memory nor written to disk.
+"""
+
+import bisect
+import math
+import struct
+import tempfile
+from collections import deque
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+OGG_CAPTURE_PATTERN = b"OggS"
+OGG_HEADER = struct.Struct("<4sBBqIIIB")
+# Granule position of pages on which no packet ends
+OGG_NO_GRANULE = -1
+
+# Opus granule positions are always expressed at 48kHz
+OPUS_GRANULE_RATE = 48000
+
+
+@dataclass
+class OggPage:
+    """An Ogg page, the unit in which Ogg streams are split, with its raw bytes."""
+
+    granule_position: int
+    data: bytes
+
+    @property
+    def body(self) -> bytes:
+        """Return the page body, following the header and the segment table."""
+        return self.data[OGG_HEADER.size + self.data[OGG_HEADER.size - 1] :]
+
+
+@dataclass
+class TimestampMap:
+    """Map timestamps of trimmed audio back to the audio it was cut from.
+
+    Each span is a pair of the start of a kept stretch in the trimmed audio and
+    its start in the original audio, in seconds.
+    """
+
+    spans: List[Tuple[float, float]] = field(default_factory=list)
+
+    def to_original(self, timestamp: float) -> float:
+        """Return the original timestamp of a timestamp in the trimmed audio."""
+        if not self.spans:
+            return timestamp
+        position = max(bisect.bisect_right(self.spans, (timestamp, math.inf)) - 1, 0)
+        trimmed_start, original_start = self.spans[position]
+        return original_start + timestamp - trimmed_start
+
+
+@dataclass
+class AudioChunk:
+    """A standalone Ogg file covering a time range of a recording, in seconds.
+
+    The file is rewound once the chunk is complete, and must be closed by its
+    consumer. Chunks whose audio was trimmed have a map of their timestamps to
+    the recording's, relative to the chunk start.
+    """
+
+    index: int
+    start: float
+    end: float
+    data: BinaryIO = field(repr=False)
+    size: int = 0
+    timestamp_map: Optional[TimestampMap] = None
+
+    def write(self, page: OggPage, start: float, end: float):
+        """Append a page, covering a time range, to the chunk file."""
+        if not self.size:
+            self.start = start
+        self.data.write(page.data)
+        self.size += len(page.data)
+        self.end = end
+
+    def close(self):
+        """Close the chunk file, deleting it if it was spilled to disk."""
+        self.data.close()
+
+
+def read_object_ranges(
+    client,
+    bucket_name: str,
+    object_name: str,
+    range_size: int,
+    size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """Read an object from a Minio bucket, one byte range at a time.
+
+    The object is stat for its size, unless it is given.
+    """
+    if size is None:
+        size = client.stat_object(bucket_name, object_name).size
+
+    for offset in range(0, size, range_size):
+        response = client.get_object(
+            bucket_name,
+            object_name,
+            offset=offset,
+            length=min(range_size, size - offset),
+        )
+        try:
+            yield response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+
+def iter_pages(data: Iterable[bytes]) -> Iterator[OggPage]:
+    """Parse Ogg pages out of a stream of bytes, whatever the way it is sliced."""
+    buffer = bytearray()
+
+    for block in data:
+        buffer += block
+        offset = 0
+
+        while len(buffer) - offset >= OGG_HEADER.size:
+            header = OGG_HEADER.unpack_from(buffer, offset)
+            capture_pattern, granule_position, segments_count = (
+                header[0],
+                header[3],
+                header[7],
+            )
+
+            if capture_pattern != OGG_CAPTURE_PATTERN:
+                raise ValueError(f"Invalid Ogg page at offset {offset}.")
+
+            table_start = offset + OGG_HEADER.size
+            body_start = table_start + segments_count
+            if len(buffer) < body_start:
+                break
+
+            body_end = body_start + sum(buffer[table_start:body_start])
+            if len(buffer) < body_end:
+                break
+
+            yield OggPage(
+                granule_position=granule_position,
+                data=bytes(buffer[offset:body_end]),
+            )
+            offset = body_end
+
+        del buffer[:offset]
+
+    if buffer:
+        raise ValueError("Truncated Ogg stream.")
+
+
+def get_granule_rate(header_pages: List[OggPage]) -> int:
+    """Return the number of granules per second from the stream header pages."""
+    if not header_pages:
+        raise ValueError("Ogg stream has no header page.")
+
+    identification = header_pages[0].body
+
+    if identification.startswith(b"OpusHead"):
+        return OPUS_GRANULE_RATE
+
+    if identification.startswith(b"\x01vorbis"):
+        return struct.unpack_from("<I", identification, 12)[0]
+
+    raise ValueError("Unsupported Ogg codec, only Opus and Vorbis are supported.")
+
+
+def _open_chunk(index, header_pages, start, spool_size) -> AudioChunk:
+    """Open a chunk file, starting with the stream header pages.
+
+    Pages are copied as is: decoders locate audio in time with granule positions
+    and tolerate the gap in page sequence numbers after the headers.
+    """
+    data = tempfile.SpooledTemporaryFile(max_size=spool_size, suffix=".ogg")
+    for page in header_pages:
+        data.write(page.data)
+    return AudioChunk(index=index, start=start, end=start, data=data)
+
+
+def split_in_chunks(
+    pages: Iterable[OggPage], duration: float, overlap: float, spool_size: int
+) -> Iterator[AudioChunk]:
+    """Split an Ogg stream into overlapping chunks of about `duration` seconds.
+
+    Chunks are yielded as soon as their last page is read, so that they can be
+    processed while the rest of the stream is downloaded. Chunk files are kept
+    in memory up to `spool_size` bytes, and spilled to disk above it.
+    """
+    if not 0 <= overlap < duration:
+        raise ValueError("Chunk overlap must be positive and shorter than chunks.")
+
+    step = duration - overlap
+    header_pages = []
+    granule_rate = None
+    # Chunks being written, pages of overlaps being written to two of them
+    chunks = deque()
+    index = 0
+    previous_end = 0.0
+    emitted_until = 0.0
+
+    try:
+        for page in pages:
+            # Header pages come first, no audio sample ending on them
+            if granule_rate is None and page.granule_position == 0:
+                header_pages.append(page)
+                continue
+
+            if granule_rate is None:
+                granule_rate = get_granule_rate(header_pages)
+
+            end = (
+                previous_end
+                if page.granule_position == OGG_NO_GRANULE
+                else page.granule_position / granule_rate
+            )
+
+            # A chunk holds the pages ending after its start
+            while index * step < end:
+                chunks.append(
+                    _open_chunk(index, header_pages, index * step, spool_size)
+                )
+                index += 1
+
+            for chunk in chunks:
+                chunk.write(page, previous_end, end)
+            previous_end = end
+
+            while chunks and end - chunks[0].index * step >= duration:
+                chunk = chunks.popleft()
+                chunk.data.seek(0)
+                emitted_until = end
+                yield chunk
+
+        # The first unfinished chunk holds the remaining pages of the others
+        if chunks and chunks[0].size and chunks[0].end > emitted_until:
+            chunk = chunks.popleft()
+            chunk.data.seek(0)
+            yield chunk
+    finally:
+        for chunk in chunks:
+            chunk.close()
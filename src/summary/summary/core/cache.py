@@ -0,0 +1,69 @@
+"""Cache transcripts and summaries, keyed on their inputs' content.
+
+Entries expire after a TTL which is refreshed on each hit, so that unused
+entries are evicted first. The cache is best effort: Redis errors are logged
+and handled as cache misses.
+"""
+
+import hashlib
+from typing import Optional
+
+import redis
+from celery.utils.log import get_task_logger
+
+logger = get_task_logger(__name__)
+
+
+def get_content_key(*parts) -> str:
+    """Return a digest identifying the given parts, in order."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Redis cache of the results of the summary pipeline stages."""
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        ttl: int,
+        enabled: bool = True,
+        prefix: str = "summary:cache",
+    ):
+        """Initialize the cache with its Redis client and entries TTL, in seconds."""
+        self.client = client
+        self.ttl = ttl
+        self.enabled = enabled
+        self.prefix = prefix
+
+    def _get_name(self, kind: str, key: str) -> str:
+        return f"{self.prefix}:{kind}:{key}"
+
+    def get(self, kind: str, key: str) -> Optional[str]:
+        """Return a cached result, or None if it is not cached."""
+        if not self.enabled:
+            return None
+
+        try:
+            value = self.client.getex(self._get_name(kind, key), ex=self.ttl)
+        except redis.RedisError as e:
+            logger.warning("Failed to read %s from cache: %s", kind, e)
+            return None
+
+        logger.info("Cache %s for %s %s", "hit" if value else "miss", kind, key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, kind: str, key: str, value: str):
+        """Cache a result."""
+        if not self.enabled:
+            return
+
+        try:
+            self.client.set(
+                self._get_name(kind, key), value.encode("utf-8"), ex=self.ttl
+            )
+        except redis.RedisError as e:
+            logger.warning("Failed to write %s to cache: %s", kind, e)
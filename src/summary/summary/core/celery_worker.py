@@ -2,20 +2,57 @@
 
 import json
 import os
-import tempfile
-from pathlib import Path
+import uuid
+from typing import List, Optional
 
 import openai
 import sentry_sdk
-from celery import Celery, signals
+import urllib3
+from celery import Celery, chain, chord, signals
 from celery.utils.log import get_task_logger
-from minio import Minio
-from requests import Session
-from requests.adapters import HTTPAdapter
-from urllib3.util import Retry
+from minio.error import S3Error
+from requests import RequestException
 
+from summary.core.audio import iter_pages, read_object_ranges, split_in_chunks
+from summary.core.cache import get_content_key
+from summary.core.clients import (
+    close_clients,
+    get_cache,
+    get_minio_client,
+    get_openai_client,
+    get_redis_client,
+    get_transcription_engine,
+    get_webhook_client,
+    init_clients,
+)
 from summary.core.config import get_settings
-from summary.core.prompt import get_instructions
+from summary.core.dedup import get_task_lock_key, release_task_lock
+from summary.core.preprocessing import PreprocessingOptions, preprocess_chunks
+from summary.core.progress import ProgressTracker
+from summary.core.prompt import PROMPT_VERSION
+from summary.core.scheduling import (
+    MAX_PRIORITY,
+    SHORT,
+    Schedule,
+    add_user_job,
+    get_schedule,
+    remove_user_job,
+)
+from summary.core.storage import (
+    delete_objects,
+    get_intermediate_name,
+    load_text,
+    save_text,
+)
+from summary.core.summarization import Summarizer, get_completion_options
+from summary.core.transcription import (
+    ChunkTranscript,
+    merge_speaker_segments,
+    stitch_segments,
+    stitch_transcripts,
+    transcribe,
+)
+from summary.core.webhook import ThrottledDelivery, save_stats
 
 settings = get_settings()
 
@@ -28,6 +65,16 @@ celery = Celery(
     broker_connection_retry_on_startup=True,
 )
 
+# Messages of a queue are consumed by priority, one at a time, for priorities to
+# matter. Queues are consumed in turn, for a busy one not to starve the others.
+celery.conf.broker_transport_options = {
+    "priority_steps": list(range(MAX_PRIORITY + 1)),
+    "sep": ":",
+    "queue_order_strategy": "round_robin",
+}
+celery.conf.task_default_priority = 0
+celery.conf.worker_prefetch_multiplier = 1
+
 if settings.sentry_dsn and settings.sentry_is_enabled:
 
     @signals.celeryd_init.connect
@@ -36,95 +83,347 @@ if settings.sentry_dsn and settings.sentry_is_enabled:
         sentry_sdk.init(dsn=settings.sentry_dsn, enable_tracing=True)
 
 
-def save_audio_stream(audio_stream, chunk_size=32 * 1024):
-    """Save an audio stream to a temporary OGG file."""
-    with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp:
-        tmp.writelines(audio_stream.stream(chunk_size))
-        return Path(tmp.name)
+@signals.worker_process_init.connect
+def init_worker_process_clients(**_kwargs):
+    """Create the clients shared by the tasks of a worker process."""
+    init_clients()
+
+
+@signals.worker_process_shutdown.connect
+@signals.worker_shutdown.connect
+def close_worker_process_clients(**_kwargs):
+    """Close the clients of a worker process, or of a worker not forking processes."""
+    close_clients()
+
+
+# Statuses of the summaries delivered in streaming mode
+PARTIAL = "partial"
+COMPLETE = "complete"
+
+# Transient errors of the OpenAI-compliant API or of object storage
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    urllib3.exceptions.HTTPError,
+)
+
+
+def get_tracker(pipeline_id: str) -> ProgressTracker:
+    """Return the progress tracker of a pipeline."""
+    return ProgressTracker(get_redis_client(), pipeline_id, settings.progress_ttl)
 
 
-def create_retry_session():
-    """Create an HTTP session configured with retry logic."""
-    session = Session()
-    retries = Retry(
-        total=settings.webhook_max_retries,
-        backoff_factor=settings.webhook_backoff_factor,
-        status_forcelist=settings.webhook_status_forcelist,
-        allowed_methods={"POST"},
+def get_retryable_errors(task, errors):
+    """Return the errors a task is retried on, none on its last attempt."""
+    return errors if task.request.retries < task.max_retries else ()
+
+
+def get_preprocessing_options() -> Optional[PreprocessingOptions]:
+    """Return the options of the audio pre-processing, None if it is disabled."""
+    if not settings.preprocessing_enabled:
+        return None
+    return PreprocessingOptions(
+        sample_rate=settings.preprocessing_sample_rate,
+        bitrate=settings.preprocessing_bitrate,
+        silence_threshold=settings.preprocessing_silence_threshold,
+        min_silence_duration=settings.preprocessing_min_silence_duration,
+        padding=settings.preprocessing_padding,
+        spool_size=settings.transcription_chunk_spool_size,
     )
-    session.mount("https://", HTTPAdapter(max_retries=retries))
-    return session
 
 
-def post_with_retries(url, data):
-    """Send POST request with automatic retries."""
-    session = create_retry_session()
-    session.headers.update({"Authorization": f"Bearer {settings.webhook_api_token}"})
-    try:
-        response = session.post(url, json=data)
-        response.raise_for_status()
-        return response
-    finally:
-        session.close()
+def get_queue(queue: str, size: str) -> str:
+    """Return the queue of a stage for jobs of a given size."""
+    return f"{queue}-{size}"
 
 
-@celery.task(max_retries=settings.celery_max_retries)
-def process_audio_transcribe_summarize(filename: str, email: str, sub: str):
-    """Process an audio file by transcribing it and generating a summary.
+# Stages are routed to queues for short or long jobs, those of tasks sent without
+# a schedule defaulting to the short ones, which workers consume
+TRANSCRIPTION_QUEUE = get_queue(settings.celery_transcription_queue, SHORT)
+SUMMARIZATION_QUEUE = get_queue(settings.celery_summarization_queue, SHORT)
+
+
+def get_intermediate(pipeline_id: str, name: str) -> str:
+    """Return the object name of an intermediate result of a pipeline."""
+    return get_intermediate_name(settings.aws_s3_intermediate_prefix, pipeline_id, name)
 
-    This Celery task performs the following operations:
-    1. Retrieves the audio file from MinIO storage
-    2. Transcribes the audio using OpenAI-compliant API's ASR model
-    3. Generates a summary of the transcription using OpenAI-compliant API's LLM
-    4. Sends the results via webhook
+
+@celery.task(
+    queue=TRANSCRIPTION_QUEUE,
+    autoretry_for=RETRYABLE_ERRORS,
+    max_retries=settings.celery_max_retries,
+    retry_backoff=True,
+    bind=True,
+)
+def transcribe_audio(self, pipeline_id: str, filename: str):
+    """Stream an audio file from MinIO storage and transcribe it.
+
+    The audio is split in overlapping chunks, transcribed in parallel while the
+    rest of the file is downloaded. Return the object name of the transcript.
     """
     logger.info("Notification received")
     logger.debug("filename: %s", filename)
 
-    minio_client = Minio(
-        settings.aws_s3_endpoint_url,
-        access_key=settings.aws_s3_access_key_id,
-        secret_key=settings.aws_s3_secret_access_key,
-        secure=settings.aws_s3_secure_access,
+    minio_client = get_minio_client()
+    cache = get_cache()
+    tracker = get_tracker(pipeline_id)
+    retry_on = get_retryable_errors(self, RETRYABLE_ERRORS)
+
+    # Transcripts are identified by the audio content, through its ETag
+    with tracker.stage("download", retry_on=retry_on):
+        stat = minio_client.stat_object(settings.aws_storage_bucket_name, filename)
+    cache_key = get_transcript_cache_key(stat.etag, settings.transcription_timestamps)
+    transcription = cache.get("transcript", cache_key)
+    if transcription is None:
+        transcription = stitch_transcripts(
+            transcribe_recording(
+                minio_client, stat, tracker, retry_on, settings.transcription_timestamps
+            ),
+            settings.transcription_chunk_overlap,
+        )
+        logger.debug("Transcription: \n %s", transcription)
+        cache.set("transcript", cache_key, transcription)
+    else:
+        tracker.end("download")
+        tracker.end("transcription")
+
+    transcript_name = get_intermediate(pipeline_id, "transcript.txt")
+    save_text(
+        minio_client, settings.aws_storage_bucket_name, transcript_name, transcription
+    )
+    return transcript_name
+
+
+@celery.task(
+    queue=TRANSCRIPTION_QUEUE,
+    autoretry_for=RETRYABLE_ERRORS,
+    max_retries=settings.celery_max_retries,
+    retry_backoff=True,
+    bind=True,
+)
+def transcribe_track(self, pipeline_id: str, track: dict):
+    """Stream the audio track of a participant from MinIO storage and transcribe it.
+
+    The track holds the object name of its file, the name of its speaker and its
+    offset, in seconds, from the start of the recording. Return the object name
+    of the speaker's timed segments.
+    """
+    logger.debug("Track: %s", track)
+
+    minio_client = get_minio_client()
+    cache = get_cache()
+    tracker = get_tracker(pipeline_id)
+    retry_on = get_retryable_errors(self, RETRYABLE_ERRORS)
+
+    with tracker.stage("download", retry_on=retry_on):
+        stat = minio_client.stat_object(
+            settings.aws_storage_bucket_name, track["filename"]
+        )
+    # Segments are timed, for those of all speakers to be merged in order
+    cache_key = get_transcript_cache_key(stat.etag, True)
+    segments = cache.get("segments", cache_key)
+    if segments is None:
+        segments = json.dumps(
+            stitch_segments(
+                transcribe_recording(minio_client, stat, tracker, retry_on, True),
+                settings.transcription_chunk_overlap,
+            )
+        )
+        cache.set("segments", cache_key, segments)
+
+    segments_name = get_intermediate(
+        pipeline_id, f"tracks/{get_content_key(track['filename'])}.json"
+    )
+    save_text(
+        minio_client,
+        settings.aws_storage_bucket_name,
+        segments_name,
+        json.dumps({**track, "segments": json.loads(segments)}),
+    )
+    return segments_name
+
+
+@celery.task(queue=TRANSCRIPTION_QUEUE)
+def merge_tracks(segments_names: List[str], pipeline_id: str):
+    """Merge the timed segments of all speakers into a speaker-labelled transcript.
+
+    Return the object name of the transcript.
+    """
+    minio_client = get_minio_client()
+
+    speaker_segments = []
+    for segments_name in segments_names:
+        track = json.loads(
+            load_text(minio_client, settings.aws_storage_bucket_name, segments_name)
+        )
+        offset = track.get("offset", 0)
+        speaker_segments.append(
+            (
+                track["speaker"],
+                [
+                    (start + offset, end + offset, text)
+                    for start, end, text in track["segments"]
+                ],
+            )
+        )
+
+    transcription = merge_speaker_segments(speaker_segments)
+    logger.debug("Transcription: \n %s", transcription)
+    # Tracks being transcribed in parallel, transcription ends with the last one
+    get_tracker(pipeline_id).end("transcription")
+
+    transcript_name = get_intermediate(pipeline_id, "transcript.txt")
+    save_text(
+        minio_client, settings.aws_storage_bucket_name, transcript_name, transcription
     )
+    return transcript_name
 
-    logger.debug("Connection to the Minio bucket successful")
 
-    audio_file_stream = minio_client.get_object(
-        settings.aws_storage_bucket_name, object_name=filename
+def get_transcript_cache_key(etag: str, timestamps: bool) -> str:
+    """Return the cache key of the transcript of an audio file, from its ETag."""
+    return get_content_key(
+        etag,
+        get_transcription_engine().name,
+        settings.transcription_chunk_duration,
+        settings.transcription_chunk_overlap,
+        timestamps,
+        get_preprocessing_options(),
     )
 
-    temp_file_path = save_audio_stream(audio_file_stream)
-    logger.debug("Recording successfully downloaded, filepath: %s", temp_file_path)
 
-    logger.debug("Initiating OpenAI client")
-    openai_client = openai.OpenAI(
-        api_key=settings.openai_api_key, base_url=settings.openai_base_url
+def transcribe_recording(
+    minio_client, stat, tracker, retry_on, timestamps
+) -> List[ChunkTranscript]:
+    """Stream a recording from MinIO storage and transcribe it in chunks.
+
+    Return the transcripts of the chunks, in any order.
+    """
+
+    def download():
+        with tracker.stage("download", totals={"bytes": stat.size}, retry_on=retry_on):
+            for data in read_object_ranges(
+                minio_client,
+                settings.aws_storage_bucket_name,
+                stat.object_name,
+                settings.aws_s3_range_size,
+                size=stat.size,
+            ):
+                tracker.advance("download", bytes=len(data))
+                yield data
+
+    chunks = split_in_chunks(
+        iter_pages(download()),
+        duration=settings.transcription_chunk_duration,
+        overlap=settings.transcription_chunk_overlap,
+        spool_size=settings.transcription_chunk_spool_size,
     )
+    preprocessing_options = get_preprocessing_options()
+    if preprocessing_options is not None:
+        chunks = preprocess_chunks(chunks, preprocessing_options)
 
-    try:
-        logger.debug("Querying transcription …")
-        with open(temp_file_path, "rb") as audio_file:
-            transcription = openai_client.audio.transcriptions.create(
-                model=settings.openai_asr_model, file=audio_file
+    logger.debug("Querying transcription …")
+    transcripts = []
+    with tracker.stage("transcription", retry_on=retry_on):
+        for transcript in transcribe(
+            get_transcription_engine(),
+            chunks,
+            max_workers=settings.transcription_max_workers,
+            timestamps=timestamps,
+        ):
+            transcripts.append(transcript)
+            # Overlapping audio is counted once
+            overlap = settings.transcription_chunk_overlap if transcript.index else 0
+            tracker.advance(
+                "transcription",
+                chunks=1,
+                audio_seconds=transcript.end - transcript.start - overlap,
             )
 
-            transcription = transcription.text
+    return transcripts
 
-            logger.debug("Transcription: \n %s", transcription)
-    finally:
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-            logger.debug("Temporary file removed: %s", temp_file_path)
 
-    instructions = get_instructions(transcription)
-    summary_response = openai_client.chat.completions.create(
-        model=settings.openai_llm_model, messages=instructions
+@celery.task(
+    queue=SUMMARIZATION_QUEUE,
+    autoretry_for=RETRYABLE_ERRORS,
+    max_retries=settings.celery_max_retries,
+    retry_backoff=True,
+    bind=True,
+)
+def summarize_transcript(
+    self, transcript_name: str, pipeline_id: str, email: str, sub: str
+):
+    """Summarize a transcript with the OpenAI-compliant API's LLM.
+
+    In streaming mode, partial minutes are delivered via webhook while they are
+    generated. Return the object name of the summary.
+    """
+    minio_client = get_minio_client()
+    transcription = load_text(
+        minio_client, settings.aws_storage_bucket_name, transcript_name
     )
 
-    summary = summary_response.choices[0].message.content
+    cache = get_cache()
+    cache_key = get_content_key(
+        get_content_key(transcription),
+        settings.openai_llm_model,
+        PROMPT_VERSION,
+        settings.summary_segment_max_tokens,
+        get_completion_options(settings),
+    )
+    tracker = get_tracker(pipeline_id)
+    summary = cache.get("summary", cache_key)
+    if summary is None:
+        retry_on = get_retryable_errors(self, RETRYABLE_ERRORS)
+        with tracker.stage("summarization", retry_on=retry_on):
+            summarizer = Summarizer(
+                get_openai_client(),
+                model=settings.openai_llm_model,
+                max_tokens=settings.summary_segment_max_tokens,
+                max_workers=settings.summary_max_workers,
+                completion_options=get_completion_options(settings),
+                on_completion=lambda tokens: tracker.advance(
+                    "summarization", completions=1, tokens=tokens
+                ),
+            )
+            summary = summarize(summarizer, transcription, pipeline_id, email, sub)
+        cache.set("summary", cache_key, summary)
+    else:
+        tracker.end("summarization")
     logger.debug("Summary: \n %s", summary)
 
+    summary_name = get_intermediate(pipeline_id, "summary.md")
+    save_text(minio_client, settings.aws_storage_bucket_name, summary_name, summary)
+    return summary_name
+
+
+def summarize(summarizer, transcription, pipeline_id, email, sub) -> str:
+    """Summarize a transcript, delivering partial minutes in streaming mode."""
+    if not settings.summary_streaming_enabled:
+        return summarizer.summarize(transcription)
+
+    delivery = ThrottledDelivery(
+        get_webhook_client(),
+        settings.webhook_url,
+        interval=settings.summary_streaming_interval,
+    )
+    try:
+        return summarizer.summarize(
+            transcription,
+            on_partial=lambda summary: delivery.update(
+                get_webhook_payload(summary, pipeline_id, email, sub, PARTIAL)
+            ),
+        )
+    finally:
+        delivery.close()
+
+
+def get_webhook_payload(summary, pipeline_id, email, sub, status=COMPLETE) -> dict:
+    """Return the webhook payload of a summary.
+
+    In streaming mode, the task id and status identify the successive versions
+    of the summary, only the last one being complete.
+    """
     # fixme - generate a title using LLM
     data = {
         "title": "Votre résumé",
@@ -132,11 +431,157 @@ def process_audio_transcribe_summarize(filename: str, email: str, sub: str):
         "email": email,
         "sub": sub,
     }
+    if settings.summary_streaming_enabled:
+        data.update({"id": pipeline_id, "status": status})
+    return data
+
+
+@celery.task(
+    queue=settings.celery_delivery_queue,
+    autoretry_for=(RequestException,),
+    max_retries=settings.celery_max_retries,
+    retry_backoff=True,
+    bind=True,
+)
+def deliver_summary(self, summary_name: str, pipeline_id: str, email: str, sub: str):
+    """Send a summary via webhook, then delete the pipeline intermediate results.
+
+    Intermediate results are deleted on a best effort basis, once delivered.
+    """
+    minio_client = get_minio_client()
+    summary = load_text(minio_client, settings.aws_storage_bucket_name, summary_name)
+
+    data = get_webhook_payload(summary, pipeline_id, email, sub)
 
     logger.debug("Submitting webhook to %s", settings.webhook_url)
     logger.debug("Request payload: %s", json.dumps(data, indent=2))
 
-    response = post_with_retries(settings.webhook_url, data)
+    webhook_client = get_webhook_client()
+    retry_on = get_retryable_errors(self, (RequestException,))
+    with get_tracker(pipeline_id).stage("delivery", retry_on=retry_on):
+        response = webhook_client.post(settings.webhook_url, data)
 
     logger.info("Webhook submitted successfully. Status: %s", response.status_code)
     logger.debug("Response body: %s", response.text)
+    save_stats(
+        get_redis_client(),
+        f"{self.request.hostname}:{os.getpid()}",
+        webhook_client.stats(),
+        settings.webhook_stats_ttl,
+    )
+
+    # The summary was delivered, failing to clean up must neither fail the
+    # pipeline nor have the task retried, delivering the webhook once more
+    try:
+        delete_objects(
+            minio_client,
+            settings.aws_storage_bucket_name,
+            get_intermediate(pipeline_id, ""),
+        )
+    except (RuntimeError, S3Error, urllib3.exceptions.HTTPError) as e:
+        logger.warning(
+            "Failed to delete the results of pipeline %s: %s", pipeline_id, e
+        )
+
+
+@celery.task(queue=settings.celery_delivery_queue)
+def release_task(lock_key: str, task_id: str, sub: str):
+    """Release the deduplication lock and the job slot of a task, once it ended.
+
+    Errbacks are linked to each task of the chain, so a failed job may be
+    released several times, which is harmless.
+    """
+    redis_client = get_redis_client()
+    release_task_lock(redis_client, lock_key, task_id)
+    remove_user_job(redis_client, sub, task_id, settings.task_dedup_ttl)
+
+
+def get_transcription(
+    pipeline_id: str, filename: str, tracks: Optional[List[dict]], schedule: Schedule
+):
+    """Return the signature of the transcription of a recording.
+
+    Recordings with a track per participant have their tracks transcribed in
+    parallel, then merged into a speaker-labelled transcript.
+    """
+    options = {
+        "queue": get_queue(settings.celery_transcription_queue, schedule.size),
+        "priority": schedule.priority,
+    }
+    if not tracks:
+        return transcribe_audio.s(pipeline_id, filename).set(**options)
+
+    return chord(
+        [transcribe_track.s(pipeline_id, track).set(**options) for track in tracks],
+        merge_tracks.s(pipeline_id).set(**options),
+    )
+
+
+def process_audio_transcribe_summarize(  # noqa: PLR0913
+    filename: str,
+    email: str,
+    sub: str,
+    task_id: Optional[str] = None,
+    size: Optional[int] = None,
+    tracks: Optional[List[dict]] = None,
+):
+    """Process an audio file by transcribing it and generating a summary.
+
+    The work is split into a chain of tasks, routed to their own queue so that
+    each stage scales independently:
+    1. Transcribes the audio using OpenAI-compliant API's ASR model
+    2. Generates a summary of the transcription using OpenAI-compliant API's LLM
+    3. Sends the results via webhook
+    Intermediate results are persisted in MinIO storage, so that a failed stage
+    is retried without running the previous ones again.
+
+    With `tracks`, the audio track of each participant, holding its object name,
+    speaker name and offset from the start of the recording, is transcribed
+    instead of the mixed audio, for the transcript to be labelled by speaker.
+
+    Transcription and summarization are routed to queues for short or long jobs,
+    depending on the recording `size` in bytes, and prioritized below the other
+    jobs of the user in progress.
+
+    Return the result of the last task of the chain, whose id is `task_id` if given,
+    which identifies the pipeline and its progress as well. The deduplication lock
+    of the file and user is released once the chain ends.
+    """
+    task_id = task_id or str(uuid.uuid4())
+    pipeline_id = task_id
+    redis_client = get_redis_client()
+
+    user_jobs = add_user_job(redis_client, sub, settings.task_dedup_ttl)
+    schedule = get_schedule(
+        size,
+        user_jobs,
+        bitrate=settings.scheduling_audio_bitrate,
+        short_max_duration=settings.scheduling_short_max_duration,
+    )
+    logger.info("Scheduling task %s as %s", task_id, schedule)
+
+    pipeline = chain(
+        get_transcription(pipeline_id, filename, tracks, schedule),
+        summarize_transcript.s(pipeline_id, email, sub).set(
+            queue=get_queue(settings.celery_summarization_queue, schedule.size),
+            priority=schedule.priority,
+        ),
+        deliver_summary.s(pipeline_id, email, sub),
+    )
+
+    release = release_task.si(get_task_lock_key(filename, sub), task_id, sub)
+    try:
+        return pipeline.apply_async(task_id=task_id, link=release, link_error=release)
+    except Exception:
+        remove_user_job(redis_client, sub, task_id, settings.task_dedup_ttl)
+        raise
+
+
+@celery.task(name=f"{__name__}.process_audio_transcribe_summarize")
+def process_audio_transcribe_summarize_task(filename: str, email: str, sub: str):
+    """Start the pipeline of a recording, from a message of the former task.
+
+    Summaries used to be processed by a single task of this name, on the default
+    queue, whose messages enqueued before an upgrade are still consumed.
+    """
+    process_audio_transcribe_summarize(filename, email, sub)
@@ -0,0 +1,210 @@
+"""Minio, OpenAI, webhook and Redis clients shared by the tasks of a worker process.
+
+Clients hold connection pools, which are kept alive between tasks instead of
+being set up for each of them. They are all created when a worker process
+starts, and closed when it shuts down. Otherwise, as in the API process or when
+the pool does not fork processes, each client is created lazily on first use,
+along with the clients it depends on only. The transcription engine is shared
+likewise, local models being loaded once per process.
+"""
+
+import os
+import threading
+from collections import Counter
+from typing import Optional
+
+import certifi
+import httpx
+import openai
+import redis
+import urllib3
+from celery.utils.log import get_task_logger
+from minio import Minio
+
+from summary.core.cache import ResultCache
+from summary.core.config import get_settings
+from summary.core.engines import TranscriptionEngine, create_transcription_engine
+from summary.core.ratelimit import Limit, OpenAIRateLimiter, RateLimiter
+from summary.core.webhook import WebhookClient
+
+logger = get_task_logger(__name__)
+
+# Reentrant, as creating a client may get the clients it depends on
+_lock = threading.RLock()
+_clients = {}
+
+# Number of HTTP requests sent by OpenAI clients of the process
+openai_request_count = Counter()
+
+
+def _count_openai_request(_request):
+    """Count a request sent by an OpenAI client."""
+    openai_request_count["requests"] += 1
+
+
+def create_minio_client(settings) -> Minio:
+    """Create a Minio client with a tuned connection pool."""
+    http_client = urllib3.PoolManager(
+        maxsize=settings.http_pool_maxsize,
+        block=False,
+        timeout=urllib3.Timeout(connect=settings.http_connect_timeout, read=300),
+        retries=urllib3.Retry(
+            total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]
+        ),
+        cert_reqs="CERT_REQUIRED",
+        ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+    )
+    return Minio(
+        settings.aws_s3_endpoint_url,
+        access_key=settings.aws_s3_access_key_id,
+        secret_key=settings.aws_s3_secret_access_key,
+        secure=settings.aws_s3_secure_access,
+        http_client=http_client,
+    )
+
+
+def create_rate_limiter(settings, client: redis.Redis) -> OpenAIRateLimiter:
+    """Create the rate limiter of OpenAI requests, from the configured limits."""
+    limits = {
+        "chat": {
+            "requests": settings.openai_llm_requests_per_minute,
+            "tokens": settings.openai_llm_tokens_per_minute,
+        },
+        "audio": {"requests": settings.openai_asr_requests_per_minute},
+    }
+    return OpenAIRateLimiter(
+        {
+            kind: RateLimiter(
+                client,
+                name=kind,
+                limits={unit: Limit(value) for unit, value in units.items() if value},
+                max_wait=settings.openai_rate_limit_max_wait,
+            )
+            for kind, units in limits.items()
+        }
+    )
+
+
+def create_openai_client(
+    settings, rate_limiter: Optional[OpenAIRateLimiter] = None
+) -> openai.OpenAI:
+    """Create an OpenAI client with a tuned connection pool, and rate limits."""
+    event_hooks = {"request": [_count_openai_request], "response": []}
+    if rate_limiter is not None:
+        event_hooks["request"].append(rate_limiter.before_request)
+        event_hooks["response"].append(rate_limiter.after_response)
+
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=settings.http_pool_maxsize,
+            max_keepalive_connections=settings.http_pool_maxsize,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(600, connect=settings.http_connect_timeout),
+        event_hooks=event_hooks,
+    )
+    return openai.OpenAI(
+        api_key=settings.openai_api_key,
+        base_url=settings.openai_base_url,
+        http_client=http_client,
+    )
+
+
+def _get_client(name: str, create):
+    """Return a client of the current process, creating it on first use."""
+    with _lock:
+        if name not in _clients:
+            logger.debug("Creating %s client of process %s", name, os.getpid())
+            _clients[name] = create(get_settings())
+        return _clients[name]
+
+
+def get_minio_client() -> Minio:
+    """Return the Minio client of the current process."""
+    return _get_client("minio", create_minio_client)
+
+
+def get_redis_client() -> redis.Redis:
+    """Return the Redis client of the current process."""
+    return _get_client(
+        "redis", lambda settings: redis.Redis.from_url(settings.redis_url)
+    )
+
+
+def get_openai_client() -> openai.OpenAI:
+    """Return the OpenAI client of the current process."""
+    return _get_client(
+        "openai",
+        lambda settings: create_openai_client(
+            settings, create_rate_limiter(settings, get_redis_client())
+        ),
+    )
+
+
+def get_transcription_engine() -> TranscriptionEngine:
+    """Return the transcription engine of the current process."""
+    return _get_client(
+        "transcription",
+        lambda settings: create_transcription_engine(settings, get_openai_client()),
+    )
+
+
+def get_webhook_client() -> WebhookClient:
+    """Return the webhook client of the current process."""
+    return _get_client("webhook", WebhookClient)
+
+
+def get_cache() -> ResultCache:
+    """Return the result cache client of the current process."""
+    return _get_client(
+        "cache",
+        lambda settings: ResultCache(
+            get_redis_client()
+            if settings.cache_redis_url == settings.redis_url
+            else redis.Redis.from_url(settings.cache_redis_url),
+            ttl=settings.cache_ttl,
+            enabled=settings.cache_enabled,
+        ),
+    )
+
+
+def init_clients():
+    """Create all the clients of the current process, if not already created."""
+    get_minio_client()
+    get_redis_client()
+    get_openai_client()
+    get_transcription_engine()
+    get_webhook_client()
+    get_cache()
+
+
+def get_minio_stats(client: Minio) -> Counter:
+    """Return the number of connections opened and requests sent by a Minio client."""
+    pools = client._http.pools
+    stats = Counter()
+    for key in pools.keys():
+        stats["connections"] += pools[key].num_connections
+        stats["requests"] += pools[key].num_requests
+    return stats
+
+
+def close_clients():
+    """Close the connection pools of the clients of the current process."""
+    with _lock:
+        minio_client = _clients.pop("minio", None)
+        openai_client = _clients.pop("openai", None)
+        webhook_client = _clients.pop("webhook", None)
+        redis_client = _clients.pop("redis", None)
+        cache = _clients.pop("cache", None)
+        _clients.pop("transcription", None)
+
+    if minio_client is not None:
+        minio_client._http.clear()
+    if openai_client is not None:
+        openai_client.close()
+    if webhook_client is not None:
+        webhook_client.close()
+    if redis_client is not None:
+        redis_client.close()
+    if cache is not None and cache.client is not redis_client:
+        cache.client.close()
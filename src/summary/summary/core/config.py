@@ -10,7 +10,8 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     """Configuration settings loaded from environment variables and .env file."""
 
-    model_config = SettingsConfigDict(env_file=".env")
+    # Optional settings are unset with a "null" value
+    model_config = SettingsConfigDict(env_file=".env", env_parse_none_str="null")
 
     app_name: str = "app"
     app_api_v1_str: str = "/api/v1"
@@ -20,6 +21,16 @@ class Settings(BaseSettings):
     celery_broker_url: str = "redis://redis/0"
     celery_result_backend: str = "redis://redis/0"
     celery_max_retries: int = 1
+    celery_transcription_queue: str = "transcription"
+    celery_summarization_queue: str = "summarization"
+    celery_delivery_queue: str = "delivery"
+
+    # Redis settings, apart from the broker's: the Redis of deduplication,
+    # progress, scheduling and rate limits, and the Redis of the result cache.
+    # The cache size is only bound by its TTL, so a Redis of its own with a
+    # `maxmemory` and the `allkeys-lru` eviction policy is best for heavy usage.
+    redis_url: str = "redis://redis/1"
+    cache_redis_url: str = "redis://redis/1"
 
     # Minio settings
     aws_storage_bucket_name: str
@@ -27,6 +38,13 @@ class Settings(BaseSettings):
     aws_s3_access_key_id: str
     aws_s3_secret_access_key: str
     aws_s3_secure_access: bool = True
+    aws_s3_range_size: int = 1024 * 1024
+    aws_s3_intermediate_prefix: str = "summary"
+
+    # HTTP clients settings, shared by the tasks of a worker process
+    http_pool_maxsize: int = 10
+    http_keepalive_expiry: float = 60
+    http_connect_timeout: float = 10
 
     # AI-related settings
     openai_api_key: str
@@ -34,10 +52,77 @@ class Settings(BaseSettings):
     openai_asr_model: str = "whisper-1"
     openai_llm_model: str = "gpt-4o"
 
+    # Limits of the OpenAI-compliant API shared by all workers, 0 for no limit
+    openai_llm_requests_per_minute: int = 0
+    openai_llm_tokens_per_minute: int = 0
+    openai_asr_requests_per_minute: int = 0
+    openai_rate_limit_max_wait: float = 120
+
+    # Transcription settings
+    transcription_chunk_duration: float = 600
+    transcription_chunk_overlap: float = 10
+    transcription_max_workers: int = 4
+    # Chunks larger than this are spilled from memory to disk
+    transcription_chunk_spool_size: int = 32 * 1024 * 1024
+    # Request timed segments of the ASR API, deduplicating overlapping chunks on
+    # them rather than on their words, if the API supports them
+    transcription_timestamps: bool = False
+    # Engine transcribing audio, "openai" for the OpenAI-compliant API, or
+    # "local" for a faster-whisper model running on the worker CPU
+    transcription_engine: str = "openai"
+    local_asr_model: str = "small"
+    local_asr_compute_type: str = "int8"
+    # Threads of each inference, 0 for the default
+    local_asr_cpu_threads: int = 0
+    local_asr_batch_size: int = 8
+
+    # Audio pre-processing settings, trimming silences out before transcription
+    preprocessing_enabled: bool = False
+    # Native sample rate of the ASR model, and bitrate of the trimmed audio
+    preprocessing_sample_rate: int = 16000
+    preprocessing_bitrate: int = 24000
+    # Energy, in dBFS, below which audio is silent
+    preprocessing_silence_threshold: float = -45
+    preprocessing_min_silence_duration: float = 1
+    preprocessing_padding: float = 0.25
+
+    # Summarization settings
+    summary_segment_max_tokens: int = 16000
+    summary_max_workers: int = 4
+    # Sampling of the LLM completions, the API defaults being used if unset. Set
+    # both to 0 for deterministic summaries, on providers supporting a seed.
+    summary_temperature: Optional[float] = None
+    summary_seed: Optional[int] = None
+    # Deliver partial minutes to the webhook while they are generated
+    summary_streaming_enabled: bool = False
+    summary_streaming_interval: float = 5
+
+    # Cache of transcripts and summaries
+    cache_enabled: bool = True
+    cache_ttl: int = 7 * 24 * 60 * 60
+
+    # Progress of tasks, kept after their last update
+    progress_ttl: int = 24 * 60 * 60
+    progress_wait_max: float = 60
+    progress_stream_timeout: float = 15 * 60
+    progress_stream_keepalive: float = 15
+
+    # Jobs scheduling, recordings longer than the maximum going to long queues
+    scheduling_audio_bitrate: int = 64_000
+    scheduling_short_max_duration: float = 30 * 60
+
+    # Duplicated tasks for a same file and user are ignored while one is running
+    task_dedup_ttl: int = 6 * 60 * 60
+
     # Webhook-related settings
     webhook_max_retries: int = 2
     webhook_status_forcelist: list[int] = [502, 503, 504]
     webhook_backoff_factor: float = 0.1
+    webhook_timeout: float = 30
+    webhook_pool_connections: int = 10
+    webhook_max_connections_per_host: int = 4
+    # Delivery latencies of a worker process are kept after its last delivery
+    webhook_stats_ttl: int = 24 * 60 * 60
     webhook_api_token: str
     webhook_url: str
 
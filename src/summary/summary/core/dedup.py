@@ -0,0 +1,65 @@
+"""Deduplicate tasks created for a same file and user while one is running.
+
+The first request takes a Redis lock holding its task id, with an atomic
+SET NX and a TTL in case the lock is never released. Concurrent requests, on
+any API replica, get the id of the task holding the lock instead.
+"""
+
+import hashlib
+from functools import lru_cache
+from typing import Annotated, Optional
+
+import redis
+import redis.asyncio
+from fastapi import Depends
+
+from summary.core.config import get_settings
+
+# Delete the lock only if it is still held by the given task
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def get_task_lock_key(filename: str, sub: str) -> str:
+    """Return the name of the lock of tasks processing a file for a user."""
+    digest = hashlib.sha256(f"{filename}\0{sub}".encode()).hexdigest()
+    return f"summary:task:{digest}"
+
+
+async def acquire_task_lock(
+    client: redis.asyncio.Redis, key: str, task_id: str, ttl: int
+) -> Optional[str]:
+    """Take the lock for a task, or return the id of the task holding it."""
+    while True:
+        if await client.set(key, task_id, nx=True, ex=ttl):
+            return None
+
+        holder = await client.get(key)
+        # Retry if the lock was released since it was attempted
+        if holder is not None:
+            return holder.decode("utf-8")
+
+
+async def release_task_lock_async(
+    client: redis.asyncio.Redis, key: str, task_id: str
+) -> bool:
+    """Release the lock if it is still held by the task."""
+    return bool(await client.eval(RELEASE_SCRIPT, 1, key, task_id))
+
+
+def release_task_lock(client: redis.Redis, key: str, task_id: str) -> bool:
+    """Release the lock if it is still held by the task."""
+    return bool(client.eval(RELEASE_SCRIPT, 1, key, task_id))
+
+
+@lru_cache
+def get_redis():
+    """Return the Redis client of the application."""
+    return redis.asyncio.Redis.from_url(get_settings().redis_url)
+
+
+RedisDeps = Annotated[redis.asyncio.Redis, Depends(get_redis)]
@@ -0,0 +1,143 @@
+"""Transcription engines, turning audio files into timed text.
+
+The OpenAI-compliant ASR API is the default engine. A local engine runs a
+Whisper model in process, on the worker CPU cores, which spares sending large
+audio files over the network and does not need a GPU.
+"""
+
+import threading
+from typing import BinaryIO, List, Optional, Protocol, Tuple
+
+from celery.utils.log import get_task_logger
+
+logger = get_task_logger(__name__)
+
+OPENAI = "openai"
+LOCAL = "local"
+
+# Timed segments of a transcription, as start and end in seconds, and text
+Segments = List[Tuple[float, float, str]]
+
+
+class TranscriptionEngine(Protocol):
+    """Interface of the engines transcribing audio files."""
+
+    name: str
+
+    def transcribe(
+        self, file: BinaryIO, filename: str, timestamps: bool
+    ) -> Tuple[str, Optional[Segments]]:
+        """Transcribe an audio file, returning its text and, if asked, its segments.
+
+        Segments are timed relatively to the start of the file.
+        """
+
+
+class OpenAIEngine:
+    """Transcribe audio files with an OpenAI-compliant ASR API."""
+
+    def __init__(self, client, model: str):
+        """Initialize the engine with its OpenAI client and ASR model."""
+        self.client = client
+        self.model = model
+        self.name = f"{OPENAI}:{model}"
+
+    def transcribe(
+        self, file: BinaryIO, filename: str, timestamps: bool
+    ) -> Tuple[str, Optional[Segments]]:
+        """Upload an audio file to the API, and return its transcription."""
+        options = {"response_format": "verbose_json"} if timestamps else {}
+        transcription = self.client.audio.transcriptions.create(
+            model=self.model, file=(filename, file, "audio/ogg"), **options
+        )
+
+        segments = getattr(transcription, "segments", None)
+        return transcription.text, (
+            [(s.start, s.end, s.text) for s in segments] if segments else None
+        )
+
+
+class LocalEngine:
+    """Transcribe audio files with a Whisper model running on the worker CPU.
+
+    The model, loaded on first use, is shared by the transcription threads of the
+    process, as many of which run inference at once as `workers`. Speech of each
+    file is split on silences, and its parts transcribed in batches.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        compute_type: str = "int8",
+        cpu_threads: int = 0,
+        workers: int = 1,
+        batch_size: int = 8,
+    ):
+        """Initialize the engine with a faster-whisper model name or path."""
+        self.model = model
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.workers = workers
+        self.batch_size = batch_size
+        self.name = f"{LOCAL}:{model}:{compute_type}"
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    def _get_pipeline(self):
+        """Return the batched inference pipeline, loading the model if needed."""
+        with self._lock:
+            if self._pipeline is None:
+                try:
+                    from faster_whisper import (
+                        BatchedInferencePipeline,
+                        WhisperModel,
+                    )
+                except ImportError as e:
+                    raise RuntimeError(
+                        "The local transcription engine requires the 'local' extra "
+                        "dependencies, installed with `pip install summary[local]`."
+                    ) from e
+
+                logger.info("Loading local ASR model %s", self.model)
+                whisper_model = WhisperModel(
+                    self.model,
+                    device="cpu",
+                    compute_type=self.compute_type,
+                    cpu_threads=self.cpu_threads,
+                    num_workers=self.workers,
+                )
+                self._pipeline = BatchedInferencePipeline(model=whisper_model)
+            return self._pipeline
+
+    def transcribe(
+        self, file: BinaryIO, filename: str, timestamps: bool
+    ) -> Tuple[str, Optional[Segments]]:
+        """Decode and transcribe an audio file in process."""
+        logger.debug("Transcribing %s locally", filename)
+        segments, _info = self._get_pipeline().transcribe(
+            file, batch_size=self.batch_size
+        )
+        segments = [(s.start, s.end, s.text) for s in segments]
+
+        text = "".join(text for _, _, text in segments).strip()
+        return text, segments if timestamps else None
+
+
+def create_transcription_engine(settings, openai_client) -> TranscriptionEngine:
+    """Create the configured transcription engine."""
+    if settings.transcription_engine == OPENAI:
+        return OpenAIEngine(openai_client, settings.openai_asr_model)
+
+    if settings.transcription_engine == LOCAL:
+        return LocalEngine(
+            settings.local_asr_model,
+            compute_type=settings.local_asr_compute_type,
+            cpu_threads=settings.local_asr_cpu_threads,
+            workers=settings.transcription_max_workers,
+            batch_size=settings.local_asr_batch_size,
+        )
+
+    raise ValueError(
+        f"Unknown transcription engine {settings.transcription_engine!r}, "
+        f"expected {OPENAI!r} or {LOCAL!r}."
+    )
@@ -0,0 +1,175 @@
+"""Pre-process audio chunks before transcription, trimming silences out.
+
+Chunks are decoded, downmixed to mono and resampled to the ASR model's native
+rate, then silent stretches are detected on the energy of short frames and cut
+out. The remaining audio is encoded back to Ogg Opus, which shrinks uploads and
+transcription costs of sparse meetings. A timestamp map of the kept audio lets
+transcript timings be restored on the original recording.
+"""
+
+import io
+import math
+import tempfile
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Iterable, Iterator, List, Tuple
+
+import av
+import numpy as np
+from celery.utils.log import get_task_logger
+
+from summary.core.audio import AudioChunk, TimestampMap
+
+logger = get_task_logger(__name__)
+
+# Duration of the frames on which energy is measured, in seconds
+FRAME_DURATION = 0.03
+
+# Samples encoded at once, the encoder buffering them into Opus frames
+ENCODE_BLOCK_SIZE = 16000
+
+# Floor of the frame energies, avoiding the logarithm of zero on digital silence
+ENERGY_FLOOR = 1e-10
+
+
+@dataclass(frozen=True)
+class PreprocessingOptions:
+    """Options of the pre-processing of audio chunks."""
+
+    sample_rate: int = 16000
+    bitrate: int = 24000
+    # Energy, in dBFS, below which a frame is silent
+    silence_threshold: float = -45
+    # Silences shorter than this, in seconds, are kept
+    min_silence_duration: float = 1
+    # Audio kept around speech, in seconds, so that words are not clipped
+    padding: float = 0.25
+    spool_size: int = 32 * 1024 * 1024
+
+
+def decode(file, sample_rate: int) -> np.ndarray:
+    """Decode an audio file into mono float samples at the given rate."""
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+    blocks = []
+
+    with av.open(file, mode="r", format="ogg") as container:
+        for frame in container.decode(audio=0):
+            blocks.extend(f.to_ndarray()[0] for f in resampler.resample(frame))
+        blocks.extend(f.to_ndarray()[0] for f in resampler.resample(None))
+
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+
+def detect_speech(
+    samples: np.ndarray, sample_rate: int, options: PreprocessingOptions
+) -> List[Tuple[int, int]]:
+    """Return the sample ranges holding speech, as pairs of start and end."""
+    frame_size = int(sample_rate * FRAME_DURATION)
+    frames_count = math.ceil(len(samples) / frame_size)
+    if not frames_count:
+        return []
+
+    frames = np.pad(samples, (0, frames_count * frame_size - len(samples)))
+    frames = frames.reshape(frames_count, frame_size)
+    energy = 10 * np.log10(np.mean(frames**2, axis=1) + ENERGY_FLOOR)
+    voiced = energy > options.silence_threshold
+
+    # Speech is padded on both sides by widening voiced frames
+    padding = math.ceil(options.padding / FRAME_DURATION)
+    if padding:
+        voiced = np.convolve(voiced, np.ones(2 * padding + 1), mode="same") > 0
+
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    starts, ends = edges[::2], edges[1::2]
+    if not len(starts):
+        return []
+
+    # Speech stretches separated by short silences are joined
+    long_gaps = starts[1:] - ends[:-1] >= options.min_silence_duration / FRAME_DURATION
+    starts = np.concatenate((starts[:1], starts[1:][long_gaps]))
+    ends = np.concatenate((ends[:-1][long_gaps], ends[-1:]))
+
+    return [
+        (int(start) * frame_size, min(int(end) * frame_size, len(samples)))
+        for start, end in zip(starts, ends, strict=True)
+    ]
+
+
+def encode(samples: np.ndarray, sample_rate: int, options: PreprocessingOptions):
+    """Encode mono float samples into an Ogg Opus file, rewound."""
+    file = tempfile.SpooledTemporaryFile(max_size=options.spool_size, suffix=".ogg")
+
+    with av.open(file, mode="w", format="ogg") as container:
+        stream = container.add_stream("libopus", rate=sample_rate)
+        stream.layout = "mono"
+        stream.bit_rate = options.bitrate
+
+        for offset in range(0, len(samples), ENCODE_BLOCK_SIZE):
+            frame = av.AudioFrame.from_ndarray(
+                samples[np.newaxis, offset : offset + ENCODE_BLOCK_SIZE],
+                format="flt",
+                layout="mono",
+            )
+            frame.sample_rate = sample_rate
+            frame.pts = offset
+            frame.time_base = Fraction(1, sample_rate)
+            container.mux(stream.encode(frame))
+        container.mux(stream.encode(None))
+
+    file.seek(0)
+    return file
+
+
+def preprocess_chunk(chunk: AudioChunk, options: PreprocessingOptions) -> AudioChunk:
+    """Trim the silences out of a chunk, returning the chunk of the trimmed audio.
+
+    The original chunk is closed. Chunks without speech are returned empty, with
+    an empty timestamp map, and need not be transcribed.
+    """
+    try:
+        samples = decode(chunk.data, options.sample_rate)
+    finally:
+        chunk.close()
+
+    ranges = detect_speech(samples, options.sample_rate, options)
+    timestamp_map = TimestampMap()
+    kept = 0
+    for start, end in ranges:
+        timestamp_map.spans.append(
+            (kept / options.sample_rate, start / options.sample_rate)
+        )
+        kept += end - start
+
+    if ranges:
+        data = encode(
+            np.concatenate([samples[start:end] for start, end in ranges]),
+            options.sample_rate,
+            options,
+        )
+        size = data.seek(0, io.SEEK_END)
+        data.seek(0)
+    else:
+        data, size = io.BytesIO(), 0
+
+    logger.debug(
+        "Trimmed chunk %s from %.1fs to %.1fs of audio",
+        chunk.index,
+        chunk.end - chunk.start,
+        kept / options.sample_rate,
+    )
+    return AudioChunk(
+        index=chunk.index,
+        start=chunk.start,
+        end=chunk.end,
+        data=data,
+        size=size,
+        timestamp_map=timestamp_map,
+    )
+
+
+def preprocess_chunks(
+    chunks: Iterable[AudioChunk], options: PreprocessingOptions
+) -> Iterator[AudioChunk]:
+    """Trim the silences out of chunks, as they are produced."""
+    for chunk in chunks:
+        yield preprocess_chunk(chunk, options)
@@ -0,0 +1,196 @@
+"""Track the progress of summary pipelines in Redis.
+
+Each pipeline has a Redis hash holding, for each stage, its status, start and end
+timestamps and progress metrics (bytes downloaded, audio seconds transcribed,
+tokens generated). A version, incremented on every update, is published on a
+channel, so that clients can wait for changes instead of polling.
+"""
+
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import AsyncIterator, Optional
+
+import redis
+import redis.asyncio
+from celery.utils.log import get_task_logger
+
+logger = get_task_logger(__name__)
+
+STAGES = ("download", "transcription", "summarization", "delivery")
+
+PENDING = "pending"
+RUNNING = "running"
+RETRYING = "retrying"
+DONE = "done"
+FAILED = "failed"
+
+
+def get_progress_key(pipeline_id: str) -> str:
+    """Return the name of the hash, and of the channel, of a pipeline progress."""
+    return f"summary:progress:{pipeline_id}"
+
+
+class ProgressTracker:
+    """Record the progress of the stages of a pipeline.
+
+    Tracking is best effort: Redis errors are logged and ignored, so that they
+    never fail the pipeline.
+    """
+
+    def __init__(self, client: redis.Redis, pipeline_id: str, ttl: int):
+        """Initialize the tracker of a pipeline, whose progress expires after `ttl`."""
+        self.client = client
+        self.key = get_progress_key(pipeline_id)
+        self.ttl = ttl
+
+    def _update(self, fields=None, increments=None):
+        """Update fields atomically, then notify the new version."""
+        pipe = self.client.pipeline()
+        if fields:
+            pipe.hset(self.key, mapping=fields)
+        for field, amount in (increments or {}).items():
+            pipe.hincrbyfloat(self.key, field, amount)
+        pipe.hincrby(self.key, "version", 1)
+        pipe.expire(self.key, self.ttl)
+
+        try:
+            version = pipe.execute()[-2]
+            self.client.publish(self.key, version)
+        except redis.RedisError as e:
+            logger.warning("Failed to update progress %s: %s", self.key, e)
+
+    def start(self, stage: str, totals: Optional[dict] = None):
+        """Mark a stage as running, with the totals its metrics should reach."""
+        fields = {
+            "stage": stage,
+            f"{stage}.status": RUNNING,
+            f"{stage}.started_at": time.time(),
+        }
+        for name, value in (totals or {}).items():
+            fields[f"{stage}.total_{name}"] = value
+        self._update(fields)
+
+    def advance(self, stage: str, **metrics):
+        """Increment the progress metrics of a stage."""
+        self._update(
+            increments={f"{stage}.{name}": value for name, value in metrics.items()}
+        )
+
+    def end(self, stage: str, status: str = DONE, error: Optional[str] = None):
+        """Mark a stage as done, or failed with an error."""
+        fields = {f"{stage}.status": status, f"{stage}.ended_at": time.time()}
+        if error is not None:
+            fields[f"{stage}.error"] = error
+        self._update(fields)
+
+    @contextmanager
+    def stage(self, stage: str, totals: Optional[dict] = None, retry_on=()):
+        """Track a stage, from its start until it ends or fails.
+
+        Errors in `retry_on`, which the stage is retried on, mark it as retrying.
+        """
+        self.start(stage, totals)
+        try:
+            yield self
+        except Exception as e:
+            status = RETRYING if isinstance(e, retry_on) else FAILED
+            self.end(stage, status=status, error=repr(e))
+            raise
+        self.end(stage)
+
+
+def _parse_value(value: str):
+    """Parse a number stored in a hash, or return the string as is."""
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() else number
+
+
+def parse_progress(fields: dict) -> Optional[dict]:
+    """Turn the hash of a pipeline progress into a nested mapping."""
+    if not fields:
+        return None
+
+    fields = {key.decode(): value.decode() for key, value in fields.items()}
+    stages = defaultdict(dict)
+    for field, value in fields.items():
+        stage, _, name = field.partition(".")
+        if name:
+            stages[stage][name] = _parse_value(value)
+
+    return {
+        "version": int(fields.get("version", 0)),
+        "stage": fields.get("stage"),
+        "stages": {
+            stage: {"status": PENDING, **stages.get(stage, {})} for stage in STAGES
+        },
+    }
+
+
+def is_finished(progress: Optional[dict]) -> bool:
+    """Return whether a pipeline delivered its result or failed."""
+    if progress is None:
+        return False
+    statuses = [stage["status"] for stage in progress["stages"].values()]
+    return statuses[-1] == DONE or FAILED in statuses
+
+
+async def get_progress(client: redis.asyncio.Redis, pipeline_id: str):
+    """Return the progress of a pipeline, or None if it is unknown."""
+    return parse_progress(await client.hgetall(get_progress_key(pipeline_id)))
+
+
+async def wait_progress(
+    client: redis.asyncio.Redis, pipeline_id: str, version: int, timeout: float
+):
+    """Return the progress of a pipeline once its version exceeds `version`.
+
+    Return the current progress if it does not change within `timeout` seconds.
+    """
+    key = get_progress_key(pipeline_id)
+    deadline = time.monotonic() + timeout
+
+    async with client.pubsub() as pubsub:
+        # Subscribe before reading, so that no update is missed in between
+        await pubsub.subscribe(key)
+        progress = await get_progress(client, pipeline_id)
+
+        while (progress is None or progress["version"] <= version) and (
+            remaining := deadline - time.monotonic()
+        ) > 0:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=remaining
+            )
+            if message is not None:
+                progress = await get_progress(client, pipeline_id)
+
+    return progress
+
+
+async def stream_progress(
+    client: redis.asyncio.Redis, pipeline_id: str, timeout: float, keepalive: float
+) -> AsyncIterator[str]:
+    """Stream the progress of a pipeline as server-sent events, until it finishes.
+
+    Comments are sent every `keepalive` seconds without update, and the stream
+    ends after `timeout` seconds, clients being expected to reconnect.
+    """
+    version = -1
+    deadline = time.monotonic() + timeout
+
+    while (remaining := deadline - time.monotonic()) > 0:
+        progress = await wait_progress(
+            client, pipeline_id, version, min(keepalive, remaining)
+        )
+        if progress is None or progress["version"] <= version:
+            yield ": keepalive\n\n"
+            continue
+
+        version = progress["version"]
+        yield f"id: {version}\nevent: progress\ndata: {json.dumps(progress)}\n\n"
+        if is_finished(progress):
+            return
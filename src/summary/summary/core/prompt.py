@@ -1,5 +1,8 @@
 # ruff: noqa
 
+# Bump when instructions change, so that summaries cached with previous ones are ignored
+PROMPT_VERSION = "2"
+
 
 def get_instructions(transcript):
     """Declare the summarize instructions."""
@@ -13,6 +16,7 @@ def get_instructions(transcript):
     - Format the response using proper markdown and structured sections.
     - Be concise and avoid repeating yourself between the sections.
     - Be super precise on nickname
+    - When lines of the transcript start with a speaker's name, attribute what they say and their action items to that speaker
     - Be a nit-picker
     - Auto-evaluate your response
 
@@ -50,3 +54,94 @@ def get_instructions(transcript):
         },
         {"role": "user", "content": prompt},
     ]
+
+
+def get_segment_instructions(segment, index, count):
+    """Declare the instructions to take notes on a segment of a long transcript."""
+    prompt = f"""
+    Audience: An assistant who will merge these notes with the notes of the other parts of the meeting.
+
+    **Do:**
+    - Detect the language of the transcript and write your notes in the same language.
+    - Ensure the accuracy of all information and refrain from adding unverified details.
+    - Keep every decision, topic, action item, owner, deadline and nickname mentioned.
+    - When lines of the transcript start with a speaker's name, attribute what they say and their action items to that speaker.
+    - Be concise.
+
+    **Don't:**
+    - Write something that is not mention in the transcript.
+    - Write an introduction or a conclusion, this is only a part of the meeting.
+
+    **Task:**
+    Take notes on part {index + 1} of {count} of a meeting transcript, using the following sections:
+
+    ### Subjects Discussed
+    - [Each topic, concisely]
+
+    ### Next Steps
+    - [ ] Action - List of owner(s), deadline.
+
+    **Transcript (part {index + 1} of {count})**:
+    {segment}
+
+    **Response:**
+    """
+
+    return [
+        {
+            "role": "system",
+            "content": "You are a concise and structured assistant, that takes notes on meeting transcripts.",
+        },
+        {"role": "user", "content": prompt},
+    ]
+
+
+def get_merge_instructions(notes):
+    """Declare the instructions to merge the notes of consecutive transcript segments."""
+    parts = "\n\n".join(
+        f"**Notes (part {index + 1} of {len(notes)})**:\n{part}"
+        for index, part in enumerate(notes)
+    )
+    prompt = f"""
+    Audience: Coworkers.
+
+    **Do:**
+    - Provide your entire response in the language of the notes.
+    - Ensure the accuracy of all information and refrain from adding unverified details.
+    - Format the response using proper markdown and structured sections.
+    - Keep the chronological order of the parts.
+    - Merge duplicated topics and action items, without losing owners or deadlines.
+    - Be concise and avoid repeating yourself between the sections.
+
+    **Don't:**
+    - Write something that is not mention in the notes.
+
+    **Task:**
+    Merge the notes taken on consecutive parts of a meeting into clear and well-organized meeting minutes, structured into the following sections:
+
+    1. **Summary**: Write a  TL;DR of the meeting.
+    2. **Subjects Discussed**: List the key points or issues in bullet points.
+    4. **Next Steps**: Provide action items as tickable checkboxes, assigning each task to a responsible individual and including deadlines (if mentioned).
+
+    {parts}
+
+    **Response:**
+
+    ### Summary [Translate this title based on the notes’ language]
+    [Provide a brief overview of the key points discussed]
+
+    ### Subjects Discussed [Translate this title based on the notes’ language]
+    - [Summarize each topic concisely]
+
+    ### Next Steps [Translate this title based on the notes’ language]
+    - [ ] Action item [Assign to the responsible individual(s) and include a deadline if applicable, follow this strict format: Action - List of owner(s), deadline.]
+
+    """
+
+    return [
+        {
+            "role": "system",
+            "content": "You are a concise and structured assistant, that summarizes meeting transcripts.",
+        },
+        {"role": "user", "content": prompt},
+    ]
@@ -0,0 +1,232 @@
+"""Rate limit requests to the OpenAI-compliant API across worker processes.
+
+Token buckets stored in Redis limit the requests and tokens sent per minute, by
+kind of endpoint, and are shared by all worker processes. Rate limit headers of
+responses pause every process when the upstream API is, or is about to be,
+exhausted, instead of each of them retrying on its own.
+"""
+
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+import redis
+from celery.utils.log import get_task_logger
+
+from summary.core.summarization import estimate_tokens
+
+logger = get_task_logger(__name__)
+
+# Take the requested amount from every bucket if all of them hold enough, and
+# return 0, otherwise return the time to wait, in milliseconds.
+# KEYS: pause key, then bucket keys. ARGV: for each bucket, capacity, refill rate
+# per millisecond and requested amount.
+ACQUIRE_SCRIPT = """
+local time = redis.call("time")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local paused_until = tonumber(redis.call("get", KEYS[1]) or "0")
+if paused_until > now then
+    return paused_until - now
+end
+
+local wait = 0
+local levels = {}
+for i = 2, #KEYS do
+    local capacity = tonumber(ARGV[i * 3 - 5])
+    local rate = tonumber(ARGV[i * 3 - 4])
+    local requested = math.min(tonumber(ARGV[i * 3 - 3]), capacity)
+    local state = redis.call("hmget", KEYS[i], "level", "updated_at")
+    local level = tonumber(state[1]) or capacity
+    local updated_at = tonumber(state[2]) or now
+    level = math.min(capacity, level + (now - updated_at) * rate)
+    if level < requested then
+        wait = math.max(wait, math.ceil((requested - level) / rate))
+    end
+    levels[i] = level - requested
+end
+
+if wait > 0 then
+    return wait
+end
+
+for i = 2, #KEYS do
+    local capacity = tonumber(ARGV[i * 3 - 5])
+    local rate = tonumber(ARGV[i * 3 - 4])
+    redis.call("hset", KEYS[i], "level", levels[i], "updated_at", now)
+    redis.call("pexpire", KEYS[i], math.ceil(capacity / rate))
+end
+return 0
+"""
+
+# Pause all processes for ARGV[1] milliseconds, unless already paused for longer
+PAUSE_SCRIPT = """
+local time = redis.call("time")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local until_ = now + tonumber(ARGV[1])
+if until_ > tonumber(redis.call("get", KEYS[1]) or "0") then
+    redis.call("set", KEYS[1], until_, "px", ARGV[1])
+end
+return 0
+"""
+
+DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+# Tokens expected to be generated when a completion request sets no maximum
+DEFAULT_COMPLETION_TOKENS = 1024
+
+
+@dataclass(frozen=True)
+class Limit:
+    """A token bucket holding `capacity` units, refilled over `period` seconds."""
+
+    capacity: int
+    period: float = 60
+
+    @property
+    def rate(self) -> float:
+        """Return the refill rate of the bucket, per millisecond."""
+        return self.capacity / (self.period * 1000)
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse a duration like "1s", "6m0s" or "20ms" into seconds."""
+    matches = DURATION.findall(value or "")
+    if not matches:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in matches)
+
+
+def get_retry_delay(headers) -> Optional[float]:
+    """Return how long to pause before the next request, from response headers."""
+    if "retry-after-ms" in headers:
+        return parse_duration(headers["retry-after-ms"] + "ms")
+    if "retry-after" in headers:
+        return parse_duration(headers["retry-after"])
+
+    # Pause until the reset of an exhausted limit, before being rejected
+    delays = [
+        parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+        for kind in ("requests", "tokens")
+        if headers.get(f"x-ratelimit-remaining-{kind}") == "0"
+    ]
+    delays = [delay for delay in delays if delay]
+    return max(delays) if delays else None
+
+
+def estimate_request_tokens(request: httpx.Request) -> int:
+    """Estimate the tokens consumed by a chat completion request."""
+    try:
+        body = json.loads(request.content)
+    except (ValueError, httpx.RequestNotRead):
+        return 0
+
+    prompt = "".join(
+        message.get("content") or ""
+        for message in body.get("messages", [])
+        if isinstance(message.get("content"), str)
+    )
+    completion = body.get("max_completion_tokens") or body.get("max_tokens")
+    return estimate_tokens(prompt) + (completion or DEFAULT_COMPLETION_TOKENS)
+
+
+class RateLimiter:
+    """Distributed token-bucket rate limiter, shared through Redis."""
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        name: str,
+        limits: Dict[str, Limit],
+        max_wait: float = 60,
+    ):
+        """Initialize a limiter with a limit per unit, like requests or tokens."""
+        self.client = client
+        self.prefix = f"summary:ratelimit:{name}"
+        self.limits = limits
+        self.max_wait = max_wait
+        self._acquire = client.register_script(ACQUIRE_SCRIPT)
+        self._pause = client.register_script(PAUSE_SCRIPT)
+
+    def acquire(self, **amounts) -> float:
+        """Wait until every bucket holds the given amounts, and take them.
+
+        Return the time waited, in seconds. Requests are let through, rather than
+        failed, if Redis is unavailable or after `max_wait` seconds.
+        """
+        units = [unit for unit in self.limits if amounts.get(unit)]
+        keys = [f"{self.prefix}:paused"] + [f"{self.prefix}:{u}" for u in units]
+        args = []
+        for unit in units:
+            args += [self.limits[unit].capacity, self.limits[unit].rate, amounts[unit]]
+
+        start = time.monotonic()
+        while (waited := time.monotonic() - start) < self.max_wait:
+            try:
+                wait = self._acquire(keys=keys, args=args)
+            except redis.RedisError as e:
+                logger.warning("Rate limiter %s unavailable: %s", self.prefix, e)
+                return waited
+            if not wait:
+                return waited
+            # Jitter spreads the processes waiting for the same refill
+            time.sleep(min(wait / 1000 * random.uniform(1, 1.2), self.max_wait))  # noqa: S311
+
+        logger.warning("Rate limiter %s waited over %ss", self.prefix, self.max_wait)
+        return waited
+
+    def pause(self, seconds: float):
+        """Pause all processes for some time, unless already paused for longer."""
+        try:
+            self._pause(
+                keys=[f"{self.prefix}:paused"], args=[max(int(seconds * 1000), 1)]
+            )
+        except redis.RedisError as e:
+            logger.warning("Rate limiter %s unavailable: %s", self.prefix, e)
+
+
+class OpenAIRateLimiter:
+    """Rate limit the requests of an OpenAI client, through its HTTP event hooks."""
+
+    def __init__(self, limiters: Dict[str, RateLimiter]):
+        """Initialize with a limiter per kind of endpoint, "chat" or "audio"."""
+        self.limiters = limiters
+
+    def _get_limiter(self, request: httpx.Request) -> Optional[RateLimiter]:
+        if request.url.path.endswith("/chat/completions"):
+            return self.limiters.get("chat")
+        if "/audio/" in request.url.path:
+            return self.limiters.get("audio")
+        return None
+
+    def before_request(self, request: httpx.Request):
+        """Wait for the rate limits before sending a request."""
+        limiter = self._get_limiter(request)
+        if limiter is None:
+            return
+
+        tokens = estimate_request_tokens(request) if "tokens" in limiter.limits else 0
+        waited = limiter.acquire(requests=1, tokens=tokens)
+        if waited:
+            logger.debug("Rate limited %s for %.2fs", request.url.path, waited)
+
+    def after_response(self, response: httpx.Response):
+        """Pause all processes if the upstream API asks to, or is exhausted."""
+        limiter = self._get_limiter(response.request)
+        if limiter is None:
+            return
+
+        delay = get_retry_delay(response.headers)
+        if delay is None and response.status_code == httpx.codes.TOO_MANY_REQUESTS:
+            delay = 1
+        if delay:
+            logger.info("Upstream rate limit reached, pausing for %.2fs", delay)
+            limiter.pause(delay)
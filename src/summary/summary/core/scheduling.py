@@ -0,0 +1,94 @@
+"""Schedule summary jobs according to their size and to their user's other jobs.
+
+Jobs are routed to queues for short or long recordings, estimated from the
+recording size, so that long meetings do not delay short ones. Within a queue,
+jobs of users with several jobs in progress get a lower priority, so that one
+user cannot monopolise the workers.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import redis
+
+SHORT = "short"
+LONG = "long"
+
+# Priorities of the Redis transport, 0 being the highest
+MAX_PRIORITY = 9
+
+# Decrement the number of jobs of a user, without going below zero, only once
+# per job, as several callbacks may report the end of a same job
+REMOVE_JOB_SCRIPT = """
+if not redis.call("set", KEYS[2], 1, "NX", "EX", ARGV[1]) then
+    return false
+end
+local jobs = redis.call("decr", KEYS[1])
+if jobs <= 0 then
+    redis.call("del", KEYS[1])
+end
+return jobs
+"""
+
+
+@dataclass(frozen=True)
+class Schedule:
+    """Queue suffix and priority of a job."""
+
+    size: str
+    priority: int
+
+
+def estimate_duration(size: int, bitrate: int) -> float:
+    """Estimate the duration of a recording, in seconds, from its size in bytes."""
+    return size * 8 / bitrate
+
+
+def get_user_jobs_key(sub: str) -> str:
+    """Return the name of the counter of jobs in progress for a user."""
+    return f"summary:jobs:{sub}"
+
+
+def get_removed_job_key(job_id: str) -> str:
+    """Return the name of the marker of a job uncounted from its user's jobs."""
+    return f"summary:jobs:removed:{job_id}"
+
+
+def add_user_job(client: redis.Redis, sub: str, ttl: int) -> int:
+    """Count a new job of a user, returning their number of jobs in progress."""
+    key = get_user_jobs_key(sub)
+    pipe = client.pipeline()
+    pipe.incr(key)
+    pipe.expire(key, ttl)
+    return pipe.execute()[0]
+
+
+def remove_user_job(client: redis.Redis, sub: str, job_id: str, ttl: int):
+    """Uncount a job of a user, once it succeeded or failed.
+
+    Jobs are uncounted once, however many times their end is reported, as long
+    as their marker lives for `ttl` seconds.
+    """
+    client.eval(
+        REMOVE_JOB_SCRIPT,
+        2,
+        get_user_jobs_key(sub),
+        get_removed_job_key(job_id),
+        ttl,
+    )
+
+
+def get_schedule(
+    size: Optional[int], user_jobs: int, bitrate: int, short_max_duration: float
+) -> Schedule:
+    """Return the schedule of a job, given its recording size and its user's jobs.
+
+    Recordings of unknown size are handled as long ones.
+    """
+    is_short = (
+        size is not None and estimate_duration(size, bitrate) <= short_max_duration
+    )
+    return Schedule(
+        size=SHORT if is_short else LONG,
+        priority=min(max(user_jobs - 1, 0), MAX_PRIORITY),
+    )
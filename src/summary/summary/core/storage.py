@@ -0,0 +1,43 @@
+"""Persist the intermediate results of the summary pipeline in object storage."""
+
+import io
+
+from minio.deleteobjects import DeleteObject
+
+
+def get_intermediate_name(prefix: str, pipeline_id: str, name: str) -> str:
+    """Return the object name of an intermediate result of a pipeline."""
+    return f"{prefix}/{pipeline_id}/{name}"
+
+
+def save_text(client, bucket_name: str, object_name: str, text: str):
+    """Save a text to an object, replacing it if it exists."""
+    data = text.encode("utf-8")
+    client.put_object(
+        bucket_name,
+        object_name,
+        io.BytesIO(data),
+        length=len(data),
+        content_type="text/plain; charset=utf-8",
+    )
+
+
+def load_text(client, bucket_name: str, object_name: str) -> str:
+    """Load a text saved to an object."""
+    response = client.get_object(bucket_name, object_name)
+    try:
+        return response.read().decode("utf-8")
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def delete_objects(client, bucket_name: str, prefix: str):
+    """Delete all objects whose name starts with a prefix."""
+    objects = client.list_objects(bucket_name, prefix=prefix, recursive=True)
+    errors = client.remove_objects(
+        bucket_name, (DeleteObject(obj.object_name) for obj in objects)
+    )
+    # Deletion is lazy, errors must be consumed for objects to be deleted
+    for error in errors:
+        raise RuntimeError(f"Failed to delete {error.name}: {error.message}")
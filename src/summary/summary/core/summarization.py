@@ -0,0 +1,186 @@
+"""Summarize transcripts too long for a single chat completion, with map-reduce.
+
+The transcript is split into segments fitting a token budget, notes are taken on
+segments in parallel, then merged in order into the meeting minutes.
+"""
+
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from celery.utils.log import get_task_logger
+
+from summary.core.prompt import (
+    get_instructions,
+    get_merge_instructions,
+    get_segment_instructions,
+)
+
+logger = get_task_logger(__name__)
+
+# Rough average for Latin languages, which avoids depending on the model tokenizer
+CHARS_PER_TOKEN = 4
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _split_sentence(sentence: str, max_tokens: int) -> List[str]:
+    """Split a sentence longer than the token budget on whitespaces."""
+    parts, current = [], []
+    for word in sentence.split():
+        if current and estimate_tokens(" ".join([*current, word])) > max_tokens:
+            parts.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+def split_transcript(transcript: str, max_tokens: int) -> List[str]:
+    """Split a transcript into segments of at most `max_tokens`, between sentences."""
+    segments, current, current_tokens = [], [], 0
+
+    for sentence in SENTENCE_BOUNDARY.split(transcript.strip()):
+        for part in _split_sentence(sentence, max_tokens):
+            tokens = estimate_tokens(part) + 1
+            if current and current_tokens + tokens > max_tokens:
+                segments.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += tokens
+
+    if current:
+        segments.append(" ".join(current))
+    return segments
+
+
+def get_completion_options(settings) -> dict:
+    """Return the sampling options of the LLM completions which are set."""
+    options = {
+        "temperature": settings.summary_temperature,
+        "seed": settings.summary_seed,
+    }
+    return {name: value for name, value in options.items() if value is not None}
+
+
+def _group_notes(notes: List[str], max_tokens: int) -> List[List[str]]:
+    """Group consecutive notes in batches fitting the token budget, keeping order.
+
+    Batches hold at least two notes, so that each merge round reduces their number.
+    """
+    groups, current, current_tokens = [], [], 0
+
+    for note in notes:
+        tokens = estimate_tokens(note)
+        if len(current) >= 2 and current_tokens + tokens > max_tokens:  # noqa: PLR2004
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(note)
+        current_tokens += tokens
+
+    if current:
+        groups.append(current)
+    return groups
+
+
+class Summarizer:
+    """Summarize transcripts with an OpenAI-compliant API's LLM."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        client,
+        model: str,
+        max_tokens: int,
+        max_workers: int,
+        on_completion: Optional[Callable[[int], None]] = None,
+        completion_options: Optional[dict] = None,
+    ):
+        """Initialize the summarizer with its LLM and its budgets.
+
+        `on_completion` is called with the number of tokens generated by each
+        chat completion, to report progress. `completion_options`, such as the
+        temperature or seed, are passed to every chat completion.
+        """
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_workers = max_workers
+        self.on_completion = on_completion
+        self.completion_options = completion_options or {}
+
+    def complete(self, messages, on_partial=None) -> str:
+        """Query a chat completion.
+
+        With `on_partial`, the completion is streamed, and the callback is called
+        with the text generated so far each time it grows.
+        """
+        if on_partial is not None:
+            return self._stream(messages, on_partial)
+
+        response = self.client.chat.completions.create(
+            model=self.model, messages=messages, **self.completion_options
+        )
+        if self.on_completion is not None:
+            usage = response.usage
+            self.on_completion(usage.completion_tokens if usage else 0)
+        return response.choices[0].message.content
+
+    def _stream(self, messages, on_partial) -> str:
+        """Stream a chat completion, reporting the text generated so far."""
+        stream = self.client.chat.completions.create(
+            model=self.model, messages=messages, stream=True, **self.completion_options
+        )
+        parts = []
+        for chunk in stream:
+            content = chunk.choices[0].delta.content if chunk.choices else None
+            if content:
+                parts.append(content)
+                on_partial("".join(parts))
+
+        text = "".join(parts)
+        # Usage is not sent by every API when streaming, it is estimated instead
+        if self.on_completion is not None:
+            self.on_completion(estimate_tokens(text))
+        return text
+
+    def _map(self, instructions: List[list]) -> List[str]:
+        """Query chat completions in parallel, returning results in order."""
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="summarization"
+        ) as executor:
+            return list(executor.map(self.complete, instructions))
+
+    def summarize(self, transcript: str, on_partial=None) -> str:
+        """Summarize a transcript into the meeting minutes.
+
+        With `on_partial`, the final completion, which writes the minutes, is
+        streamed to the callback.
+        """
+        if estimate_tokens(transcript) <= self.max_tokens:
+            return self.complete(get_instructions(transcript), on_partial)
+
+        segments = split_transcript(transcript, self.max_tokens)
+        logger.info("Summarizing transcript in %s segments", len(segments))
+
+        notes = self._map(
+            [
+                get_segment_instructions(segment, index, len(segments))
+                for index, segment in enumerate(segments)
+            ]
+        )
+
+        # Notes are merged in rounds until they all fit in a single completion
+        groups = _group_notes(notes, self.max_tokens)
+        while len(groups) > 1:
+            logger.info("Merging %s notes in %s groups", len(notes), len(groups))
+            notes = self._map([get_merge_instructions(group) for group in groups])
+            groups = _group_notes(notes, self.max_tokens)
+
+        return self.complete(get_merge_instructions(groups[0]), on_partial)
@@ -0,0 +1,243 @@
+"""Transcribe audio chunks in parallel and stitch their transcripts together."""
+
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from celery.utils.log import get_task_logger
+
+from summary.core.audio import AudioChunk
+from summary.core.engines import TranscriptionEngine
+
+logger = get_task_logger(__name__)
+
+# Words matched between the ends of consecutive transcripts for them to be
+# deduplicated, when they are not timed
+MIN_OVERLAP_WORDS = 3
+MIN_OVERLAP_WINDOW = 20
+PUNCTUATION = ".,;:!?…\"'"
+
+
+@dataclass
+class ChunkTranscript:
+    """Transcript of an audio chunk, with segments timed relatively to the chunk."""
+
+    index: int
+    start: float
+    end: float
+    text: str
+    segments: Optional[List[Tuple[float, float, str]]] = None
+
+
+def transcribe_chunk(engine: TranscriptionEngine, chunk: AudioChunk, timestamps: bool):
+    """Transcribe an audio chunk with a transcription engine."""
+    logger.debug(
+        "Transcribing chunk %s (%.1fs-%.1fs)", chunk.index, chunk.start, chunk.end
+    )
+
+    # Chunks trimmed to no audio hold no speech
+    if chunk.timestamp_map is not None and not chunk.size:
+        chunk.close()
+        return ChunkTranscript(
+            index=chunk.index,
+            start=chunk.start,
+            end=chunk.end,
+            text="",
+            segments=[] if timestamps else None,
+        )
+
+    try:
+        text, segments = engine.transcribe(
+            chunk.data, f"chunk-{chunk.index:05d}.ogg", timestamps
+        )
+    finally:
+        chunk.close()
+
+    if segments and chunk.timestamp_map:
+        # Timings of trimmed audio are restored on the recording's
+        to_original = chunk.timestamp_map.to_original
+        segments = [
+            (to_original(start), to_original(end), text)
+            for start, end, text in segments
+        ]
+
+    return ChunkTranscript(
+        index=chunk.index,
+        start=chunk.start,
+        end=chunk.end,
+        text=text,
+        segments=segments or None,
+    )
+
+
+def _get_kept_segments(
+    transcripts: List[ChunkTranscript], position: int, overlap: float
+) -> Iterator[Tuple[float, float, str]]:
+    """Return the segments of a transcript kept on its side of the overlaps' cuts.
+
+    Each overlap is cut in its middle: timed segments are kept by the chunk in
+    which their midpoint falls on its side of the cut. Segments are timed
+    relatively to the recording.
+    """
+    transcript = transcripts[position]
+    lower = transcript.start + overlap / 2 if position > 0 else float("-inf")
+    upper = (
+        transcripts[position + 1].start + overlap / 2
+        if position < len(transcripts) - 1
+        else float("inf")
+    )
+    for start, end, text in transcript.segments:
+        if lower <= transcript.start + (start + end) / 2 < upper:
+            yield transcript.start + start, transcript.start + end, text.strip()
+
+
+def _get_overlap_window(transcript: ChunkTranscript, overlap: float) -> int:
+    """Return the number of words that may have been spoken during an overlap."""
+    words_per_second = len(transcript.text.split()) / max(
+        transcript.end - transcript.start, 1
+    )
+    # Speech is not evenly spread, the window is widened accordingly
+    return max(math.ceil(words_per_second * overlap * 2), MIN_OVERLAP_WINDOW)
+
+
+def _join_overlapping_words(
+    previous: List[str], words: List[str], window: int
+) -> Tuple[List[str], List[str]]:
+    """Cut the words of two consecutive transcripts of overlapping audio.
+
+    The longest run of words shared by the end of the previous transcript and
+    the start of the next one is looked for. If found, the previous transcript
+    is cut before it and the next one keeps it. Return the words kept from each.
+    """
+    tail = previous[-window:]
+    head = words[:window]
+    # Words are compared regardless of case and punctuation, which vary at cuts
+    matcher = SequenceMatcher(
+        None,
+        [word.lower().strip(PUNCTUATION) for word in tail],
+        [word.lower().strip(PUNCTUATION) for word in head],
+        autojunk=False,
+    )
+    match = matcher.find_longest_match(0, len(tail), 0, len(head))
+    if match.size < MIN_OVERLAP_WORDS:
+        return previous, words
+
+    cut = len(previous) - len(tail) + match.a
+    return previous[:cut], words[match.b :]
+
+
+def stitch_transcripts(transcripts: List[ChunkTranscript], overlap: float) -> str:
+    """Join chunk transcripts in order, deduplicating overlapping audio.
+
+    Transcripts without segments are deduplicated on the words shared by their
+    start and the end of the previous transcript.
+    """
+    transcripts = sorted(transcripts, key=lambda transcript: transcript.index)
+    words = []
+
+    for position, transcript in enumerate(transcripts):
+        if transcript.segments is None:
+            chunk_words = transcript.text.split()
+            if position > 0 and overlap:
+                words, chunk_words = _join_overlapping_words(
+                    words, chunk_words, _get_overlap_window(transcript, overlap)
+                )
+            words.extend(chunk_words)
+            continue
+        for _, _, text in _get_kept_segments(transcripts, position, overlap):
+            words.extend(text.split())
+
+    return " ".join(words)
+
+
+def stitch_segments(
+    transcripts: List[ChunkTranscript], overlap: float
+) -> List[Tuple[float, float, str]]:
+    """Join the timed segments of chunk transcripts, deduplicating overlapping audio.
+
+    Transcripts without segments make a single segment spanning their chunk,
+    deduplicated like by `stitch_transcripts` with the previous segment.
+    """
+    transcripts = sorted(transcripts, key=lambda transcript: transcript.index)
+    segments = []
+
+    for position, transcript in enumerate(transcripts):
+        if transcript.segments is None:
+            words = transcript.text.split()
+            if segments and overlap:
+                start, end, text = segments.pop()
+                previous, words = _join_overlapping_words(
+                    text.split(), words, _get_overlap_window(transcript, overlap)
+                )
+                segments.append((start, end, " ".join(previous)))
+            segments.append((transcript.start, transcript.end, " ".join(words)))
+            continue
+        segments.extend(_get_kept_segments(transcripts, position, overlap))
+
+    return [segment for segment in segments if segment[2]]
+
+
+def merge_speaker_segments(
+    speaker_segments: List[Tuple[str, List[Tuple[float, float, str]]]],
+) -> str:
+    """Merge the timed segments of several speakers into a labelled transcript.
+
+    Segments are ordered by start time, and consecutive segments of a speaker are
+    joined, each speaker turn making a line prefixed with the speaker's name.
+    """
+    segments = sorted(
+        (start, end, speaker, text)
+        for speaker, segments in speaker_segments
+        for start, end, text in segments
+    )
+
+    turns = []
+    for _, _, speaker, text in segments:
+        if turns and turns[-1][0] == speaker:
+            turns[-1][1].append(text)
+        else:
+            turns.append((speaker, [text]))
+
+    return "\n".join(f"{speaker}: {' '.join(texts)}" for speaker, texts in turns)
+
+
+def transcribe(
+    engine: TranscriptionEngine,
+    chunks: Iterable[AudioChunk],
+    *,
+    max_workers: int,
+    timestamps: bool = True,
+) -> Iterator[ChunkTranscript]:
+    """Transcribe audio chunks in parallel, as they are produced.
+
+    Transcripts are yielded as soon as they are complete, in any order. At most
+    `max_workers` chunks are transcribed at once, and as many wait for a worker,
+    which bounds the audio held in memory while chunks are downloaded.
+    """
+    slots = threading.BoundedSemaphore(max_workers * 2)
+    pending = set()
+    count = 0
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="transcription"
+    ) as executor:
+        for chunk in chunks:
+            slots.acquire()
+            future = executor.submit(transcribe_chunk, engine, chunk, timestamps)
+            future.add_done_callback(lambda _future: slots.release())
+            pending.add(future)
+
+            done = {future for future in pending if future.done()}
+            pending -= done
+            for future in done:
+                count += 1
+                yield future.result()
+
+        for future in as_completed(pending):
+            count += 1
+            yield future.result()
+
+    logger.info("Transcribed %s chunks", count)
@@ -0,0 +1,240 @@
+"""Deliver task results to webhooks over pooled, persistent connections.
+
+Each worker process saves the latency histograms of its deliveries in Redis, to
+be merged across processes by the API.
+"""
+
+import bisect
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Union
+from urllib.parse import urlsplit
+
+import redis
+import redis.asyncio
+from celery.utils.log import get_task_logger
+from requests import RequestException, Response, Session
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+logger = get_task_logger(__name__)
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class LatencyHistogram:
+    """Thread-safe cumulative histogram of latencies, Prometheus-style."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """Initialize an empty histogram with the given bucket upper bounds."""
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record a latency, in seconds."""
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        """Return the cumulative count of each bucket, the count and the sum."""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+
+        cumulative, buckets = 0, {}
+        for bound, count in zip([*self.buckets, "+Inf"], counts, strict=True):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"buckets": buckets, "count": cumulative, "sum": total}
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    """Merge histogram snapshots of the same buckets, from several processes."""
+    merged = {"buckets": {}, "count": 0, "sum": 0.0}
+    for snapshot in snapshots:
+        for bound, count in snapshot["buckets"].items():
+            merged["buckets"][bound] = merged["buckets"].get(bound, 0) + count
+        merged["count"] += snapshot["count"]
+        merged["sum"] += snapshot["sum"]
+    return merged
+
+
+def get_stats_key(worker: str) -> str:
+    """Return the key of the delivery latencies of a worker process."""
+    return f"summary:webhook:stats:{worker}"
+
+
+def save_stats(client: redis.Redis, worker: str, stats: Dict[str, dict], ttl: int):
+    """Save the delivery latencies of a worker process, on a best effort basis.
+
+    They expire after `ttl`, once the process stopped delivering.
+    """
+    try:
+        client.set(get_stats_key(worker), json.dumps(stats), ex=ttl)
+    except redis.RedisError as e:
+        logger.warning("Failed to save webhook delivery latencies: %s", e)
+
+
+async def get_stats(client: redis.asyncio.Redis) -> Dict[str, dict]:
+    """Return the delivery latency histograms of all worker processes, by host."""
+    by_host = defaultdict(list)
+    async for key in client.scan_iter(match=get_stats_key("*")):
+        data = await client.get(key)
+        # The stats of a process may expire while scanning
+        if data is None:
+            continue
+        for host, snapshot in json.loads(data).items():
+            by_host[host].append(snapshot)
+    return {host: merge_snapshots(snapshots) for host, snapshots in by_host.items()}
+
+
+class WebhookClient:
+    """Webhook delivery client, shared by the tasks of a process.
+
+    Connections are pooled and kept alive between deliveries, retried for both
+    HTTP and HTTPS, and at most `max_per_host` deliveries are in flight to a host,
+    whether results are delivered one at a time or in batches.
+    """
+
+    def __init__(self, settings):
+        """Initialize the session and the per-host limits from the settings."""
+        self.timeout = settings.webhook_timeout
+        self.max_per_host = settings.webhook_max_connections_per_host
+
+        retries = Retry(
+            total=settings.webhook_max_retries,
+            backoff_factor=settings.webhook_backoff_factor,
+            status_forcelist=settings.webhook_status_forcelist,
+            allowed_methods={"POST"},
+        )
+        adapter = HTTPAdapter(
+            pool_connections=settings.webhook_pool_connections,
+            pool_maxsize=self.max_per_host,
+            max_retries=retries,
+        )
+
+        self.session = Session()
+        self.session.headers.update(
+            {"Authorization": f"Bearer {settings.webhook_api_token}"}
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        self.latencies: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+
+    def _get_host_slots(self, host: str) -> threading.BoundedSemaphore:
+        """Return the semaphore capping concurrent deliveries to a host."""
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def post(self, url: str, data) -> Response:
+        """Deliver a result to a webhook, raising if delivery eventually fails."""
+        host = urlsplit(url).netloc
+
+        with self._get_host_slots(host):
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, json=data, timeout=self.timeout)
+            finally:
+                with self._lock:
+                    histogram = self.latencies[host]
+                histogram.observe(time.perf_counter() - start)
+
+        response.raise_for_status()
+        return response
+
+    def post_many(
+        self, url: str, payloads: List
+    ) -> List[Union[Response, RequestException]]:
+        """Deliver several results to the same webhook, over the pooled connections.
+
+        Deliveries are sent concurrently, within the per-host cap. Return the
+        response of each delivery in order, or its exception if it eventually failed.
+        """
+
+        def deliver(data):
+            try:
+                return self.post(url, data)
+            except RequestException as e:
+                logger.warning("Webhook delivery to %s failed: %s", url, e)
+                return e
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_per_host, thread_name_prefix="webhook"
+        ) as executor:
+            return list(executor.map(deliver, payloads))
+
+    def stats(self) -> Dict[str, dict]:
+        """Return the delivery latency histograms, by host."""
+        with self._lock:
+            latencies = dict(self.latencies)
+        return {host: histogram.snapshot() for host, histogram in latencies.items()}
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+
+class ThrottledDelivery:
+    """Deliver successive versions of a result in the background, to a webhook.
+
+    At most one version is delivered per `interval` seconds, the latest one, so
+    that a slow webhook never holds back the producer of the versions.
+    """
+
+    def __init__(self, client: WebhookClient, url: str, interval: float):
+        """Start the background delivery of the versions to a webhook."""
+        self.client = client
+        self.url = url
+        self.interval = interval
+        self._pending = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name="webhook-throttled", daemon=True
+        )
+        self._thread.start()
+
+    def update(self, data):
+        """Replace the version waiting to be delivered."""
+        with self._condition:
+            self._pending = data
+            self._condition.notify()
+
+    def _run(self):
+        last_delivery = time.monotonic()
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+
+                delay = last_delivery + self.interval - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                data, self._pending = self._pending, None
+
+            try:
+                self.client.post(self.url, data)
+            except RequestException as e:
+                logger.warning("Webhook delivery to %s failed: %s", self.url, e)
+            last_delivery = time.monotonic()
+
+    def close(self):
+        """Stop delivering, dropping the version waiting to be delivered, if any."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
@@ -0,0 +1,17 @@
+"""Configure the tests of the summary service."""
+
+import os
+
+# Settings required by the modules reading them on import, none of the tests
+# connecting to the services they point to
+for name, value in {
+    "APP_API_TOKEN": "token",
+    "AWS_STORAGE_BUCKET_NAME": "bucket",
+    "AWS_S3_ENDPOINT_URL": "minio:9000",
+    "AWS_S3_ACCESS_KEY_ID": "access",
+    "AWS_S3_SECRET_ACCESS_KEY": "secret",
+    "OPENAI_API_KEY": "key",
+    "WEBHOOK_API_TOKEN": "token",
+    "WEBHOOK_URL": "http://webhook/",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,22 @@
+"""Build synthetic Ogg Opus streams, made of pages without actual audio."""
+
+from summary.core.audio import OGG_HEADER, OPUS_GRANULE_RATE
+
+
+def build_page(granule_position: int, body: bytes) -> bytes:
+    """Build an Ogg page, without checksum, holding a single packet."""
+    segments = [255] * (len(body) // 255) + [len(body) % 255]
+    return (
+        OGG_HEADER.pack(b"OggS", 0, 0, granule_position, 1, 0, 0, len(segments))
+        + bytes(segments)
+        + body
+    )
+
+
+def build_stream(seconds: int, page_size: int = 100) -> bytes:
+    """Build an Ogg Opus stream of one page per second of audio."""
+    header = build_page(0, b"OpusHead" + bytes(11)) + build_page(0, b"OpusTags")
+    return header + b"".join(
+        build_page(second * OPUS_GRANULE_RATE, bytes([second % 256]) * page_size)
+        for second in range(1, seconds + 1)
+    )
@@ -0,0 +1,189 @@
+"""Test the splitting of Ogg recordings into chunks."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from summary.core.audio import (
+    TimestampMap,
+    iter_pages,
+    read_object_ranges,
+    split_in_chunks,
+)
+from tests.ogg import build_stream
+
+
+def slices(data: bytes, size: int):
+    """Slice bytes in blocks of a given size."""
+    return [data[offset : offset + size] for offset in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 100, 10_000])
+def test_iter_pages_any_slicing(block_size):
+    """Pages should be parsed whatever the way the stream is sliced."""
+    data = build_stream(10)
+
+    pages = list(iter_pages(slices(data, block_size)))
+
+    assert len(pages) == 12
+    assert b"".join(page.data for page in pages) == data
+    assert [page.granule_position for page in pages[2:]] == [
+        second * 48000 for second in range(1, 11)
+    ]
+    assert pages[0].body.startswith(b"OpusHead")
+
+
+def test_iter_pages_truncated():
+    """A stream ending in the middle of a page should be rejected."""
+    with pytest.raises(ValueError, match="Truncated"):
+        list(iter_pages([build_stream(2)[:-10]]))
+
+
+def test_iter_pages_invalid():
+    """Bytes which are not Ogg pages should be rejected."""
+    with pytest.raises(ValueError, match="Invalid Ogg page"):
+        list(iter_pages([b"RIFF" + bytes(100)]))
+
+
+def test_split_in_chunks_overlap():
+    """Chunks should cover the recording, overlapping by the given duration."""
+    chunks = list(
+        split_in_chunks(
+            iter_pages([build_stream(25)]), duration=10, overlap=2, spool_size=1024
+        )
+    )
+
+    assert [(chunk.index, chunk.start, chunk.end) for chunk in chunks] == [
+        (0, 0, 10),
+        (1, 8, 18),
+        (2, 16, 25),
+    ]
+    for chunk in chunks:
+        pages = list(iter_pages([chunk.data.read()]))
+        # Each chunk is a standalone stream, starting with the header pages
+        assert pages[0].body.startswith(b"OpusHead")
+        assert pages[1].body.startswith(b"OpusTags")
+        assert [page.granule_position // 48000 for page in pages[2:]] == list(
+            range(int(chunk.start) + 1, int(chunk.end) + 1)
+        )
+        chunk.close()
+
+
+def test_split_in_chunks_last_chunk_within_overlap():
+    """No chunk should be made of audio already held by the previous one."""
+    chunks = list(
+        split_in_chunks(
+            iter_pages([build_stream(19)]), duration=10, overlap=2, spool_size=1024
+        )
+    )
+
+    assert [(chunk.start, chunk.end) for chunk in chunks] == [
+        (0, 10),
+        (8, 18),
+        (16, 19),
+    ]
+
+    chunks = list(
+        split_in_chunks(
+            iter_pages([build_stream(18)]), duration=10, overlap=2, spool_size=1024
+        )
+    )
+
+    assert [(chunk.start, chunk.end) for chunk in chunks] == [(0, 10), (8, 18)]
+
+
+def test_split_in_chunks_spool():
+    """Chunks should be held in memory up to the spool size, on disk above it."""
+    chunks = list(
+        split_in_chunks(
+            iter_pages([build_stream(20, page_size=1000)]),
+            duration=10,
+            overlap=0,
+            spool_size=5000,
+        )
+    )
+
+    assert [chunk.data._rolled for chunk in chunks] == [True, True]
+    assert all(chunk.size > 10_000 for chunk in chunks)
+
+    chunks = list(
+        split_in_chunks(
+            iter_pages([build_stream(20)]), duration=10, overlap=0, spool_size=5000
+        )
+    )
+
+    assert [chunk.data._rolled for chunk in chunks] == [False, False]
+
+
+def test_split_in_chunks_invalid_overlap():
+    """Overlaps as long as chunks should be rejected."""
+    with pytest.raises(ValueError, match="overlap"):
+        list(split_in_chunks(iter([]), duration=10, overlap=10, spool_size=1024))
+
+
+class FakeResponse:
+    """Response of a Minio get_object call."""
+
+    def __init__(self, data: bytes):
+        """Initialize the response with its data."""
+        self.data = data
+
+    def read(self) -> bytes:
+        """Return the data."""
+        return self.data
+
+    def close(self):
+        """Close the response."""
+
+    def release_conn(self):
+        """Release the connection."""
+
+
+class FakeMinio:
+    """Minio client holding a single object, recording its calls."""
+
+    def __init__(self, data: bytes):
+        """Initialize the client with the object data."""
+        self.data = data
+        self.calls = []
+
+    def stat_object(self, bucket_name, object_name):
+        """Return the size of the object."""
+        self.calls.append("stat_object")
+        return SimpleNamespace(size=len(self.data))
+
+    def get_object(self, bucket_name, object_name, offset, length):
+        """Return a range of the object."""
+        self.calls.append("get_object")
+        return FakeResponse(self.data[offset : offset + length])
+
+
+def test_read_object_ranges():
+    """Objects should be read in ranges, stat only if their size is not given."""
+    client = FakeMinio(bytes(range(250)))
+
+    assert b"".join(read_object_ranges(client, "bucket", "name", 100)) == bytes(
+        range(250)
+    )
+    assert client.calls == ["stat_object"] + ["get_object"] * 3
+
+    client.calls.clear()
+    ranges = list(read_object_ranges(client, "bucket", "name", 100, size=250))
+    assert [len(data) for data in ranges] == [100, 100, 50]
+    assert client.calls == ["get_object"] * 3
+
+
+@pytest.mark.parametrize(
+    ("timestamp", "original"),
+    [(0, 2), (1.5, 3.5), (3, 10), (4.5, 11.5), (10, 17)],
+)
+def test_timestamp_map_to_original(timestamp, original):
+    """Timestamps should be shifted by the silences cut before them."""
+    timestamp_map = TimestampMap(spans=[(0, 2), (3, 10)])
+
+    assert timestamp_map.to_original(timestamp) == original
+
+
+def test_timestamp_map_empty():
+    """Timestamps of audio which was not trimmed should be kept."""
+    assert TimestampMap().to_original(4.2) == 4.2
@@ -0,0 +1,170 @@
+"""Test the cache of the results of the pipeline stages, keyed on their inputs."""
+
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+import redis
+
+from summary.core import celery_worker
+from summary.core.cache import ResultCache, get_content_key
+
+
+class FakeRedis:
+    """Redis client holding keys in memory, with the TTL they were last given."""
+
+    def __init__(self, error=None):
+        """Initialize the client without any key, failing with `error` if given."""
+        self.values = {}
+        self.ttls = {}
+        self.error = error
+
+    def getex(self, key, ex=None):
+        """Return the value of a key, refreshing its TTL."""
+        if self.error:
+            raise self.error
+        if key in self.values:
+            self.ttls[key] = ex
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        """Set a key with its TTL."""
+        if self.error:
+            raise self.error
+        self.values[key] = value
+        self.ttls[key] = ex
+
+
+def test_get_content_key():
+    """Keys should identify their parts, in order and without ambiguity."""
+    key = get_content_key("etag", "openai", 60, True)
+
+    assert key == get_content_key("etag", "openai", 60, True)
+    assert key != get_content_key("etag", "openai", 60, False)
+    assert key != get_content_key("openai", "etag", 60, True)
+    assert get_content_key("a", "bc") != get_content_key("ab", "c")
+
+
+def test_result_cache_miss_then_hit():
+    """Results should be missing until cached, then returned."""
+    cache = ResultCache(FakeRedis(), ttl=60)
+
+    assert cache.get("transcript", "key") is None
+    cache.set("transcript", "key", "Bonjour à tous")
+
+    assert cache.get("transcript", "key") == "Bonjour à tous"
+    # Results of other kinds are cached apart
+    assert cache.get("summary", "key") is None
+
+
+def test_result_cache_ttl():
+    """Entries should expire after the TTL, refreshed on each hit."""
+    client = FakeRedis()
+    cache = ResultCache(client, ttl=60, prefix="cache")
+
+    cache.set("transcript", "key", "text")
+    assert client.ttls == {"cache:transcript:key": 60}
+
+    client.ttls.clear()
+    cache.get("transcript", "key")
+    assert client.ttls == {"cache:transcript:key": 60}
+
+
+def test_result_cache_disabled():
+    """A disabled cache should neither read nor write results."""
+    client = FakeRedis()
+    cache = ResultCache(client, ttl=60, enabled=False)
+
+    cache.set("transcript", "key", "text")
+
+    assert client.values == {}
+    assert cache.get("transcript", "key") is None
+
+
+def test_result_cache_errors_missed():
+    """Redis errors should be handled as cache misses."""
+    cache = ResultCache(FakeRedis(error=redis.ConnectionError()), ttl=60)
+
+    cache.set("transcript", "key", "text")
+
+    assert cache.get("transcript", "key") is None
+
+
+class FakeTracker:
+    """Progress tracker ignoring the stages."""
+
+    @contextlib.contextmanager
+    def stage(self, _stage, totals=None, retry_on=()):
+        """Track nothing."""
+        yield
+
+    def end(self, _stage):
+        """Track nothing."""
+
+
+class FakeMinio:
+    """Minio client of an audio file of a given ETag, keeping the objects saved."""
+
+    def __init__(self, etag):
+        """Initialize the client with the ETag of its audio file."""
+        self.etag = etag
+        self.objects = {}
+
+    def stat_object(self, _bucket_name, object_name):
+        """Return the stat of the audio file."""
+        return SimpleNamespace(object_name=object_name, etag=self.etag)
+
+    def put_object(self, _bucket_name, object_name, data, **_kwargs):
+        """Keep the text of an object."""
+        self.objects[object_name] = data.read().decode("utf-8")
+
+
+@pytest.fixture
+def transcription(monkeypatch):
+    """Transcribe audio files through the cache, recording the transcriptions."""
+    cache = ResultCache(FakeRedis(), ttl=60)
+    monkeypatch.setattr(celery_worker, "get_cache", lambda: cache)
+    monkeypatch.setattr(celery_worker, "get_tracker", lambda _id: FakeTracker())
+    monkeypatch.setattr(
+        celery_worker,
+        "get_transcription_engine",
+        lambda: SimpleNamespace(name="openai"),
+    )
+
+    transcribed = []
+
+    def transcribe_recording(_minio_client, stat, *_args):
+        transcribed.append(stat.object_name)
+        return []
+
+    monkeypatch.setattr(celery_worker, "transcribe_recording", transcribe_recording)
+    monkeypatch.setattr(
+        celery_worker, "stitch_transcripts", lambda _chunks, _overlap: "Bonjour"
+    )
+
+    def transcribe(minio_client, filename):
+        monkeypatch.setattr(celery_worker, "get_minio_client", lambda: minio_client)
+        transcript_name = celery_worker.transcribe_audio("pipeline", filename)
+        return minio_client.objects[transcript_name]
+
+    return transcribe, transcribed
+
+
+def test_transcribe_audio_cache_hit(transcription):
+    """Audio files of a same content should be transcribed once."""
+    transcribe, transcribed = transcription
+
+    assert transcribe(FakeMinio("etag"), "first.ogg") == "Bonjour"
+    assert transcribe(FakeMinio("etag"), "copy.ogg") == "Bonjour"
+
+    assert transcribed == ["first.ogg"]
+
+
+def test_transcribe_audio_cache_miss(transcription):
+    """Audio files of another content should be transcribed."""
+    transcribe, transcribed = transcription
+
+    transcribe(FakeMinio("etag"), "first.ogg")
+    transcribe(FakeMinio("other"), "second.ogg")
+
+    assert transcribed == ["first.ogg", "second.ogg"]
@@ -0,0 +1,320 @@
+"""Test the pipeline of tasks transcribing and summarizing a recording."""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("celery")
+
+from celery import chain
+
+from summary.core import celery_worker
+from summary.core.dedup import RELEASE_SCRIPT
+from summary.core.scheduling import MAX_PRIORITY, REMOVE_JOB_SCRIPT
+
+# 10 minutes and an hour of audio, at the default bitrate of the scheduling
+SHORT_SIZE = 8000 * 60 * 10
+LONG_SIZE = 8000 * 60 * 60
+
+EMAIL = "user@example.com"
+
+
+class FakeRedis:
+    """Redis client holding keys in memory, running the scripts of the pipeline."""
+
+    def __init__(self):
+        """Initialize the client without any key."""
+        self.values = {}
+
+    def pipeline(self):
+        """Return a pipeline running the commands immediately."""
+        return FakePipeline(self)
+
+    def incr(self, key):
+        """Increment a counter."""
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+    def eval(self, script, _numkeys, *args):
+        """Run the script releasing a task lock or uncounting a job."""
+        if script == RELEASE_SCRIPT:
+            key, value = args
+            if self.values.get(key) == value:
+                del self.values[key]
+                return 1
+            return 0
+
+        assert script == REMOVE_JOB_SCRIPT
+        jobs_key, marker_key, _ttl = args
+        if marker_key in self.values:
+            return None
+        self.values[marker_key] = 1
+        self.values[jobs_key] -= 1
+        if self.values[jobs_key] <= 0:
+            del self.values[jobs_key]
+        return self.values.get(jobs_key, 0)
+
+
+class FakePipeline:
+    """Pipeline of the fake Redis client."""
+
+    def __init__(self, client):
+        """Initialize the pipeline of a client."""
+        self.client = client
+        self.results = []
+
+    def incr(self, key):
+        """Increment a counter."""
+        self.results.append(self.client.incr(key))
+
+    def expire(self, _key, _ttl):
+        """Ignore the TTL of a key."""
+        self.results.append(True)
+
+    def execute(self):
+        """Return the results of the commands."""
+        return self.results
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """Run the tasks eagerly, recording their calls instead of processing files."""
+    redis_client = FakeRedis()
+    monkeypatch.setattr(celery_worker, "get_redis_client", lambda: redis_client)
+    monkeypatch.setattr(celery_worker.celery.conf, "task_always_eager", True)
+
+    calls = []
+
+    def stage(name, result):
+        def run(*args):
+            calls.append((name, args))
+            return result
+
+        monkeypatch.setattr(getattr(celery_worker, name), "run", run)
+
+    stage("transcribe_audio", "transcript.txt")
+    stage("transcribe_track", "segments.json")
+    stage("merge_tracks", "transcript.txt")
+    stage("summarize_transcript", "summary.txt")
+    stage("deliver_summary", None)
+
+    # Keep the pipelines sent, for their signatures to be checked
+    pipelines = []
+
+    def record_chain(*tasks):
+        pipelines.append(chain(*tasks))
+        return pipelines[-1]
+
+    monkeypatch.setattr(celery_worker, "chain", record_chain)
+
+    return redis_client, calls, pipelines
+
+
+def lock(redis_client, filename, sub, task_id):
+    """Take the lock of a task, as the API does before sending it."""
+    redis_client.values[celery_worker.get_task_lock_key(filename, sub)] = task_id
+
+
+def test_pipeline_mixed_audio(worker):
+    """A recording without tracks should be transcribed, summarized and delivered."""
+    redis_client, calls, pipelines = worker
+    lock(redis_client, "recording.ogg", "user", "task")
+
+    celery_worker.process_audio_transcribe_summarize(
+        "recording.ogg", EMAIL, "user", task_id="task", size=SHORT_SIZE
+    )
+
+    assert calls == [
+        ("transcribe_audio", ("task", "recording.ogg")),
+        ("summarize_transcript", ("transcript.txt", "task", EMAIL, "user")),
+        ("deliver_summary", ("summary.txt", "task", EMAIL, "user")),
+    ]
+    transcription, summarization, delivery = pipelines[0].tasks
+    assert transcription.task == celery_worker.transcribe_audio.name
+    assert transcription.options == {"queue": "transcription-short", "priority": 0}
+    assert summarization.options == {"queue": "summarization-short", "priority": 0}
+    assert delivery.options == {}
+    # The lock and the job slot are released once the pipeline ended
+    assert redis_client.values == {"summary:jobs:removed:task": 1}
+
+
+def test_pipeline_tracks(worker):
+    """Tracks should be transcribed in parallel, then merged before summarizing."""
+    redis_client, calls, pipelines = worker
+    tracks = [
+        {"filename": "alice.ogg", "speaker": "Alice", "offset": 0},
+        {"filename": "bob.ogg", "speaker": "Bob", "offset": 2.5},
+    ]
+
+    celery_worker.process_audio_transcribe_summarize(
+        "recording.ogg",
+        EMAIL,
+        "user",
+        task_id="task",
+        size=LONG_SIZE,
+        tracks=tracks,
+    )
+
+    assert calls[:3] == [
+        ("transcribe_track", ("task", tracks[0])),
+        ("transcribe_track", ("task", tracks[1])),
+        ("merge_tracks", (["segments.json", "segments.json"], "task")),
+    ]
+    assert [name for name, _args in calls[3:]] == [
+        "summarize_transcript",
+        "deliver_summary",
+    ]
+    # The stages following the chord are chained to its body
+    (transcription,) = pipelines[0].tasks
+    assert [task.options for task in transcription.tasks] == [
+        {"queue": "transcription-long", "priority": 0},
+        {"queue": "transcription-long", "priority": 0},
+    ]
+    merge, summarization, _delivery = transcription.body.tasks
+    assert merge.task == celery_worker.merge_tracks.name
+    assert merge.options == {"queue": "transcription-long", "priority": 0}
+    assert summarization.options == {"queue": "summarization-long", "priority": 0}
+
+
+def test_pipeline_failure_releases(worker, monkeypatch):
+    """A failed pipeline should release its lock and job slot, through its errback."""
+    redis_client, calls, _pipelines = worker
+    lock(redis_client, "recording.ogg", "user", "task")
+
+    def fail(*_args):
+        raise ValueError("Summarization failed")
+
+    monkeypatch.setattr(celery_worker.summarize_transcript, "run", fail)
+    released = []
+    release = celery_worker.release_task.run
+    monkeypatch.setattr(
+        celery_worker.release_task,
+        "run",
+        lambda *args: released.append(args) or release(*args),
+    )
+
+    with pytest.raises(ValueError, match="Summarization failed"):
+        celery_worker.process_audio_transcribe_summarize(
+            "recording.ogg", EMAIL, "user", task_id="task"
+        )
+
+    assert [name for name, _args in calls] == ["transcribe_audio"]
+    lock_key = celery_worker.get_task_lock_key("recording.ogg", "user")
+    # Tasks run eagerly are each linked to the release, which the errback of the
+    # failed summarization runs once more
+    assert released == [(lock_key, "task", "user"), (lock_key, "task", "user")]
+    assert redis_client.values == {"summary:jobs:removed:task": 1}
+
+
+@pytest.mark.parametrize(
+    ("user_jobs", "size", "queue", "priority"),
+    [
+        (0, SHORT_SIZE, "short", 0),
+        (2, SHORT_SIZE, "short", 2),
+        (1, LONG_SIZE, "long", 1),
+        (20, None, "long", MAX_PRIORITY),
+    ],
+)
+def test_pipeline_schedule_by_user_jobs(worker, user_jobs, size, queue, priority):
+    """Jobs should be routed by size, below the other jobs of their user."""
+    redis_client, _calls, pipelines = worker
+    if user_jobs:
+        redis_client.values["summary:jobs:user"] = user_jobs
+
+    celery_worker.process_audio_transcribe_summarize(
+        "recording.ogg", EMAIL, "user", task_id="task", size=size
+    )
+
+    transcription, summarization, _delivery = pipelines[0].tasks
+    assert transcription.options == {
+        "queue": f"transcription-{queue}",
+        "priority": priority,
+    }
+    assert summarization.options == {
+        "queue": f"summarization-{queue}",
+        "priority": priority,
+    }
+    # Only the job of the pipeline is uncounted once it ended
+    assert redis_client.values.get("summary:jobs:user", 0) == user_jobs
+
+
+def test_pipeline_failure_uncounts_job(worker, monkeypatch):
+    """A failed job should be uncounted once, for the next ones not to be delayed."""
+    redis_client, _calls, pipelines = worker
+    redis_client.values["summary:jobs:user"] = 1
+
+    def fail(*_args):
+        raise ValueError("Transcription failed")
+
+    transcribe = celery_worker.transcribe_audio.run
+    monkeypatch.setattr(celery_worker.transcribe_audio, "run", fail)
+    released = []
+    release = celery_worker.release_task.run
+    monkeypatch.setattr(
+        celery_worker.release_task,
+        "run",
+        lambda *args: released.append(args) or release(*args),
+    )
+
+    with pytest.raises(ValueError, match="Transcription failed"):
+        celery_worker.process_audio_transcribe_summarize(
+            "recording.ogg", EMAIL, "user", task_id="failed", size=SHORT_SIZE
+        )
+
+    # Uncounted by the errback of the transcription
+    lock_key = celery_worker.get_task_lock_key("recording.ogg", "user")
+    assert released == [(lock_key, "failed", "user")]
+    assert redis_client.values["summary:jobs:user"] == 1
+    assert redis_client.values["summary:jobs:removed:failed"] == 1
+
+    monkeypatch.setattr(celery_worker.transcribe_audio, "run", transcribe)
+    celery_worker.process_audio_transcribe_summarize(
+        "recording.ogg", EMAIL, "user", task_id="next", size=SHORT_SIZE
+    )
+    assert pipelines[1].tasks[0].options["priority"] == 1
+
+
+def test_pipeline_enqueue_failure_uncounts_job(worker, monkeypatch):
+    """A job failing to be enqueued should be uncounted."""
+    redis_client, _calls, _pipelines = worker
+
+    def fail(*_args, **_kwargs):
+        raise ConnectionError("Broker unavailable")
+
+    monkeypatch.setattr(
+        celery_worker, "chain", lambda *_tasks: SimpleNamespace(apply_async=fail)
+    )
+
+    with pytest.raises(ConnectionError, match="Broker unavailable"):
+        celery_worker.process_audio_transcribe_summarize(
+            "recording.ogg", EMAIL, "user", task_id="task", size=SHORT_SIZE
+        )
+
+    assert "summary:jobs:user" not in redis_client.values
+
+
+def test_compat_task_default_schedule(worker):
+    """Messages of the former task should start a pipeline routed as a long job."""
+    _redis_client, calls, pipelines = worker
+
+    celery_worker.process_audio_transcribe_summarize_task.delay(
+        "recording.ogg", EMAIL, "user"
+    )
+
+    assert [name for name, _args in calls] == [
+        "transcribe_audio",
+        "summarize_transcript",
+        "deliver_summary",
+    ]
+    transcription, summarization, _delivery = pipelines[0].tasks
+    assert transcription.options["queue"] == "transcription-long"
+    assert summarization.options["queue"] == "summarization-long"
+
+
+def test_stage_default_queues():
+    """Stages sent without a schedule should go to queues consumed by the workers."""
+    assert celery_worker.transcribe_audio.queue == "transcription-short"
+    assert celery_worker.transcribe_track.queue == "transcription-short"
+    assert celery_worker.merge_tracks.queue == "transcription-short"
+    assert celery_worker.summarize_transcript.queue == "summarization-short"
+    assert celery_worker.deliver_summary.queue == "delivery"
@@ -0,0 +1,66 @@
+"""Test the clients shared by the tasks of a process."""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("minio")
+
+from summary.core import clients
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """Configure the clients, without connecting to any service."""
+    settings = SimpleNamespace(
+        aws_s3_endpoint_url="minio:9000",
+        aws_s3_access_key_id="access",
+        aws_s3_secret_access_key="secret",  # noqa: S106
+        aws_s3_secure_access=False,
+        http_pool_maxsize=2,
+        http_keepalive_expiry=60,
+        http_connect_timeout=10,
+        redis_url="redis://redis/1",
+        cache_redis_url="redis://redis/1",
+        cache_ttl=60,
+        cache_enabled=True,
+        openai_api_key="key",
+        openai_base_url="http://openai/v1",
+        openai_asr_model="whisper-1",
+        openai_llm_requests_per_minute=0,
+        openai_llm_tokens_per_minute=0,
+        openai_asr_requests_per_minute=0,
+        openai_rate_limit_max_wait=1,
+        transcription_engine="openai",
+    )
+    monkeypatch.setattr(clients, "get_settings", lambda: settings)
+    clients.close_clients()
+    yield settings
+    clients.close_clients()
+
+
+def test_get_client_lazily(settings):
+    """Test a client is created on first use only, without the unrelated ones."""
+    minio_client = clients.get_minio_client()
+
+    assert set(clients._clients) == {"minio"}
+    assert clients.get_minio_client() is minio_client
+
+
+def test_get_client_dependencies(settings):
+    """Test a client is created along with the clients it depends on."""
+    engine = clients.get_transcription_engine()
+
+    assert set(clients._clients) == {"redis", "openai", "transcription"}
+    assert engine.client is clients.get_openai_client()
+
+
+def test_get_cache_shared_redis(settings):
+    """Test the cache shares the Redis client, unless it has a Redis of its own."""
+    assert clients.get_cache().client is clients.get_redis_client()
+
+    clients.close_clients()
+    settings.cache_redis_url = "redis://cache/0"
+
+    assert clients.get_cache().client is not clients.get_redis_client()
@@ -0,0 +1,126 @@
+"""Test the deduplication of tasks created for a same file and user."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi.testclient import TestClient
+
+from summary.api.route import tasks
+from summary.core.dedup import (
+    acquire_task_lock,
+    get_redis,
+    get_task_lock_key,
+    release_task_lock_async,
+)
+from summary.main import app
+
+
+class FakeAsyncRedis:
+    """Asynchronous Redis client holding keys in memory, without their TTL."""
+
+    def __init__(self):
+        """Initialize the client without any key."""
+        self.values = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        """Set a key, only if it does not exist with `nx`."""
+        if nx and key in self.values:
+            return None
+        self.values[key] = value.encode()
+        return True
+
+    async def get(self, key):
+        """Return the value of a key, or None."""
+        return self.values.get(key)
+
+    async def eval(self, _script, _numkeys, key, value):
+        """Run the release script, deleting a key holding the value."""
+        if self.values.get(key) == value.encode():
+            del self.values[key]
+            return 1
+        return 0
+
+
+def test_get_task_lock_key():
+    """Keys should identify the pair of file and user."""
+    key = get_task_lock_key("recording.ogg", "user")
+
+    assert key == get_task_lock_key("recording.ogg", "user")
+    assert key != get_task_lock_key("recording.ogg", "other")
+    assert get_task_lock_key("a", "bc") != get_task_lock_key("ab", "c")
+
+
+def test_task_lock_held_by_first_task():
+    """Later tasks should get the id of the task holding the lock, until released."""
+    client = FakeAsyncRedis()
+
+    async def scenario():
+        assert await acquire_task_lock(client, "lock", "first", ttl=60) is None
+        assert await acquire_task_lock(client, "lock", "second", ttl=60) == "first"
+        # Only the task holding the lock releases it
+        assert not await release_task_lock_async(client, "lock", "second")
+        assert await release_task_lock_async(client, "lock", "first")
+        assert await acquire_task_lock(client, "lock", "second", ttl=60) is None
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Call the API with an in-memory Redis, recording the pipelines started."""
+    client = FakeAsyncRedis()
+    app.dependency_overrides[get_redis] = lambda: client
+
+    async def get_object_size(_settings, _filename):
+        return 1024
+
+    started = []
+    monkeypatch.setattr(tasks, "get_object_size", get_object_size)
+    monkeypatch.setattr(
+        tasks,
+        "process_audio_transcribe_summarize",
+        lambda *args, **kwargs: started.append(kwargs["task_id"]),
+    )
+
+    yield TestClient(app, raise_server_exceptions=False), client, started
+    app.dependency_overrides.clear()
+
+
+def create_task(test_client, filename="recording.ogg", sub="user"):
+    """Create a task for a file and user, through the API."""
+    return test_client.post(
+        "/api/v1/tasks/",
+        json={"filename": filename, "email": "user@example.com", "sub": sub},
+        headers={"Authorization": "Bearer token"},
+    )
+
+
+def test_create_task_duplicate(api):
+    """Tasks of a same file and user should be created once, until released."""
+    test_client, _client, started = api
+
+    first = create_task(test_client).json()
+    duplicate = create_task(test_client).json()
+    other = create_task(test_client, sub="other").json()
+
+    assert first["message"] == "Task created"
+    assert duplicate == {"id": first["id"], "message": "Task already exists"}
+    assert other["message"] == "Task created"
+    assert started == [first["id"], other["id"]]
+
+
+def test_create_task_enqueue_failure(api, monkeypatch):
+    """The lock of a task failing to be enqueued should be released."""
+    test_client, client, started = api
+
+    def fail(*_args, **_kwargs):
+        raise ConnectionError("Broker unavailable")
+
+    monkeypatch.setattr(tasks, "process_audio_transcribe_summarize", fail)
+
+    assert create_task(test_client).status_code == 500
+    assert client.values == {}
+    assert started == []
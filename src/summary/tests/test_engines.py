@@ -0,0 +1,116 @@
+"""Test the transcription engines and their selection."""
+
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from summary.core.engines import (
+    LOCAL,
+    OPENAI,
+    LocalEngine,
+    OpenAIEngine,
+    create_transcription_engine,
+)
+
+
+class FakeASRClient:
+    """OpenAI client answering transcriptions with fixed segments."""
+
+    def __init__(self, segments=None):
+        """Initialize the client with the segments of its transcriptions."""
+        self.calls = []
+        self.segments = segments
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        """Record a transcription, and answer it."""
+        self.calls.append(kwargs)
+        if "response_format" not in kwargs:
+            return SimpleNamespace(text="hello world")
+        return SimpleNamespace(
+            text="hello world",
+            segments=[
+                SimpleNamespace(start=start, end=end, text=text)
+                for start, end, text in self.segments
+            ],
+        )
+
+
+def get_settings(engine):
+    """Return the settings of the engines, selecting one of them."""
+    return SimpleNamespace(
+        transcription_engine=engine,
+        openai_asr_model="whisper-1",
+        local_asr_model="small",
+        local_asr_compute_type="int8",
+        local_asr_cpu_threads=2,
+        transcription_max_workers=3,
+        local_asr_batch_size=4,
+    )
+
+
+def test_openai_engine_text():
+    """Test the API is asked for text only, without timestamps."""
+    client = FakeASRClient()
+    file = io.BytesIO(b"audio")
+
+    text, segments = OpenAIEngine(client, "whisper-1").transcribe(
+        file, "chunk.ogg", timestamps=False
+    )
+
+    assert (text, segments) == ("hello world", None)
+    assert client.calls == [
+        {"model": "whisper-1", "file": ("chunk.ogg", file, "audio/ogg")}
+    ]
+
+
+def test_openai_engine_segments():
+    """Test timed segments are asked for, and returned as tuples."""
+    client = FakeASRClient([(0.0, 1.5, " hello"), (1.5, 2.0, " world")])
+
+    text, segments = OpenAIEngine(client, "whisper-1").transcribe(
+        io.BytesIO(b"audio"), "chunk.ogg", timestamps=True
+    )
+
+    assert client.calls[0]["response_format"] == "verbose_json"
+    assert text == "hello world"
+    assert segments == [(0.0, 1.5, " hello"), (1.5, 2.0, " world")]
+
+
+def test_openai_engine_no_segments():
+    """Test an answer without segments returns none."""
+    client = FakeASRClient([])
+
+    _text, segments = OpenAIEngine(client, "whisper-1").transcribe(
+        io.BytesIO(b"audio"), "chunk.ogg", timestamps=True
+    )
+
+    assert segments is None
+
+
+def test_create_transcription_engine_openai():
+    """Test the OpenAI engine uses the client and model of the settings."""
+    client = FakeASRClient()
+
+    engine = create_transcription_engine(get_settings(OPENAI), client)
+
+    assert isinstance(engine, OpenAIEngine)
+    assert engine.client is client
+    assert engine.name == "openai:whisper-1"
+
+
+def test_create_transcription_engine_local():
+    """Test the local engine is configured without loading its model."""
+    engine = create_transcription_engine(get_settings(LOCAL), None)
+
+    assert isinstance(engine, LocalEngine)
+    assert engine.name == "local:small:int8"
+    assert (engine.cpu_threads, engine.workers, engine.batch_size) == (2, 3, 4)
+    assert engine._pipeline is None
+
+
+def test_create_transcription_engine_unknown():
+    """Test an unknown engine is refused."""
+    with pytest.raises(ValueError, match="Unknown transcription engine 'gpu'"):
+        create_transcription_engine(get_settings("gpu"), None)
@@ -0,0 +1,104 @@
+"""Test the trimming of silences out of audio chunks."""
+
+import io
+
+import numpy as np
+import pytest
+
+from summary.core.audio import AudioChunk
+from summary.core.preprocessing import (
+    PreprocessingOptions,
+    decode,
+    detect_speech,
+    encode,
+    preprocess_chunk,
+)
+
+SAMPLE_RATE = 16000
+OPTIONS = PreprocessingOptions(sample_rate=SAMPLE_RATE, padding=0)
+
+
+def build_audio(*stretches):
+    """Return samples of stretches of silence or tone, given by duration."""
+    blocks = []
+    for kind, duration in stretches:
+        times = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+        if kind == "tone":
+            blocks.append(0.5 * np.sin(2 * np.pi * 440 * times))
+        else:
+            blocks.append(np.zeros(len(times)))
+    return np.concatenate(blocks).astype(np.float32)
+
+
+def to_seconds(ranges):
+    """Return sample ranges in seconds, rounded to the energy frames."""
+    return [
+        (round(start / SAMPLE_RATE, 1), round(end / SAMPLE_RATE, 1))
+        for start, end in ranges
+    ]
+
+
+def test_detect_speech_long_silences():
+    """Speech should be split by silences longer than the minimum."""
+    samples = build_audio(("silence", 1), ("tone", 2), ("silence", 3), ("tone", 1))
+
+    ranges = detect_speech(samples, SAMPLE_RATE, OPTIONS)
+
+    assert to_seconds(ranges) == [(1, 3), (6, 7)]
+
+
+def test_detect_speech_short_silences():
+    """Silences shorter than the minimum should be kept within speech."""
+    samples = build_audio(("tone", 1), ("silence", 0.5), ("tone", 1))
+
+    ranges = detect_speech(samples, SAMPLE_RATE, OPTIONS)
+
+    assert to_seconds(ranges) == [(0, 2.5)]
+
+
+def test_detect_speech_padding():
+    """Speech should be padded, within the bounds of the audio."""
+    samples = build_audio(("tone", 1), ("silence", 3), ("tone", 1))
+    options = PreprocessingOptions(sample_rate=SAMPLE_RATE, padding=0.3)
+
+    ranges = detect_speech(samples, SAMPLE_RATE, options)
+
+    assert to_seconds(ranges) == [(0, 1.3), (3.7, 5)]
+
+
+@pytest.mark.parametrize("duration", [0, 2])
+def test_detect_speech_silence(duration):
+    """Silent or empty audio should hold no speech."""
+    samples = build_audio(("silence", duration))
+
+    assert detect_speech(samples, SAMPLE_RATE, OPTIONS) == []
+
+
+def test_preprocess_chunk():
+    """Chunks should be trimmed, with a map of their timestamps to the original."""
+    samples = build_audio(("tone", 1), ("silence", 4), ("tone", 1))
+    original = encode(samples, SAMPLE_RATE, OPTIONS)
+    chunk = AudioChunk(index=3, start=60, end=66, data=original)
+
+    trimmed = preprocess_chunk(chunk, OPTIONS)
+
+    assert original.closed
+    assert (trimmed.index, trimmed.start, trimmed.end) == (3, 60, 66)
+    assert trimmed.size > 0
+    # Encoding delays the audio, speech being detected a frame late at most
+    assert trimmed.timestamp_map.to_original(0.5) == pytest.approx(0.5, abs=0.05)
+    assert trimmed.timestamp_map.to_original(1.5) == pytest.approx(5.5, abs=0.05)
+    duration = len(decode(trimmed.data, SAMPLE_RATE)) / SAMPLE_RATE
+    assert duration == pytest.approx(2, abs=0.1)
+
+
+def test_preprocess_chunk_silent():
+    """Silent chunks should be returned empty."""
+    original = encode(build_audio(("silence", 2)), SAMPLE_RATE, OPTIONS)
+    chunk = AudioChunk(index=0, start=0, end=2, data=original)
+
+    trimmed = preprocess_chunk(chunk, OPTIONS)
+
+    assert trimmed.size == 0
+    assert trimmed.timestamp_map.spans == []
+    assert isinstance(trimmed.data, io.BytesIO)
@@ -0,0 +1,133 @@
+"""Test the tracking of the progress of summary pipelines."""
+
+import pytest
+
+from summary.core.progress import (
+    DONE,
+    FAILED,
+    PENDING,
+    RETRYING,
+    RUNNING,
+    ProgressTracker,
+    get_progress_key,
+    is_finished,
+    parse_progress,
+)
+
+
+class FakeRedis:
+    """Redis client holding hashes in memory, with pipelines run at once."""
+
+    def __init__(self):
+        """Initialize the client without any hash."""
+        self.hashes = {}
+        self.published = []
+        self.commands = []
+
+    def pipeline(self):
+        """Return a pipeline, run by `execute`."""
+        self.commands = []
+        return self
+
+    def hset(self, key, mapping):
+        """Queue fields to be set."""
+        self.commands.append(lambda: self._set(key, mapping))
+
+    def hincrbyfloat(self, key, field, amount):
+        """Queue a field to be incremented by a float."""
+        self.commands.append(lambda: self._increment(key, field, amount, float))
+
+    def hincrby(self, key, field, amount):
+        """Queue a field to be incremented by an integer."""
+        self.commands.append(lambda: self._increment(key, field, amount, int))
+
+    def expire(self, _key, _ttl):
+        """Queue an expiry, which is ignored."""
+        self.commands.append(lambda: True)
+
+    def execute(self):
+        """Run the queued commands, and return their results."""
+        return [command() for command in self.commands]
+
+    def publish(self, channel, message):
+        """Record a published message."""
+        self.published.append((channel, message))
+
+    def hgetall(self, key):
+        """Return the fields of a hash, encoded like Redis returns them."""
+        return {
+            field.encode(): str(value).encode()
+            for field, value in self.hashes.get(key, {}).items()
+        }
+
+    def _set(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def _increment(self, key, field, amount, kind):
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = kind(fields.get(field, 0)) + amount
+        return fields[field]
+
+
+def get_progress(client, pipeline_id="pipeline"):
+    """Return the parsed progress of a pipeline."""
+    return parse_progress(client.hgetall(get_progress_key(pipeline_id)))
+
+
+def test_progress_unknown():
+    """Pipelines without progress should have none."""
+    assert parse_progress({}) is None
+    assert not is_finished(None)
+
+
+def test_progress_tracker_stages():
+    """Stages should be tracked with their metrics, and versions notified."""
+    client = FakeRedis()
+    tracker = ProgressTracker(client, "pipeline", ttl=60)
+
+    with tracker.stage("download", totals={"bytes": 100}):
+        tracker.advance("download", bytes=60)
+        tracker.advance("download", bytes=40)
+    tracker.start("transcription")
+
+    progress = get_progress(client)
+    assert progress["version"] == 5
+    assert progress["stage"] == "transcription"
+    download = progress["stages"]["download"]
+    assert download["status"] == DONE
+    assert download["bytes"] == download["total_bytes"] == 100
+    assert download["ended_at"] >= download["started_at"]
+    assert progress["stages"]["transcription"]["status"] == RUNNING
+    assert progress["stages"]["delivery"] == {"status": PENDING}
+    assert [message for _channel, message in client.published] == [1, 2, 3, 4, 5]
+    assert not is_finished(progress)
+
+
+@pytest.mark.parametrize(
+    ("error", "status"), [(ConnectionError("down"), RETRYING), (KeyError(), FAILED)]
+)
+def test_progress_tracker_errors(error, status):
+    """Stages failing should be marked retrying or failed, with their error."""
+    client = FakeRedis()
+    tracker = ProgressTracker(client, "pipeline", ttl=60)
+
+    with pytest.raises(type(error)), tracker.stage("summarization", retry_on=OSError):
+        raise error
+
+    progress = get_progress(client)
+    assert progress["stages"]["summarization"]["status"] == status
+    assert progress["stages"]["summarization"]["error"] == repr(error)
+    assert is_finished(progress) == (status == FAILED)
+
+
+def test_progress_finished_once_delivered():
+    """Pipelines should be finished once their last stage is done."""
+    client = FakeRedis()
+    tracker = ProgressTracker(client, "pipeline", ttl=60)
+
+    for stage in ("download", "transcription", "summarization", "delivery"):
+        tracker.start(stage)
+        tracker.end(stage)
+
+    assert is_finished(get_progress(client))
@@ -0,0 +1,149 @@
+"""Test the rate limiting of requests to the OpenAI-compliant API."""
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from summary.core import ratelimit  # noqa: E402
+from summary.core.ratelimit import (  # noqa: E402
+    DEFAULT_COMPLETION_TOKENS,
+    Limit,
+    RateLimiter,
+    estimate_request_tokens,
+    get_retry_delay,
+    parse_duration,
+)
+
+
+class FakeScriptsRedis:
+    """Redis client whose scripts answer the given waits, in milliseconds."""
+
+    def __init__(self, waits):
+        """Initialize the client with the successive answers of the scripts."""
+        self.waits = list(waits)
+        self.calls = []
+
+    def register_script(self, script):
+        """Return a script recording its calls."""
+
+        def run(keys, args):
+            self.calls.append((script, keys, args))
+            return self.waits.pop(0) if script == ratelimit.ACQUIRE_SCRIPT else 0
+
+        return run
+
+
+def test_limit_rate():
+    """Buckets should be refilled at their capacity per period, per millisecond."""
+    assert Limit(capacity=600).rate == 0.01
+    assert Limit(capacity=10, period=1).rate == 0.01
+
+
+@pytest.mark.parametrize(
+    ("value", "seconds"),
+    [("1s", 1), ("6m0s", 360), ("20ms", 0.02), ("1h2m3.5s", 3723.5), ("2.5", 2.5)],
+)
+def test_parse_duration(value, seconds):
+    """Durations of rate limit headers should be parsed into seconds."""
+    assert parse_duration(value) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize("value", [None, "", "soon"])
+def test_parse_duration_invalid(value):
+    """Invalid durations should be ignored."""
+    assert parse_duration(value) is None
+
+
+@pytest.mark.parametrize(
+    ("headers", "delay"),
+    [
+        ({"retry-after-ms": "250"}, 0.25),
+        ({"retry-after": "2"}, 2),
+        (
+            {
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-reset-requests": "1s",
+                "x-ratelimit-remaining-tokens": "0",
+                "x-ratelimit-reset-tokens": "6s",
+            },
+            6,
+        ),
+        (
+            {
+                "x-ratelimit-remaining-requests": "5",
+                "x-ratelimit-reset-requests": "1s",
+            },
+            None,
+        ),
+        ({}, None),
+    ],
+)
+def test_get_retry_delay(headers, delay):
+    """Pauses should follow retry headers, or the reset of exhausted limits."""
+    assert get_retry_delay(headers) == delay
+
+
+def test_estimate_request_tokens():
+    """Tokens should count the prompt and the expected completion."""
+    body = {"messages": [{"role": "user", "content": "a" * 400}], "max_tokens": 50}
+    request = httpx.Request("POST", "http://api/v1/chat/completions", json=body)
+
+    assert estimate_request_tokens(request) == (
+        ratelimit.estimate_tokens("a" * 400) + 50
+    )
+
+    del body["max_tokens"]
+    request = httpx.Request("POST", "http://api/v1/chat/completions", json=body)
+    assert estimate_request_tokens(request) == (
+        ratelimit.estimate_tokens("a" * 400) + DEFAULT_COMPLETION_TOKENS
+    )
+
+    request = httpx.Request("POST", "http://api/v1/audio", content=b"\xff")
+    assert estimate_request_tokens(request) == 0
+
+
+def test_rate_limiter_acquire(monkeypatch):
+    """Amounts should be taken from their buckets, waiting for them to refill."""
+    sleeps = []
+    monkeypatch.setattr(ratelimit.time, "sleep", sleeps.append)
+    monkeypatch.setattr(ratelimit.random, "uniform", lambda low, _high: low)
+    client = FakeScriptsRedis(waits=[1500, 0])
+    limiter = RateLimiter(
+        client, "chat", {"requests": Limit(600), "tokens": Limit(60000)}
+    )
+
+    limiter.acquire(requests=1, tokens=200)
+
+    assert sleeps == [1.5]
+    _script, keys, args = client.calls[-1]
+    assert keys == [
+        "summary:ratelimit:chat:paused",
+        "summary:ratelimit:chat:requests",
+        "summary:ratelimit:chat:tokens",
+    ]
+    assert args == [600, 0.01, 1, 60000, 1.0, 200]
+
+
+def test_rate_limiter_acquire_skips_zero_amounts():
+    """Buckets of units not requested should be left untouched."""
+    client = FakeScriptsRedis(waits=[0])
+    limiter = RateLimiter(client, "audio", {"requests": Limit(60), "tokens": Limit(1)})
+
+    assert limiter.acquire(requests=1, tokens=0) == pytest.approx(0, abs=0.1)
+    _script, keys, args = client.calls[-1]
+    assert keys == [
+        "summary:ratelimit:audio:paused",
+        "summary:ratelimit:audio:requests",
+    ]
+    assert args == [60, 0.001, 1]
+
+
+def test_rate_limiter_pause():
+    """Pauses should be shared through Redis, in milliseconds."""
+    client = FakeScriptsRedis(waits=[])
+    limiter = RateLimiter(client, "chat", {"requests": Limit(60)})
+
+    limiter.pause(0.0001)
+    limiter.pause(2.5)
+
+    assert [args for _script, _keys, args in client.calls] == [[1], [2500]]
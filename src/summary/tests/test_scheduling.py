@@ -0,0 +1,70 @@
+"""Test the scheduling of jobs by size and by their user's other jobs."""
+
+import pytest
+
+from summary.core.scheduling import (
+    LONG,
+    MAX_PRIORITY,
+    REMOVE_JOB_SCRIPT,
+    SHORT,
+    Schedule,
+    estimate_duration,
+    get_schedule,
+    remove_user_job,
+)
+
+BITRATE = 64000
+
+
+class FakeScriptsRedis:
+    """Record the scripts run by the job counting."""
+
+    def __init__(self):
+        """Start without any script run."""
+        self.calls = []
+
+    def eval(self, script, numkeys, *args):
+        """Record a script run."""
+        self.calls.append((script, numkeys, args))
+
+
+def test_estimate_duration():
+    """Durations should be estimated from the size and the bitrate."""
+    assert estimate_duration(8000 * 60, BITRATE) == 60
+
+
+@pytest.mark.parametrize(
+    ("size", "expected"),
+    [(8000 * 600, SHORT), (8000 * 601, LONG), (None, LONG)],
+)
+def test_get_schedule_size(size, expected):
+    """Recordings up to the short duration should go to the short queue."""
+    schedule = get_schedule(size, 1, bitrate=BITRATE, short_max_duration=600)
+
+    assert schedule == Schedule(size=expected, priority=0)
+
+
+@pytest.mark.parametrize(
+    ("user_jobs", "priority"),
+    [(0, 0), (1, 0), (2, 1), (5, 4), (100, MAX_PRIORITY)],
+)
+def test_get_schedule_priority(user_jobs, priority):
+    """Jobs should be deprioritized by the other jobs of their user, up to the max."""
+    schedule = get_schedule(0, user_jobs, bitrate=BITRATE, short_max_duration=600)
+
+    assert schedule.priority == priority
+
+
+def test_remove_user_job_once():
+    """Jobs should be uncounted behind a marker of their own, living the TTL."""
+    client = FakeScriptsRedis()
+
+    remove_user_job(client, "user", "task", 60)
+
+    assert client.calls == [
+        (
+            REMOVE_JOB_SCRIPT,
+            2,
+            ("summary:jobs:user", "summary:jobs:removed:task", 60),
+        )
+    ]
@@ -0,0 +1,150 @@
+"""Test the map-reduce summarization of transcripts."""
+
+import threading
+from types import SimpleNamespace
+
+from summary.core.config import Settings
+from summary.core.summarization import (
+    Summarizer,
+    _group_notes,
+    estimate_tokens,
+    get_completion_options,
+    split_transcript,
+)
+
+REQUIRED_SETTINGS = {
+    "app_api_token": "token",
+    "aws_storage_bucket_name": "bucket",
+    "aws_s3_endpoint_url": "minio:9000",
+    "aws_s3_access_key_id": "key",
+    "aws_s3_secret_access_key": "secret",
+    "openai_api_key": "key",
+    "webhook_api_token": "token",
+    "webhook_url": "https://meet/webhook",
+}
+
+
+class FakeChatClient:
+    """OpenAI client answering chat completions with the number of the call."""
+
+    def __init__(self):
+        """Initialize the client without any call."""
+        self.calls = []
+        self.lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        """Record a chat completion, and answer it."""
+        with self.lock:
+            self.calls.append(kwargs)
+            content = f"note {len(self.calls)}"
+
+        if kwargs.get("stream"):
+            return iter(
+                SimpleNamespace(
+                    choices=[SimpleNamespace(delta=SimpleNamespace(content=c))]
+                )
+                for c in ("note", " streamed")
+            )
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(completion_tokens=10),
+        )
+
+
+def test_split_transcript_between_sentences():
+    """Segments should fit the token budget, split between sentences."""
+    transcript = " ".join(f"Sentence number {index} is here." for index in range(50))
+
+    segments = split_transcript(transcript, max_tokens=40)
+
+    assert len(segments) > 1
+    assert all(estimate_tokens(segment) <= 40 for segment in segments)
+    assert all(segment.endswith(".") for segment in segments)
+    assert " ".join(segments) == transcript
+
+
+def test_split_transcript_long_sentence():
+    """Sentences longer than the budget should be split between words."""
+    transcript = " ".join(["word"] * 100)
+
+    segments = split_transcript(transcript, max_tokens=10)
+
+    assert all(estimate_tokens(segment) <= 10 for segment in segments)
+    assert " ".join(segments) == transcript
+
+
+def test_group_notes_keeps_order_and_pairs():
+    """Notes should be grouped in order, at least two per group."""
+    notes = ["a" * 40, "b" * 40, "c" * 40, "d" * 40, "e" * 40]
+
+    groups = _group_notes(notes, max_tokens=15)
+
+    assert [note for group in groups for note in group] == notes
+    assert all(len(group) >= 2 for group in groups[:-1])
+    assert len(groups) < len(notes)
+
+
+def test_get_completion_options_unset_by_default():
+    """No sampling option should be sent unless set, for the API defaults."""
+    settings = Settings(_env_file=None, **REQUIRED_SETTINGS)
+
+    assert get_completion_options(settings) == {}
+
+
+def test_get_completion_options_set():
+    """Sampling options should be sent once set."""
+    settings = Settings(
+        _env_file=None, summary_temperature=0, summary_seed=0, **REQUIRED_SETTINGS
+    )
+
+    assert get_completion_options(settings) == {"temperature": 0, "seed": 0}
+
+
+def test_summarizer_single_completion():
+    """Short transcripts should be summarized with a single completion."""
+    client = FakeChatClient()
+    tokens = []
+    summarizer = Summarizer(
+        client, model="llm", max_tokens=1000, max_workers=2, on_completion=tokens.append
+    )
+
+    assert summarizer.summarize("A short meeting.") == "note 1"
+    assert len(client.calls) == 1
+    # The API defaults are used unless sampling options are set
+    assert set(client.calls[0]) == {"model", "messages"}
+    assert tokens == [10]
+
+
+def test_summarizer_map_reduce():
+    """Long transcripts should be summarized by segments, then merged."""
+    client = FakeChatClient()
+    summarizer = Summarizer(
+        client,
+        model="llm",
+        max_tokens=50,
+        max_workers=4,
+        completion_options={"temperature": 0, "seed": 0},
+    )
+    transcript = " ".join(f"Sentence number {index} is here." for index in range(50))
+
+    summary = summarizer.summarize(transcript)
+
+    segments = split_transcript(transcript, max_tokens=50)
+    assert summary == f"note {len(client.calls)}"
+    assert len(client.calls) > len(segments)
+    assert all(call["temperature"] == 0 for call in client.calls)
+    assert all(call["seed"] == 0 for call in client.calls)
+
+
+def test_summarizer_streamed():
+    """The final completion should be streamed to the partial callback."""
+    client = FakeChatClient()
+    summarizer = Summarizer(client, model="llm", max_tokens=1000, max_workers=1)
+    partials = []
+
+    assert summarizer.summarize("A short meeting.", on_partial=partials.append) == (
+        "note streamed"
+    )
+    assert partials == ["note", "note streamed"]
+    assert client.calls[0]["stream"] is True
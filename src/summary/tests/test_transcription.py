@@ -0,0 +1,120 @@
+"""Test the stitching of chunk transcripts."""
+
+from summary.core.transcription import (
+    ChunkTranscript,
+    merge_speaker_segments,
+    stitch_segments,
+    stitch_transcripts,
+)
+
+
+def test_stitch_transcripts_segments():
+    """Segments of overlaps should be kept by the chunk holding their midpoint."""
+    transcripts = [
+        ChunkTranscript(
+            index=1,
+            start=8,
+            end=18,
+            text="",
+            segments=[(0, 0.8, "two"), (1.2, 5, "three"), (5, 10, "four")],
+        ),
+        ChunkTranscript(
+            index=0,
+            start=0,
+            end=10,
+            text="",
+            segments=[(0, 4, " one "), (4, 8.8, "two"), (9.2, 10, "thr")],
+        ),
+    ]
+
+    assert stitch_transcripts(transcripts, overlap=2) == "one two three four"
+
+
+def test_stitch_transcripts_text_overlap():
+    """Words of overlaps should be deduplicated when transcripts are not timed."""
+    transcripts = [
+        ChunkTranscript(
+            index=0,
+            start=0,
+            end=10,
+            text="Hello everyone, welcome to the weekly meeting of the",
+        ),
+        ChunkTranscript(
+            index=1,
+            start=8,
+            end=18,
+            text="to the weekly meeting of the team. Let's start.",
+        ),
+    ]
+
+    assert stitch_transcripts(transcripts, overlap=2) == (
+        "Hello everyone, welcome to the weekly meeting of the team. Let's start."
+    )
+
+
+def test_stitch_transcripts_text_overlap_case_and_punctuation():
+    """Words of overlaps should match whatever their case and punctuation."""
+    transcripts = [
+        ChunkTranscript(index=0, start=0, end=10, text="we agreed on the budget. And"),
+        ChunkTranscript(index=1, start=8, end=18, text="On the budget, and then"),
+    ]
+
+    assert stitch_transcripts(transcripts, overlap=2) == (
+        "we agreed On the budget, and then"
+    )
+
+
+def test_stitch_transcripts_text_no_overlap():
+    """Transcripts sharing too few words should be joined as is."""
+    transcripts = [
+        ChunkTranscript(index=0, start=0, end=10, text="the end of the"),
+        ChunkTranscript(index=1, start=10, end=20, text="the start"),
+    ]
+
+    assert stitch_transcripts(transcripts, overlap=2) == "the end of the the start"
+    assert stitch_transcripts(transcripts, overlap=0) == "the end of the the start"
+
+
+def test_stitch_segments():
+    """Segments should be timed relatively to the recording, without duplicates."""
+    transcripts = [
+        ChunkTranscript(
+            index=0, start=0, end=10, text="", segments=[(1, 4, "a"), (9, 10, "b")]
+        ),
+        ChunkTranscript(
+            index=1, start=8, end=18, text="", segments=[(1, 2, "b"), (3, 4, "c")]
+        ),
+    ]
+
+    assert stitch_segments(transcripts, overlap=2) == [
+        (1, 4, "a"),
+        (9, 10, "b"),
+        (11, 12, "c"),
+    ]
+
+
+def test_stitch_segments_text_overlap():
+    """Transcripts without segments should span their chunk, deduplicated."""
+    transcripts = [
+        ChunkTranscript(index=0, start=0, end=10, text="one two three four five"),
+        ChunkTranscript(index=1, start=8, end=18, text="three four five six"),
+    ]
+
+    assert stitch_segments(transcripts, overlap=2) == [
+        (0, 10, "one two"),
+        (8, 18, "three four five six"),
+    ]
+
+
+def test_merge_speaker_segments():
+    """Segments should be ordered in time, consecutive ones of a speaker joined."""
+    transcript = merge_speaker_segments(
+        [
+            ("Alice", [(0, 2, "Hello."), (2, 3, "How are you?"), (8, 9, "Great.")]),
+            ("Bob", [(4, 6, "Fine, thanks."), (20, 21, "Bye.")]),
+        ]
+    )
+
+    assert transcript == (
+        "Alice: Hello. How are you?\nBob: Fine, thanks.\nAlice: Great.\nBob: Bye."
+    )
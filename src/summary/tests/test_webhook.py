@@ -0,0 +1,223 @@
+"""Test the delivery of results to webhooks."""
+
+import asyncio
+import fnmatch
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from requests import ConnectionError as RequestsConnectionError
+
+from summary.core.webhook import (
+    LatencyHistogram,
+    ThrottledDelivery,
+    WebhookClient,
+    get_stats,
+    merge_snapshots,
+    save_stats,
+)
+
+
+class FakeResponse:
+    """Response of a delivery."""
+
+    def __init__(self, data):
+        """Initialize the response with the delivered data."""
+        self.data = data
+
+    def raise_for_status(self):
+        """Accept the response."""
+
+
+class FakeSession:
+    """Session answering deliveries, failing those of a payload."""
+
+    def __init__(self, failing, latency=0):
+        """Initialize the session with the payload of failing deliveries."""
+        self.failing = failing
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def post(self, url, json, timeout):
+        """Deliver a payload, or fail."""
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if json == self.failing:
+                raise RequestsConnectionError("refused")
+            return FakeResponse(json)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def get_client(session):
+    """Return a webhook client delivering over a fake session."""
+    client = WebhookClient(
+        SimpleNamespace(
+            webhook_timeout=1,
+            webhook_max_connections_per_host=2,
+            webhook_max_retries=0,
+            webhook_backoff_factor=0,
+            webhook_status_forcelist=[],
+            webhook_pool_connections=1,
+            webhook_api_token="token",  # noqa: S106
+        )
+    )
+    client.session = session
+    return client
+
+
+class RecordingClient:
+    """Webhook client recording its deliveries."""
+
+    def __init__(self):
+        """Initialize the client without any delivery."""
+        self.posts = []
+        self.delivered = threading.Event()
+
+    def post(self, url, data):
+        """Record a delivery."""
+        self.posts.append((url, data))
+        self.delivered.set()
+
+
+def test_latency_histogram_cumulative():
+    """Buckets should count the latencies up to their bound, cumulatively."""
+    histogram = LatencyHistogram(buckets=(0.1, 1))
+
+    for latency in (0.05, 0.1, 0.5, 2):
+        histogram.observe(latency)
+
+    assert histogram.snapshot() == {
+        "buckets": {"0.1": 2, "1": 3, "+Inf": 4},
+        "count": 4,
+        "sum": 2.65,
+    }
+
+
+def test_webhook_client_post_records_latencies():
+    """Deliveries should be timed by host, even failed ones."""
+    session = FakeSession(failing={"id": 1})
+    client = get_client(session)
+
+    assert client.post("http://webhook/results", {"id": 0}).data == {"id": 0}
+    with pytest.raises(RequestsConnectionError):
+        client.post("http://webhook/results", {"id": 1})
+    client.post("http://other/results", {"id": 2})
+
+    stats = client.stats()
+    assert stats["webhook"]["count"] == 2
+    assert stats["other"]["count"] == 1
+
+
+def test_webhook_client_post_many():
+    """Batched deliveries should be answered in order, failures in place."""
+    session = FakeSession(failing={"id": 2})
+    client = get_client(session)
+
+    responses = client.post_many(
+        "http://webhook/results", [{"id": index} for index in range(5)]
+    )
+
+    assert [getattr(response, "data", None) for response in responses] == [
+        {"id": 0},
+        {"id": 1},
+        None,
+        {"id": 3},
+        {"id": 4},
+    ]
+    assert isinstance(responses[2], RequestsConnectionError)
+    assert client.stats()["webhook"]["count"] == 5
+
+
+def test_webhook_client_post_many_per_host_cap():
+    """Batched deliveries should share the cap of deliveries in flight to a host."""
+    session = FakeSession(failing=None, latency=0.01)
+    client = get_client(session)
+    client.max_per_host = 1
+    payloads = [{"id": index} for index in range(6)]
+
+    # Another batch to the same host runs meanwhile, from another task
+    other = threading.Thread(
+        target=client.post_many, args=("http://webhook/other", payloads)
+    )
+    other.start()
+    client.post_many("http://webhook/results", payloads)
+    other.join()
+
+    assert session.max_in_flight == 1
+
+
+def test_merge_snapshots():
+    """Snapshots of several processes should be summed by bucket."""
+    first, second = LatencyHistogram(buckets=(1,)), LatencyHistogram(buckets=(1,))
+    first.observe(0.5)
+    second.observe(0.5)
+    second.observe(2)
+
+    assert merge_snapshots([first.snapshot(), second.snapshot()]) == {
+        "buckets": {"1": 2, "+Inf": 3},
+        "count": 3,
+        "sum": 3.0,
+    }
+
+
+def test_saved_stats_merged_across_workers():
+    """Stats saved by each worker process should be merged by host."""
+    values = {}
+    sync_client = SimpleNamespace(
+        set=lambda key, value, ex: values.__setitem__(key, value.encode())
+    )
+    histogram = LatencyHistogram(buckets=(1,))
+    histogram.observe(0.5)
+
+    save_stats(sync_client, "worker@a:1", {"webhook": histogram.snapshot()}, ttl=60)
+    save_stats(sync_client, "worker@b:1", {"webhook": histogram.snapshot()}, ttl=60)
+
+    async def scan_iter(match):
+        for key in list(values):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+    async def get(key):
+        return values.get(key)
+
+    stats = asyncio.run(get_stats(SimpleNamespace(scan_iter=scan_iter, get=get)))
+
+    assert stats == {
+        "webhook": {"buckets": {"1": 2, "+Inf": 2}, "count": 2, "sum": 1.0}
+    }
+
+
+def test_throttled_delivery_collapses_updates():
+    """Versions updated within the interval should collapse to the latest one."""
+    client = RecordingClient()
+    delivery = ThrottledDelivery(client, "http://webhook/results", interval=0.2)
+
+    for version in range(3):
+        delivery.update({"version": version})
+    assert client.delivered.wait(timeout=5)
+    delivery.close()
+
+    assert client.posts == [("http://webhook/results", {"version": 2})]
+
+
+def test_throttled_delivery_close_drops_pending():
+    """Closing should drop the version waiting for the interval, undelivered."""
+    client = RecordingClient()
+    delivery = ThrottledDelivery(client, "http://webhook/results", interval=0.1)
+
+    delivery.update({"version": 0})
+    assert client.delivered.wait(timeout=5)
+    # Waiting for the interval since the delivery of the former version
+    delivery.interval = 60
+    delivery.update({"version": 1})
+    delivery.close()
+
+    assert client.posts == [("http://webhook/results", {"version": 0})]